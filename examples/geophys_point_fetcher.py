@@ -16,7 +16,7 @@ from datetime import datetime
 from pprint import pformat
 import numpy as np
 
-from geophys_utils import NetCDFPointUtils
+from geophys_utils import NetCDFLineUtils
 
 # Setup logging handlers if required
 logger = logging.getLogger(__name__) # Get __main__ logger
@@ -117,7 +117,7 @@ class GeophysPointFetcher(object):
             try:
                 logger.info('Opening {}'.format(nc_path))
                 nc_dataset = netCDF4.Dataset(nc_path, 'r')
-                netcdf_line_utils = NetCDFPointUtils(nc_dataset)
+                netcdf_line_utils = NetCDFLineUtils(nc_dataset)
                 
                 # Skip processing this dataset if it doesn't contain any of the required variables
                 if variable_names and not (set(variable_names) & set(netcdf_line_utils.point_variables)):
@@ -128,8 +128,8 @@ class GeophysPointFetcher(object):
                     logger.info('Excluding points in tie-lines')
                     line_numbers = nc_dataset.variables['line'][nc_dataset.variables['flag_linetype'][:] == 2]
                     line_mask = np.zeros(shape=(netcdf_line_utils.point_count,), dtype=bool)
-                    for _line_number, single_line_mask in netcdf_line_utils.get_line_masks(line_numbers):
-                        line_mask = np.logical_or(line_mask, single_line_mask)
+                    for _line_number, point_indices in netcdf_line_utils.get_line_point_indices(line_numbers):
+                        line_mask[point_indices] = True
                 else:
                     line_mask = np.ones(shape=(netcdf_line_utils.point_count,), dtype=bool)
                 
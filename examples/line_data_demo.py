@@ -132,8 +132,8 @@ def dataset_point_generator(dataset_list,
                 print('Excluding tie-lines')
                 line_numbers = nc_dataset.variables['line'][nc_dataset.variables['flag_linetype'][:] == 2]
                 line_mask = np.zeros(shape=nc_dataset.variables[variable_name].shape, dtype=bool)
-                for _line_number, single_line_mask in netcdf_line_utils.get_line_masks(line_numbers):
-                    line_mask = np.logical_or(line_mask, single_line_mask)
+                for _line_number, point_indices in netcdf_line_utils.get_line_point_indices(line_numbers):
+                    line_mask[point_indices] = True
             else:
                 line_mask = np.ones(shape=nc_dataset.variables[variable_name].shape, dtype=bool)
             
@@ -16,7 +16,7 @@ import numpy as np
 from datetime import datetime
 from pprint import pformat
 
-from geophys_utils import NetCDFPointUtils
+from geophys_utils import NetCDFLineUtils
 
 # Setup logging handlers if required
 logger = logging.getLogger(__name__) # Get __main__ logger
@@ -133,7 +133,7 @@ class NearestGeophysPointFinder(object):
             try:
                 logger.info('Opening {}'.format(nc_path))
                 nc_dataset = netCDF4.Dataset(nc_path, 'r')
-                netcdf_line_utils = NetCDFPointUtils(nc_dataset)
+                netcdf_line_utils = NetCDFLineUtils(nc_dataset)
                 
                 # Skip processing this dataset if it doesn't contain any of the required variables
                 if variable_names and not (set(variable_names) & set(netcdf_line_utils.point_variables)):
@@ -144,27 +144,24 @@ class NearestGeophysPointFinder(object):
                     logger.info('Excluding points in tie-lines')
                     line_numbers = nc_dataset.variables['line'][nc_dataset.variables['flag_linetype'][:] == 2]
                     line_mask = np.zeros(shape=(netcdf_line_utils.point_count,), dtype=bool)
-                    for _line_number, single_line_mask in netcdf_line_utils.get_line_masks(line_numbers):
-                        line_mask = np.logical_or(line_mask, single_line_mask)
+                    for _line_number, point_indices in netcdf_line_utils.get_line_point_indices(line_numbers):
+                        line_mask[point_indices] = True
                 else:
                     line_mask = None
                 
-                for coordinate in coordinate_list:
+                # Find nearest points for all coordinates in a single pass
+                distance_list, point_index_list = netcdf_line_utils.batch_nearest_neighbours(coordinate_list, 
+                                                                                            points_required=points_required, 
+                                                                                            max_distance=max_distance,
+                                                                                            secondary_mask=line_mask
+                                                                                            )
+                
+                for coordinate, distances, point_indices in zip(coordinate_list, distance_list, point_index_list):
                     point_result_list = point_result_dict[coordinate]
-                    distances, point_indices = netcdf_line_utils.nearest_neighbours(coordinate, 
-                                                                                    points_required=points_required, 
-                                                                                    max_distance=max_distance,
-                                                                                    secondary_mask=line_mask
-                                                                                    )
                     #logger.debug('distances = {}'.format(distances))
                     #logger.debug('point_indices = {}'.format(point_indices))
                     
                     if len(point_indices):
-                        # Convert scalars to lists if required
-                        if not hasattr(point_indices, '__iter__'):
-                            distances = [distances]
-                            point_indices = [point_indices]
-                            
                         logger.info('{} points near {} found in {}'.format(len(point_indices), coordinate, nc_path))
                         for found_index in range(len(point_indices)):
                             point_metadata_dict = dict(metadata_dict)
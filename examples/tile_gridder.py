@@ -100,37 +100,32 @@ class TileGridder(object):
         '''
         if self._dataset_values is None:
             self._dataset_values = {dataset: dataset_value_dict
-                for dataset, dataset_value_dict in self.dataset_value_generator([self.grid_variable_name, self.filter_variable_name],
+                for dataset, dataset_value_dict in self.dataset_value_generator([self.grid_variable_name],
                                                                                 self.dataset_list, 
                                                                                 self.expanded_gda94_grid_bounds,
                                                                                 )
                                     }
-            self.filter_points()
             
         return self._dataset_values
         
 
-    def filter_points(self):        
+    def get_filter_mask(self, netcdf_point_utils):        
         '''
-        Set filter points from individual datasets
+        Return filter point mask for an individual dataset before any point values are read
         e.g. Only use points where gridflag == 'Station used in the production of GA grids.'
+        Only chunks which may contain allowed values are read if the filter variable has chunk summaries
         '''
         # Only filter if we have a filter variable and allowed values
         if not (self.filter_variable_name and self.filter_value_list):
-            return
+            return None
         
-        for dataset in sorted(self.dataset_values.keys()):
-            filter_mask = np.zeros(shape=(self.dataset_values[dataset]['coordinates'].shape[0],), dtype=np.bool)
-            for filter_value in self.filter_value_list:
-                filter_mask = np.logical_or(filter_mask, (self.dataset_values[dataset][self.filter_variable_name] == filter_value))
-                
-            coordinates = self.dataset_values[dataset]['coordinates'][filter_mask]
-            if len(coordinates):
-                self.dataset_values[dataset]['coordinates'] = coordinates
-                self.dataset_values[dataset][self.grid_variable_name] = self.dataset_values[dataset][self.grid_variable_name][filter_mask]
-                del self.dataset_values[dataset][self.filter_variable_name] # We don't need this any more
-            else:
-                del self.dataset_values[dataset] # No usable points in dataset
+        filter_variable = netcdf_point_utils.netcdf_dataset.variables[self.filter_variable_name]
+        if (filter_variable.dimensions[0] != 'point'): # Variable is NOT of point dimension - must be lookup
+            return netcdf_point_utils.get_lookup_mask(self.filter_value_list, 
+                                                      lookup_variable_name=self.filter_variable_name)
+        else: # 'point' is in variable.dimensions - "normal" variable
+            return netcdf_point_utils.get_value_mask(self.filter_variable_name, 
+                                                     value_list=self.filter_value_list)
                 
             
     def reproject_bounds(self, bounds, from_crs_wkt, to_crs_wkt):
@@ -222,9 +217,14 @@ class TileGridder(object):
                 #print(nc_dataset.variables.keys())
                 #print('Computing spatial mask')
                 spatial_mask = netcdf_point_utils.get_spatial_mask(bounding_box, self.grid_crs_wkt)
+                
+                filter_mask = self.get_filter_mask(netcdf_point_utils)
+                if filter_mask is not None:
+                    spatial_mask = np.logical_and(spatial_mask, filter_mask)
+                    
                 point_count = np.count_nonzero(spatial_mask)
     
-                print('{}/{} points found in expanded bounding box for {}'.format(point_count, netcdf_point_utils.point_count, dataset))
+                print('{}/{} filtered points found in expanded bounding box for {}'.format(point_count, netcdf_point_utils.point_count, dataset))
                             
                 if not point_count:
                     continue
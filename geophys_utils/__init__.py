@@ -43,11 +43,14 @@ from geophys_utils._netcdf_point_utils import NetCDFPointUtils
 from geophys_utils._netcdf_line_utils import NetCDFLineUtils
 from geophys_utils._csw_utils import CSWUtils
 from geophys_utils._array_pieces import array_pieces
-from geophys_utils._data_stats import DataStats
+from geophys_utils._chunk_advisor import get_chunk_advice, benchmark_chunk_advice
+from geophys_utils._data_stats import DataStats, StreamingStats
+from geophys_utils._point_in_polygon import points_in_geometry
+from geophys_utils._spatial_index import SpatialIndex, get_spatial_order
 from geophys_utils._polygon_utils import get_grid_edge_points, get_netcdf_edge_points, points2convex_hull, points2alpha_shape, netcdf2convex_hull
-from geophys_utils._crs_utils import get_spatial_ref_from_wkt, get_wkt_from_spatial_ref, get_coordinate_transformation, get_utm_wkt, transform_coords, get_reprojected_bounds
-from geophys_utils._gdal_grid_utils import get_gdal_wcs_dataset, get_gdal_grid_values
-from geophys_utils._transect_utils import line_length, point_along_line, utm_coords, coords2distance, sample_transect
+from geophys_utils._crs_utils import get_spatial_ref_from_wkt, get_wkt_from_spatial_ref, get_coordinate_transformation, get_utm_wkt, get_utm_zones, transform_coords, get_reprojected_bounds, get_crs_cache_info, clear_crs_cache
+from geophys_utils._gdal_grid_utils import get_gdal_wcs_dataset, get_gdal_dataset, get_gdal_grid_values
+from geophys_utils._transect_utils import line_length, point_along_line, utm_coords, coords2distance, grouped_coords2distance, sample_polylines, sample_transects, sample_transect
 from geophys_utils._dem_utils import DEMUtils
 from geophys_utils._array2file import array2file
 from geophys_utils._datetime_utils import date_string2datetime
@@ -25,80 +25,122 @@ import sys
 import netCDF4
 import math
 import itertools
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 
-def array_pieces(ndarray, max_bytes=None, overlap=0):
+# Default maximum piece size in bytes (500MB for NCI's OPeNDAP)
+DEFAULT_MAX_BYTES = 500000000
+
+def get_chunk_shape(ndarray):
+    '''
+    Function to return the chunk shape of a netCDF variable, or None for numpy arrays and unchunked variables
+    @param ndarray: Numpy array or NetCDF array variable
+    @return chunk_shape: tuple containing chunk size in each dimension or None
+    '''
+    try:
+        chunking = ndarray.chunking()
+    except: # Numpy arrays don't have chunking
+        return None
+    
+    if type(chunking) not in [list, tuple] or len(chunking) != len(ndarray.shape): # 'contiguous' or unknown (e.g. OPeNDAP)
+        return None
+    
+    return tuple(max(min(chunking[dim_index], ndarray.shape[dim_index]), 1) 
+                 for dim_index in range(len(ndarray.shape)))
+
+def get_piece_shape(array_shape, itemsize, max_bytes=None, chunk_shape=None):
+    '''
+    Function to return the shape of the largest pieces aligned to the chunk grid which are no more than max_bytes 
+    in size. Starting from the whole array, the dimension with the largest piece extent is repeatedly halved
+    (in whole chunks) until pieces fit. Chunking is disregarded if a single chunk exceeds max_bytes.
+    @param array_shape: shape of whole array
+    @param itemsize: number of bytes per array element
+    @param max_bytes: Maximum number of bytes per piece. Defaults to DEFAULT_MAX_BYTES
+    @param chunk_shape: Optional chunk shape as returned by get_chunk_shape
+    @return piece_shape: tuple containing piece shape
+    '''
+    max_bytes = max_bytes or DEFAULT_MAX_BYTES
+    array_dimensions = len(array_shape)
+    
+    if not chunk_shape or itemsize * reduce(lambda x, y: x * y, chunk_shape, 1) > max_bytes:
+        chunk_shape = (1,) * array_dimensions
+    
+    piece_chunks = [int(math.ceil(array_shape[dim_index] / chunk_shape[dim_index])) 
+                    for dim_index in range(array_dimensions)]
+    
+    def piece_extents():
+        return [max(min(piece_chunks[dim_index] * chunk_shape[dim_index], array_shape[dim_index]), 1) 
+                for dim_index in range(array_dimensions)]
+    
+    while (itemsize * reduce(lambda x, y: x * y, piece_extents(), 1) > max_bytes) and max(piece_chunks, default=1) > 1:
+        extents = piece_extents()
+        split_dim_index = max([dim_index for dim_index in range(array_dimensions) if piece_chunks[dim_index] > 1], 
+                              key=lambda dim_index: (extents[dim_index], -dim_index))
+        piece_chunks[split_dim_index] = int(math.ceil(piece_chunks[split_dim_index] / 2.0))
+    
+    return tuple(piece_extents())
+
+def get_piece_slices(array_shape, piece_shape, overlap=0):
+    '''
+    Generator to return slices for all pieces of an array in row-major order, including any trailing partial pieces
+    @param array_shape: shape of whole array
+    @param piece_shape: shape of pieces as returned by get_piece_shape
+    @param overlap: number of elements (or tuple of numbers per dimension) to add to each edge of each piece as a halo
+    
+    Yields:
+        piece_slices: tuple of slices for piece without halo
+        read_slices: tuple of slices for piece with halo clipped to array
+    '''
+    array_dimensions = len(array_shape)
+    overlaps = tuple(overlap) if hasattr(overlap, '__iter__') else (overlap,) * array_dimensions
+    
+    for piece_indices in itertools.product(*[range(int(math.ceil(array_shape[dim_index] / piece_shape[dim_index])))
+                                             for dim_index in range(array_dimensions)]):
+        piece_slices = tuple(slice(piece_indices[dim_index] * piece_shape[dim_index],
+                                   min((piece_indices[dim_index] + 1) * piece_shape[dim_index], array_shape[dim_index]))
+                             for dim_index in range(array_dimensions))
+        read_slices = tuple(slice(max(piece_slices[dim_index].start - overlaps[dim_index], 0),
+                                  min(piece_slices[dim_index].stop + overlaps[dim_index], array_shape[dim_index]))
+                            for dim_index in range(array_dimensions))
+        yield piece_slices, read_slices
+
+def array_pieces(ndarray, max_bytes=None, overlap=0, prefetch=False):
     '''
     Generator to return a series of numpy arrays less than max_bytes in size and the offset within the complete data from a NetCDF variable
+    Pieces are aligned to the chunk grid of NetCDF variables in any number of dimensions.
     Parameters:
         ndarray: Numpy array or NetCDF array variable
-        overlap: number of pixels to add to each edge
-        max_bytes: Maximum number of bytes to retrieve. Defaults to 500,000,000 for NCI's OPeNDAP
+        overlap: number of pixels to add to each edge (or tuple of numbers per dimension)
+        max_bytes: Maximum number of bytes to retrieve (excluding overlap). Defaults to 500,000,000 for NCI's OPeNDAP
+        prefetch: Boolean flag indicating whether to read the next piece in a background thread while the current
+            piece is being processed. N.B: The caller must not access any netCDF dataset while iterating with prefetch
 
     Yields:
         piece_array: array subset less than max_bytes in size
         array_offset: start indices of subset in whole array
     '''
-    max_bytes = max_bytes or 500000000  # Defaults to 500MB for NCI's OPeNDAP
-
     array_shape = ndarray.shape
-    array_dimensions = len(array_shape)
-
-    # Determine overall array size in bytes
-    array_bytes = ndarray.dtype.itemsize * \
-        reduce(lambda x, y: x * y, array_shape)
-
-    if array_bytes > max_bytes:  # Multiple pieces required
-        # Determine number of divisions in each axis required to keep pieces
-        # under max_bytes in size
-        axis_divisions = int(math.ceil(
-            math.pow(math.ceil(array_bytes / float(max_bytes)), 1.0 / array_dimensions)))
-
-        # Determine chunk size for pieces or default to natural divisions if no
-        # chunking set
-        try:
-            chunking = ndarray.chunking() or (1, 1)
-        except:  # Numpy arrays don't have chunking
-            chunking = (1, 1)
-
-        # Disregard chunking if it's too big to be useful
-        chunking = [chunking[index] if chunking[index] < array_shape[index] // axis_divisions else 1
-                    for index in range(array_dimensions)]
-
-        # Determine piece shape rounded down to chunk sizes
-        piece_shape = [array_shape[index] // axis_divisions // chunking[index]
-                       * chunking[index] for index in range(array_dimensions)]
-
-        # Determine total number of pieces in each axis
-        axis_pieces = [int(math.ceil(float(array_shape[index]) // piece_shape[index]))
-                       for index in range(array_dimensions)]
-
-        # Iterate over every piece of array
-        for piece_indices in itertools.product(*[range(axis_pieces[dimension_index]) 
-                                                 for dimension_index in range(array_dimensions)]):
-            
-            # Compute base start indices with no overlap
-            start_indices = [piece_indices[dimension_index] * piece_shape[dimension_index]
-                             for dimension_index in range(array_dimensions)]
-            
-            # Compute end indices plus overlap from start indices
-            end_indices = [min(start_indices[dimension_index] + piece_shape[dimension_index] + overlap,
-                               array_shape[dimension_index]) 
-                           for dimension_index in range(array_dimensions)]
-            
-            # Subtract overlap from base start indices 
-            start_indices = [max(0, start_indices[dimension_index] - overlap)
-                             for dimension_index in range(array_dimensions)]
-            
-            array_slices = [slice(start_indices[dimension_index],
-                                  end_indices[dimension_index])
-                            for dimension_index in range(array_dimensions)]
-
-            piece_array = ndarray[array_slices]
-            yield piece_array, tuple(start_indices)
-
-    else:  # Only one piece required
-        yield ndarray[...], (0, 0)
+    if not array_shape: # Scalar
+        yield ndarray[...], ()
+        return
+    
+    itemsize = max(ndarray.dtype.itemsize, 1) # Variable-length strings have zero itemsize
+    piece_shape = get_piece_shape(array_shape, itemsize, max_bytes, get_chunk_shape(ndarray))
+    
+    read_slices_list = [read_slices for _piece_slices, read_slices in get_piece_slices(array_shape, piece_shape, overlap)]
+    
+    if not prefetch or len(read_slices_list) == 1:
+        for read_slices in read_slices_list:
+            yield ndarray[read_slices], tuple(read_slice.start for read_slice in read_slices)
+        return
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        piece_future = executor.submit(ndarray.__getitem__, read_slices_list[0])
+        for piece_index in range(len(read_slices_list)):
+            piece_array = piece_future.result()
+            if piece_index + 1 < len(read_slices_list): # Read next piece while this one is processed
+                piece_future = executor.submit(ndarray.__getitem__, read_slices_list[piece_index + 1])
+            yield piece_array, tuple(read_slice.start for read_slice in read_slices_list[piece_index])
 
 
 def main():
@@ -122,9 +164,9 @@ def main():
         piece_count += 1
         piece_bytes = data_variable.dtype.itemsize * \
             reduce(lambda x, y: x * y, piece_array.shape)
-        print('piece_array.shape = %s, array_offset = %s, piece_bytes = %d'.format(piece_array.shape, array_offset, piece_bytes))
+        print('piece_array.shape = {}, array_offset = {}, piece_bytes = {}'.format(piece_array.shape, array_offset, piece_bytes))
 
-    print('piece_count = %s'.format(piece_count))
+    print('piece_count = {}'.format(piece_count))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+'''
+Functions to recommend netCDF chunk shapes and compression settings for a declared access pattern.
+Recommendations are returned as a variable_options_dict suitable for NetCDFUtils.copy. Candidate layouts
+can optionally be compared by a micro-benchmark which copies a sample subset of the largest variable
+to temporary files and times representative reads.
+
+Created on 16Oct.,2026
+'''
+import os
+import math
+import tempfile
+import time
+import logging
+import numpy as np
+import netCDF4
+from collections import OrderedDict
+from functools import reduce
+from geophys_utils._netcdf_utils import NetCDFUtils
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO) # Initial logging level for this module
+
+ACCESS_PATTERNS = ['point-stream', 'line-by-line', 'spatial-window', 'pixel-drill']
+
+# Target uncompressed chunk size in bytes for each access pattern
+DEFAULT_CHUNK_BYTES = {'point-stream': 4194304, # Long sequential reads - favour large chunks
+                       'line-by-line': 1048576,
+                       'spatial-window': 262144,
+                       'pixel-drill': 65536, # Small random reads - favour small chunks
+                       }
+
+# Compression settings for each access pattern
+COMPRESSION_OPTIONS = {'point-stream': {'zlib': True, 'complevel': 4, 'shuffle': True},
+                       'line-by-line': {'zlib': True, 'complevel': 4, 'shuffle': True},
+                       'spatial-window': {'zlib': True, 'complevel': 4, 'shuffle': True},
+                       'pixel-drill': {'zlib': True, 'complevel': 1, 'shuffle': True}, # Minimise decompression latency
+                       }
+
+BENCHMARK_CHUNK_BYTES_FACTORS = [0.25, 1, 4] # Multiples of default chunk size to benchmark
+BENCHMARK_SAMPLE_BYTES = 67108864 # Maximum size of sample subset for benchmarking
+BENCHMARK_READ_COUNT = 64 # Number of reads per benchmark
+
+
+def pow2_floor(value):
+    '''
+    Function to return the largest power of two no greater than value (minimum 1)
+    '''
+    return 2 ** int(math.floor(math.log2(value))) if value >= 1 else 1
+
+def pow2_ceil(value):
+    '''
+    Function to return the smallest power of two no less than value (minimum 1)
+    '''
+    return 2 ** int(math.ceil(math.log2(value))) if value > 1 else 1
+
+def get_spatial_dim_indices(dimensions):
+    '''
+    Function to return the indices of the Y and X grid dimensions of a variable, or None if the variable is not a grid
+    @param dimensions: tuple of dimension names for variable
+    @return spatial_dim_indices: (y_dim_index, x_dim_index) tuple or None
+    '''
+    y_dim_indices = [dim_index for dim_index in range(len(dimensions))
+                     if dimensions[dim_index] in NetCDFUtils.Y_DIM_VARIABLE_NAMES]
+    x_dim_indices = [dim_index for dim_index in range(len(dimensions))
+                     if dimensions[dim_index] in NetCDFUtils.X_DIM_VARIABLE_NAMES]
+
+    if y_dim_indices and x_dim_indices:
+        return y_dim_indices[0], x_dim_indices[0]
+
+def get_line_point_count(netcdf_dataset):
+    '''
+    Function to return the mean number of points per line for a line dataset, or None for other datasets
+    @param netcdf_dataset: netCDF4.Dataset object
+    @return line_point_count: mean number of points per line or None
+    '''
+    try:
+        return netcdf_dataset.dimensions['point'].size / netcdf_dataset.dimensions['line'].size
+    except (KeyError, ZeroDivisionError):
+        return None
+
+def get_itemsize(dtype):
+    '''
+    Function to return the nominal size in bytes of an array element. Variable-length strings have zero itemsize
+    '''
+    try:
+        return np.dtype(dtype).itemsize or NetCDFUtils.COPY_STRING_ITEM_BYTES
+    except TypeError: # Compound or other non-numpy datatypes
+        return NetCDFUtils.COPY_STRING_ITEM_BYTES
+
+def get_variable_chunk_shape(dimensions, shape, itemsize, access_pattern, chunk_bytes=None, line_point_count=None):
+    '''
+    Function to return the recommended chunk shape for a variable with the specified access pattern.
+    Grid variables are chunked as near-square spatial tiles for spatial-window and pixel-drill access
+    (pixel-drill chunks also span any non-spatial dimensions), or as bands of complete rows for
+    point-stream and line-by-line access. Point variables are chunked along their first dimension, with
+    chunks sized to the mean line length for line-by-line access. Trailing non-spatial dimensions of point
+    variables are never split.
+    @param dimensions: tuple of dimension names for variable
+    @param shape: tuple of dimension sizes for variable
+    @param itemsize: number of bytes per array element
+    @param access_pattern: one of ACCESS_PATTERNS
+    @param chunk_bytes: target uncompressed chunk size in bytes. Defaults to DEFAULT_CHUNK_BYTES[access_pattern]
+    @param line_point_count: Optional mean number of points per line for line-by-line access
+    @return chunk_shape: list containing chunk size for each dimension
+    '''
+    assert access_pattern in ACCESS_PATTERNS, 'Invalid access pattern {}. Must be one of {}'.format(access_pattern, ACCESS_PATTERNS)
+    chunk_bytes = chunk_bytes or DEFAULT_CHUNK_BYTES[access_pattern]
+    chunk_elements = max(int(chunk_bytes // itemsize), 1)
+    sizes = [max(size, 1) for size in shape] # Allow for empty unlimited dimensions
+
+    spatial_dim_indices = get_spatial_dim_indices(dimensions)
+
+    if spatial_dim_indices: # Grid variable
+        y_dim_index, x_dim_index = spatial_dim_indices
+        other_dim_indices = [dim_index for dim_index in range(len(sizes)) if dim_index not in spatial_dim_indices]
+
+        chunk_shape = [1] * len(sizes)
+        if access_pattern == 'pixel-drill': # Whole extent of non-spatial dimensions for each pixel
+            for dim_index in other_dim_indices:
+                chunk_shape[dim_index] = min(sizes[dim_index],
+                                             max(chunk_elements // reduce(lambda x, y: x * y, chunk_shape, 1), 1))
+
+        spatial_elements = max(chunk_elements // reduce(lambda x, y: x * y, chunk_shape, 1), 1)
+
+        if access_pattern in ['spatial-window', 'pixel-drill']: # Near-square tiles
+            tile_size = pow2_floor(math.sqrt(spatial_elements))
+            chunk_shape[y_dim_index] = min(tile_size, sizes[y_dim_index])
+            chunk_shape[x_dim_index] = min(tile_size, sizes[x_dim_index])
+            # Give any unused allowance from a small dimension to the other one
+            if chunk_shape[y_dim_index] < tile_size:
+                chunk_shape[x_dim_index] = min(pow2_floor(spatial_elements // chunk_shape[y_dim_index]), sizes[x_dim_index])
+            elif chunk_shape[x_dim_index] < tile_size:
+                chunk_shape[y_dim_index] = min(pow2_floor(spatial_elements // chunk_shape[x_dim_index]), sizes[y_dim_index])
+        else: # Bands of complete rows
+            chunk_shape[x_dim_index] = min(sizes[x_dim_index], pow2_floor(spatial_elements))
+            chunk_shape[y_dim_index] = min(max(spatial_elements // chunk_shape[x_dim_index], 1), sizes[y_dim_index])
+
+        return chunk_shape
+
+    # Point or other non-grid variable - keep trailing dimensions whole unless they exceed the chunk size
+    chunk_shape = list(sizes)
+    primary_elements = chunk_elements
+    for dim_index in reversed(range(1, len(sizes))):
+        chunk_shape[dim_index] = min(sizes[dim_index], primary_elements)
+        primary_elements = max(primary_elements // chunk_shape[dim_index], 1)
+
+    if access_pattern == 'line-by-line' and dimensions[0] == 'point' and line_point_count:
+        primary_elements = min(pow2_ceil(line_point_count), primary_elements)
+
+    chunk_shape[0] = min(primary_elements, sizes[0])
+    return chunk_shape
+
+def get_chunk_advice(netcdf_dataset, access_pattern, chunk_bytes=None, var_list=None):
+    '''
+    Function to return recommended chunk shapes and compression settings for all array variables in a dataset
+    @param netcdf_dataset: netCDF4.Dataset object
+    @param access_pattern: one of ACCESS_PATTERNS
+    @param chunk_bytes: target uncompressed chunk size in bytes. Defaults to DEFAULT_CHUNK_BYTES[access_pattern]
+    @param var_list: Optional list of variable names to advise on. Defaults to all variables
+    @return variable_options_dict: dict of variable creation options keyed by variable name for NetCDFUtils.copy
+    '''
+    assert access_pattern in ACCESS_PATTERNS, 'Invalid access pattern {}. Must be one of {}'.format(access_pattern, ACCESS_PATTERNS)
+    line_point_count = get_line_point_count(netcdf_dataset)
+
+    variable_options_dict = OrderedDict()
+    for variable_name, variable in netcdf_dataset.variables.items():
+        if (var_list and variable_name not in var_list) or not variable.shape: # Scalar variables can't be chunked
+            continue
+
+        chunk_shape = get_variable_chunk_shape(variable.dimensions,
+                                               variable.shape,
+                                               get_itemsize(variable.dtype),
+                                               access_pattern,
+                                               chunk_bytes,
+                                               line_point_count)
+
+        variable_options_dict[variable_name] = dict(COMPRESSION_OPTIONS[access_pattern], chunksizes=chunk_shape)
+        logger.debug('Recommended options for {} {}: {}'.format(variable_name, variable.shape, variable_options_dict[variable_name]))
+
+    return variable_options_dict
+
+def get_benchmark_reads(dimensions, shape, access_pattern, read_count=None, line_point_count=None, random_seed=0):
+    '''
+    Function to return a list of index tuples representative of the specified access pattern
+    @param dimensions: tuple of dimension names for variable
+    @param shape: tuple of dimension sizes for variable
+    @param access_pattern: one of ACCESS_PATTERNS
+    @param read_count: number of reads to return. Defaults to BENCHMARK_READ_COUNT
+    @param line_point_count: Optional mean number of points per line for line-by-line access
+    @param random_seed: seed for random read locations
+    @return read_list: list of index tuples
+    '''
+    read_count = read_count or BENCHMARK_READ_COUNT
+    random_state = np.random.RandomState(random_seed)
+    spatial_dim_indices = get_spatial_dim_indices(dimensions)
+
+    def sequential_blocks(dim_index, block_size):
+        '''
+        Helper function to return full-extent index tuples for sequential blocks along the specified dimension
+        '''
+        block_size = max(int(block_size), 1)
+        return [tuple(slice(start_index, min(start_index + block_size, shape[dim_index])) if index == dim_index else slice(None)
+                      for index in range(len(shape)))
+                for start_index in range(0, shape[dim_index], block_size)][:read_count]
+
+    if spatial_dim_indices: # Grid variable
+        if access_pattern == 'point-stream':
+            return sequential_blocks(spatial_dim_indices[0], math.ceil(shape[spatial_dim_indices[0]] / read_count))
+
+        if access_pattern == 'line-by-line':
+            return sequential_blocks(spatial_dim_indices[0], 1)
+
+        read_list = []
+        for _read_index in range(read_count):
+            read_indices = [slice(None)] * len(shape)
+            for dim_index in spatial_dim_indices:
+                window_size = max(shape[dim_index] // 4, 1) if access_pattern == 'spatial-window' else 1
+                start_index = random_state.randint(0, shape[dim_index] - window_size + 1)
+                read_indices[dim_index] = slice(start_index, start_index + window_size)
+            read_list.append(tuple(read_indices))
+        return read_list
+
+    # Point or other non-grid variable
+    if access_pattern == 'point-stream':
+        return sequential_blocks(0, math.ceil(shape[0] / read_count))
+
+    if access_pattern == 'line-by-line':
+        return sequential_blocks(0, line_point_count or math.ceil(shape[0] / read_count))
+
+    trailing_indices = tuple([slice(None)] * (len(shape) - 1))
+    if access_pattern == 'spatial-window': # Scattered points within a window of an unordered survey
+        window_point_count = max(shape[0] // 100, 1)
+        return [(np.sort(random_state.choice(shape[0], window_point_count, replace=False)),) + trailing_indices
+                for _read_index in range(read_count)]
+
+    # Pixel drill - single random points
+    return [(slice(point_index, point_index + 1),) + trailing_indices
+            for point_index in random_state.randint(0, shape[0], read_count)]
+
+def benchmark_chunk_advice(netcdf_dataset, access_pattern, chunk_bytes_list=None, variable_name=None,
+                           sample_bytes=None, read_count=None, temp_dir=None):
+    '''
+    Function to compare candidate chunk layouts by writing a sample subset of a variable with each layout and
+    timing reads representative of the access pattern.
+    @param netcdf_dataset: netCDF4.Dataset object
+    @param access_pattern: one of ACCESS_PATTERNS
+    @param chunk_bytes_list: list of target chunk sizes in bytes to compare. Defaults to multiples of
+        DEFAULT_CHUNK_BYTES[access_pattern] given by BENCHMARK_CHUNK_BYTES_FACTORS
+    @param variable_name: Name of variable to benchmark. Defaults to largest array variable
+    @param sample_bytes: Maximum size of sample subset in bytes. Defaults to BENCHMARK_SAMPLE_BYTES
+    @param read_count: number of reads to time for each layout. Defaults to BENCHMARK_READ_COUNT
+    @param temp_dir: Optional directory for temporary benchmark files
+    @return benchmark_results: list of dicts describing each layout, sorted by ascending read time
+    '''
+    assert access_pattern in ACCESS_PATTERNS, 'Invalid access pattern {}. Must be one of {}'.format(access_pattern, ACCESS_PATTERNS)
+    chunk_bytes_list = chunk_bytes_list or [int(DEFAULT_CHUNK_BYTES[access_pattern] * factor)
+                                            for factor in BENCHMARK_CHUNK_BYTES_FACTORS]
+    sample_bytes = sample_bytes or BENCHMARK_SAMPLE_BYTES
+    line_point_count = get_line_point_count(netcdf_dataset)
+
+    array_variables = {name: variable for name, variable in netcdf_dataset.variables.items()
+                       if variable.shape and np.dtype(variable.dtype).itemsize} # Ignore scalars and strings
+    assert array_variables, 'No numeric array variables to benchmark'
+    variable_name = variable_name or max(array_variables.keys(),
+                                         key=lambda name: (reduce(lambda x, y: x * y, array_variables[name].shape, 1)
+                                                           * np.dtype(array_variables[name].dtype).itemsize))
+    variable = netcdf_dataset.variables[variable_name]
+
+    # Take leading slab of variable no larger than sample_bytes
+    slab_bytes = variable.dtype.itemsize * reduce(lambda x, y: x * y, variable.shape[1:], 1)
+    sample_slices = (slice(0, min(max(sample_bytes // slab_bytes, 1), variable.shape[0])),) + tuple([slice(None)] * (len(variable.shape) - 1))
+    sample_array = np.ma.getdata(variable[sample_slices])
+    logger.debug('Benchmarking {} layouts for {} using sample of shape {}'.format(access_pattern, variable_name, sample_array.shape))
+
+    read_list = get_benchmark_reads(variable.dimensions, sample_array.shape, access_pattern, read_count, line_point_count)
+
+    benchmark_results = []
+    with tempfile.TemporaryDirectory(dir=temp_dir) as benchmark_dir:
+        for chunk_bytes in chunk_bytes_list:
+            chunk_shape = get_variable_chunk_shape(variable.dimensions,
+                                                   sample_array.shape,
+                                                   sample_array.dtype.itemsize,
+                                                   access_pattern,
+                                                   chunk_bytes,
+                                                   line_point_count)
+            nc_path = os.path.join(benchmark_dir, 'benchmark_{}.nc'.format(chunk_bytes))
+
+            start_time = time.time()
+            with netCDF4.Dataset(nc_path, mode='w', format='NETCDF4') as benchmark_dataset:
+                for dimension_name, dimension_size in zip(variable.dimensions, sample_array.shape):
+                    benchmark_dataset.createDimension(dimension_name, dimension_size)
+                benchmark_variable = benchmark_dataset.createVariable(variable_name,
+                                                                      sample_array.dtype,
+                                                                      variable.dimensions,
+                                                                      chunksizes=chunk_shape,
+                                                                      **COMPRESSION_OPTIONS[access_pattern])
+                benchmark_variable[...] = sample_array
+            write_seconds = time.time() - start_time
+
+            start_time = time.time()
+            with netCDF4.Dataset(nc_path, mode='r') as benchmark_dataset:
+                benchmark_variable = benchmark_dataset.variables[variable_name]
+                for read_indices in read_list:
+                    benchmark_variable[read_indices]
+            read_seconds = time.time() - start_time
+
+            benchmark_results.append(OrderedDict([('chunk_bytes', chunk_bytes),
+                                                  ('chunksizes', chunk_shape),
+                                                  ('write_seconds', write_seconds),
+                                                  ('read_seconds', read_seconds),
+                                                  ('file_bytes', os.path.getsize(nc_path)),
+                                                  ]))
+            logger.debug('Benchmark result: {}'.format(benchmark_results[-1]))
+
+    return sorted(benchmark_results, key=lambda benchmark_result: benchmark_result['read_seconds'])
@@ -21,7 +21,10 @@ Created on 16Nov.,2016
 @author: u76345
 '''
 import re
+import threading
 import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
 from osgeo.osr import SpatialReference, CoordinateTransformation
 import logging
 
@@ -43,6 +46,9 @@ CRS_NAME_MAPPING = {
     'AGD66': 'EPSG:4202',
     }
 
+# Maximum number of CRS definitions and coordinate transformations to cache (per thread for transformations)
+CRS_CACHE_SIZE = 64
+
 def get_spatial_ref_from_wkt(wkt_or_crs_name):
     '''
     Function to return SpatialReference object for supplied WKT
@@ -108,30 +114,213 @@ def get_wkt_from_spatial_ref(spatial_ref):
     return spatial_ref.ExportToWkt()
 
 
+@lru_cache(maxsize=CRS_CACHE_SIZE * 2)
+def normalise_crs_string(wkt_or_crs_name):
+    '''
+    Function to return a normalised form of a WKT or CRS name string for use as a cache key.
+    Whitespace is removed around WKT delimiters and "EPSG:nnnn" names are upper-cased.
+    @param wkt_or_crs_name: Well-known text or CRS name, including "EPSG:XXXX"
+    @return normalised_crs_string: Normalised string
+    '''
+    normalised_crs_string = re.sub('\s*([\[\],])\s*', '\\1', wkt_or_crs_name.strip())
+    if re.match('EPSG:\s*\d+$', normalised_crs_string, re.IGNORECASE):
+        normalised_crs_string = re.sub('\s+', '', normalised_crs_string.upper())
+    return normalised_crs_string
+
+
+class CRSTransformationCache(object):
+    '''
+    Class implementing bounded LRU caches of CRS definitions and coordinate transformations keyed by normalised
+    CRS strings. Exported WKT for each CRS is shared between threads, but GDAL CoordinateTransformation objects are
+    not thread-safe, so each thread builds and caches its own instances.
+    '''
+    # Cached value indicating that no transformation is required
+    NO_TRANSFORMATION = 'NO_TRANSFORMATION'
+
+    def __init__(self, max_size=CRS_CACHE_SIZE):
+        '''
+        CRSTransformationCache Constructor
+        @param max_size: Maximum number of entries in each cache
+        '''
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+        self.clear()
+
+    def clear(self):
+        '''
+        Function to empty all caches and reset hit & miss counters
+        N.B: Transformation caches in other threads are discarded on their next access
+        '''
+        with self._lock:
+            self._wkt_cache = OrderedDict()
+            self._generation = getattr(self, '_generation', 0) + 1
+            self.hits = 0
+            self.misses = 0
+
+    def _get_lru_value(self, cache, key):
+        '''
+        Helper function to return cached value and move it to the most recently used position, or None if not cached
+        '''
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    def _set_lru_value(self, cache, key, value):
+        '''
+        Helper function to store value in cache, discarding least recently used values beyond max_size
+        '''
+        cache[key] = value
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    def get_wkt(self, wkt_or_crs_name):
+        '''
+        Function to return exported WKT for a CRS, parsing the CRS only on the first request
+        @param wkt_or_crs_name: Well-known text or CRS name, including "EPSG:XXXX"
+        @return wkt: WKT exported from SpatialReference
+        '''
+        key = normalise_crs_string(wkt_or_crs_name)
+        with self._lock:
+            wkt = self._get_lru_value(self._wkt_cache, key)
+        if wkt is None:
+            wkt = get_spatial_ref_from_wkt(wkt_or_crs_name).ExportToWkt()
+            with self._lock:
+                self._set_lru_value(self._wkt_cache, key, wkt)
+        return wkt
+
+    def get_coordinate_transformation(self, from_wkt, to_wkt):
+        '''
+        Function to return a CoordinateTransformation for the current thread or None if no transformation required
+        @parameter from_wkt: WKT or "EPSG:nnnn" string from which to transform
+        @parameter to_wkt: WKT or "EPSG:nnnn" string to which to transform
+        @return coordinate_transformation: CoordinateTransformation object or None
+        '''
+        # Discard this thread's transformations if cache has been cleared
+        if getattr(self._thread_local, 'generation', None) != self._generation:
+            self._thread_local.transformation_cache = OrderedDict()
+            self._thread_local.generation = self._generation
+
+        transformation_cache = self._thread_local.transformation_cache
+        key = (normalise_crs_string(from_wkt), normalise_crs_string(to_wkt))
+
+        coordinate_transformation = self._get_lru_value(transformation_cache, key)
+        with self._lock:
+            if coordinate_transformation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if coordinate_transformation is None:
+            logger.debug('Creating new coordinate transformation')
+            from_crs_wkt = self.get_wkt(from_wkt)
+            to_crs_wkt = self.get_wkt(to_wkt)
+
+            if from_crs_wkt == to_crs_wkt:
+                coordinate_transformation = CRSTransformationCache.NO_TRANSFORMATION
+            else:
+                from_spatial_ref = get_spatial_ref_from_wkt(from_wkt)
+                to_spatial_ref = get_spatial_ref_from_wkt(to_wkt)
+
+                # Hack to make sure that traditional x-y coordinate order is always used
+                if osgeo_version >= '3.':
+                    logger.debug('Setting axis mapping strategy to XY  for GDAL 3.X  using OAMS_TRADITIONAL_GIS_ORDER')
+                    from_spatial_ref.SetAxisMappingStrategy(OAMS_TRADITIONAL_GIS_ORDER)
+                    to_spatial_ref.SetAxisMappingStrategy(OAMS_TRADITIONAL_GIS_ORDER)
+
+                coordinate_transformation = CoordinateTransformation(from_spatial_ref, to_spatial_ref)
+
+            self._set_lru_value(transformation_cache, key, coordinate_transformation)
+
+        if coordinate_transformation is CRSTransformationCache.NO_TRANSFORMATION:
+            return None
+        return coordinate_transformation
+
+    def cache_info(self):
+        '''
+        Function to return cache statistics
+        @return cache_info: dict containing hits, misses, max_size, wkt_cache_size and transformation_cache_size
+            (for the current thread) values
+        '''
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'max_size': self.max_size,
+                    'wkt_cache_size': len(self._wkt_cache),
+                    'transformation_cache_size': (len(self._thread_local.transformation_cache)
+                                                  if getattr(self._thread_local, 'generation', None) == self._generation
+                                                  else 0)
+                    }
+
+# Module-level cache shared by all functions in this module
+CRS_TRANSFORMATION_CACHE = CRSTransformationCache()
+
+
+def get_crs_cache_info():
+    '''
+    Function to return hit & miss counters and sizes for the module-level CRS transformation cache
+    @return cache_info: dict as returned by CRSTransformationCache.cache_info()
+    '''
+    return CRS_TRANSFORMATION_CACHE.cache_info()
+
+
+def clear_crs_cache():
+    '''
+    Function to empty the module-level CRS transformation cache and reset its counters
+    '''
+    CRS_TRANSFORMATION_CACHE.clear()
+    get_utm_wkt_for_zone.cache_clear()
+
+
 def get_coordinate_transformation(from_wkt, to_wkt):
     '''
     Use GDAL to obtain a CoordinateTransformation object to transform coordinates between CRSs or None if no transformation required.
+    Transformations are cached per thread, so the returned object must not be shared between threads.
     @parameter from_wkt: WKT or "EPSG:nnnn" string from which to transform
     @parameter to_wkt: WKT or "EPSG:nnnn" string to which to transform
     '''
     # Assume native coordinates if no wkt given
-    if not to_wkt or from_wkt == to_wkt:
+    if not from_wkt or not to_wkt or from_wkt == to_wkt:
         return None
     
-    from_spatial_ref = get_spatial_ref_from_wkt(from_wkt)
-    to_spatial_ref = get_spatial_ref_from_wkt(to_wkt)
+    return CRS_TRANSFORMATION_CACHE.get_coordinate_transformation(from_wkt, to_wkt)
 
-    # This is probably redundant
-    if not to_spatial_ref or from_spatial_ref.ExportToWkt() == to_spatial_ref.ExportToWkt():
-        return None
+
+@lru_cache(maxsize=CRS_CACHE_SIZE)
+def get_utm_wkt_for_zone(utm_zone, is_northern):
+    '''
+    Function to return WKT for a WGS84 UTM zone
+    @param utm_zone: UTM zone number
+    @param is_northern: 1 for northern hemisphere, 0 for southern hemisphere
+    @return utm_wkt: WKT for UTM CRS
+    '''
+    utm_spatial_ref = SpatialReference()
+    utm_spatial_ref.SetWellKnownGeogCS('WGS84')
+    utm_spatial_ref.SetUTM(utm_zone, is_northern)
+
+    return utm_spatial_ref.ExportToWkt()
+
+def get_utm_zones(coordinate_array, from_wkt):
+    '''
+    Function to return UTM zone numbers and hemisphere flags for an array of coordinates.
+    All coordinates are transformed to lon/lat in a single call.
+    @param coordinate_array: Array of shape (n, 2) containing coordinate pairs
+    @param from_wkt: WKT or "EPSG:nnnn" string for coordinate CRS
     
-    # Hack to make sure that traditional x-y coordinate order is always used
-    if osgeo_version >= '3.':
-        logger.debug('Setting axis mapping strategy to XY  for GDAL 3.X  using OAMS_TRADITIONAL_GIS_ORDER')
-        from_spatial_ref.SetAxisMappingStrategy(OAMS_TRADITIONAL_GIS_ORDER)
-        to_spatial_ref.SetAxisMappingStrategy(OAMS_TRADITIONAL_GIS_ORDER)
+    @return utm_zones: Array of shape (n) containing UTM zone numbers
+    @return is_northern: Array of shape (n) containing 1 for northern hemisphere, 0 for southern hemisphere
+    '''
+    coordinate_array = np.array(coordinate_array, dtype='float64').reshape((-1, 2))
 
-    return CoordinateTransformation(from_spatial_ref, to_spatial_ref)
+    latlon_coord_trans = get_coordinate_transformation(
+        from_wkt, 'EPSG:4326')
+    latlon_coord_array = coordinate_array if latlon_coord_trans is None else np.array(latlon_coord_trans.TransformPoints(
+        coordinate_array))[:,0:2]
+        
+    utm_zones = (1 + (latlon_coord_array[:,0] + 180.0) / 6.0).astype('int64') # Truncate as for int()
+    is_northern = (~(latlon_coord_array[:,1] < 0.0)).astype('int64')
+    return utm_zones, is_northern
 
 def get_utm_wkt(coordinate, from_wkt):
     '''
@@ -139,29 +328,10 @@ def get_utm_wkt(coordinate, from_wkt):
     Used to transform coords to metres
     @param coordinate: single coordinate pair
     '''
-    def utm_getZone(longitude):
-        return (int(1 + (longitude + 180.0) / 6.0))
-
-    def utm_isNorthern(latitude):
-        if (latitude < 0.0):
-            return 0
-        else:
-            return 1
-        
-    coordinate_array = np.array(coordinate).reshape((1,2))
-
-    latlon_coord_trans = get_coordinate_transformation(
-        from_wkt, 'EPSG:4326')
-    latlon_coord = coordinate if latlon_coord_trans is None else latlon_coord_trans.TransformPoints(
-        coordinate_array)[0][0:2]
+    utm_zones, is_northern = get_utm_zones(coordinate, from_wkt)
         
     # Set UTM coordinate reference system
-    utm_spatial_ref = SpatialReference()
-    utm_spatial_ref.SetWellKnownGeogCS('WGS84')
-    utm_spatial_ref.SetUTM(utm_getZone(
-        latlon_coord[0]), utm_isNorthern(latlon_coord[1]))
-
-    return utm_spatial_ref.ExportToWkt()
+    return get_utm_wkt_for_zone(int(utm_zones[0]), int(is_northern[0]))
 
 def transform_coords(coordinates, from_wkt, to_wkt):
     '''
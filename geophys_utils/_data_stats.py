@@ -22,25 +22,216 @@ Created on 15Aug.,2016
 '''
 import sys
 import os
+import math
 import netCDF4
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from geophys_utils._array_pieces import array_pieces
 
+# Maximum number of histogram bins used for approximate percentiles
+DEFAULT_HISTOGRAM_BINS = 16384
+
+
+class StreamingStats(object):
+    '''
+    StreamingStats class definition. Single-pass accumulator of count, min, max, mean and variance (using 
+    Welford/Chan updates) with an optional fixed-size histogram for approximate percentiles.
+    Histogram bins are aligned to multiples of a power-of-two bin width, so partial results from different 
+    pieces can be merged exactly by coarsening both histograms to a common bin width.
+    '''
+    def __init__(self, histogram_bins=DEFAULT_HISTOGRAM_BINS, compute_histogram=True):
+        '''
+        StreamingStats Constructor
+        @param histogram_bins: Maximum number of histogram bins. Percentile error is at most 2 / histogram_bins 
+            of the data range
+        @param compute_histogram: Boolean flag indicating whether to accumulate a histogram for percentiles
+        '''
+        self.histogram_bins = histogram_bins
+        self.compute_histogram = compute_histogram
+        
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared differences from mean
+        
+        self.bin_exponent = None # Histogram bin width is 2 ** bin_exponent
+        self.bin_offset = None # Index of first histogram bin in multiples of bin width
+        self.bin_counts = None
+        
+    def _get_bin_exponent(self, min_value, max_value, bin_exponent=None):
+        '''
+        Helper function to return the smallest power-of-two bin width exponent (no smaller than bin_exponent) for 
+        which values between min_value and max_value fit in histogram_bins aligned bins
+        '''
+        min_value = float(min_value)
+        max_value = float(max_value)
+        
+        # Bin indices must be exactly representable as integers
+        max_abs_value = max(abs(min_value), abs(max_value))
+        min_bin_exponent = (math.frexp(max_abs_value)[1] - 52) if max_abs_value else 0
+        if max_value > min_value:
+            min_bin_exponent = max(min_bin_exponent, 
+                                   int(math.ceil(math.log2((max_value - min_value) / max(self.histogram_bins - 1, 1)))))
+        bin_exponent = max(bin_exponent if bin_exponent is not None else min_bin_exponent, min_bin_exponent)
+        
+        while (math.floor(math.ldexp(max_value, -bin_exponent)) 
+               - math.floor(math.ldexp(min_value, -bin_exponent)) + 1) > self.histogram_bins:
+            bin_exponent += 1
+            
+        return bin_exponent
+        
+    def add(self, values):
+        '''
+        Function to add an array of valid values to the accumulated statistics
+        @param values: array of values. All values must be finite and valid (i.e. not no-data)
+        '''
+        values = np.asarray(values).reshape((-1,))
+        if not len(values):
+            return
+        
+        piece_stats = StreamingStats(histogram_bins=self.histogram_bins, compute_histogram=self.compute_histogram)
+        piece_stats.count = len(values)
+        piece_stats.min = np.min(values)
+        piece_stats.max = np.max(values)
+        piece_stats.mean = float(np.mean(values, dtype='float64'))
+        differences = values.astype('float64') - piece_stats.mean
+        piece_stats.m2 = float(np.dot(differences, differences))
+        
+        if self.compute_histogram:
+            piece_stats.bin_exponent = self._get_bin_exponent(piece_stats.min, piece_stats.max)
+            bin_indices = np.floor(np.ldexp(values.astype('float64'), -piece_stats.bin_exponent)).astype('int64')
+            piece_stats.bin_offset = int(math.floor(math.ldexp(float(piece_stats.min), -piece_stats.bin_exponent)))
+            piece_stats.bin_counts = np.bincount(bin_indices - piece_stats.bin_offset)
+        
+        self.merge(piece_stats)
+        
+    def _coarsen_histogram(self, bin_exponent):
+        '''
+        Helper function to return histogram offset and counts for a larger bin width exponent
+        '''
+        shift = bin_exponent - self.bin_exponent
+        if not shift:
+            return self.bin_offset, self.bin_counts
+        
+        bin_indices = (np.arange(len(self.bin_counts), dtype='int64') + self.bin_offset) >> shift
+        bin_offset = self.bin_offset >> shift
+        return bin_offset, np.bincount(bin_indices - bin_offset, weights=self.bin_counts).astype('int64')
+        
+    def merge(self, other):
+        '''
+        Function to merge the partial statistics from another StreamingStats object into this one
+        @param other: StreamingStats object with the same histogram settings
+        '''
+        if not other.count:
+            return
+        
+        if not self.count:
+            self.count, self.min, self.max, self.mean, self.m2 = other.count, other.min, other.max, other.mean, other.m2
+            self.bin_exponent, self.bin_offset, self.bin_counts = other.bin_exponent, other.bin_offset, other.bin_counts
+            return
+        
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        
+        if self.compute_histogram:
+            bin_exponent = self._get_bin_exponent(self.min, self.max, max(self.bin_exponent, other.bin_exponent))
+            self_offset, self_counts = self._coarsen_histogram(bin_exponent)
+            other_offset, other_counts = other._coarsen_histogram(bin_exponent)
+            
+            bin_offset = min(self_offset, other_offset)
+            bin_counts = np.zeros(shape=(max(self_offset + len(self_counts), other_offset + len(other_counts)) - bin_offset,), 
+                                  dtype='int64')
+            bin_counts[self_offset - bin_offset:self_offset - bin_offset + len(self_counts)] += self_counts
+            bin_counts[other_offset - bin_offset:other_offset - bin_offset + len(other_counts)] += other_counts
+            
+            self.bin_exponent, self.bin_offset, self.bin_counts = bin_exponent, bin_offset, bin_counts
+        
+    @property
+    def variance(self):
+        '''
+        Property getter function to return population variance or None if no values
+        '''
+        return self.m2 / self.count if self.count else None
+        
+    @property
+    def std_dev(self):
+        '''
+        Property getter function to return population standard deviation or None if no values
+        '''
+        return math.sqrt(self.variance) if self.count else None
+    
+    def percentile(self, percent):
+        '''
+        Function to return an approximate percentile interpolated from the histogram
+        @param percent: percentile to return between 0 and 100
+        @return value: approximate percentile value or None if no values or no histogram
+        '''
+        if not self.count or self.bin_counts is None:
+            return None
+        
+        target_count = self.count * percent / 100.0
+        cumulative_counts = np.cumsum(self.bin_counts)
+        bin_index = min(int(np.searchsorted(cumulative_counts, target_count, side='left')), len(cumulative_counts) - 1)
+        previous_count = cumulative_counts[bin_index - 1] if bin_index else 0
+        bin_fraction = (target_count - previous_count) / self.bin_counts[bin_index] if self.bin_counts[bin_index] else 0.0
+        
+        value = math.ldexp(self.bin_offset + bin_index + bin_fraction, self.bin_exponent)
+        return min(max(value, float(self.min)), float(self.max))
+
+
+def get_piece_stats(piece_array, nodata_value=None, histogram_bins=DEFAULT_HISTOGRAM_BINS, compute_histogram=True):
+    '''
+    Function to return a StreamingStats object for all valid values in an array piece
+    Masked, no-data and non-finite values are excluded.
+    @param piece_array: numpy array or masked array
+    @param nodata_value: no-data value to exclude or None
+    @param histogram_bins: Maximum number of histogram bins
+    @param compute_histogram: Boolean flag indicating whether to accumulate a histogram for percentiles
+    '''
+    piece_data = np.ma.getdata(piece_array)
+    
+    valid_mask = None
+    if np.ma.getmask(piece_array) is not np.ma.nomask:
+        valid_mask = ~np.ma.getmaskarray(piece_array)
+    if nodata_value is not None:
+        valid_mask = (piece_data != nodata_value) if valid_mask is None else np.logical_and(valid_mask, piece_data != nodata_value)
+    if piece_data.dtype.kind == 'f':
+        valid_mask = np.isfinite(piece_data) if valid_mask is None else np.logical_and(valid_mask, np.isfinite(piece_data))
+        
+    piece_stats = StreamingStats(histogram_bins=histogram_bins, compute_histogram=compute_histogram)
+    piece_stats.add(piece_data if valid_mask is None or valid_mask.all() else piece_data[valid_mask])
+    return piece_stats
+
 
 class DataStats(object):
     '''
-    DataStats class definition. Obtains statistics for gridded data
+    DataStats class definition. Obtains statistics for gridded or point data
     '''
-    key_list = ['nc_path', 'data_type', 'nodata_value', 'x_size', 'y_size', 'min',
-                'max', 'mean']  # , 'median', 'std_dev', 'percentile_1', 'percentile_99']
+    key_list = ['nc_path', 'data_type', 'nodata_value', 'x_size', 'y_size', 'count', 'min',
+                'max', 'mean', 'median', 'std_dev', 'percentile_1', 'percentile_99']
 
     def __init__(self, netcdf_path=None, netcdf_dataset=None,
-                 max_bytes=500000000):
+                 max_bytes=500000000, variable_name=None, max_workers=None, 
+                 compute_percentiles=True, histogram_bins=DEFAULT_HISTOGRAM_BINS):
         '''
         DataStats Constructor
+        Statistics are computed in a single pass over array pieces. Pieces are read in this thread and their partial 
+        statistics computed in a thread pool, then merged in piece order so that results do not depend on the 
+        number of workers. Median and percentiles are approximated from a histogram.
         Parameter:
             netcdf_path - string representing path to NetCDF file or URL for an OPeNDAP endpoint
             max_bytes - maximum number of bytes to pull into memory
+            variable_name - name of variable (e.g. a point variable) for statistics. Defaults to 2D data variable with
+                "grid_mapping" attribute
+            max_workers - number of threads used to compute partial statistics. Defaults to os.cpu_count(). 1 = serial
+            compute_percentiles - Boolean flag indicating whether to compute median and percentiles
+            histogram_bins - maximum number of histogram bins for approximate percentiles
         '''
         assert netcdf_dataset or netcdf_path, 'Either netcdf_dataset or netcdf_path must be defined'
         assert not (
@@ -48,70 +239,67 @@ class DataStats(object):
 
         netcdf_path = os.path.abspath(netcdf_path) if netcdf_path else None
         netcdf_dataset = netcdf_dataset or netCDF4.Dataset(netcdf_path, 'r')
+        max_workers = max_workers or os.cpu_count() or 1
 
-        # Find variable with "grid_mapping" attribute - assumed to be 2D data
-        # variable
-        try:
-            self.data_variable = [variable for variable in netcdf_dataset.variables.values(
-            ) if hasattr(variable, 'grid_mapping')][0]
-        except:
-            raise Exception(
-                'Unable to determine data variable (must have "grid_mapping" attribute')
+        if variable_name:
+            self.data_variable = netcdf_dataset.variables[variable_name]
+        else:
+            # Find variable with "grid_mapping" attribute - assumed to be 2D data
+            # variable
+            try:
+                self.data_variable = [variable for variable in netcdf_dataset.variables.values(
+                ) if hasattr(variable, 'grid_mapping')][0]
+            except:
+                raise Exception(
+                    'Unable to determine data variable (must have "grid_mapping" attribute')
 
+        nodata_value = getattr(self.data_variable, '_FillValue', None)
+        
         self._data_stats = {}
         self._data_stats['nc_path'] = netcdf_path or netcdf_dataset.filepath()
         self._data_stats['data_type'] = str(self.data_variable.dtype)
-        self._data_stats['nodata_value'] = self.data_variable._FillValue
+        self._data_stats['nodata_value'] = nodata_value
 
         shape = self.data_variable.shape
         # Array is ordered YX
-        self._data_stats['x_size'] = shape[1]
-        self._data_stats['y_size'] = shape[0]
-
-        length_read = 0
-        weighted_mean = 0.0
-
-        for piece_array, _piece_offsets in array_pieces(
-                self.data_variable, max_bytes=max_bytes):
-
-            if isinstance(piece_array, np.ma.core.MaskedArray):
-                piece_array = piece_array.data
-
-            # Discard all no-data elements
-            piece_array = np.array(
-                piece_array[piece_array != self.data_variable._FillValue])
-
-            piece_size = len(piece_array)
-
-            if piece_size:
-                try:
-                    self._data_stats['min'] = min(
-                        self._data_stats['min'], np.nanmin(piece_array))
-                except:
-                    self._data_stats['min'] = np.nanmin(piece_array)
-
-                try:
-                    self._data_stats['max'] = max(
-                        self._data_stats['max'], np.nanmax(piece_array))
-                except:
-                    self._data_stats['max'] = np.nanmax(piece_array)
-
-                weighted_mean += np.nanmean(piece_array) * piece_size
-                length_read += piece_size
-            #==================================================================
-            # else:
-            #     print 'Empty array'
-            #==================================================================
-
-        self._data_stats['mean'] = weighted_mean / length_read if length_read else None
-
-        #===================================================================
-        # #TODO: Implement something clever for these
-        # self._data_stats['median'] = np.NaN
-        # self._data_stats['std_dev'] = np.NaN
-        # self._data_stats['percentile_1'] = np.NaN
-        # self._data_stats['percentile_99'] = np.NaN
-        #===================================================================
+        self._data_stats['x_size'] = shape[-1]
+        self._data_stats['y_size'] = shape[-2] if len(shape) >= 2 else None
+
+        def piece_stats_generator():
+            '''
+            Generator yielding partial statistics for each array piece in order
+            '''
+            if max_workers == 1:
+                for piece_array, _piece_offsets in array_pieces(self.data_variable, max_bytes=max_bytes, prefetch=True):
+                    yield get_piece_stats(piece_array, nodata_value, histogram_bins, compute_percentiles)
+                return
+            
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_list = []
+                # Keep a bounded number of pieces in flight to limit memory usage
+                for piece_array, _piece_offsets in array_pieces(self.data_variable, max_bytes=max_bytes, prefetch=True):
+                    future_list.append(executor.submit(get_piece_stats, piece_array, nodata_value, 
+                                                       histogram_bins, compute_percentiles))
+                    if len(future_list) >= 2 * max_workers:
+                        yield future_list.pop(0).result()
+                        
+                while future_list:
+                    yield future_list.pop(0).result()
+        
+        self.statistics = StreamingStats(histogram_bins=histogram_bins, compute_histogram=compute_percentiles)
+        self.piece_counts = [] # Number of valid values in each piece
+        for piece_stats in piece_stats_generator():
+            self.piece_counts.append(piece_stats.count)
+            self.statistics.merge(piece_stats)
+
+        self._data_stats['count'] = self.statistics.count
+        self._data_stats['min'] = self.statistics.min
+        self._data_stats['max'] = self.statistics.max
+        self._data_stats['mean'] = self.statistics.mean if self.statistics.count else None
+        self._data_stats['std_dev'] = self.statistics.std_dev
+        self._data_stats['median'] = self.statistics.percentile(50)
+        self._data_stats['percentile_1'] = self.statistics.percentile(1)
+        self._data_stats['percentile_99'] = self.statistics.percentile(99)
 
     # TODO: Do something nicer than this to get at the values, A property
     # might be good.
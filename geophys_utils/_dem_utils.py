@@ -24,15 +24,16 @@ import os
 import sys
 import logging
 import numpy
-from osgeo import osr
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import numexpr
 import netCDF4
 from scipy.ndimage import sobel
 from geophys_utils._netcdf_grid_utils import NetCDFGridUtils 
-from geophys_utils._array_pieces import array_pieces 
+from geophys_utils._array_pieces import get_chunk_shape, get_piece_shape, get_piece_slices
 
-from geophys_utils._vincenty import vinc_dist
-from geophys_utils._blrb import interpolate_grid
+from geophys_utils._crs_utils import get_spatial_ref_from_wkt, transform_coords
+from geophys_utils._vincenty import vinc_dist_array
     
 # Set top level standard output 
 console_handler = logging.StreamHandler(sys.stdout)
@@ -46,6 +47,115 @@ if not logger.level:
     logger.addHandler(console_handler)
                 
 RADIANS_PER_DEGREE = 0.01745329251994329576923690768489
+
+# Maximum number of cached pixel size arrays
+PIXEL_SIZE_CACHE_SIZE = 256
+
+def compute_pixel_sizes(geotransform, wkt, x_indices, y_indices):
+    '''
+    Function to compute X & Y sizes in metres of pixels at the specified pixel indices
+    N.B: Pixel ordinates are zero-based from top left
+    @param geotransform: GDAL GeoTransform for grid
+    @param wkt: WKT for grid CRS
+    @param x_indices: array of pixel X (column) indices
+    @param y_indices: array of pixel Y (row) indices broadcastable against x_indices
+    @return x_sizes: array of pixel X sizes in metres
+    @return y_sizes: array of pixel Y sizes in metres
+    '''
+    x_indices, y_indices = numpy.broadcast_arrays(numpy.asarray(x_indices, dtype=numpy.float64), 
+                                                  numpy.asarray(y_indices, dtype=numpy.float64))
+    
+    # Determine pixel centre and edges in georeferenced coordinates
+    xw = geotransform[0] + x_indices * geotransform[1] + (y_indices + 0.5) * geotransform[2]
+    yw = geotransform[3] + x_indices * geotransform[4] + (y_indices + 0.5) * geotransform[5]
+    xe = geotransform[0] + (x_indices + 1.0) * geotransform[1] + (y_indices + 0.5) * geotransform[2]
+    ye = geotransform[3] + (x_indices + 1.0) * geotransform[4] + (y_indices + 0.5) * geotransform[5]
+    xn = geotransform[0] + (x_indices + 0.5) * geotransform[1] + y_indices * geotransform[2]
+    yn = geotransform[3] + (x_indices + 0.5) * geotransform[4] + y_indices * geotransform[5]
+    xs = geotransform[0] + (x_indices + 0.5) * geotransform[1] + (y_indices + 1.0) * geotransform[2]
+    ys = geotransform[3] + (x_indices + 0.5) * geotransform[4] + (y_indices + 1.0) * geotransform[5]
+    
+    edge_coordinates = [(xw, yw), (xe, ye), (xn, yn), (xs, ys)]
+    
+    # Convert georeferenced coordinates to lat/lon for Vincenty
+    spatial_ref = get_spatial_ref_from_wkt(wkt)
+    if not spatial_ref.IsGeographic():
+        geographic_wkt = spatial_ref.CloneGeogCS().ExportToWkt()
+        edge_coordinates = [transform_coords(numpy.stack([x.ravel(), y.ravel()], axis=1), wkt, geographic_wkt).T.reshape((2,) + x.shape)
+                            for x, y in edge_coordinates]
+
+    (lon_w, lat_w), (lon_e, lat_e), (lon_n, lat_n), (lon_s, lat_s) = edge_coordinates
+    
+    x_sizes = vinc_dist_array(earth.F, earth.A, 
+                              lat_w * RADIANS_PER_DEGREE, lon_w * RADIANS_PER_DEGREE, 
+                              lat_e * RADIANS_PER_DEGREE, lon_e * RADIANS_PER_DEGREE)[0]
+    y_sizes = vinc_dist_array(earth.F, earth.A, 
+                              lat_n * RADIANS_PER_DEGREE, lon_n * RADIANS_PER_DEGREE, 
+                              lat_s * RADIANS_PER_DEGREE, lon_s * RADIANS_PER_DEGREE)[0]
+    
+    return x_sizes, y_sizes
+
+@lru_cache(maxsize=PIXEL_SIZE_CACHE_SIZE)
+def is_north_up_geographic(geotransform, wkt):
+    '''
+    Function to return True if grid is an unrotated geographic grid, where pixel sizes vary only by row
+    '''
+    return (geotransform[2] == 0 and geotransform[4] == 0 
+            and bool(get_spatial_ref_from_wkt(wkt).IsGeographic()))
+
+@lru_cache(maxsize=PIXEL_SIZE_CACHE_SIZE)
+def _get_cached_pixel_size_arrays(geotransform, wkt, row_range, col_range):
+    '''
+    Cached helper function for get_pixel_size_arrays. col_range is None for per-row sizes
+    '''
+    y_indices = numpy.arange(*row_range).reshape((-1, 1))
+    x_indices = numpy.arange(*col_range).reshape((1, -1)) if col_range else numpy.zeros(shape=(1, 1))
+
+    pixel_size_arrays = compute_pixel_sizes(geotransform, wkt, x_indices, y_indices)
+    for pixel_size_array in pixel_size_arrays:
+        pixel_size_array.flags.writeable = False # Cached arrays must not be modified
+    return pixel_size_arrays
+
+def get_pixel_size_arrays(geotransform, wkt, row_range, col_range):
+    '''
+    Function to return cached arrays of X & Y pixel sizes in metres for a range of rows and columns.
+    Sizes for unrotated geographic grids only vary with latitude, so they are computed once per row and
+    cached per (GeoTransform, CRS, row range) regardless of column range.
+    @param geotransform: GDAL GeoTransform for grid as a tuple
+    @param wkt: WKT for grid CRS
+    @param row_range: tuple containing (start, end) row indices
+    @param col_range: tuple containing (start, end) column indices
+    @return x_sizes: read-only array of pixel X sizes in metres of shape (rows, 1) for geographic grids or (rows, cols) otherwise
+    @return y_sizes: read-only array of pixel Y sizes in metres of shape (rows, 1) for geographic grids or (rows, cols) otherwise
+    '''
+    geotransform = tuple(float(value) for value in geotransform)
+    row_range = tuple(int(value) for value in row_range)
+    col_range = tuple(int(value) for value in col_range)
+    
+    if is_north_up_geographic(geotransform, wkt):
+        return _get_cached_pixel_size_arrays(geotransform, wkt, row_range, None)
+    else:
+        return _get_cached_pixel_size_arrays(geotransform, wkt, row_range, col_range)
+
+# DEMUtils instance for the current worker process when computing slope & aspect tiles in a process pool
+_worker_dem_utils = None
+
+def _init_slope_and_aspect_worker(dem_path):
+    '''
+    Initialiser for slope & aspect worker processes. Opens a separate DEMUtils instance in each process and limits
+    numexpr to a single thread to avoid oversubscribing cores
+    '''
+    global _worker_dem_utils
+    numexpr.set_num_threads(1)
+    _worker_dem_utils = DEMUtils(dem_path)
+
+def _compute_slope_and_aspect_tile_worker(read_slices):
+    '''
+    Function to read and compute a slope & aspect tile in a worker process
+    '''
+    return _worker_dem_utils.compute_slope_and_aspect_tile(
+        _worker_dem_utils.data_variable[tuple(read_slices)], 
+        tuple(read_slice.start for read_slice in read_slices))
     
 class earth(object):
 
@@ -75,6 +185,9 @@ class earth(object):
     OMEGA = 0.000072722052
 
 class DEMUtils(NetCDFGridUtils):
+    
+    DEFAULT_TILE_BYTES = 256000000 # Default maximum working memory per slope & aspect tile
+    SLOPE_AND_ASPECT_WORKING_ARRAYS = 8 # Approximate number of float64 tile-sized arrays in memory during computation
 
     def getFileSizekB(self, path):
         """Gets the size of a file (megabytes).
@@ -112,58 +225,25 @@ class DEMUtils(NetCDFGridUtils):
         x, y = index_tuple
         logger.debug('(x, y) = (%f, %f)', x, y)
         
-        native_spatial_reference = osr.SpatialReference()
-        native_spatial_reference.ImportFromWkt(self.crs)
-        
-        latlong_spatial_reference = native_spatial_reference.CloneGeogCS()
-        coord_transform_to_latlong = osr.CoordinateTransformation(native_spatial_reference, latlong_spatial_reference)
-
-        # Determine pixel centre and edges in georeferenced coordinates
-        xw = self.GeoTransform[0] + x * self.GeoTransform[1]
-        yn = self.GeoTransform[3] + y * self.GeoTransform[5] 
-        xc = self.GeoTransform[0] + (x + 0.5) * self.GeoTransform[1]
-        yc = self.GeoTransform[3] + (y + 0.5) * self.GeoTransform[5] 
-        xe = self.GeoTransform[0] + (x + 1.0) * self.GeoTransform[1]
-        ys = self.GeoTransform[3] + (y + 1.0) * self.GeoTransform[5] 
-        
-        logger.debug('xw = %f, yn = %f, xc = %f, yc = %f, xe = %f, ys = %f', xw, yn, xc, yc, xe, ys)
-        
-        # Convert georeferenced coordinates to lat/lon for Vincenty
-        lon1, lat1, _z = coord_transform_to_latlong.TransformPoint(xw, yc, 0)
-        lon2, lat2, _z = coord_transform_to_latlong.TransformPoint(xe, yc, 0)
-        logger.debug('For X size: (lon1, lat1) = (%f, %f), (lon2, lat2) = (%f, %f)', lon1, lat1, lon2, lat2)
-        x_size, _az_to, _az_from = vinc_dist(earth.F, earth.A, 
-                                             lat1 * RADIANS_PER_DEGREE, lon1 * RADIANS_PER_DEGREE, 
-                                             lat2 * RADIANS_PER_DEGREE, lon2 * RADIANS_PER_DEGREE)
-        
-        lon1, lat1, _z = coord_transform_to_latlong.TransformPoint(xc, yn, 0)
-        lon2, lat2, _z = coord_transform_to_latlong.TransformPoint(xc, ys, 0)
-        logger.debug('For Y size: (lon1, lat1) = (%f, %f), (lon2, lat2) = (%f, %f)', lon1, lat1, lon2, lat2)
-        y_size, _az_to, _az_from = vinc_dist(earth.F, earth.A, 
-                                             lat1 * RADIANS_PER_DEGREE, lon1 * RADIANS_PER_DEGREE, 
-                                             lat2 * RADIANS_PER_DEGREE, lon2 * RADIANS_PER_DEGREE)
+        x_size, y_size = compute_pixel_sizes(self.GeoTransform, self.wkt, x, y)
         
         logger.debug('(x_size, y_size) = (%f, %f)', x_size, y_size)
-        return (x_size, y_size)
+        return (float(x_size), float(y_size))
 
     def get_pixel_size_grid(self, source_array, offsets):
-        """ Returns grid with interpolated X and Y pixel sizes for given arrays"""
-        
-        def get_pixel_x_size(x, y):
-            return self.get_pixel_size((offsets[0] + x, offsets[1] + y))[0]
-        
-        def get_pixel_y_size(x, y):
-            return self.get_pixel_size((offsets[0] + x, offsets[1] + y))[1]
-        
-        pixel_size_function = [get_pixel_x_size, get_pixel_y_size]
+        """ 
+        Returns grid with X and Y pixel sizes in metres for given array
+        Arguments:
+            source_array: 2D array for which pixel sizes are required
+            offsets: (row, column) start indices of source_array within the complete grid
+        """
+        x_sizes, y_sizes = get_pixel_size_arrays(self.GeoTransform, self.wkt,
+                                                 (offsets[0], offsets[0] + source_array.shape[0]),
+                                                 (offsets[1], offsets[1] + source_array.shape[1]))
         
         pixel_size_grid = numpy.zeros(shape=(source_array.shape[0], source_array.shape[1], 2)).astype(source_array.dtype)
-        
-        for dim_index in range(2):
-            interpolate_grid(depth=1, 
-                             shape=pixel_size_grid[:,:,dim_index].shape, 
-                             eval_func=pixel_size_function[dim_index], 
-                             grid=pixel_size_grid[:,:,dim_index])
+        pixel_size_grid[:,:,0] = x_sizes
+        pixel_size_grid[:,:,1] = y_sizes
         
         return pixel_size_grid
 
@@ -239,10 +319,54 @@ class DEMUtils(NetCDFGridUtils):
         return aspect_array
 
         
-    def create_slope_and_aspect(self, slope_path=None, aspect_path=None, overlap=4):
+    def compute_slope_and_aspect_tile(self, elevation_array, offsets):
+        '''
+        Function to compute slope & aspect arrays for a tile of elevation data from a single gradient pass
+        @param elevation_array: 2D array of elevation values including halo
+        @param offsets: start indices of elevation_array in the complete DEM
+        @return slope_array: slope array with the same shape as elevation_array
+        @return aspect_array: aspect array with the same shape as elevation_array
+        '''
+        if type(elevation_array) == numpy.ma.masked_array:
+            elevation_array = elevation_array.data # Convert from masked array to plain array
+            
+        elevation_array = elevation_array.astype(numpy.float64) if elevation_array.dtype.kind != 'f' else elevation_array
+        elevation_array[(elevation_array == self.data_variable._FillValue)] = numpy.nan
+
+        dzdx_array, dzdy_array = self.create_dzdxy_arrays(elevation_array, offsets)
+        
+        return self.create_slope_array(dzdx_array, dzdy_array), self.create_aspect_array(dzdx_array, dzdy_array)
+    
+    def get_slope_and_aspect_tile_shape(self, max_bytes):
+        '''
+        Function to return a tile shape aligned to the chunking of the DEM variable such that the working arrays for
+        a tile will be less than max_bytes in size
+        @param max_bytes: maximum number of bytes of working memory per tile
+        @return tile_shape: tuple containing tile shape
+        '''
+        # Allow for elevation, gradient, slope & aspect arrays as well as temporaries
+        return get_piece_shape(self.data_variable.shape, 
+                               DEMUtils.SLOPE_AND_ASPECT_WORKING_ARRAYS * numpy.dtype(numpy.float64).itemsize, 
+                               max_bytes, 
+                               get_chunk_shape(self.data_variable))
+        
+    def create_slope_and_aspect(self, slope_path=None, aspect_path=None, overlap=4, 
+                                max_workers=None, use_processes=True, max_bytes=None):
         '''
         Create slope & aspect datasets from elevation
+        The DEM is processed in chunk-aligned tiles, each read with a halo of overlap pixels, in a pool of workers.
+        Results are written by a single writer in tile order, and are independent of the number of workers.
+        @param slope_path: path of slope netCDF file to create
+        @param aspect_path: path of aspect netCDF file to create
+        @param overlap: halo size in pixels around each tile. Must be at least 1 for the Sobel gradient
+        @param max_workers: number of worker processes or threads. Defaults to os.cpu_count(). 1 = serial in-process
+        @param use_processes: Boolean flag indicating whether to use worker processes (True) or threads (False)
+        @param max_bytes: maximum working memory in bytes for each tile. Defaults to DEMUtils.DEFAULT_TILE_BYTES
         '''
+        assert overlap >= 1, 'Overlap must be at least 1 pixel'
+        max_workers = max_workers or os.cpu_count() or 1
+        max_bytes = max_bytes or DEMUtils.DEFAULT_TILE_BYTES
+        
         # Copy dataset structure but not data
         slope_path = slope_path or os.path.splitext(self.nc_path)[0] + '_slope.nc'
         self.copy(slope_path, empty_var_list=[self.data_variable.name])
@@ -259,76 +383,69 @@ class DEMUtils(NetCDFGridUtils):
         aspect_variable = aspect_nc_dataset.variables['aspect']
         aspect_variable.long_name = 'aspect expressed compass bearing of normal to plane (0=North, 90=East, etc.)'
         aspect_variable.units = 'degrees'
-              
-        # Process dataset in small pieces
-        for piece_array, offsets in array_pieces(self.data_variable, 
-                                                 max_bytes=self.max_bytes if self.opendap else self.max_bytes/2, # Need to allow for multiple arrays in memory 
-                                                 overlap=overlap):
-            print('Processing array of shape {} at {}'.format(piece_array.shape, offsets))
+        
+        array_shape = self.data_variable.shape
+        tile_shape = self.get_slope_and_aspect_tile_shape(max_bytes)
+        
+        # Tile slices without and with halo in chunk-aligned row-major order
+        tile_slices_list, read_slices_list = zip(*get_piece_slices(array_shape, tile_shape, overlap))
+        
+        print('Processing {} tiles of shape {} {}'.format(len(tile_slices_list), tile_shape, 
+                                                          'serially' if max_workers == 1 
+                                                          else 'with {} {}'.format(max_workers, 'processes' if use_processes else 'threads')))
+        
+        def tile_result_generator():
+            '''
+            Generator yielding slope & aspect arrays for each tile in order
+            '''
+            if max_workers == 1: # Serial in-process
+                for read_slices in read_slices_list:
+                    yield self.compute_slope_and_aspect_tile(self.data_variable[tuple(read_slices)], 
+                                                             tuple(read_slice.start for read_slice in read_slices))
+                return
             
-            if type(piece_array) == numpy.ma.masked_array:
-                piece_array = piece_array.data # Convert from masked array to plain array
+            if use_processes:
+                executor = ProcessPoolExecutor(max_workers=max_workers, 
+                                               initializer=_init_slope_and_aspect_worker, 
+                                               initargs=(self.nc_path,))
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+                
+            with executor:
+                future_list = []
+                tile_index = 0
+                # Keep a bounded number of tiles in flight to limit memory usage
+                while tile_index < len(read_slices_list) or future_list:
+                    while tile_index < len(read_slices_list) and len(future_list) < 2 * max_workers:
+                        read_slices = read_slices_list[tile_index]
+                        if use_processes:
+                            future_list.append(executor.submit(_compute_slope_and_aspect_tile_worker, read_slices))
+                        else: # netCDF reads are not thread-safe, so read in this thread and compute in the pool
+                            future_list.append(executor.submit(self.compute_slope_and_aspect_tile, 
+                                                               self.data_variable[tuple(read_slices)], 
+                                                               tuple(read_slice.start for read_slice in read_slices)))
+                        tile_index += 1
+                    
+                    yield future_list.pop(0).result()
 
-            piece_array[(piece_array == self.data_variable._FillValue)] = numpy.NaN
-            
-            # Calculate raw source & destination slices including overlaps
-            source_slices = [slice(0, 
-                                   piece_array.shape[dim_index])
-                             for dim_index in range(2)
-                             ]
-                                  
-            dest_slices = [slice(offsets[dim_index], 
-                                 offsets[dim_index] + piece_array.shape[dim_index])
-                           for dim_index in range(2)
-                           ]
-                                  
-            # Trim overlaps off source & destination slices
-            source_slices = [slice(0 if dest_slices[dim_index].start < overlap else source_slices[dim_index].start+overlap, 
-                                   piece_array.shape[dim_index] if (self.data_variable.shape[dim_index] - dest_slices[dim_index].stop) < overlap else source_slices[dim_index].stop-overlap)
-                             for dim_index in range(2)
-                             ]
-                                  
-            dest_slices = [slice(0 if dest_slices[dim_index].start < overlap else dest_slices[dim_index].start+overlap, 
-                                 self.data_variable.shape[dim_index] if (self.data_variable.shape[dim_index] - dest_slices[dim_index].stop) < overlap else dest_slices[dim_index].stop-overlap)
-                           for dim_index in range(2)
-                           ]
-            
-            print('Computing dzdx and dzdy arrays')
-            dzdx_array, dzdy_array = self.create_dzdxy_arrays(piece_array, offsets)
+        # Single writer
+        for tile_slices, read_slices, (slope_array, aspect_array) in zip(tile_slices_list, read_slices_list, tile_result_generator()):
+            # Trim halo off results
+            source_slices = tuple(slice(tile_slices[dim_index].start - read_slices[dim_index].start,
+                                        tile_slices[dim_index].stop - read_slices[dim_index].start)
+                                  for dim_index in range(2)
+                                  )
+            logger.debug('Writing slope & aspect arrays of shape {} at {}'.format(tuple(dest_slice.stop - dest_slice.start for dest_slice in tile_slices),
+                                                                                  tuple(dest_slice.start for dest_slice in tile_slices)))
             
-            print('Computing slope array')
-            result_array = self.create_slope_array(dzdx_array, dzdy_array)
-
-            print('Writing slope array of shape %s at %s'.format(tuple([dest_slices[dim_index].stop - dest_slices[dim_index].start
-                                                     for dim_index in range(2)
-                                                     ]),
-                                              tuple([dest_slices[dim_index].start
-                                                     for dim_index in range(2)
-                                                     ])
-                                              )
-                  )
-            slope_variable[dest_slices] = result_array[source_slices]  
-            slope_nc_dataset.sync()
-                 
-            print('Computing aspect array')
-            result_array = self.create_aspect_array(dzdx_array, dzdy_array)
-                                  
-            print('Writing aspect array of shape {} at {}'.format(tuple([dest_slices[dim_index].stop - dest_slices[dim_index].start
-                                                     for dim_index in range(2)
-                                                     ]),
-                                              tuple([dest_slices[dim_index].start
-                                                     for dim_index in range(2)
-                                                     ])
-                                              )
-                  )
-            aspect_variable[dest_slices] = result_array[source_slices]      
-            aspect_nc_dataset.sync()   
+            slope_variable[tuple(tile_slices)] = slope_array[source_slices]
+            aspect_variable[tuple(tile_slices)] = aspect_array[source_slices]
             
         slope_nc_dataset.close() 
-        print('Finished writing slope dataset %s'.format(slope_path))
+        print('Finished writing slope dataset {}'.format(slope_path))
         
         aspect_nc_dataset.close()     
-        print('Finished writing aspect dataset %s'.format(aspect_path))
+        print('Finished writing aspect dataset {}'.format(aspect_path))
                 
 if __name__ == '__main__':
     # Define command line arguments
@@ -344,6 +461,11 @@ if __name__ == '__main__':
     except:
         aspect_path = None
     
+    try:
+        max_workers = int(sys.argv[4])
+    except:
+        max_workers = None
+    
     dem_utils = DEMUtils(dem_path)
     
-    dem_utils.create_slope_and_aspect(slope_path, aspect_path)
+    dem_utils.create_slope_and_aspect(slope_path, aspect_path, max_workers=max_workers)
@@ -22,11 +22,21 @@ Created on 8Dec.,2016
 '''
 import os
 import re
+import sys
+import math
+import time
 import tempfile
 import numpy as np
 from owslib.wcs import WebCoverageService
 from osgeo import gdal
 from geophys_utils._crs_utils import transform_coords
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO) # Initial logging level for this module
+
+# Maximum number of bytes in each tile read for point queries
+DEFAULT_READ_BLOCK_BYTES = 1048576
 
 def get_gdal_wcs_dataset(wcs_url):
     '''\
@@ -49,23 +59,171 @@ def get_gdal_wcs_dataset(wcs_url):
 
     return gdal.Open(temp_xml_path)
 
-def get_gdal_grid_values(gdal_dataset, sample_points, from_crs, band_no=1):
+def get_gdal_dataset(dataset_path):
+    '''
+    Helper function to return a GDAL dataset for a WCS endpoint URL or a local file path
+    '''
+    if re.match('http', dataset_path):
+        return get_gdal_wcs_dataset(dataset_path)
+    
+    gdal_dataset = gdal.Open(dataset_path)
+    assert gdal_dataset, 'Unable to open GDAL dataset {}'.format(dataset_path)
+    return gdal_dataset
+
+def get_gdal_read_block_shape(gdal_band, itemsize, max_bytes=None):
+    '''
+    Function to return the shape of the block-aligned tiles in which a GDAL band should be read for point queries.
+    Tiles are whole multiples of the native block size, made as close to square as possible without 
+    exceeding max_bytes (but never smaller than one native block)
+    @param gdal_band: GDAL band
+    @param itemsize: Number of bytes per pixel
+    @param max_bytes: Maximum number of bytes in a tile. Defaults to DEFAULT_READ_BLOCK_BYTES
+    @return block_shape: tuple containing tile shape as (rows, columns)
+    '''
+    max_pixels = max((max_bytes or DEFAULT_READ_BLOCK_BYTES) // itemsize, 1)
+    block_columns, block_rows = gdal_band.GetBlockSize()
+    
+    tile_columns = block_columns * max(int(math.sqrt(max_pixels)) // block_columns, 1)
+    tile_rows = block_rows * max((max_pixels // tile_columns) // block_rows, 1)
+    
+    return (min(tile_rows, gdal_band.YSize), min(tile_columns, gdal_band.XSize))
+
+def get_gdal_grid_values(gdal_dataset, sample_points, from_crs, band_no=1, max_bytes=None):
     '''
     Function to return values at a series of points from a GDAL dataset
+    Pixel indices are computed for all points at once, and points are grouped by block-aligned tile so that only 
+    one window (spanning the points in the tile) is read for each tile touched. This keeps the number of
+    requests to a WCS-backed dataset proportional to the number of tiles rather than the number of points.
+    @param gdal_dataset: GDAL dataset, or path or WCS URL to open as a GDAL dataset
+    @param sample_points: iterable collection of coordinate pairs or single coordinate pair
+    @param from_crs: WKT or "EPSG:nnnn" string for sample_points
+    @param band_no: Band number to read
+    @param max_bytes: Maximum number of bytes in each tile read. Defaults to DEFAULT_READ_BLOCK_BYTES
+    @return values: Array of values at sample_points. Points outside the dataset are set to the band no-data
+        value, or NaN if the band has no no-data value
     '''
+    if isinstance(gdal_dataset, str):
+        gdal_dataset = get_gdal_dataset(gdal_dataset)
+        
     geotransform = gdal_dataset.GetGeoTransform()
     to_crs = gdal_dataset.GetProjection()
     gdal_band = gdal_dataset.GetRasterBand(band_no)
     
-    native_sample_points = transform_coords(sample_points, from_crs, to_crs)
+    native_sample_points = np.array(transform_coords(sample_points, from_crs, to_crs), dtype='float64').reshape((-1, 2))
+    
+    # Indices truncated towards zero as for int(), in (row, column) order
+    index_array = np.stack([np.trunc((native_sample_points[:,1] - geotransform[3]) / geotransform[5] + 0.5),
+                            np.trunc((native_sample_points[:,0] - geotransform[0]) / geotransform[1] + 0.5)], 
+                           axis=1)
+    in_bounds_mask = np.logical_and.reduce([np.isfinite(index_array[:,0]), np.isfinite(index_array[:,1]),
+                                            index_array[:,0] >= 0, index_array[:,0] < gdal_band.YSize,
+                                            index_array[:,1] >= 0, index_array[:,1] < gdal_band.XSize])
+    point_indices = np.where(in_bounds_mask)[0]
+    index_array = index_array[point_indices].astype('int64')
+    
+    value_array = None
+    block_count = 0
+    bytes_read = 0
+    
+    if len(point_indices):
+        block_shape = get_gdal_read_block_shape(gdal_band, max(gdal.GetDataTypeSize(gdal_band.DataType) // 8, 1), max_bytes)
+        
+        # Sort points by tile so that points in each tile are contiguous
+        block_indices = index_array // np.array(block_shape)
+        block_ids = block_indices[:,0] * (gdal_band.XSize // block_shape[1] + 1) + block_indices[:,1]
+        sort_order = np.argsort(block_ids, kind='stable')
+        sorted_block_ids = block_ids[sort_order]
+        block_starts = np.flatnonzero(np.r_[True, sorted_block_ids[1:] != sorted_block_ids[:-1]])
+        block_ends = np.r_[block_starts[1:], len(sort_order)]
+        
+        for block_start, block_end in zip(block_starts, block_ends):
+            block_point_indices = sort_order[block_start:block_end]
+            block_index_array = index_array[block_point_indices]
+            
+            # Read only the window within the tile which spans the points
+            window_start = block_index_array.min(axis=0)
+            window_end = block_index_array.max(axis=0) + 1
+            window = gdal_band.ReadAsArray(xoff=int(window_start[1]), yoff=int(window_start[0]), 
+                                           win_xsize=int(window_end[1] - window_start[1]), 
+                                           win_ysize=int(window_end[0] - window_start[0]))
+            
+            if value_array is None:
+                value_array = np.zeros(shape=(len(index_array),), dtype=window.dtype)
+            value_array[block_point_indices] = window[block_index_array[:,0] - window_start[0], 
+                                                      block_index_array[:,1] - window_start[1]]
+            block_count += 1
+            bytes_read += window.nbytes
+            
+        logger.debug('Read {} points from {} tiles of shape {} ({} bytes)'.format(len(index_array), block_count, block_shape, bytes_read))
+
+    if len(point_indices) == len(in_bounds_mask): 
+        return value_array if value_array is not None else np.zeros(shape=(0,), dtype='float64')
+    
+    # Fill values for points outside the dataset, promoting integer values to float if no-data cannot be represented
+    no_data_value = gdal_band.GetNoDataValue()
+    if no_data_value is None:
+        no_data_value = np.nan
+    if value_array is not None and (value_array.dtype.kind == 'f' or 
+                                    (not np.isnan(no_data_value) and value_array.dtype.type(no_data_value) == no_data_value)):
+        dtype = value_array.dtype
+    else:
+        dtype = 'float64'
+    values = np.full(shape=(len(in_bounds_mask),), fill_value=no_data_value, dtype=dtype)
+    if value_array is not None:
+        values[point_indices] = value_array
+    return values
+
+def main():
+    '''
+    Main function to benchmark tiled reads against point-by-point reads from a GDAL dataset
+    A tiled GeoTIFF is created in a temporary directory if no dataset path or WCS URL is given
+    Usage: python -m geophys_utils._gdal_grid_utils [<point_count> [<dataset_path_or_url>]]
+    '''
+    point_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    random_state = np.random.RandomState(0)
     
-    #TODO: Make this faster
-    values = []
-    for point in native_sample_points:
+    temp_dir = None
+    if len(sys.argv) > 2:
+        gdal_dataset = get_gdal_dataset(sys.argv[2])
+    else:
+        temp_dir = tempfile.mkdtemp()
+        gdal_dataset = gdal.GetDriverByName('GTiff').Create(os.path.join(temp_dir, 'benchmark.tif'), 4096, 4096, 1, 
+                                                            gdal.GDT_Float32, options=['TILED=YES'])
+        gdal_dataset.SetGeoTransform((140.0, 0.001, 0.0, -30.0, 0.0, -0.001))
+        gdal_dataset.SetProjection('GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]]')
+        gdal_dataset.GetRasterBand(1).WriteArray(random_state.random_sample((4096, 4096)).astype('float32'))
+        gdal_dataset.FlushCache()
+        
+    geotransform = gdal_dataset.GetGeoTransform()
+    wkt = gdal_dataset.GetProjection()
+    sample_points = np.stack([geotransform[0] + random_state.uniform(0, gdal_dataset.RasterXSize, point_count) * geotransform[1],
+                              geotransform[3] + random_state.uniform(0, gdal_dataset.RasterYSize, point_count) * geotransform[5]],
+                             axis=1)
+    
+    gdal_band = gdal_dataset.GetRasterBand(1)
+    start_time = time.time()
+    point_values = []
+    for point in sample_points:
         indices = (int((point[0] - geotransform[0]) / geotransform[1] + 0.5),
                    int((point[1] - geotransform[3]) / geotransform[5] + 0.5))
-        value = gdal_band.ReadAsArray(xoff=indices[0], yoff=indices[1], win_xsize=1, win_ysize=1)[0,0]
-        #print point, indices, value
-        values.append(value)
-        
-    return np.array(values)
\ No newline at end of file
+        if indices[0] < gdal_dataset.RasterXSize and indices[1] < gdal_dataset.RasterYSize:
+            point_values.append(gdal_band.ReadAsArray(xoff=indices[0], yoff=indices[1], win_xsize=1, win_ysize=1)[0,0])
+        else:
+            point_values.append(np.nan)
+    elapsed = time.time() - start_time
+    print('Point-by-point reads: {} points, {:.3f}s ({:.0f} points/s)'.format(point_count, elapsed, point_count / elapsed))
+    
+    start_time = time.time()
+    tile_values = get_gdal_grid_values(gdal_dataset, sample_points, wkt)
+    elapsed = time.time() - start_time
+    print('Tiled reads: {} points, {:.3f}s ({:.0f} points/s)'.format(point_count, elapsed, point_count / elapsed))
+    
+    print('Values are {}'.format('identical' if np.array_equal(np.array(point_values), tile_values, equal_nan=True) else 'DIFFERENT'))
+    
+    gdal_dataset = None
+    if temp_dir:
+        os.remove(os.path.join(temp_dir, 'benchmark.tif'))
+        os.rmdir(temp_dir)
+
+if __name__ == '__main__':
+    main()
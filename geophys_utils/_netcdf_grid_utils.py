@@ -24,9 +24,10 @@ import numpy as np
 import math
 from scipy.ndimage import map_coordinates
 from geophys_utils._crs_utils import get_utm_wkt, transform_coords, get_reprojected_bounds, get_spatial_ref_from_wkt
-from geophys_utils._transect_utils import sample_transect
+from geophys_utils._transect_utils import sample_transect, sample_transects
 from geophys_utils._polygon_utils import netcdf2convex_hull
 from geophys_utils._netcdf_utils import NetCDFUtils, METADATA_CRS
+from geophys_utils._data_stats import DataStats
 from shapely.geometry import Polygon, MultiPolygon, asPolygon
 from shapely.geometry.base import BaseGeometry
 import shapely
@@ -60,6 +61,8 @@ class NetCDFGridUtils(NetCDFUtils):
     # Assume WGS84 lat/lon if no CRS is provided
     DEFAULT_CRS = "GEOGCS[\"WGS 84\",DATUM[\"WGS_1984\",SPHEROID[\"WGS 84\",6378137,298.257223563,AUTHORITY[\"EPSG\",\"7030\"]],AUTHORITY[\"EPSG\",\"6326\"]],PRIMEM[\"Greenwich\",0,AUTHORITY[\"EPSG\",\"8901\"]],UNIT[\"degree\",0.0174532925199433,AUTHORITY[\"EPSG\",\"9122\"]],AUTHORITY[\"EPSG\",\"4326\"]]"
     DEFAULT_MAX_BYTES = 500000000  # Default to 500,000,000 bytes for NCI's OPeNDAP
+    DEFAULT_READ_BLOCK_BYTES = 1048576 # Default maximum block size for point reads from unchunked variables
+    SPLINE_INTERPOLATION_HALO = 8 # Default number of pixels read around points for spline interpolation of order > 1
     FLOAT_TOLERANCE = 0.000001
 
     def __init__(self, netcdf_dataset, debug=False):
@@ -119,6 +122,8 @@ class NetCDFGridUtils(NetCDFUtils):
         logger.debug('Running NetCDFGridUtils constructor')
         
         self._GeoTransform = None
+        self._dimension_index_parameters = None
+        self.last_read_statistics = None
 
         try:
             data_variable_dimensions = [variable for variable in self.netcdf_dataset.variables.values() 
@@ -173,81 +178,248 @@ class NetCDFGridUtils(NetCDFUtils):
         # Create bounds
         self.bounds = self.native_bbox[0] + self.native_bbox[2]
 
-    def get_indices_from_coords(self, coordinates, wkt=None):
+    def get_dimension_index_parameters(self):
+        '''
+        Function to return a list of (origin, spacing, is_regular) tuples for the two array dimensions
+        Regular dimensions map coordinates to indices as (coordinate - origin) / spacing, where spacing is signed
+        so that descending dimensions are handled correctly. Irregular dimensions require a search of the
+        dimension array.
+        @return dimension_index_parameters: list of (origin, spacing, is_regular) tuples in array dimension order
         '''
-        Returns list of netCDF array indices corresponding to coordinates to support nearest neighbour queries
+        if self._dimension_index_parameters is None:
+            self._dimension_index_parameters = []
+            for dim_index in range(2):
+                dimension_array = np.ma.getdata(self.dimension_arrays[dim_index]).astype('float64')
+                if len(dimension_array) > 1:
+                    spacing = (dimension_array[-1] - dimension_array[0]) / (len(dimension_array) - 1)
+                else:
+                    spacing = self.pixel_size[dim_index]
+                # Allow for rounding errors in stored dimension values
+                is_regular = bool(np.all(np.abs(np.diff(dimension_array) - spacing) <= abs(spacing) * 0.01))
+                self._dimension_index_parameters.append((dimension_array[0], spacing, is_regular))
+                logger.debug('Dimension {}: origin={}, spacing={}, regular={}'.format(dim_index, 
+                                                                                       *self._dimension_index_parameters[-1]))
+
+        return self._dimension_index_parameters
+
+    def get_native_ordinate_arrays(self, coordinates, wkt=None):
+        '''
+        Function to return coordinates transformed to native CRS as a pair of contiguous float64 ordinate arrays in
+        array dimension order. Ordinates of coordinates outside the grid extent are replaced with the dimension origin so
+        that they can be safely used in index calculations before being masked out.
         @parameter coordinates: iterable collection of coordinate pairs or single coordinate pair
         @parameter wkt: Coordinate Reference System for coordinates. None == native NetCDF CRS
+        @return ordinate_arrays: list containing two arrays of n ordinates in native CRS and array dimension order
+        @return in_bounds_mask: Boolean array of size n which is True for coordinates within the grid extent
+        @return is_single_coordinate: Boolean flag indicating whether a single coordinate pair was supplied
         '''
         wkt = wkt or self.wkt
-        native_coordinates = transform_coords(coordinates, self.wkt, wkt)
+        native_coordinates = np.asarray(transform_coords(coordinates, wkt, self.wkt), dtype='float64')
+
+        is_single_coordinate = (native_coordinates.shape == (2,))
         # Reshape 1D array into 2D single coordinate array if only one coordinate provided
-        if native_coordinates.shape == (2,):
+        if is_single_coordinate:
             native_coordinates = native_coordinates.reshape((1,2))
-        
+
         # Convert coordinates to same dimension ordering as array
-        if self.YX_order:
-            native_coordinates = native_coordinates[:,1::-1]
+        ordinate_arrays = [np.ascontiguousarray(native_coordinates[:,ordinate_index])
+                           for ordinate_index in ((1, 0) if self.YX_order else (0, 1))]
+
+        # N.B: NaN coordinates will be out of bounds
+        in_bounds_mask = np.ones(shape=(len(native_coordinates),), dtype='bool')
+        for dim_index in range(2):
+            in_bounds_mask &= (ordinate_arrays[dim_index] >= self.min_extent[dim_index])
+            in_bounds_mask &= (ordinate_arrays[dim_index] <= self.max_extent[dim_index])
+
+        if not in_bounds_mask.all():
+            for dim_index, dimension_index_parameters in enumerate(self.get_dimension_index_parameters()):
+                ordinate_arrays[dim_index][~in_bounds_mask] = dimension_index_parameters[0]
+
+        return ordinate_arrays, in_bounds_mask, is_single_coordinate
+
+    def get_indices_from_coords(self, coordinates, wkt=None):
+        '''
+        Returns masked integer array of netCDF array indices corresponding to coordinates to support nearest neighbour queries
+        Indices are computed directly from the dimension origin and spacing for regular dimensions, or by binary search
+        of the dimension array for irregular ones.
+        @parameter coordinates: iterable collection of coordinate pairs or single coordinate pair
+        @parameter wkt: Coordinate Reference System for coordinates. None == native NetCDF CRS
+        @return indices: n x 2 masked int64 array of indices in array dimension order, or 2-element array for a single 
+            coordinate pair. Indices for coordinates outside the grid are masked.
+        '''
+        ordinate_arrays, valid_mask, is_single_coordinate = self.get_native_ordinate_arrays(coordinates, wkt)
+
+        index_array = np.empty(shape=(len(valid_mask), 2), dtype='int64')
+        
+        for dim_index, (origin, spacing, is_regular) in enumerate(self.get_dimension_index_parameters()):
+            dimension_size = len(self.dimension_arrays[dim_index])
+            ordinates = ordinate_arrays[dim_index]
+            
+            if is_regular:
+                # Lowest index within half a pixel of coordinate
+                dim_indices = np.ceil((ordinates - origin) / spacing - 0.5)
+            else:
+                dimension_array = np.ma.getdata(self.dimension_arrays[dim_index]).astype('float64')
+                descending = dimension_array[-1] < dimension_array[0]
+                search_array = dimension_array[::-1] if descending else dimension_array
+                
+                # Choose nearest of the two neighbouring dimension values
+                upper_indices = np.clip(np.searchsorted(search_array, ordinates), 1, max(dimension_size - 1, 1))
+                lower_indices = np.maximum(upper_indices - 1, 0)
+                upper_indices = np.minimum(upper_indices, dimension_size - 1)
+                dim_indices = np.where(np.abs(search_array[upper_indices] - ordinates) < np.abs(search_array[lower_indices] - ordinates),
+                                       upper_indices, lower_indices)
+                # Mask any coordinates falling in gaps between dimension values
+                valid_mask &= (np.abs(search_array[dim_indices] - ordinates) <= self.pixel_size[dim_index] / 2.0)
                 
-        try:  # Multiple coordinates
-            indices = [[np.where(abs(self.dimension_arrays[dim_index] - coordinate[dim_index]) <= (self.pixel_size[dim_index] / 2.0))[0][0] for dim_index in range(2)]
-                       if not ([True for dim_index in range(2) if coordinate[dim_index] < self.min_extent[dim_index] or coordinate[dim_index] > self.max_extent[dim_index]])
-                       else None
-                       for coordinate in native_coordinates]
-        except TypeError:  # Single coordinate pair
-            indices = ([np.where(abs(self.dimension_arrays[dim_index] - native_coordinates[dim_index]) <= (self.pixel_size[dim_index] / 2.0))[0][0] for dim_index in range(2)]
-                       if not [True for dim_index in range(2) if native_coordinates[dim_index] < self.min_extent[dim_index] or native_coordinates[dim_index] > self.max_extent[dim_index]]
-                       else None)
+                if descending:
+                    dim_indices = dimension_size - 1 - dim_indices
+                
+            index_array[:,dim_index] = np.clip(dim_indices, 0, dimension_size - 1)
 
+        indices = np.ma.masked_array(index_array, mask=np.repeat(~valid_mask[:,None], 2, axis=1))
+        
+        if is_single_coordinate:
+            return indices[0]
         return indices
 
     def get_fractional_indices_from_coords(self, coordinates, wkt=None):
         '''
-        Returns list of fractional array indices corresponding to coordinates to support interpolation
+        Returns masked array of fractional array indices corresponding to coordinates to support interpolation
         @parameter coordinates: iterable collection of coordinate pairs or single coordinate pair
         @parameter wkt: Coordinate Reference System for coordinates. None == native NetCDF CRS
+        @return fractional_indices: n x 2 masked float64 array of fractional indices in array dimension order, or 2-element
+            array for a single coordinate pair. Fractional indices for coordinates outside the grid are masked.
         '''
-        wkt = wkt or self.wkt
-        native_coordinates = transform_coords(coordinates, self.wkt, wkt)
-
-        # Convert coordinates to same order as array
-        if self.YX_order:
-            try:
-                for coord_index in range(len(native_coordinates)):
-                    if native_coordinates[coord_index] is not None:
-                        native_coordinates[coord_index] = list(
-                            native_coordinates[coord_index])
-                        native_coordinates[coord_index].reverse()
-            except:
-                native_coordinates = list(native_coordinates)
-                native_coordinates.reverse()
-        # TODO: Make sure this still works with Southwards-positive datasets
-        try:  # Multiple coordinates
-            fractional_indices = [[(coordinate[dim_index] - min(self.dimension_arrays[dim_index])) / self.pixel_size[dim_index] for dim_index in range(2)]
-                                  if not ([True for dim_index in range(2) if coordinate[dim_index] < self.min_extent[dim_index] or coordinate[dim_index] > self.max_extent[dim_index]])
-                                  else None
-                                  for coordinate in native_coordinates]
-        except:  # Single coordinate pair
-            fractional_indices = ([(native_coordinates[dim_index] - min(self.dimension_arrays[dim_index])) / self.pixel_size[dim_index] for dim_index in range(2)]
-                                  if not [True for dim_index in range(2) if native_coordinates[dim_index] < self.min_extent[dim_index] or native_coordinates[dim_index] > self.max_extent[dim_index]]
-                                  else None)
+        ordinate_arrays, in_bounds_mask, is_single_coordinate = self.get_native_ordinate_arrays(coordinates, wkt)
 
+        fractional_index_array = np.empty(shape=(len(in_bounds_mask), 2), dtype='float64')
+        
+        for dim_index, (origin, spacing, is_regular) in enumerate(self.get_dimension_index_parameters()):
+            ordinates = ordinate_arrays[dim_index]
+            dimension_size = len(self.dimension_arrays[dim_index])
+            
+            if is_regular or dimension_size < 2:
+                fractional_index_array[:,dim_index] = (ordinates - origin) / spacing
+            else: # Interpolate linearly between dimension values, extrapolating into edge pixels
+                dimension_array = np.ma.getdata(self.dimension_arrays[dim_index]).astype('float64')
+                descending = dimension_array[-1] < dimension_array[0]
+                search_array = dimension_array[::-1] if descending else dimension_array
+                upper_indices = np.clip(np.searchsorted(search_array, ordinates), 1, dimension_size - 1)
+                fractional_indices = (upper_indices - 1 + (ordinates - search_array[upper_indices - 1]) 
+                                      / (search_array[upper_indices] - search_array[upper_indices - 1]))
+                if descending:
+                    fractional_indices = dimension_size - 1 - fractional_indices
+                fractional_index_array[:,dim_index] = fractional_indices
+                
+        fractional_indices = np.ma.masked_array(fractional_index_array, 
+                                                mask=np.repeat(~in_bounds_mask[:,None], 2, axis=1))
+        
+        if is_single_coordinate:
+            return fractional_indices[0]
         return fractional_indices
 
+    def get_read_block_shape(self, data_variable, max_bytes=None):
+        '''
+        Function to return the shape of the blocks in which a 2D variable should be read for point queries.
+        This is the HDF5 chunk shape for chunked variables, or a square block of no more than max_bytes for
+        contiguous variables or where chunking information is unavailable (e.g. OPeNDAP)
+        @parameter data_variable: 2D netCDF variable
+        @parameter max_bytes: Maximum number of bytes in an unchunked read block. Defaults to NetCDFGridUtils.DEFAULT_READ_BLOCK_BYTES
+        @return block_shape: tuple containing block shape in array dimension order
+        '''
+        try:
+            chunking = data_variable.chunking()
+        except Exception as e:
+            logger.debug('Unable to determine chunking for variable {}: {}'.format(data_variable.name, e))
+            chunking = None
+            
+        if type(chunking) == list:
+            return tuple(min(chunking[dim_index], data_variable.shape[dim_index]) for dim_index in range(2))
+        
+        max_bytes = max_bytes or NetCDFGridUtils.DEFAULT_READ_BLOCK_BYTES
+        block_size = max(int(math.sqrt(max_bytes / data_variable.dtype.itemsize)), 1)
+        return tuple(min(block_size, data_variable.shape[dim_index]) for dim_index in range(2))
+
+    def get_block_point_indices(self, index_array, block_shape, array_shape):
+        '''
+        Generator yielding arrays of point indices grouped by the read block containing each point
+        @parameter index_array: n x 2 integer array of array indices in array dimension order
+        @parameter block_shape: read block shape as returned by get_read_block_shape
+        @parameter array_shape: shape of array being read
+        '''
+        # Sort points by block so that points in each block are contiguous
+        block_indices = index_array // np.array(block_shape)
+        block_ids = block_indices[:,0] * (array_shape[1] // block_shape[1] + 1) + block_indices[:,1]
+        sort_order = np.argsort(block_ids, kind='stable')
+        sorted_block_ids = block_ids[sort_order]
+        block_starts = np.flatnonzero(np.r_[True, sorted_block_ids[1:] != sorted_block_ids[:-1]])
+        block_ends = np.r_[block_starts[1:], len(sort_order)]
+        
+        for block_start, block_end in zip(block_starts, block_ends):
+            yield sort_order[block_start:block_end]
+
+    def read_values_by_block(self, data_variable, index_array, no_data_value=None, max_bytes=None):
+        '''
+        Function to read the values of a 2D variable at the specified array indices. Indices are grouped by read
+        block (HDF5 chunk where available) so that each block touched is read once, and only the window within the
+        block spanning the points in it is requested. Read statistics for the last call are kept in
+        self.last_read_statistics
+        @parameter data_variable: 2D netCDF variable
+        @parameter index_array: n x 2 integer array of indices in array dimension order
+        @parameter no_data_value: Value to substitute for masked values. Defaults to data_variable._FillValue
+        @parameter max_bytes: Maximum number of bytes in an unchunked read block. Defaults to NetCDFGridUtils.DEFAULT_READ_BLOCK_BYTES
+        @return value_array: array of n values
+        '''
+        if no_data_value is None:
+            no_data_value = data_variable._FillValue
+            
+        index_array = np.asarray(index_array, dtype='int64').reshape((-1, 2))
+        block_shape = self.get_read_block_shape(data_variable, max_bytes)
+        
+        value_array = None
+        block_count = 0
+        bytes_read = 0
+        
+        for point_indices in self.get_block_point_indices(index_array, block_shape, data_variable.shape):
+            block_point_indices = index_array[point_indices]
+            
+            # Read only the window within the block which spans the points
+            window_start = block_point_indices.min(axis=0)
+            window_end = block_point_indices.max(axis=0) + 1
+            window = np.ma.filled(data_variable[window_start[0]:window_end[0], window_start[1]:window_end[1]], no_data_value)
+            
+            if value_array is None:
+                value_array = np.ones(shape=(len(index_array),), dtype=window.dtype) * no_data_value
+                
+            value_array[point_indices] = window[block_point_indices[:,0] - window_start[0], 
+                                                block_point_indices[:,1] - window_start[1]]
+            block_count += 1
+            bytes_read += window.nbytes
+            
+        if value_array is None: # No points read
+            value_array = np.ones(shape=(0,), dtype=data_variable.dtype) * no_data_value
+            
+        self.last_read_statistics = {'point_count': len(index_array),
+                                     'block_shape': block_shape,
+                                     'block_count': block_count,
+                                     'bytes_read': bytes_read
+                                     }
+        logger.debug('Read {point_count} points from {block_count} blocks of shape {block_shape} ({bytes_read} bytes)'.format(**self.last_read_statistics))
+        
+        return value_array
+
     def get_value_at_coords(self, coordinates, wkt=None,
                             max_bytes=None, variable_name=None):
         '''
         Returns list of array values at specified coordinates
+        Values are read block by block (HDF5 chunk by chunk for chunked variables). Read statistics for the last call
+        are available in self.last_read_statistics
         @parameter coordinates: iterable collection of coordinate pairs or single coordinate pair
         @parameter wkt: WKT for coordinate Coordinate Reference System. None == native NetCDF CRS
-        @parameter max_bytes: Maximum number of bytes to read in a single query. Defaults to NetCDFGridUtils.DEFAULT_MAX_BYTES
+        @parameter max_bytes: Maximum number of bytes to read in a single query for unchunked variables. Defaults to NetCDFGridUtils.DEFAULT_READ_BLOCK_BYTES
         @parameter variable_name: NetCDF variable_name if not default data variable
         '''
-        # Use arbitrary maximum request size of NetCDFGridUtils.DEFAULT_MAX_BYTES
-        # (500,000,000 bytes => 11180 points per query)
-        #TODO: Find a better way of overcoming the netCDF problem where whole rows & columns are retrieved
-        max_bytes = max_bytes or 100  # NetCDFGridUtils.DEFAULT_MAX_BYTES
-
         if variable_name:
             data_variable = self.netcdf_dataset.variables[variable_name]
         else:
@@ -255,116 +427,150 @@ class NetCDFGridUtils(NetCDFUtils):
 
         no_data_value = data_variable._FillValue
 
-        indices = np.array(self.get_indices_from_coords(coordinates, wkt))
+        indices = self.get_indices_from_coords(coordinates, wkt)
+        
+        if indices.ndim == 1: # Single coordinate pair
+            indices = indices.reshape((1,2))
         
-#        return data_variable[indices[:,0], indices[:,1]].diagonal() # This could get too big
+        # Boolean mask indicating which index pairs are valid
+        mask_array = ~np.ma.getmaskarray(indices)[:,0]
+        # Final result array including no-data for invalid index pairs
+        result_array = np.ones(
+            shape=(len(mask_array)), dtype=data_variable.dtype) * no_data_value
 
-        # Allow for the fact that the NetCDF advanced indexing will pull back
-        # n^2 cells rather than n
-        max_points = max(
-            int(math.sqrt(max_bytes / data_variable.dtype.itemsize)), 1)
-        try:
-            # Make this a vectorised operation for speed (one query for as many
-            # points as possible)
-            # Array of valid index pairs only
-            index_array = np.array(
-                [index_pair for index_pair in indices if index_pair is not None])
-            assert len(index_array.shape) == 2 and index_array.shape[
-                1] == 2, 'Not an iterable containing index pairs'
-            # Boolean mask indicating which index pairs are valid
-            mask_array = np.array([(index_pair is not None)
-                                   for index_pair in indices])
-            # Array of values read from variable
-            value_array = np.ones(shape=(len(index_array)),
-                                  dtype=data_variable.dtype) * no_data_value
-            # Final result array including no-data for invalid index pairs
-            result_array = np.ones(
-                shape=(len(mask_array)), dtype=data_variable.dtype) * no_data_value
-            start_index = 0
-            end_index = min(max_points, len(index_array))
-            while True:
-                # N.B: ".diagonal()" is required because NetCDF doesn't do advanced indexing exactly like numpy
-                # Hack is required to take values from leading diagonal. Requires n^2 elements retrieved instead of n. Not good, but better than whole array
-                # TODO: Think of a better way of doing this
-                value_array[start_index:end_index] = data_variable[
-                    (index_array[start_index:end_index, 0], index_array[start_index:end_index, 1])].diagonal()
-                if end_index == len(index_array):  # Finished
-                    break
-                start_index = end_index
-                end_index = min(start_index + max_points, len(index_array))
-
-            result_array[mask_array] = value_array
-            return list(result_array)
-        except:
-            return data_variable[indices[0], indices[1]]
+        result_array[mask_array] = self.read_values_by_block(data_variable, 
+                                                             np.ma.getdata(indices)[mask_array], 
+                                                             no_data_value=no_data_value, 
+                                                             max_bytes=max_bytes)
+        return list(result_array)
 
     def get_interpolated_value_at_coords(
-            self, coordinates, wkt=None, max_bytes=None, variable_name=None):
+            self, coordinates, wkt=None, max_bytes=None, variable_name=None, order=3, halo=None):
         '''
         Returns list of interpolated array values at specified coordinates
+        Only windows around the query points are read, block by block, with a halo of surrounding pixels to support
+        the interpolation. Points whose interpolation neighbourhood contains no-data are set to no-data.
         @parameter coordinates: iterable collection of coordinate pairs or single coordinate pair
         @parameter wkt: Coordinate Reference System for coordinates. None == native NetCDF CRS
-        @parameter max_bytes: Maximum number of bytes to read in a single query. Defaults to NetCDFGridUtils.DEFAULT_MAX_BYTES
+        @parameter max_bytes: Maximum number of bytes to read in a single query for unchunked variables. Defaults to NetCDFGridUtils.DEFAULT_READ_BLOCK_BYTES
         @parameter variable_name: NetCDF variable_name if not default data variable
+        @parameter order: Spline interpolation order as for scipy.ndimage.map_coordinates (1 = bilinear, 3 = bicubic spline)
+        @parameter halo: Number of pixels read around query points. Defaults to 1 for order <= 1, or 
+            NetCDFGridUtils.SPLINE_INTERPOLATION_HALO for higher orders to allow for spline prefiltering
+        @return interpolated_values: list of interpolated values, or array containing a single value for a single coordinate pair
         '''
-        # TODO: Check behaviour of scipy.ndimage.map_coordinates adjacent to no-data areas. Should not interpolate no-data value
-        # TODO: Make this work for arrays > memory
-        max_bytes = max_bytes or 100
-        #NetCDFGridUtils.DEFAULT_MAX_BYTES
-
         if variable_name:
             data_variable = self.netcdf_dataset.variables[variable_name]
         else:
             data_variable = self.data_variable
 
         no_data_value = data_variable._FillValue
+        
+        if halo is None:
+            halo = 1 if order <= 1 else NetCDFGridUtils.SPLINE_INTERPOLATION_HALO
 
         fractional_indices = self.get_fractional_indices_from_coords(
             coordinates, wkt)
+        
+        is_single_coordinate = (fractional_indices.ndim == 1)
+        if is_single_coordinate:
+            fractional_indices = fractional_indices.reshape((1,2))
 
-        # Make this a vectorised operation for speed (one query for as many
-        # points as possible)
-        try:
-            # Array of valid index pairs only
-            index_array = np.array(
-                [index_pair for index_pair in fractional_indices if index_pair is not None])
-            assert len(index_array.shape) == 2 and index_array.shape[
-                1] == 2, 'Not an iterable containing index pairs'
-            # Boolean mask indicating which index pairs are valid
-            mask_array = np.array([(index_pair is not None)
-                                   for index_pair in fractional_indices])
-            # Array of values read from variable
-            value_array = np.ones(shape=(len(index_array)),
-                                  dtype=data_variable.dtype) * no_data_value
-            # Final result array including no-data for invalid index pairs
-            result_array = np.ones(
-                shape=(len(mask_array)), dtype=data_variable.dtype) * no_data_value
-
-            value_array = map_coordinates(
-                data_variable, index_array.transpose(), cval=no_data_value)
-
-            result_array[mask_array] = value_array
-
-            # Mask out any coordinates falling in no-data areas. Need to do this to stop no-data value from being interpolated
-            # This is a bit ugly.
-            result_array[np.array(self.get_value_at_coords(
-                coordinates, wkt, max_bytes, variable_name)) == no_data_value] = no_data_value
-
-            return list(result_array)
-        except AssertionError:
-            return map_coordinates(data_variable, np.array(
-                [[fractional_indices[0]], [fractional_indices[1]]]), cval=no_data_value)
+        # Boolean mask indicating which index pairs are valid
+        mask_array = ~np.ma.getmaskarray(fractional_indices)[:,0]
+        # Array of valid index pairs only
+        index_array = np.ma.getdata(fractional_indices)[mask_array]
+        # Final result array including no-data for invalid index pairs
+        result_array = np.ones(
+            shape=(len(mask_array)), dtype=data_variable.dtype) * no_data_value
+        value_array = np.ones(
+            shape=(len(index_array)), dtype=data_variable.dtype) * no_data_value
+        
+        array_shape = np.array(data_variable.shape[0:2])
+        
+        # Range of pixel offsets from floor of fractional index which contribute to each interpolated value
+        if order == 0:
+            support_offsets = np.array([0])
+            support_indices = np.floor(index_array + 0.5).astype('int64')
+        else:
+            support_offsets = np.arange(-((order - 1) // 2), order // 2 + 2)
+            support_indices = np.floor(index_array).astype('int64')
+        support_indices = np.clip(support_indices, 0, array_shape - 1)
+
+        block_shape = self.get_read_block_shape(data_variable, max_bytes)
+        block_count = 0
+        bytes_read = 0
+        
+        for point_indices in self.get_block_point_indices(support_indices, block_shape, array_shape):
+            block_support_indices = support_indices[point_indices]
+            
+            # Read window spanning the points in the block plus halo
+            window_start = np.maximum(block_support_indices.min(axis=0) - halo, 0)
+            window_end = np.minimum(block_support_indices.max(axis=0) + halo + 1, array_shape)
+            window = data_variable[window_start[0]:window_end[0], window_start[1]:window_end[1]]
+            block_count += 1
+            bytes_read += window.nbytes
+            
+            no_data_mask = np.ma.getmaskarray(window) | (np.ma.getdata(window) == no_data_value)
+            if window.dtype.kind == 'f':
+                no_data_mask |= np.isnan(np.ma.getdata(window))
+            window = np.ma.getdata(window).astype('float64')
+                
+            # Points with no-data anywhere in their neighbourhood are no-data
+            point_no_data = np.zeros(shape=(len(point_indices),), dtype='bool')
+            local_support_indices = block_support_indices - window_start
+            for row_offset in support_offsets:
+                for col_offset in support_offsets:
+                    point_no_data |= no_data_mask[np.clip(local_support_indices[:,0] + row_offset, 0, window.shape[0] - 1),
+                                                  np.clip(local_support_indices[:,1] + col_offset, 0, window.shape[1] - 1)]
+                    
+            if no_data_mask.all():
+                continue
+            
+            # Replace no-data with mean of valid values to stop no-data spreading through spline prefiltering
+            if no_data_mask.any():
+                window[no_data_mask] = np.mean(window[~no_data_mask])
+                
+            interpolated_values = map_coordinates(window, 
+                                                  (index_array[point_indices] - window_start).transpose(), 
+                                                  order=order, 
+                                                  mode='nearest')
+            interpolated_values[point_no_data] = no_data_value
+            value_array[point_indices] = interpolated_values
+            
+        self.last_read_statistics = {'point_count': len(index_array),
+                                     'block_shape': block_shape,
+                                     'block_count': block_count,
+                                     'bytes_read': bytes_read
+                                     }
+        logger.debug('Interpolated {point_count} points from {block_count} blocks of shape {block_shape} ({bytes_read} bytes)'.format(**self.last_read_statistics))
+
+        result_array[mask_array] = value_array
+        
+        if is_single_coordinate:
+            return result_array
+
+        return list(result_array)
 
 
     def sample_transect(self, transect_vertices, wkt=None, sample_metres=None):
         '''
-        Function to return a list of sample points sample_metres apart along lines between transect vertices
-        @param transect_vertices: list or array of transect vertex coordinates
+        Function to return sample points sample_metres apart along lines between transect vertices
+        @param transect_vertices: list or array of transect vertex coordinates, or a list of these for a batch of 
+            transects
         @param wkt: coordinate reference system for transect_vertices
         @param sample_metres: distance between sample points in metres
+        
+        @return sample_points: Array of shape (N, 2) containing sample points, or a list of these for a batch of 
+            transects
+        @return sample_metres: distance between sample points in metres
         '''
         wkt = wkt or self.wkt
         sample_metres = sample_metres or self.default_sample_metres
+        
+        if len(transect_vertices) and np.ndim(transect_vertices[0]) == 2: # Batch of transects
+            return sample_transects(transect_vertices, wkt, sample_metres), sample_metres
+        
         return sample_transect(transect_vertices, wkt, sample_metres)
         
 
@@ -666,6 +872,9 @@ class NetCDFGridUtils(NetCDFUtils):
              var_list=[],        
              empty_var_list=[],        
              invert_y=None,
+             max_workers=1,
+             checkpoint_path=None,
+             resume=False,
         ):
         '''
         Function to copy a netCDF dataset to another one with potential changes to size, format, 
@@ -709,6 +918,9 @@ class NetCDFGridUtils(NetCDFUtils):
              limit_dim_size=limit_dim_size,
              var_list=expanded_var_list,
              empty_var_list=empty_var_list,
+             max_workers=max_workers,
+             checkpoint_path=checkpoint_path,
+             resume=resume,
              )
         
         try:
@@ -823,8 +1035,12 @@ class NetCDFGridUtils(NetCDFUtils):
                     continue
                 
                 try:
+                    data_stats = DataStats(netcdf_dataset=self.netcdf_dataset, 
+                                           variable_name=variable_name, 
+                                           compute_percentiles=False)
+                    assert data_stats.value('count'), 'No valid values'
                     variable.actual_range = np.array(
-                        [np.nanmin(variable[:]), np.nanmax(variable[:])], dtype=variable.dtype)
+                        [data_stats.value('min'), data_stats.value('max')], dtype=variable.dtype)
                     logger.debug('{}.actual_range = {}'.format(variable_name, variable.actual_range))
                 except:
                     logger.warning('Unable to compute actual_range value for variable {}'.format(variable_name))
@@ -32,7 +32,7 @@ import logging
 import netCDF4
 from pprint import pformat
 import shapely.wkt
-from geophys_utils._transect_utils import utm_coords, coords2distance
+from geophys_utils._transect_utils import utm_coords, coords2distance, grouped_coords2distance
 
 # Setup logging handlers if required
 logger = logging.getLogger(__name__) # Get logger
@@ -62,12 +62,18 @@ class NetCDFLineUtils(NetCDFPointUtils):
                  enable_disk_cache=None,
                  enable_memory_cache=True,
                  cache_path=None,
+                 enable_spatial_index=None,
+                 cache_backend='netcdf',
                  debug=False):
         '''
         NetCDFLineUtils Constructor
         @parameter netcdf_dataset: netCDF4.Dataset object containing a line dataset
         @parameter enable_disk_cache: Boolean parameter indicating whether local cache file should be used, or None for default 
         @parameter enable_memory_cache: Boolean parameter indicating whether values should be cached in memory or not.
+        @parameter cache_backend: Disk cache backend - 'netcdf' for a compressed netCDF cache file, or 'npy' for raw 
+            .npy files which are memory-mapped read-only so that processes on one host share the page cache
+        @parameter enable_spatial_index: Boolean parameter indicating whether a persistent spatial index should be 
+            saved alongside the disk cache file, or None to follow enable_disk_cache
         @parameter debug: Boolean parameter indicating whether debug output should be turned on or not
         '''     
         # Start of init function - Call inherited constructor first
@@ -76,6 +82,8 @@ class NetCDFLineUtils(NetCDFPointUtils):
                          enable_disk_cache=enable_disk_cache, 
                          enable_memory_cache=enable_memory_cache,
                          cache_path=cache_path,
+                         enable_spatial_index=enable_spatial_index,
+                         cache_backend=cache_backend,
                          debug=debug)
 
         logger.debug('Running NetCDFLineUtils constructor')
@@ -85,56 +93,177 @@ class NetCDFLineUtils(NetCDFPointUtils):
         # Initialise private property variables to None until set by property getter methods
         self._line = None
         self._line_index = None
+        self._line_segments = None
             
         
-    def get_line_masks(self, line_numbers=None, subset_mask=None, get_contiguous_lines=False):
+    def get_line_segments(self):
         '''
-        Generator to return boolean masks of dimension 'point' for specified lines
+        Function to build line segment index describing where the points for each line are located.
+        Uses line_start_index & line_count (or line_point_count) variables if present in the dataset, 
+        otherwise derives start offsets and counts from line_index in a single pass.
+        
+        @return point_order: array of point indices sorted by line, or None if all lines are contiguous in the point dimension
+        @return line_start_indices: array of start offsets for each line into point_order (or point dimension if point_order is None)
+        @return line_point_counts: array of point counts for each line
+        '''
+        line_count = len(self.line)
+        
+        start_index_variable = self.netcdf_dataset.variables.get('line_start_index')
+        count_variable = self.netcdf_dataset.variables.get('line_count')
+        if count_variable is None:
+            count_variable = self.netcdf_dataset.variables.get('line_point_count')
+        if start_index_variable is not None and count_variable is not None:
+            logger.debug('Reading line segment index from start index and count variables')
+            return (None, 
+                    np.array(start_index_variable[:], dtype='int64').reshape((line_count,)), 
+                    np.array(count_variable[:], dtype='int64').reshape((line_count,))
+                    )
+        
+        line_index = np.asarray(self.line_index).astype('int64')
+        valid_mask = np.logical_and(line_index >= 0, line_index < line_count)
+        line_point_counts = np.bincount(line_index[valid_mask], minlength=line_count)
+        
+        # Lines are contiguous if there is exactly one run of points per line
+        run_start_mask = np.ones(shape=line_index.shape, dtype=bool)
+        run_start_mask[1:] = (line_index[1:] != line_index[:-1])
+        run_start_mask = np.logical_and(run_start_mask, valid_mask)
+        
+        if np.all(valid_mask) and np.count_nonzero(run_start_mask) == np.count_nonzero(line_point_counts):
+            logger.debug('Lines are contiguous in point dimension')
+            line_start_indices = np.zeros(shape=(line_count,), dtype='int64')
+            run_start_indices = np.where(run_start_mask)[0]
+            line_start_indices[line_index[run_start_indices]] = run_start_indices
+            return None, line_start_indices, line_point_counts
+            
+        logger.debug('Lines are not contiguous in point dimension - sorting points by line')
+        point_order = np.where(valid_mask)[0]
+        point_order = point_order[np.argsort(line_index[point_order], kind='stable')]
+        line_start_indices = np.cumsum(line_point_counts) - line_point_counts
+        return point_order, line_start_indices, line_point_counts
+    
+    
+    @property
+    def line_segments(self):
+        '''
+        Property getter function to return line segment index as returned by get_line_segments
+        '''
+        if self._line_segments is None:
+            self._line_segments = self.get_line_segments()
+        return self._line_segments
+    
+    
+    def get_line_point_indices(self, line_numbers=None, subset_mask=None, get_contiguous_lines=False):
+        '''
+        Generator to return ascending point indices for specified lines using the line segment index
+        Total cost is proportional to the number of points in the selected lines rather than lines x points
         @param line_numbers: list of integer line number or single integer line number, or None for all lines
         @param subset_mask: optional Boolean mask for subset (e.g. spatial mask)
         @param get_contiguous_lines: Boolean flag indicating whether masked gaps in lines should be included
         
         @return line_number: line number for single line
-        @return line_mask: Boolean mask for single line
-
-        '''       
-        # Yield masks for all lines in subset if no line numbers specified
+        @return point_indices: array of point indices for single line
+        '''
+        point_order, line_start_indices, line_point_counts = self.line_segments
+        
+        # Yield indices for all lines if no line numbers specified
         if line_numbers is None:
-            line_number_subset = self.line # All line numbers
+            line_index_subset = np.arange(len(self.line))
         else:
             # Convert single line number to single element list
             try:
                 _line_numbers_iterator = iter(line_numbers)
             except TypeError:
                 line_numbers = [line_numbers]
-
-            line_number_subset = np.array(line_numbers)
-            
-        if subset_mask is not None:
-            line_number_subset = line_number_subset[np.isin(line_number_subset, self.line[np.unique(self.line_index[subset_mask])])] # Exclude lines not in subset
-        else:    
-            line_number_subset = line_number_subset[np.isin(line_number_subset, self.line)] # Exclude bad line numbers 
-    
-        line_mask = np.zeros(shape=self.line_index.shape, dtype=np.bool) # Keep re-using same in-memory array
-
-        for line_number in line_number_subset:
-            line_mask[:] = False
-            line_index = int(np.where(self.line == line_number)[0])
+                
+            line_sort_order = np.argsort(self.line)
+            line_index_subset = np.searchsorted(self.line, np.array(line_numbers), sorter=line_sort_order)
+            line_index_subset[line_index_subset >= len(self.line)] = 0
+            line_index_subset = line_sort_order[line_index_subset]
+            line_index_subset = line_index_subset[self.line[line_index_subset] == np.array(line_numbers)] # Exclude bad line numbers
+        
+        for line_index in line_index_subset:
+            line_start_index = line_start_indices[line_index]
+            line_end_index = line_start_index + line_point_counts[line_index]
             
+            if point_order is None:
+                point_indices = np.arange(line_start_index, line_end_index)
+            else:
+                point_indices = point_order[line_start_index:line_end_index]
+                
             if subset_mask is not None:
-                line_mask[subset_mask] = (self.line_index[subset_mask] == line_index)
+                point_subset_mask = subset_mask[point_indices]
                 
                 if get_contiguous_lines:
                     # Include all points in line from first to last in subset
-                    point_indices = np.where(line_mask)[0]
-                    line_mask[min(point_indices):max(point_indices)+1] = True
-            else:
-                line_mask[(self.line_index == line_index)] = True
+                    subset_positions = np.where(point_subset_mask)[0]
+                    if len(subset_positions):
+                        point_indices = point_indices[subset_positions[0]:subset_positions[-1]+1]
+                    else:
+                        point_indices = point_indices[point_subset_mask]
+                else:
+                    point_indices = point_indices[point_subset_mask]
                 
-            #logger.debug('Line {} has a total of {} points'.format(line_number, np.count_nonzero(line_mask))) 
+            #logger.debug('Line {} has a total of {} points'.format(self.line[line_index], len(point_indices))) 
+            
+            if len(point_indices):
+                yield self.line[line_index], point_indices
+    
+    
+    def get_line_distances(self, geodesic=True):
+        '''
+        Function to compute cumulative distance in metres along every line in a single pass over all points
+        using the line segment index
+        @param geodesic: Boolean flag indicating whether to compute ellipsoidal distances from WGS84 lon/lat 
+            coordinates. Planar distances are computed from coordinates in a single UTM zone for the whole dataset 
+            if False
+        
+        @return distance_array: Array of shape (point_count) containing the cumulative distance of each point from 
+            the first point in its line. Points not in any line are set to NaN
+        '''
+        point_order, line_start_indices, line_point_counts = self.line_segments
+        
+        if geodesic:
+            coordinate_array = transform_coords(self.xycoords, self.wkt, 'EPSG:4326')
+        else:
+            _utm_wkt, coordinate_array = utm_coords(self.xycoords, self.wkt)
+            
+        if point_order is not None:
+            coordinate_array = coordinate_array[point_order]
+            
+        line_distance_array = grouped_coords2distance(coordinate_array, 
+                                                      line_start_indices[line_point_counts > 0], 
+                                                      geodesic=geodesic)
+        
+        if point_order is None:
+            return line_distance_array
+        
+        distance_array = np.full(shape=(self.point_count,), fill_value=np.nan, dtype=line_distance_array.dtype)
+        distance_array[point_order] = line_distance_array
+        return distance_array
+    
+    
+    def get_line_masks(self, line_numbers=None, subset_mask=None, get_contiguous_lines=False):
+        '''
+        Generator to return boolean masks of dimension 'point' for specified lines
+        N.B: The same mask array is re-used for each line. Use get_line_point_indices instead where possible.
+        @param line_numbers: list of integer line number or single integer line number, or None for all lines
+        @param subset_mask: optional Boolean mask for subset (e.g. spatial mask)
+        @param get_contiguous_lines: Boolean flag indicating whether masked gaps in lines should be included
+        
+        @return line_number: line number for single line
+        @return line_mask: Boolean mask for single line
+
+        '''       
+        line_mask = np.zeros(shape=(self.point_count,), dtype=bool) # Keep re-using same in-memory array
+
+        for line_number, point_indices in self.get_line_point_indices(line_numbers=line_numbers, 
+                                                                      subset_mask=subset_mask, 
+                                                                      get_contiguous_lines=get_contiguous_lines
+                                                                      ):
+            line_mask[:] = False
+            line_mask[point_indices] = True
             
-            if np.any(line_mask): # This is probably redundant
-                yield line_number, line_mask
+            yield line_number, line_mask
     
     
     def get_lines(self, line_numbers=None, 
@@ -171,12 +300,10 @@ class NetCDFLineUtils(NetCDFPointUtils):
         
         logger.debug('subsampling_distance: {}'.format(subsampling_distance))
         
-        for line_number, line_mask in self.get_line_masks(line_numbers=line_numbers, 
-                                                          subset_mask=spatial_subset_mask,
-                                                          get_contiguous_lines=get_contiguous_lines
-                                                          ):
-        
-            point_indices = np.where(line_mask)[0]
+        for line_number, point_indices in self.get_line_point_indices(line_numbers=line_numbers, 
+                                                                      subset_mask=spatial_subset_mask,
+                                                                      get_contiguous_lines=get_contiguous_lines
+                                                                      ):
             #logger.debug('Line {} has {} points in bounding box'.format(line_number, len(point_indices))) 
             line_point_count = len(point_indices)
             if line_point_count: # This test should be redundant
@@ -195,6 +322,11 @@ class NetCDFLineUtils(NetCDFPointUtils):
                     point_indices = point_indices[subset_indices]
                     
                 line_dict = {'coordinates': self.xycoords[point_indices]}
+                
+                # Read contiguous points as a single slice rather than with an index array
+                if point_indices[-1] - point_indices[0] + 1 == len(point_indices):
+                    point_indices = slice(point_indices[0], point_indices[-1] + 1)
+                    
                 # Add <variable_name>: <variable_array> for each specified variable
                 for variable_name in variables:
                     line_dict[variable_name] = self.netcdf_dataset.variables[variable_name][point_indices]
@@ -202,6 +334,14 @@ class NetCDFLineUtils(NetCDFPointUtils):
                 yield line_number, line_dict
  
     
+    def get_line_sort_order(self, sort_variable_name=None, line_index=None):
+        '''
+        Function to return point indices sorted by line, then by fiducial or time within each line, using cached 
+        line_index values. See NetCDFPointUtils.get_line_sort_order
+        '''
+        return super().get_line_sort_order(sort_variable_name=sort_variable_name, 
+                                           line_index=self.line_index if line_index is None else line_index)
+    
     def get_line_values(self):
         '''
         Function to retrieve array of line number values from self.netcdf_dataset
@@ -244,7 +384,16 @@ class NetCDFLineUtils(NetCDFPointUtils):
         line = None
         line_index = None
 
-        if self.enable_disk_cache:
+        if self.enable_disk_cache and self.cache_backend == 'npy':
+            line = self.read_npy_cache('line')
+            if line is None:
+                line = self.write_npy_cache('line', self.get_line_values())
+                
+            line_index = self.read_npy_cache('line_index')
+            if line_index is None:
+                line_index = self.write_npy_cache('line_index', self.get_line_index_values())
+                
+        elif self.enable_disk_cache:
             if os.path.isfile(self.cache_path):
                 # Cached coordinate file exists - read it
                 cache_dataset = netCDF4.Dataset(self.cache_path, 'r')
@@ -413,15 +562,14 @@ class NetCDFLineUtils(NetCDFPointUtils):
         @param line_divisions: Number of sampling subdivisions for each line (1 = start/end points only)
         '''    
         line_sample_indices_set = set()
-        for line_index in range(self.netcdf_dataset.dimensions['line'].size):
-            line_indices = np.where(self.netcdf_dataset.variables['line_index'][:] == line_index)[0]
-            logger.debug('Sampling line index {} with {} points'.format(line_index, len(line_indices)))
+        for line_number, line_indices in self.get_line_point_indices():
+            logger.debug('Sampling line {} with {} points'.format(line_number, len(line_indices)))
             valid_coord_mask = ~np.any(np.isnan(self.xycoords[line_indices]), axis=1) 
             if not np.count_nonzero(valid_coord_mask): # No valid coordinates in line
-                logger.debug('No valid coordinates found in line index {}'.format(line_index))
+                logger.debug('No valid coordinates found in line {}'.format(line_number))
                 continue
             
-            #logger.debug('Found {}/{} valid points in line index {}'.format(np.count_nonzero(valid_coord_mask), len(line_indices), line_index))
+            #logger.debug('Found {}/{} valid points in line {}'.format(np.count_nonzero(valid_coord_mask), len(line_indices), line_number))
             line_indices = line_indices[valid_coord_mask] # Filter out NaN ordinates  
                        
             # Take samples between first and last valid line indices            
@@ -453,17 +601,9 @@ class NetCDFLineUtils(NetCDFPointUtils):
         '''\
         Function to return a shapely MultiLineString object representing the line dataset
         '''
-        _line_indices, line_start_indices = np.sort(np.unique(self.line_index, return_index=True))
-        
-        line_end_indices = np.array(line_start_indices)
-        line_end_indices[0:-1] = line_start_indices[1:]
-        line_end_indices[-1] = self.point_count
-        line_end_indices = line_end_indices -1
-        
         line_list = []
-        for line_index in range(len(line_start_indices)):
-            line_slice = slice(line_start_indices[line_index], line_end_indices[line_index]+1)
-            line_vertices = self.xycoords[line_slice]
+        for _line_number, point_indices in self.get_line_point_indices():
+            line_vertices = self.xycoords[point_indices]
             line_vertices = line_vertices[~np.any(np.isnan(line_vertices), axis=1)] # Discard null coordinates
             if len(line_vertices) >= 2: # LineStrings must have at least 2 coordinate tuples
                 line_list.append(LineString(transform_coords(line_vertices, self.wkt, to_wkt)).simplify(tolerance))
@@ -26,18 +26,23 @@ import math
 import os
 import sys
 import re
+import json
 import tempfile
 from collections import OrderedDict
 from pprint import pformat
 from scipy.interpolate import griddata
 from geophys_utils._crs_utils import transform_coords, get_utm_wkt, get_reprojected_bounds, get_spatial_ref_from_wkt
 from geophys_utils._transect_utils import utm_coords, coords2distance
-from geophys_utils._netcdf_utils import NetCDFUtils, METADATA_CRS
+from geophys_utils._netcdf_utils import NetCDFUtils, METADATA_CRS, get_index_runs
+from geophys_utils._array_pieces import get_chunk_shape
+from geophys_utils._data_stats import DataStats
 from geophys_utils._polygon_utils import points2convex_hull
+from geophys_utils._point_in_polygon import points_in_geometry
+from geophys_utils._spatial_index import SpatialIndex, get_source_key, get_spatial_order
 from geophys_utils._concave_hull import concaveHull
 from shapely.geometry import shape
 from scipy.spatial.ckdtree import cKDTree
-from shapely.geometry import Polygon, MultiPoint, MultiPolygon
+from shapely.geometry import Polygon, MultiPolygon
 from shapely.geometry.polygon import asPolygon
 from shapely.geometry.base import BaseGeometry
 from shapely.ops import transform
@@ -80,6 +85,12 @@ class NetCDFPointUtils(NetCDFUtils):
                                    'shuffle': True,
                                    'endian': 'little',
                                    }
+    CACHE_BACKENDS = ['netcdf', 'npy'] # Disk cache backends - compressed netCDF file or memory-mappable .npy files
+    
+    LINE_SORT_VARIABLE_NAMES = ['fiducial', 'fid', 'time'] # Point variables for ordering points within lines in order of preference
+    LINE_SEGMENT_VARIABLE_NAMES = ['line_start_index', 'line_point_count'] # Variables which are only valid for unchanged point order
+    CHUNK_BOUNDS_VARIABLE_NAME = 'point_chunk_bounds' # Variable containing [xmin, ymin, xmax, ymax] for each chunk of points
+    CHUNK_SUMMARY_STATISTICS = ['min', 'max', 'count'] # Per-chunk statistics stored in <variable_name>_chunk_<statistic> variables
 
     def __init__(self, 
                  netcdf_dataset,
@@ -88,12 +99,18 @@ class NetCDFPointUtils(NetCDFUtils):
                  enable_memory_cache=True,
                  cache_path=None,
                  s3_bucket=None,
+                 enable_spatial_index=None,
+                 cache_backend='netcdf',
                  debug=False):
         '''
         NetCDFPointUtils Constructor
         @parameter netcdf_dataset: netCDF4.Dataset object containing a point dataset
         @parameter enable_disk_cache: Boolean parameter indicating whether local cache file should be used, or None for default 
         @parameter enable_memory_cache: Boolean parameter indicating whether values should be cached in memory or not.
+        @parameter cache_backend: Disk cache backend - 'netcdf' for a compressed netCDF cache file, or 'npy' for raw 
+            .npy files which are memory-mapped read-only so that processes on one host share the page cache
+        @parameter enable_spatial_index: Boolean parameter indicating whether a persistent spatial index should be 
+            saved alongside the disk cache file, or None to follow enable_disk_cache
         @parameter debug: Boolean parameter indicating whether debug output should be turned on or not
         '''
         # Start of init function - Call inherited constructor first
@@ -123,24 +140,45 @@ class NetCDFPointUtils(NetCDFUtils):
 
         self.enable_memory_cache = enable_memory_cache
         
+        assert cache_backend in NetCDFPointUtils.CACHE_BACKENDS, 'Invalid cache_backend {}. Must be one of {}'.format(cache_backend, 
+                                                                                                                  NetCDFPointUtils.CACHE_BACKENDS)
+        self.cache_backend = cache_backend
+        self.npy_cache_dir = os.path.splitext(self.cache_path)[0] + '_npy'
+        
         # If caching is not explicitly specified, enable it for OPeNDAP access
         if enable_disk_cache is None:
             self.enable_disk_cache = self.opendap
         else:
             self.enable_disk_cache = enable_disk_cache
 
+        if enable_spatial_index is None:
+            self.enable_spatial_index = self.enable_disk_cache
+        else:
+            self.enable_spatial_index = enable_spatial_index
+
+        self.spatial_index_path = os.path.splitext(self.cache_path)[0] + '_spatial_index'
+
         # Initialise private property variables to None until set by property getter methods
         self._xycoords = None         
         self._point_variables = None        
         self._data_variable_list = None
         self._kdtree = None
-
-        # Determine exact spatial bounds
-        xycoords = self.xycoords
-        xmin = np.nanmin(xycoords[:,0])
-        xmax = np.nanmax(xycoords[:,0])
-        ymin = np.nanmin(xycoords[:,1])
-        ymax = np.nanmax(xycoords[:,1])
+        self._spatial_index = None
+        self._point_chunk_bounds = None
+        self._chunk_summaries = {}
+
+        # Determine exact spatial bounds - use saved spatial index or chunk bounds if possible to avoid reading all coordinates
+        if self.spatial_index is not None:
+            xmin, ymin, xmax, ymax = self.spatial_index.bounds
+        elif self.point_chunk_bounds is not None:
+            xmin, ymin = np.nanmin(self.point_chunk_bounds[1][:,0:2], axis=0)
+            xmax, ymax = np.nanmax(self.point_chunk_bounds[1][:,2:4], axis=0)
+        else:
+            xycoords = self.xycoords
+            xmin = np.nanmin(xycoords[:,0])
+            xmax = np.nanmax(xycoords[:,0])
+            ymin = np.nanmin(xycoords[:,1])
+            ymax = np.nanmax(xycoords[:,1])
         
         # Create nested list of bounding box corner coordinates
         self.native_bbox = [[xmin, ymin], [xmax, ymin], [xmax, ymax], [xmin, ymax]]
@@ -219,41 +257,7 @@ class NetCDFPointUtils(NetCDFUtils):
         :return mask: Boolean array of size n
         '''
         
-        #TODO: Deal with this in a more high-level way
-        POINT_CHUNK_SIZE = 1048576 # Number of points to check at any one time to keep memory usage down
-            
-        def get_intersection_mask(points, geometry):
-            """
-            Determine if points lie inside (multi)polygon
-            N.B: points and geometry must be in the same CRS
-            :param points: 2 x n array of input coordinates
-            :param geometry: (multi)polygon
-            :return mask: Boolean array of size n 
-            """
-            mask = np.zeros(shape=(points.shape[0]), dtype=np.bool)
-            
-            chunk_start_index = 0
-            while chunk_start_index < len(points):
-                chunk_end_index = min(chunk_start_index + POINT_CHUNK_SIZE, len(points))
-                logger.debug('Checking spatial containment for points {} to {} of {}'.format(chunk_start_index, chunk_end_index-1, len(points)))
-                intersection_points = np.array(MultiPoint(points[slice(chunk_start_index, chunk_end_index)]).intersection(geometry))
-                
-                #TODO: Find out if there's a better way of getting the mask from the intersection points
-                # Note that this method would have some issues with duplicated coordinates, but there shouldn't be any
-                logger.debug('Computing partial mask from {} intersection points'.format(len(intersection_points)))
-                _x_values, x_indices, _x_intersection_indices = np.intersect1d(points.flatten()[0::2], intersection_points.flatten()[0::2], return_indices=True)
-                _y_values, y_indices, _y_intersection_indices = np.intersect1d(points.flatten()[1::2], intersection_points.flatten()[1::2], return_indices=True)
-                intersection_indices = np.intersect1d(x_indices, y_indices, return_indices=False)
-                mask[intersection_indices] = True
-                    
-                chunk_start_index = chunk_end_index
-
-            return mask
-            
-            
-        coordinates = self.xycoords # Don't transform these - do all spatial operations in native CRS
-        #logger.debug('coordinates = {}'.format(coordinates))
-    
+        # N.B: Don't transform coordinates - do all spatial operations in native CRS
     
         if isinstance(bounds, BaseGeometry): # Process shapely (multi)polygon bounds    
             if bounds_wkt is None:
@@ -268,11 +272,34 @@ class NetCDFPointUtils(NetCDFUtils):
             # Shortcut the whole process if the extents are within the bounds geometry       
             if asPolygon(self.native_bbox).within(native_crs_bounds):
                 logger.debug('Dataset is completely contained within bounds')
-                return np.ones(shape=(len(coordinates),), dtype=np.bool)
+                return np.ones(shape=(self.point_count,), dtype=bool)
+            
+            if self.spatial_index is not None:
+                # Only retrieve coordinates for points within the geometry's rectangular extent from the index
+                point_indices, point_coordinates = self.spatial_index.get_bbox_points(native_crs_bounds.bounds)
+                logger.debug('{}/{} points found in spatial index bounding box query'.format(len(point_indices), self.point_count))
+                
+                mask = np.zeros(shape=(self.point_count,), dtype=bool)
+                mask[point_indices[points_in_geometry(point_coordinates, native_crs_bounds)]] = True
+                
+                logger.debug('{}/{} points found in final mask'.format(np.count_nonzero(mask), self.point_count))
+                return mask
+                
+            if self.point_chunk_bounds is not None:
+                # Only retrieve coordinates for chunks which intersect the geometry's rectangular extent
+                point_indices, point_coordinates = self.get_chunk_bounds_points(native_crs_bounds.bounds)
                 
+                mask = np.zeros(shape=(self.point_count,), dtype=bool)
+                mask[point_indices[points_in_geometry(point_coordinates, native_crs_bounds)]] = True
+                
+                logger.debug('{}/{} points found in final mask'.format(np.count_nonzero(mask), self.point_count))
+                return mask
+                
+            coordinates = self.xycoords
             bounds_half_size = abs(np.array([native_crs_bounds.bounds[2] - native_crs_bounds.bounds[0], 
                                              native_crs_bounds.bounds[3] - native_crs_bounds.bounds[1]])) / 2.0
-            bounds_centroid = np.array(native_crs_bounds.centroid.coords[0])
+            bounds_centroid = np.array([native_crs_bounds.bounds[2] + native_crs_bounds.bounds[0], 
+                                        native_crs_bounds.bounds[3] + native_crs_bounds.bounds[1]]) / 2.0 # Centre of bounding box, not geometry centroid
             #logger.debug('bounds_half_size = {}, bounds_centroid = {}'.format(bounds_half_size, bounds_centroid))
             
             # Limit the points checked to those within the same rectangular extent (for speed)
@@ -281,13 +308,13 @@ class NetCDFPointUtils(NetCDFUtils):
             logger.debug('{}/{} points found in initial bounding box intersection'.format(np.count_nonzero(mask), len(coordinates)))
             
             # Apply sub-mask for all points within bounds geometry
-            (mask[mask])[~get_intersection_mask(coordinates[mask], native_crs_bounds)] = False
+            mask[mask] = points_in_geometry(coordinates[mask], native_crs_bounds)
             #logger.debug('Final shape mask = {}'.format(mask))
             
         else: # Process four-element bounds iterable if possible
             assert len(bounds) == 4, 'Invalid bounds iterable: {}. Must be of form [<xmin>, <ymin>, <xmax>, <ymax>]'.format(bounds)
             
-            native_crs_bounds = transform_coords(np.array(bounds).reshape((2,2)), bounds_wkt, self.wkt).reshape((4, 1)) # Transform as [xmin, ymin], [xmax, ymax]]
+            native_crs_bounds = transform_coords(np.array(bounds).reshape((2,2)), bounds_wkt, self.wkt).reshape((4,)) # Transform as [xmin, ymin], [xmax, ymax]]
                 
             if (self.bounds[0] >= native_crs_bounds[0]
                 and self.bounds[1] >= native_crs_bounds[1]
@@ -295,19 +322,192 @@ class NetCDFPointUtils(NetCDFUtils):
                 and self.bounds[3] <= native_crs_bounds[3]
                 ):
                 logger.debug('Dataset is completely contained within bounds')
-                return np.ones(shape=(len(coordinates),), dtype=np.bool)
+                return np.ones(shape=(self.point_count,), dtype=bool)
+            
+            if self.spatial_index is not None:
+                mask = self.spatial_index.get_bbox_mask(native_crs_bounds)
+                logger.debug('{}/{} points found in final mask'.format(np.count_nonzero(mask), self.point_count))
+                return mask
                 
-        
+            if self.point_chunk_bounds is not None:
+                mask = np.zeros(shape=(self.point_count,), dtype=bool)
+                mask[self.get_chunk_bounds_points(native_crs_bounds)[0]] = True
+                logger.debug('{}/{} points found in final mask'.format(np.count_nonzero(mask), self.point_count))
+                return mask
+                
+            coordinates = self.xycoords
             bounds_half_size = abs(np.array([native_crs_bounds[2] - native_crs_bounds[0], native_crs_bounds[3] - native_crs_bounds[1]])) / 2.0
             bounds_centroid = np.array([native_crs_bounds[0], native_crs_bounds[1]]) + bounds_half_size
             
             # Return true for each point which is <= bounds_half_size distance from bounds_centroid
             mask = np.all(ne.evaluate("abs(coordinates - bounds_centroid) <= bounds_half_size"), axis=1)  
                       
-        logger.debug('{}/{} points found in final mask'.format(np.count_nonzero(mask), len(coordinates)))
+        logger.debug('{}/{} points found in final mask'.format(np.count_nonzero(mask), self.point_count))
         return mask
         
         
+    @property
+    def point_chunk_bounds(self):
+        '''
+        Property getter function to return the per-chunk bounding box table written by copy(spatial_order=...)
+        @return chunk_size: number of points per chunk
+        @return chunk_bounds: n x 4 array of [xmin, ymin, xmax, ymax] for each chunk
+        or None if the dataset has no chunk bounds variable
+        '''
+        if (self._point_chunk_bounds is None 
+            and NetCDFPointUtils.CHUNK_BOUNDS_VARIABLE_NAME in self.netcdf_dataset.variables.keys()):
+            chunk_bounds_variable = self.netcdf_dataset.variables[NetCDFPointUtils.CHUNK_BOUNDS_VARIABLE_NAME]
+            self._point_chunk_bounds = (int(chunk_bounds_variable.point_chunk_size), 
+                                        np.ma.filled(np.ma.asarray(chunk_bounds_variable[:], dtype='float64'), np.nan)
+                                        )
+            logger.debug('Read bounds for {} chunks of {} points'.format(self._point_chunk_bounds[1].shape[0], 
+                                                                         self._point_chunk_bounds[0]))
+        return self._point_chunk_bounds
+    
+    def get_chunk_bounds_points(self, bounds):
+        '''
+        Function to return indices and coordinates of points within a native CRS bounding box, reading only the
+        coordinates of point chunks whose bounding boxes intersect it
+        @param bounds: [xmin, ymin, xmax, ymax] in native CRS
+        @return point_indices: array of point indices within bounds
+        @return point_coordinates: n x 2 array of coordinates for points within bounds
+        '''
+        chunk_size, chunk_bounds = self.point_chunk_bounds
+        chunk_indices = np.where(np.logical_and.reduce((chunk_bounds[:,0] <= bounds[2],
+                                                        chunk_bounds[:,2] >= bounds[0],
+                                                        chunk_bounds[:,1] <= bounds[3],
+                                                        chunk_bounds[:,3] >= bounds[1]
+                                                        )))[0]
+        logger.debug('{}/{} point chunks intersect bounding box'.format(len(chunk_indices), len(chunk_bounds)))
+        
+        if not len(chunk_indices):
+            return np.zeros(shape=(0,), dtype='int64'), np.zeros(shape=(0, 2), dtype='float64')
+        
+        # Read runs of adjacent chunks as single slices
+        point_slices = [slice(chunk_slice.start * chunk_size, min(chunk_slice.stop * chunk_size, self.point_count))
+                        for chunk_slice in get_index_runs(chunk_indices)[0]]
+        point_indices = np.concatenate([np.arange(point_slice.start, point_slice.stop) for point_slice in point_slices])
+        
+        if self._xycoords is not None: # Coordinates already in memory
+            point_coordinates = self._xycoords[point_indices]
+        else:
+            point_coordinates = np.concatenate([np.column_stack([np.ma.filled(np.ma.asarray(variable[point_slice], dtype='float64'), np.nan)
+                                                                 for variable in [self.x_variable, self.y_variable]])
+                                                for point_slice in point_slices
+                                                ])
+        
+        bbox_mask = np.logical_and.reduce((point_coordinates[:,0] >= bounds[0],
+                                           point_coordinates[:,0] <= bounds[2],
+                                           point_coordinates[:,1] >= bounds[1],
+                                           point_coordinates[:,1] <= bounds[3]
+                                           ))
+        return point_indices[bbox_mask], point_coordinates[bbox_mask]
+    
+    @property
+    def point_chunk_size(self):
+        '''
+        Property getter function to return the number of points per chunk for chunk bounds and summaries. 
+        Uses the size of any existing point_chunk variables, otherwise the storage chunk size of the X coordinate variable
+        '''
+        if 'point_chunk' in self.netcdf_dataset.dimensions.keys():
+            for variable in self.netcdf_dataset.variables.values():
+                if variable.dimensions[:1] == ('point_chunk',) and hasattr(variable, 'point_chunk_size'):
+                    return int(variable.point_chunk_size)
+                
+        return (get_chunk_shape(self.x_variable) or (DEFAULT_READ_CHUNK_SIZE,))[0]
+    
+    def get_chunk_summary(self, variable_name):
+        '''
+        Function to return the per-chunk summary written by set_variable_chunk_summaries for a point variable
+        @param variable_name: Name of point variable
+        @return chunk_size: number of points per chunk
+        @return chunk_summary: dict of per-chunk arrays keyed by CHUNK_SUMMARY_STATISTICS
+        or None if the variable has no chunk summary
+        '''
+        if variable_name not in self._chunk_summaries:
+            summary_variable_names = {statistic: '{}_chunk_{}'.format(variable_name, statistic) 
+                                      for statistic in NetCDFPointUtils.CHUNK_SUMMARY_STATISTICS}
+            
+            if set(summary_variable_names.values()) <= set(self.netcdf_dataset.variables.keys()):
+                chunk_summary = {statistic: self.netcdf_dataset.variables[summary_variable_name][:]
+                                 for statistic, summary_variable_name in summary_variable_names.items()}
+                self._chunk_summaries[variable_name] = (int(self.netcdf_dataset.variables[summary_variable_names['count']].point_chunk_size), 
+                                                        chunk_summary)
+            else:
+                self._chunk_summaries[variable_name] = None
+                
+        return self._chunk_summaries[variable_name]
+    
+    def get_chunk_candidate_mask(self, variable_name, min_value=None, max_value=None, value_list=None):
+        '''
+        Function to return a boolean mask of chunks which may contain values satisfying range and/or equality predicates
+        @param variable_name: Name of point variable with chunk summary
+        @param min_value: Optional minimum value (inclusive)
+        @param max_value: Optional maximum value (inclusive)
+        @param value_list: Optional list of permitted values
+        @return chunk_mask: boolean array with one element per chunk
+        '''
+        chunk_summary = self.get_chunk_summary(variable_name)[1]
+        chunk_min = np.ma.filled(chunk_summary['min'], 0)
+        chunk_max = np.ma.filled(chunk_summary['max'], 0)
+        
+        chunk_mask = np.ma.filled(chunk_summary['count'], 0) > 0
+        if min_value is not None:
+            chunk_mask &= (chunk_max >= min_value)
+        if max_value is not None:
+            chunk_mask &= (chunk_min <= max_value)
+        if value_list is not None:
+            # Chunk may contain a value if any permitted value lies between the chunk minimum and maximum
+            sorted_values = np.sort(np.array(value_list))
+            chunk_mask &= (np.searchsorted(sorted_values, chunk_min, side='left') 
+                           < np.searchsorted(sorted_values, chunk_max, side='right'))
+            
+        logger.debug('{}/{} chunks of {} may contain matching values'.format(np.count_nonzero(chunk_mask), len(chunk_mask), variable_name))
+        return chunk_mask
+    
+    def get_value_mask(self, variable_name, min_value=None, max_value=None, value_list=None):
+        '''
+        Function to return a point mask for values satisfying range and/or equality predicates. Only chunks which may 
+        contain matching values are read if the variable has a chunk summary.
+        Points in multi-dimensional variables match if any of their values match
+        @param variable_name: Name of point variable
+        @param min_value: Optional minimum value (inclusive)
+        @param max_value: Optional maximum value (inclusive)
+        @param value_list: Optional list of permitted values
+        @return value_mask: boolean point mask
+        '''
+        variable = self.netcdf_dataset.variables[variable_name]
+        assert variable.dimensions[0] == 'point', 'Variable {} is not of point dimension'.format(variable_name)
+        
+        if self.get_chunk_summary(variable_name) is not None:
+            chunk_size = self.get_chunk_summary(variable_name)[0]
+            chunk_indices = np.where(self.get_chunk_candidate_mask(variable_name, min_value, max_value, value_list))[0]
+            point_slices = ([slice(chunk_slice.start * chunk_size, min(chunk_slice.stop * chunk_size, self.point_count))
+                             for chunk_slice in get_index_runs(chunk_indices)[0]]
+                            if len(chunk_indices) else [])
+        else:
+            point_slices = [slice(0, self.point_count)]
+            
+        value_mask = np.zeros(shape=(self.point_count,), dtype='bool')
+        for point_slice in point_slices:
+            values = np.ma.asarray(variable[point_slice])
+            match_mask = ~np.ma.getmaskarray(values)
+            if min_value is not None:
+                match_mask &= np.ma.filled(values >= min_value, False)
+            if max_value is not None:
+                match_mask &= np.ma.filled(values <= max_value, False)
+            if value_list is not None:
+                match_mask &= np.isin(values.data, np.array(value_list))
+            
+            value_mask[point_slice] = np.any(match_mask.reshape((match_mask.shape[0], -1)), axis=1)
+            
+        logger.debug('{}/{} points of {} read to find {} matching points'.format(sum(point_slice.stop - point_slice.start 
+                                                                                     for point_slice in point_slices),
+                                                                                 self.point_count, 
+                                                                                 variable_name, 
+                                                                                 np.count_nonzero(value_mask)))
+        return value_mask
+        
     def grid_points(self, grid_resolution, 
                     variables=None, 
                     native_grid_bounds=None, 
@@ -449,16 +649,21 @@ class NetCDFPointUtils(NetCDFUtils):
         return utm_coords(coordinate_array, wkt)
     
     
-    def coords2metres(self, coordinate_array, wkt=None):
+    def coords2metres(self, coordinate_array, wkt=None, geodesic=False):
         '''
         Function to calculate cumulative distance in metres from coordinates in specified CRS
         @param coordinate_array: Array of shape (n, 2) or iterable containing coordinate pairs
         @param wkt: WKT for coordinate CRS - default to native
+        @param geodesic: Boolean flag indicating whether to compute ellipsoidal distances from WGS84 lon/lat 
+            coordinates instead of planar distances from UTM coordinates
         
         @return distance_array: Array of shape (n) containing cumulative distances from first coord
         '''
         wkt = wkt or self.wkt # Default to native CRS for coordinates
 
+        if geodesic:
+            return coords2distance(transform_coords(coordinate_array, wkt, 'EPSG:4326'), geodesic=True)
+        
         _utm_wkt, utm_coord_array = utm_coords(coordinate_array, wkt)
         return coords2distance(utm_coord_array)
 
@@ -494,7 +699,7 @@ class NetCDFPointUtils(NetCDFUtils):
                            max_distance=None, 
                            secondary_mask=None):
         '''
-        Function to determine nearest neighbours using cKDTree
+        Function to determine nearest neighbours using the persistent spatial index if enabled, otherwise cKDTree
         N.B: All distances are expressed in the native dataset CRS
         
         @param coordinates: two-element XY coordinate tuple, list or array
@@ -504,27 +709,41 @@ class NetCDFPointUtils(NetCDFUtils):
             STRONGLY ADVISED TO SPECIFY SENSIBLE VALUE OF max_distance TO LIMIT SEARCH AREA
         @param secondary_mask: Boolean array of same shape as point array used to filter points. None = no filter.
         
-        @return distances: distances from the target coordinate for each of the points_required nearest points
-        @return indices: point indices for each of the points_required nearest points
+        @return distances: distances from the target coordinate for each of the points_required nearest points found,
+            or scalar distance if points_required == 1. Empty list if no points are found
+        @return indices: point indices for each of the points_required nearest points found,
+            or scalar index if points_required == 1. Empty list if no points are found
         '''
         if wkt:
             reprojected_coords = transform_coords(coordinates, wkt, self.wkt)
         else:
             reprojected_coords = coordinates
             
-        if secondary_mask is None:
-            secondary_mask = np.ones(shape=(self.point_count,), dtype=bool)
-        else:
+        if secondary_mask is not None:
             assert secondary_mask.shape == (self.point_count,)        
 
-        if max_distance: # max_distance has been specified
-            logger.debug('Computing spatial subset mask...')
-            spatial_mask = self.get_spatial_mask([reprojected_coords[0] - max_distance,
-                                                  reprojected_coords[1] - max_distance,
-                                                  reprojected_coords[0] + max_distance,
-                                                  reprojected_coords[1] + max_distance
-                                                  ]
-                                                 )
+        if self.spatial_index is not None:
+            distances, indices = self.spatial_index.nearest(np.array(reprojected_coords).reshape((1, 2)),
+                                                            points_required=points_required,
+                                                            max_distance=max_distance,
+                                                            point_mask=secondary_mask
+                                                            )
+            return self._found_neighbours(distances[0], indices[0], points_required)
+
+        if max_distance is not None or secondary_mask is not None: # Search subset of points
+            if secondary_mask is None:
+                secondary_mask = np.ones(shape=(self.point_count,), dtype=bool)
+                
+            if max_distance is not None: # max_distance has been specified
+                logger.debug('Computing spatial subset mask...')
+                spatial_mask = self.get_spatial_mask([reprojected_coords[0] - max_distance,
+                                                      reprojected_coords[1] - max_distance,
+                                                      reprojected_coords[0] + max_distance,
+                                                      reprojected_coords[1] + max_distance
+                                                      ]
+                                                     )
+            else:
+                spatial_mask = secondary_mask
             
             point_indices = np.where(np.logical_and(spatial_mask,
                                                     secondary_mask
@@ -536,23 +755,126 @@ class NetCDFPointUtils(NetCDFUtils):
                 return [], []
             
             # Set up KDTree for nearest neighbour queries
-            logger.debug('Indexing spatial subset with {} points into KDTree...'.format(np.count_nonzero(spatial_mask)))
+            logger.debug('Indexing spatial subset with {} points into KDTree...'.format(len(point_indices)))
             kdtree = cKDTree(data=self.xycoords[point_indices])
             logger.debug('Finished indexing spatial subset into KDTree.')
         else: # Consider ALL points
-            max_distance = np.inf
+            point_indices = None
             kdtree = self.kdtree
 
             
         distances, indices = kdtree.query(x=np.array(reprojected_coords),
                                           k=points_required,
-                                          distance_upper_bound=max_distance)
+                                          distance_upper_bound=np.inf if max_distance is None else max_distance)
+        distances = np.reshape(distances, (points_required,))
+        indices = np.reshape(indices, (points_required,))
         
-        if max_distance == np.inf:
-            return distances, indices
-        else: # Return indices of complete coordinate array, not the spatial subset
-            return distances, np.where(spatial_mask)[0][indices]
+        if point_indices is not None: # Return indices of complete coordinate array, not the spatial subset
+            indices = np.append(point_indices, self.point_count)[indices] # Missing neighbours have index == point_count
             
+        return self._found_neighbours(distances, indices, points_required)
+
+    def _found_neighbours(self, distances, indices, points_required):
+        '''
+        Helper function to remove missing neighbours (inf distance, index == point_count) from a single-coordinate query 
+        result so that nearest_neighbours returns the same values with or without the spatial index
+        @param distances: array of points_required distances
+        @param indices: array of points_required point indices
+        @param points_required: Number of points requested
+        
+        @return distances: distances of found neighbours, scalar distance if points_required == 1, or [] if none found
+        @return indices: indices of found neighbours, scalar index if points_required == 1, or [] if none found
+        '''
+        found_mask = np.logical_and(np.isfinite(distances), indices < self.point_count)
+        if not np.any(found_mask):
+            logger.debug('No points found')
+            return [], []
+        
+        if points_required == 1: # Return scalar values in same form as cKDTree.query for a single coordinate
+            return distances[0], indices[0]
+        
+        return distances[found_mask], indices[found_mask]
+
+
+    def batch_nearest_neighbours(self, coordinates,
+                                 wkt=None,
+                                 points_required=1,
+                                 max_distance=None,
+                                 secondary_mask=None):
+        '''
+        Function to determine nearest neighbours for many coordinates in a single pass.
+        Coordinates are reprojected in one call and queried against a single cKDTree using all available cores.
+        The full dataset KDTree is reused if no max_distance or secondary_mask is specified, otherwise one
+        KDTree is built over the points near any of the coordinates (using the spatial index if enabled).
+        N.B: All distances are expressed in the native dataset CRS
+
+        @param coordinates: n x 2 array of XY coordinates
+        @param wkt: Well-known text of coordinate CRS - defaults to native dataset CRS
+        @param points_required: Maximum number of points to retrieve for each coordinate. Default=1
+        @param max_distance: Maximum distance to search from each coordinate -
+            STRONGLY ADVISED TO SPECIFY SENSIBLE VALUE OF max_distance TO LIMIT SEARCH AREA
+        @param secondary_mask: Boolean array of same shape as point array used to filter points. None = no filter.
+
+        @return distance_list: list of n arrays of ascending distances from each coordinate (up to points_required long)
+        @return index_list: list of n arrays of point indices corresponding to distance_list
+        '''
+        coordinates = np.array(coordinates, dtype='float64').reshape((-1, 2))
+        if wkt:
+            reprojected_coords = transform_coords(coordinates, wkt, self.wkt)
+        else:
+            reprojected_coords = coordinates
+
+        if secondary_mask is not None:
+            assert secondary_mask.shape == (self.point_count,)
+
+        point_indices = None # Indices of points in KDTree, or None for full dataset KDTree
+        if max_distance is not None and self.spatial_index is not None:
+            logger.debug('Finding points within distance {} of {} coordinates using spatial index...'.format(max_distance, len(reprojected_coords)))
+            positions = np.unique(np.concatenate([self.spatial_index.get_bbox_positions([coordinate[0] - max_distance,
+                                                                                         coordinate[1] - max_distance,
+                                                                                         coordinate[0] + max_distance,
+                                                                                         coordinate[1] + max_distance
+                                                                                         ])
+                                                  for coordinate in reprojected_coords
+                                                  ] + [np.zeros(shape=(0,), dtype='int64')]))
+            point_indices = np.asarray(self.spatial_index.sorted_indices[positions])
+            point_coords = np.asarray(self.spatial_index.sorted_xy[positions])
+
+            if secondary_mask is not None:
+                subset_mask = secondary_mask[point_indices]
+                point_indices = point_indices[subset_mask]
+                point_coords = point_coords[subset_mask]
+
+        elif secondary_mask is not None:
+            point_indices = np.where(secondary_mask)[0]
+            point_coords = self.xycoords[point_indices]
+
+        if point_indices is None: # Consider ALL points
+            kdtree = self.kdtree
+        elif len(point_indices):
+            logger.debug('Indexing subset with {} points into KDTree...'.format(len(point_indices)))
+            kdtree = cKDTree(data=point_coords, balanced_tree=False)
+        else:
+            logger.debug('No points within distance {} of any coordinates'.format(max_distance))
+            return ([np.zeros(shape=(0,), dtype='float64')] * len(reprojected_coords),
+                    [np.zeros(shape=(0,), dtype='int64')] * len(reprojected_coords))
+
+        distances, indices = kdtree.query(x=reprojected_coords,
+                                          k=points_required,
+                                          distance_upper_bound=np.inf if max_distance is None else max_distance,
+                                          workers=-1)
+        distances = distances.reshape((len(reprojected_coords), points_required))
+        indices = indices.reshape((len(reprojected_coords), points_required))
+
+        if point_indices is not None: # Convert subset indices to indices of complete coordinate array
+            indices = np.append(point_indices, self.point_count)[indices]
+
+        # Missing neighbours are sorted to the end of each row, so split found neighbours into ragged arrays
+        found_mask = np.isfinite(distances)
+        split_indices = np.cumsum(np.count_nonzero(found_mask, axis=1))[:-1]
+
+        return np.split(distances[found_mask], split_indices), np.split(indices[found_mask], split_indices)
+
 
     def get_lookup_mask(self, 
                         lookup_value_list, 
@@ -608,7 +930,10 @@ class NetCDFPointUtils(NetCDFUtils):
             
         logger.debug('lookup_indices: {}'.format(lookup_indices))  
           
-        lookup_mask = np.in1d(indexing_variable, lookup_indices) 
+        if indexing_variable.dimensions[0] == 'point': # Only read chunks which may contain lookup indices
+            lookup_mask = self.get_value_mask(indexing_variable.name, value_list=lookup_indices)
+        else:
+            lookup_mask = np.in1d(indexing_variable, lookup_indices) 
         logger.debug('lookup_mask: {}'.format(lookup_mask))  
         return lookup_mask
                        
@@ -677,7 +1002,11 @@ class NetCDFPointUtils(NetCDFUtils):
         except:
             raise BaseException('start_index_variable_name not supplied and cannot be inferred')
         
-        count_variable_name = count_variable_name or lookup_variable_name + '_count'            
+        count_variable_name = count_variable_name or next((variable_name 
+                                                           for variable_name in [lookup_variable_name + '_count', 
+                                                                                 lookup_variable_name + '_point_count']
+                                                           if variable_name in self.netcdf_dataset.variables.keys()), 
+                                                          None)
         try:
             count_variable = self.netcdf_dataset.variables[count_variable_name]
         except:
@@ -762,30 +1091,31 @@ class NetCDFPointUtils(NetCDFUtils):
             
         return result_array
                        
-    def chunk_point_data_generator(self, 
-                                   start_index=0, 
-                                   end_index=0,
-                                   field_list=None,
-                                   mask=None,
-                                   yield_variable_attributes_first=False):
+    def chunk_point_data_columns(self, 
+                                 start_index=0, 
+                                 end_index=0,
+                                 field_list=None,
+                                 mask=None,
+                                 yield_variable_attributes_first=False,
+                                 structured_array=False):
         '''
-        Generator to optionally yield variable attributes followed by all point data for the specified point index range
-        Used to retrieve data as chunks for outputting as point-wise lists of lists
+        Generator to optionally yield variable attributes followed by column-oriented point data for the specified point index range
+        Lookup and scalar variables are expanded to one value per point so that all columns have the same length
         @param start_index: start point index of range to read 
         @param end_index: end point index of range to read. Defaults to number of points
         @param field_list: Optional list of field names to read. Default is None for all variables 
         @param mask: Optional Boolean mask array to subset points
         @param yield_variable_attributes_first: Boolean flag to determine whether variable attribute dict is yielded first. Defaults to False
+        @param structured_array: Boolean flag to determine whether data is yielded as a numpy structured array instead of a dict. Defaults to False
         
         @yield variable_attributes: dict of netCDF variable attributes. Optionally the first item yielded if yield_variable_attributes_first is True
-        @yield point_value_list: List of single values for 1D variables or sub-lists for 2D variables for a single point
+        @yield column_dict: OrderedDict of {variable_name: array} with one row per point (or structured array if structured_array is True)
         '''
-        # Start of point_data_generator function
         end_index = end_index or self.point_count
         index_range = end_index - start_index
          
         if mask is None: # No mask defined - take all points in range
-            subset_mask = np.ones(shape=(index_range,), dtype='bool')
+            subset_mask = None
         else:
             subset_mask = mask[start_index:end_index]
             index_range = np.count_nonzero(subset_mask)
@@ -807,6 +1137,7 @@ class NetCDFPointUtils(NetCDFUtils):
                                   )
                               )
                           and not variable.name.endswith('_index') 
+                            and not variable.name.endswith('_point_count')
                             and not hasattr(variable, 'lookup') # Variable is not an index variable
                           and not variable.name in NetCDFUtils.CRS_VARIABLE_NAMES 
                             and not re.match('ga_.+_metadata', variable.name) # Not an excluded variable
@@ -815,7 +1146,7 @@ class NetCDFPointUtils(NetCDFUtils):
         logger.debug('field_list: {}'.format(field_list))
         
         variable_attributes = OrderedDict()
-        memory_cache = OrderedDict()
+        column_dict = OrderedDict()
         for variable_name in field_list:
             variable = self.netcdf_dataset.variables.get(variable_name)
             if variable is None:
@@ -830,15 +1161,15 @@ class NetCDFPointUtils(NetCDFUtils):
                     continue 
                 
                 # Repeat scalar value for each point
-                data_array = variable[:]
-                memory_cache[variable_name] = np.array([data_array] * index_range)
+                data_array = np.asarray(variable[:])
+                column_dict[variable_name] = np.repeat(data_array.reshape((1,) + data_array.shape), index_range, axis=0)
                  
             else: # nD array variable
                 if (variable.dimensions[0] != 'point'): # Variable is NOT of point dimension - must be lookup
-                    memory_cache[variable_name] = self.expand_lookup_variable(lookup_variable_name=variable_name, 
-                                                                              start_index=start_index, 
-                                                                              end_index=end_index, 
-                                                                              mask=mask)                     
+                    column_dict[variable_name] = self.expand_lookup_variable(lookup_variable_name=variable_name, 
+                                                                             start_index=start_index, 
+                                                                             end_index=end_index, 
+                                                                             mask=mask)                     
                 else: # 'point' is in variable.dimensions - "normal" variable
                     data_array = variable[start_index:end_index]
                      
@@ -846,31 +1177,148 @@ class NetCDFPointUtils(NetCDFUtils):
                     if type(data_array) == np.ma.core.MaskedArray:
                         data_array = data_array.data
                          
-                    memory_cache[variable_name] = data_array[subset_mask]
+                    column_dict[variable_name] = data_array if subset_mask is None else data_array[subset_mask]
                
             if yield_variable_attributes_first:
                 variable_attributes[variable_name] = dict(variable.__dict__)
             
         logger.debug('variable_attributes: {}'.format(pformat(variable_attributes)))
-        logger.debug('memory_cache: {}'.format(pformat(memory_cache)))
+        
+        # If no fields to retrieve, don't yield anything
+        if not column_dict:
+            logger.debug('No fields to retrieve for point indices {}-{}'.format(start_index, end_index-1))
+            return
         
         if yield_variable_attributes_first:
             yield variable_attributes
         
-        for index in range(index_range):
+        if structured_array:
+            structured_data = np.empty(shape=(index_range,), 
+                                       dtype=[(variable_name, data_array.dtype, data_array.shape[1:])
+                                              for variable_name, data_array in column_dict.items()
+                                              ])
+            for variable_name, data_array in column_dict.items():
+                structured_data[variable_name] = data_array
+            yield structured_data
+        else:
+            yield column_dict
+            
+        logger.debug('{} points read for point indices {}-{}'.format(index_range, start_index, end_index-1))        
+        
+        
+    def all_point_data_columns(self,
+                               field_list=None,
+                               mask=None,
+                               read_chunk_size=None,
+                               yield_variable_attributes_first=True,
+                               structured_array=False):
+        '''
+        Generator to yield variable attributes followed by column-oriented data for each chunk of points
+        @param field_list: Optional list of field names to read. Default is None for all variables 
+        @param mask: Optional Boolean mask array to subset points
+        @param read_chunk_size: Number of points to read from the netCDF per chunk
+        @param yield_variable_attributes_first: Boolean flag to determine whether variable attribute dict is yielded first. Defaults to True
+        @param structured_array: Boolean flag to determine whether data is yielded as numpy structured arrays instead of dicts. Defaults to False
+        
+        @yield variable_attributes: dict of netCDF variable attributes. Optionally the first item yielded if yield_variable_attributes_first is True
+        @yield column_dict: OrderedDict of {variable_name: array} with one row per point (or structured array if structured_array is True)
+        '''
+        read_chunk_size = read_chunk_size or DEFAULT_READ_CHUNK_SIZE
+        
+        # Process all chunks
+        point_count = 0
+        for start_index in range(0, self.point_count, read_chunk_size):
+            for chunk_data in self.chunk_point_data_columns(field_list=field_list,
+                                                            start_index=start_index,
+                                                            end_index=min(start_index + read_chunk_size,
+                                                                          self.point_count
+                                                                          ),
+                                                            mask=mask,
+                                                            yield_variable_attributes_first=yield_variable_attributes_first,
+                                                            structured_array=structured_array
+                                                            ):
+                if yield_variable_attributes_first:
+                    yield_variable_attributes_first = False # Only yield variable attributes from the first chunk
+                    yield chunk_data
+                    continue
+                
+                chunk_point_count = len(chunk_data) if structured_array else len(next(iter(chunk_data.values()), []))
+                if not chunk_point_count: # Skip empty chunks
+                    continue
+                
+                if POINT_LIMIT and (point_count + chunk_point_count > POINT_LIMIT): # Truncate final chunk
+                    chunk_point_count = POINT_LIMIT - point_count
+                    if structured_array:
+                        chunk_data = chunk_data[:chunk_point_count]
+                    else:
+                        chunk_data = OrderedDict([(variable_name, data_array[:chunk_point_count]) 
+                                                  for variable_name, data_array in chunk_data.items()])
+                
+                point_count += chunk_point_count
+                yield chunk_data
+            
+            if POINT_LIMIT and (point_count >= POINT_LIMIT):
+                break
+        
+        logger.debug('{} points read from netCDF file {}'.format(point_count, self.nc_path))
+        
+        
+    @staticmethod
+    def column_dict_rows(column_dict):
+        '''
+        Generator to convert a dict of column arrays into point-wise lists of values
+        @param column_dict: OrderedDict of {variable_name: array} as yielded by chunk_point_data_columns
+        
+        @yield point_value_list: List of single values for 1D variables or sub-lists for 2D variables for a single point
+        '''
+        column_list = list(column_dict.values())
+        if not column_list:
+            return
+        
+        for index in range(len(column_list[0])):
             point_value_list = []
-            for variable_name, variable in iter(memory_cache.items()):
-                data_array = variable[index]
+            for data_array in column_list:
+                point_value = data_array[index]
                 
                 # Convert array to string if required
-                if type(data_array) == np.ndarray and data_array.dtype == object:
-                    data_array = str(data_array)
+                if type(point_value) == np.ndarray and point_value.dtype == object:
+                    point_value = str(point_value)
 
-                point_value_list.append(data_array)
+                point_value_list.append(point_value)
                             
             yield point_value_list
-            
-        logger.debug('{} points read for point indices {}-{}'.format(index_range, start_index, end_index-1))        
+        
+        
+    def chunk_point_data_generator(self, 
+                                   start_index=0, 
+                                   end_index=0,
+                                   field_list=None,
+                                   mask=None,
+                                   yield_variable_attributes_first=False):
+        '''
+        Generator to optionally yield variable attributes followed by all point data for the specified point index range
+        Used to retrieve data as chunks for outputting as point-wise lists of lists
+        N.B: This is a row-wise adaptor over chunk_point_data_columns, which should be used in preference where possible
+        @param start_index: start point index of range to read 
+        @param end_index: end point index of range to read. Defaults to number of points
+        @param field_list: Optional list of field names to read. Default is None for all variables 
+        @param mask: Optional Boolean mask array to subset points
+        @param yield_variable_attributes_first: Boolean flag to determine whether variable attribute dict is yielded first. Defaults to False
+        
+        @yield variable_attributes: dict of netCDF variable attributes. Optionally the first item yielded if yield_variable_attributes_first is True
+        @yield point_value_list: List of single values for 1D variables or sub-lists for 2D variables for a single point
+        '''
+        for chunk_data in self.chunk_point_data_columns(start_index=start_index, 
+                                                        end_index=end_index,
+                                                        field_list=field_list,
+                                                        mask=mask,
+                                                        yield_variable_attributes_first=yield_variable_attributes_first):
+            if yield_variable_attributes_first:
+                yield_variable_attributes_first = False
+                yield chunk_data
+            else:
+                for point_value_list in self.column_dict_rows(chunk_data):
+                    yield point_value_list
         
  
     def all_point_data_generator(self,
@@ -880,6 +1328,7 @@ class NetCDFPointUtils(NetCDFUtils):
                                  yield_variable_attributes_first=True):
         '''
         Generator to yield variable attributes followed by lists of values for all points
+        N.B: This is a row-wise adaptor over all_point_data_columns, which should be used in preference where possible
         @param field_list: Optional list of field names to read. Default is None for all variables 
         @param mask: Optional Boolean mask array to subset points
         @param read_chunk_size: Number of points to read from the netCDF per chunk (for greater efficiency than single point reads)
@@ -888,34 +1337,16 @@ class NetCDFPointUtils(NetCDFUtils):
         @yield variable_attributes: dict of netCDF variable attributes. Optionally the first item yielded if yield_variable_attributes_first is True
         @yield point_value_list: List of single values for 1D variables or sub-lists for 2D variables for a single point
         '''
-        read_chunk_size = read_chunk_size or DEFAULT_READ_CHUNK_SIZE
-        
-        # Process all chunks
-        point_count = 0
-        for chunk_index in range(self.point_count // read_chunk_size + 1):
-            for line in self.chunk_point_data_generator(field_list=field_list,
-                                                        start_index=chunk_index*read_chunk_size,
-                                                        end_index=min((chunk_index+1)*read_chunk_size,
-                                                                      self.point_count
-                                                                      ),
-                                                        mask=mask,
-                                                        yield_variable_attributes_first=yield_variable_attributes_first
-                                             ):
-                if not yield_variable_attributes_first:
-                    point_count += 1
-                
-                yield_variable_attributes_first = False # Only yield variable attributes from the first chunk
-
-                #logger.debug('line: {}'.format(line))
-                yield line
-            
-                if POINT_LIMIT and (point_count >= POINT_LIMIT):
-                    break                    
-                
-            if POINT_LIMIT and (point_count >= POINT_LIMIT):
-                break
-        
-        logger.debug('{} points read from netCDF file {}'.format(point_count, self.nc_path))
+        for chunk_data in self.all_point_data_columns(field_list=field_list,
+                                                      mask=mask,
+                                                      read_chunk_size=read_chunk_size,
+                                                      yield_variable_attributes_first=yield_variable_attributes_first):
+            if yield_variable_attributes_first:
+                yield_variable_attributes_first = False
+                yield chunk_data
+            else:
+                for point_value_list in self.column_dict_rows(chunk_data):
+                    yield point_value_list
 
     def get_xy_coord_values(self):
         '''
@@ -965,6 +1396,11 @@ class NetCDFPointUtils(NetCDFUtils):
                 self.memcached_connection.add(coord_cache_key, xycoords)
 
 
+        elif self.enable_disk_cache and self.cache_backend == 'npy':
+            xycoords = self.read_npy_cache('xycoords')
+            if xycoords is None:
+                xycoords = self.write_npy_cache('xycoords', self.get_xy_coord_values()) # read coords from source file
+
         elif self.enable_disk_cache:
             if os.path.isfile(self.cache_path):
                 # Cached coordinate file exists - read it
@@ -1018,6 +1454,66 @@ class NetCDFPointUtils(NetCDFUtils):
             self._xycoords = xycoords
             
         return xycoords
+    
+    def read_npy_cache(self, array_name):
+        '''
+        Function to open a cached array from the .npy disk cache as a read-only memory map
+        @param array_name: Name of cached array, e.g. 'xycoords'
+        @return array: read-only np.memmap, or None if the array is not cached or the cache is stale
+        '''
+        npy_path = os.path.join(self.npy_cache_dir, array_name + '.npy')
+        if not os.path.isfile(npy_path):
+            logger.debug('Cache file {} does not exist'.format(npy_path))
+            return None
+        
+        key_path = os.path.join(self.npy_cache_dir, array_name + '.json')
+        try:
+            with open(key_path, 'r') as key_file:
+                cached_source_key = json.load(key_file)
+        except (OSError, ValueError) as e:
+            logger.debug('Unable to read cache key file {}: {}'.format(key_path, e))
+            return None
+        
+        if cached_source_key != self.source_key:
+            logger.debug('Cache file {} is stale: {} != {}'.format(npy_path, cached_source_key, self.source_key))
+            return None
+        
+        try:
+            array = np.load(npy_path, mmap_mode='r')
+            logger.debug('Memory-mapped {} {} values from cache file {}'.format(array.shape[0], array_name, npy_path))
+            return array
+        except Exception as e:
+            logger.warning('Unable to read cache file {}: {}'.format(npy_path, e))
+            return None
+        
+    def write_npy_cache(self, array_name, array):
+        '''
+        Function to write an array to the .npy disk cache as raw little-endian values and return it memory-mapped.
+        Masked floating point values are stored as NaN. The file is written under a temporary name and then renamed 
+        so that concurrent processes never see a partially written file. The source key is written alongside the array 
+        so that a stale cache can be detected by read_npy_cache
+        @param array_name: Name of cached array, e.g. 'xycoords'
+        @param array: Array to cache
+        @return array: read-only np.memmap of cached array
+        '''
+        array = np.ma.filled(array, np.nan) if array.dtype.kind == 'f' else np.ma.getdata(array)
+        array = np.asarray(array, dtype=array.dtype.newbyteorder('<'))
+        
+        os.makedirs(self.npy_cache_dir, exist_ok=True)
+        npy_path = os.path.join(self.npy_cache_dir, array_name + '.npy')
+        temp_path = '{}.{}.tmp'.format(npy_path, os.getpid())
+        with open(temp_path, 'wb') as npy_file:
+            np.save(npy_file, array)
+        os.replace(temp_path, npy_path)
+        
+        key_path = os.path.join(self.npy_cache_dir, array_name + '.json')
+        temp_path = '{}.{}.tmp'.format(key_path, os.getpid())
+        with open(temp_path, 'w') as key_file:
+            json.dump(self.source_key, key_file)
+        os.replace(temp_path, key_path)
+        logger.debug('Saved {} {} values to cache file {}'.format(array.shape[0], array_name, npy_path))
+        
+        return np.load(npy_path, mmap_mode='r')
         
     @property
     def point_variables(self):
@@ -1056,6 +1552,37 @@ class NetCDFPointUtils(NetCDFUtils):
             logger.debug('Finished indexing full dataset into KDTree.')
         return self._kdtree
 
+    @property
+    def source_key(self):
+        '''
+        Property getter function to return dict identifying the source dataset, used to detect stale disk caches
+        '''
+        return get_source_key(self.nc_path, 
+                              self.netcdf_dataset.dimensions['point'].size,
+                              getattr(self.netcdf_dataset, 'date_modified', None)
+                              )
+
+    @property
+    def spatial_index(self):
+        '''
+        Property getter function to return persistent spatial index, or None if not enabled.
+        The index is opened from spatial_index_path if it is current for the source dataset, otherwise it is rebuilt and saved.
+        '''
+        if self._spatial_index is None and self.enable_spatial_index:
+            source_key = self.source_key
+            self._spatial_index = SpatialIndex.load(self.spatial_index_path, source_key)
+            
+            if self._spatial_index is None:
+                logger.debug('Building spatial index for {} points...'.format(self.netcdf_dataset.dimensions['point'].size))
+                self._spatial_index = SpatialIndex.build(self.xycoords, source_key)
+                try:
+                    self._spatial_index.save(self.spatial_index_path)
+                    logger.debug('Saved spatial index to {}'.format(self.spatial_index_path))
+                except OSError as e:
+                    logger.warning('Unable to save spatial index to {}: {}'.format(self.spatial_index_path, e))
+                    
+        return self._spatial_index
+
     def copy(self, 
              nc_out_path, 
              datatype_map_dict={},
@@ -1066,7 +1593,13 @@ class NetCDFPointUtils(NetCDFUtils):
              limit_dim_size=False,
              var_list=[],
              empty_var_list=[],
-             to_crs=None       
+             to_crs=None,
+             max_workers=1,
+             checkpoint_path=None,
+             resume=False,
+             sort_by_line=False,
+             sort_variable_name=None,
+             spatial_order=None,
         ):
         '''
         Function to copy a netCDF dataset to another one with potential changes to size, format, 
@@ -1074,8 +1607,35 @@ class NetCDFPointUtils(NetCDFUtils):
             
             @param nc_out_path: path to netCDF output file 
             @param to_crs: WKT of destination CRS
+            @param sort_by_line: Boolean flag indicating whether points should be written in line order with 
+                line_start_index & line_point_count variables so that each line can be read as a contiguous slice
+            @param sort_variable_name: Name of point variable for ordering points within lines. Defaults to the first
+                of LINE_SORT_VARIABLE_NAMES found in the dataset
+            @param spatial_order: Optional space-filling curve ('hilbert' or 'zorder') for ordering points so that 
+                spatial queries touch as few chunks as possible. A point_chunk_bounds variable is written with the 
+                bounding box of each chunk of points
 
         '''  
+        assert not (sort_by_line and spatial_order), 'Points cannot be sorted by both line and space-filling curve'
+        
+        # Line segment and chunk bounds variables are rewritten, or dropped if points are no longer in line order
+        write_line_segments = sort_by_line or (not spatial_order 
+                                               and set(NetCDFPointUtils.LINE_SEGMENT_VARIABLE_NAMES) <= set(self.netcdf_dataset.variables.keys()))
+        write_chunk_bounds = bool(spatial_order) or NetCDFPointUtils.CHUNK_BOUNDS_VARIABLE_NAME in self.netcdf_dataset.variables.keys()
+        summary_variable_names = [variable_name for variable_name in self.netcdf_dataset.variables.keys()
+                                  if self.get_chunk_summary(variable_name) is not None]
+        excluded_variable_names = (([NetCDFPointUtils.CHUNK_BOUNDS_VARIABLE_NAME] if write_chunk_bounds else []) 
+                                   + (NetCDFPointUtils.LINE_SEGMENT_VARIABLE_NAMES if write_line_segments or spatial_order else [])
+                                   + ['{}_chunk_{}'.format(variable_name, statistic) 
+                                      for variable_name in summary_variable_names
+                                      for statistic in NetCDFPointUtils.CHUNK_SUMMARY_STATISTICS])
+        
+        if sort_by_line:
+            dim_order_dict = {'point': self.get_line_sort_order(sort_variable_name)}
+        elif spatial_order:
+            dim_order_dict = {'point': get_spatial_order(self.xycoords, spatial_order)}
+        else:
+            dim_order_dict = {}
         
         if var_list:
             expanded_var_list = list(set(
@@ -1087,6 +1647,10 @@ class NetCDFPointUtils(NetCDFUtils):
                 ))
         else:
             expanded_var_list = var_list
+            
+        if excluded_variable_names:
+            expanded_var_list = [variable_name for variable_name in (expanded_var_list or self.netcdf_dataset.variables.keys())
+                                 if variable_name not in excluded_variable_names]
         
         # Call inherited NetCDFUtils method
         super().copy( 
@@ -1098,13 +1662,24 @@ class NetCDFPointUtils(NetCDFUtils):
              nc_format=nc_format,
              limit_dim_size=limit_dim_size,
              var_list=expanded_var_list,
-             empty_var_list=empty_var_list,  
+             empty_var_list=empty_var_list,
+             max_workers=max_workers,
+             checkpoint_path=checkpoint_path,
+             resume=resume,
+             dim_order_dict=dim_order_dict,
             )
         
+        if write_line_segments:
+            self._write_line_segment_variables(nc_out_path)
+        
         # Finish up if no reprojection required
         dest_srs = get_spatial_ref_from_wkt(to_crs)
         if not to_crs or dest_srs.IsSame(get_spatial_ref_from_wkt(self.wkt)):
             logger.debug('No reprojection required for dataset {}'.format(nc_out_path))
+            if write_chunk_bounds:
+                self._write_point_chunk_bounds(nc_out_path)
+            if summary_variable_names:
+                self._write_chunk_summaries(nc_out_path, summary_variable_names)
             return
         
         try:
@@ -1164,6 +1739,119 @@ class NetCDFPointUtils(NetCDFUtils):
         
         finally:
             new_dataset.close()
+            
+        if write_chunk_bounds: # Bounds must be in the new CRS
+            self._write_point_chunk_bounds(nc_out_path)
+        if summary_variable_names:
+            self._write_chunk_summaries(nc_out_path, summary_variable_names)
+
+    def get_line_sort_order(self, sort_variable_name=None, line_index=None):
+        '''
+        Function to return point indices sorted by line, then by fiducial or time within each line.
+        Points keep their original order within each line if no sort variable is found, and points without a 
+        valid line index are placed after all lines.
+        @param sort_variable_name: Name of point variable for ordering points within lines. Defaults to the first
+            of LINE_SORT_VARIABLE_NAMES found in the dataset
+        @param line_index: Optional array of line indices for all points. Defaults to line_index variable values
+        
+        @return point_order: array of source point indices in line order
+        '''
+        line_count = self.netcdf_dataset.dimensions['line'].size
+        
+        if line_index is None:
+            line_index = self.fetch_array(self.netcdf_dataset.variables['line_index'])
+        line_keys = np.ma.filled(np.ma.asarray(line_index), -1).astype('int64')
+        line_keys[np.logical_or(line_keys < 0, line_keys >= line_count)] = line_count # Sort invalid lines last
+        
+        if sort_variable_name is None:
+            sort_variable_name = next((variable_name for variable_name in NetCDFPointUtils.LINE_SORT_VARIABLE_NAMES
+                                       if variable_name in self.netcdf_dataset.variables.keys()
+                                       and self.netcdf_dataset.variables[variable_name].dimensions == ('point',)), 
+                                      None)
+            
+        if sort_variable_name is None:
+            logger.debug('Sorting points by line only')
+            return np.argsort(line_keys, kind='stable')
+        
+        logger.debug('Sorting points by line and {}'.format(sort_variable_name))
+        sort_values = np.ma.getdata(self.fetch_array(self.netcdf_dataset.variables[sort_variable_name]))
+        return np.lexsort((sort_values, line_keys)) # Stable sort - last key is primary
+    
+    def _write_line_segment_variables(self, nc_out_path):
+        '''
+        Helper function to write line_start_index & line_point_count variables to a line-ordered copy
+        '''
+        with netCDF4.Dataset(nc_out_path, 'r+') as new_dataset:
+            line_count = new_dataset.dimensions['line'].size
+            line_index = np.ma.filled(new_dataset.variables['line_index'][:], -1).astype('int64')
+            
+            valid_line_index = line_index[np.logical_and(line_index >= 0, line_index < line_count)]
+            assert np.all(np.diff(valid_line_index) >= 0), 'Points are not in line order'
+            
+            line_point_counts = np.bincount(valid_line_index, minlength=line_count)
+            line_start_indices = np.cumsum(line_point_counts) - line_point_counts
+            
+            index_dtype = 'i8' if len(line_index) > np.iinfo('i4').max else 'i4'
+            for variable_name, values, long_name in [('line_start_index', line_start_indices, 'start index of line in point dimension'),
+                                                     ('line_point_count', line_point_counts, 'number of points in line'),
+                                                     ]:
+                if variable_name in new_dataset.variables.keys():
+                    variable = new_dataset.variables[variable_name]
+                else:
+                    variable = new_dataset.createVariable(variable_name, 
+                                                          index_dtype, 
+                                                          ('line',), 
+                                                          **NetCDFPointUtils.CACHE_VARIABLE_PARAMETERS
+                                                          )
+                variable.long_name = long_name
+                variable[:] = values
+                
+            logger.debug('Wrote line segment variables for {} lines to {}'.format(line_count, nc_out_path))
+            
+    def _write_point_chunk_bounds(self, nc_out_path):
+        '''
+        Helper function to write a point_chunk_bounds variable containing [xmin, ymin, xmax, ymax] for each chunk of 
+        points in a copy. Chunks match the storage chunks of the output coordinate variables where possible
+        '''
+        with netCDF4.Dataset(nc_out_path, 'r+') as new_dataset:
+            new_ncpu = NetCDFPointUtils(new_dataset, enable_disk_cache=False, enable_spatial_index=False, debug=self.debug)
+            chunk_size = new_ncpu.point_chunk_size
+            chunk_count = int(math.ceil(new_ncpu.point_count / chunk_size))
+            
+            # Pad coordinates with NaN to a whole number of chunks
+            xycoords = np.full(shape=(chunk_count * chunk_size, 2), fill_value=np.nan, dtype='float64')
+            xycoords[:new_ncpu.point_count] = new_ncpu.xycoords
+            xycoords = xycoords.reshape((chunk_count, chunk_size, 2))
+            
+            finite_mask = np.all(np.isfinite(xycoords), axis=2)
+            chunk_bounds = np.full(shape=(chunk_count, 4), fill_value=np.nan, dtype='float64')
+            valid_chunks = np.any(finite_mask, axis=1)
+            chunk_bounds[valid_chunks, 0:2] = np.nanmin(xycoords[valid_chunks], axis=1)
+            chunk_bounds[valid_chunks, 2:4] = np.nanmax(xycoords[valid_chunks], axis=1)
+            
+            new_dataset.createDimension('point_chunk', chunk_count)
+            new_dataset.createDimension('bbox', 4)
+            chunk_bounds_variable = new_dataset.createVariable(NetCDFPointUtils.CHUNK_BOUNDS_VARIABLE_NAME, 
+                                                               'f8', 
+                                                               ('point_chunk', 'bbox'), 
+                                                               fill_value=np.nan,
+                                                               **NetCDFPointUtils.CACHE_VARIABLE_PARAMETERS
+                                                               )
+            chunk_bounds_variable.long_name = 'bounding box of each chunk of points as [xmin, ymin, xmax, ymax]'
+            chunk_bounds_variable.point_chunk_size = chunk_size
+            chunk_bounds_variable[:] = chunk_bounds
+            
+            logger.debug('Wrote bounds for {} chunks of {} points to {}'.format(chunk_count, chunk_size, nc_out_path))
+            
+    def _write_chunk_summaries(self, nc_out_path, variable_names):
+        '''
+        Helper function to rewrite per-chunk summary variables for the specified point variables in a copy
+        '''
+        with netCDF4.Dataset(nc_out_path, 'r+') as new_dataset:
+            variable_names = [variable_name for variable_name in variable_names if variable_name in new_dataset.variables.keys()]
+            if variable_names:
+                new_ncpu = NetCDFPointUtils(new_dataset, enable_disk_cache=False, enable_spatial_index=False, debug=self.debug)
+                new_ncpu.set_variable_chunk_summaries(variable_names)
 
     def set_global_attributes(self, compute_shape=False):
         '''\
@@ -1245,14 +1933,92 @@ class NetCDFPointUtils(NetCDFUtils):
                     continue
                 
                 try:
+                    data_stats = DataStats(netcdf_dataset=self.netcdf_dataset, 
+                                           variable_name=variable_name, 
+                                           compute_percentiles=False)
+                    assert data_stats.value('count'), 'No valid values'
                     variable.actual_range = np.array(
-                        [np.nanmin(variable[:]), np.nanmax(variable[:])], dtype=variable.dtype)
+                        [data_stats.value('min'), data_stats.value('max')], dtype=variable.dtype)
                     logger.debug('{}.actual_range = {}'.format(variable_name, variable.actual_range))
                 except:
                     logger.warning('Unable to compute actual_range value for point variable {}'.format(variable_name))
         except:
             logger.error('Unable to set variable actual_range metadata attributes in netCDF point dataset')
             raise
+        
+    def set_variable_chunk_summaries(self, variable_names=None):
+        '''\
+        Function to write per-chunk min, max and count variables for point variables so that get_value_mask can skip 
+        chunks which cannot contain matching values. Also sets ACDD actual_range attribute in non-index variables
+        N.B: Will fail if dataset is not writable
+        @param variable_names: Optional list of point variable names. Defaults to all numeric point variables
+        '''
+        self.netcdf_dataset.set_auto_mask(True)
+        
+        variable_names = variable_names or [variable_name 
+                                            for variable_name, variable in self.netcdf_dataset.variables.items()
+                                            if variable.dimensions[:1] == ('point',)
+                                            and variable.dtype != str and variable.dtype.kind in 'iuf'
+                                            ]
+        
+        chunk_size = self.point_chunk_size
+        chunk_count = int(math.ceil(self.point_count / chunk_size))
+        if 'point_chunk' not in self.netcdf_dataset.dimensions.keys():
+            self.netcdf_dataset.createDimension('point_chunk', chunk_count)
+        assert self.netcdf_dataset.dimensions['point_chunk'].size == chunk_count, 'Inconsistent point_chunk dimension size'
+        
+        for variable_name in variable_names:
+            variable = self.netcdf_dataset.variables[variable_name]
+            
+            # Summarise values in the type returned by netCDF4, i.e. unpacked if scale_factor or add_offset are applied
+            summary_dtype = np.result_type(variable.dtype, 
+                                           *[np.asarray(getattr(variable, attribute_name))
+                                             for attribute_name in ['scale_factor', 'add_offset']
+                                             if variable.scale and hasattr(variable, attribute_name)
+                                             ])
+            
+            chunk_summary = {'min': np.ma.masked_all(shape=(chunk_count,), dtype=summary_dtype),
+                             'max': np.ma.masked_all(shape=(chunk_count,), dtype=summary_dtype),
+                             'count': np.zeros(shape=(chunk_count,), dtype='int32')
+                             }
+            
+            # Read whole numbers of chunks up to max_bytes at a time
+            point_bytes = variable.dtype.itemsize * int(np.prod(variable.shape[1:]))
+            read_chunks = max(1, self.max_bytes // (chunk_size * point_bytes))
+            for start_chunk in range(0, chunk_count, read_chunks):
+                end_chunk = min(start_chunk + read_chunks, chunk_count)
+                values = np.ma.masked_invalid(variable[start_chunk * chunk_size:min(end_chunk * chunk_size, self.point_count)])
+                
+                # Pad values with masked points to a whole number of chunks
+                padded_values = np.ma.masked_all(shape=((end_chunk - start_chunk) * chunk_size * int(np.prod(variable.shape[1:])),), 
+                                                 dtype=summary_dtype)
+                padded_values[:values.size] = values.reshape((-1,))
+                padded_values = padded_values.reshape((end_chunk - start_chunk, -1))
+                
+                chunk_summary['min'][start_chunk:end_chunk] = np.ma.min(padded_values, axis=1)
+                chunk_summary['max'][start_chunk:end_chunk] = np.ma.max(padded_values, axis=1)
+                chunk_summary['count'][start_chunk:end_chunk] = np.ma.count(padded_values, axis=1)
+                
+            for statistic in NetCDFPointUtils.CHUNK_SUMMARY_STATISTICS:
+                summary_variable_name = '{}_chunk_{}'.format(variable_name, statistic)
+                if summary_variable_name not in self.netcdf_dataset.variables.keys():
+                    summary_variable = self.netcdf_dataset.createVariable(summary_variable_name,
+                                                                          chunk_summary[statistic].dtype, 
+                                                                          ('point_chunk',),
+                                                                          **NetCDFPointUtils.CACHE_VARIABLE_PARAMETERS
+                                                                          )
+                else:
+                    summary_variable = self.netcdf_dataset.variables[summary_variable_name]
+                summary_variable.long_name = '{} of {} values in each chunk of points'.format(
+                    {'min': 'minimum', 'max': 'maximum', 'count': 'number'}[statistic], variable_name)
+                summary_variable.point_chunk_size = chunk_size
+                summary_variable[:] = chunk_summary[statistic]
+            
+            if not re.search('_index$', variable_name) and np.any(chunk_summary['count']):
+                variable.actual_range = np.array([np.ma.min(chunk_summary['min']), np.ma.max(chunk_summary['max'])], dtype=summary_dtype)
+                
+            self._chunk_summaries.pop(variable_name, None)
+            logger.debug('Wrote summaries of {} for {} chunks of {} points'.format(variable_name, chunk_count, chunk_size))
 
 
 
@@ -29,19 +29,163 @@ import itertools
 import argparse
 import re
 import sys
+import os
+import json
+import time
 import numpy as np
 import logging
 import osgeo
 from pprint import pformat
 from collections import OrderedDict
 from functools import reduce
+from concurrent.futures import ProcessPoolExecutor
 from geophys_utils._crs_utils import transform_coords, get_spatial_ref_from_wkt
+from geophys_utils._array_pieces import get_chunk_shape, get_piece_shape, get_piece_slices
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO) # Initial logging level for this module
 
 METADATA_CRS = 'EPSG:4283' # Standard CRS for metadata (GDA94)  
 
+# Variable creation keywords returned by netCDF4.Variable.filters() which are not accepted by createVariable
+UNSUPPORTED_FILTER_KEYS = ['szip', 'zstd', 'bzip2', 'blosc']
+
+def get_filter_options(variable):
+    '''
+    Function to return the compression filter settings of a netCDF variable as createVariable keyword arguments
+    N.B: Filters other than zlib, shuffle & fletcher32 are not carried over
+    @param variable: netCDF4.Variable
+    @return filter_options: dict of createVariable keyword arguments
+    '''
+    return {key: value for key, value in (variable.filters() or {}).items() 
+            if key not in UNSUPPORTED_FILTER_KEYS
+            }
+    
+def get_index_runs(indices, max_gap=0):
+    '''
+    Function to return the runs of contiguous values in an array of unique indices
+    @param indices: array of unique indices in any order
+    @param max_gap: maximum number of missing indices to include in a run rather than starting a new one
+    @return run_slices: list of slices for runs in ascending order
+    @return run_positions: positions of indices within the concatenated runs
+    '''
+    sorted_indices = np.sort(indices)
+    break_positions = np.where(np.diff(sorted_indices) > max_gap + 1)[0] + 1
+    run_starts = sorted_indices[np.concatenate(([0], break_positions))]
+    run_stops = sorted_indices[np.concatenate((break_positions - 1, [len(sorted_indices) - 1]))] + 1
+    run_offsets = np.cumsum(run_stops - run_starts) - (run_stops - run_starts)
+    
+    run_numbers = np.searchsorted(run_starts, indices, side='right') - 1
+    run_positions = run_offsets[run_numbers] + indices - run_starts[run_numbers]
+    
+    return [slice(int(run_starts[run_index]), int(run_stops[run_index])) for run_index in range(len(run_starts))], run_positions
+    
+def get_run_gap(indices, max_gap):
+    '''
+    Function to return the largest gap between runs of indices which can be read without reading more than twice
+    as many elements as there are indices
+    @param indices: array of unique indices in any order
+    @param max_gap: maximum number of missing indices to include in a run
+    @return run_gap: maximum number of missing indices to include in a run, not greater than max_gap
+    '''
+    gaps = np.sort(np.diff(np.sort(indices)) - 1)
+    gaps = gaps[np.logical_and(gaps > 0, gaps <= max_gap)]
+    if not len(gaps):
+        return 0
+    
+    # Only use the total of all gaps up to and including the last occurrence of each gap size
+    last_gap_mask = np.ones(shape=gaps.shape, dtype=bool)
+    last_gap_mask[:-1] = gaps[1:] != gaps[:-1]
+    valid_gaps = gaps[np.logical_and(last_gap_mask, np.cumsum(gaps) <= len(indices))]
+    
+    return int(valid_gaps[-1]) if len(valid_gaps) else 0
+    
+def get_copy_pieces(dest_shape, piece_shape, source_indices_list, max_gap=0):
+    '''
+    Generator to return output and input slices for copying pieces of a variable with optional dimension subsets
+    Source indices for masked or reordered dimensions are read as runs of nearly contiguous indices, so that no 
+    more than about twice the number of elements in the piece is read from the source in any dimension.
+    @param dest_shape: shape of output variable
+    @param piece_shape: shape of output pieces
+    @param source_indices_list: list of source index arrays (or None for unchanged dimensions) for each dimension
+    @param max_gap: maximum number of unwanted indices to read between runs of masked or reordered indices
+    
+    Yields:
+        write_slices: tuple of slices for piece in output variable
+        read_slices: tuple of slices (or lists of run slices for masked or reordered dimensions) for piece in input variable
+        select_indices: tuple of index arrays to select from read piece (or None for contiguous dimensions)
+    '''
+    for write_slices, _read_slices in get_piece_slices(dest_shape, piece_shape):
+        read_slices = []
+        select_indices = []
+        for dimension_index in range(len(dest_shape)):
+            source_indices = source_indices_list[dimension_index]
+            if source_indices is None:
+                read_slices.append(write_slices[dimension_index])
+                select_indices.append(None)
+                continue
+            
+            piece_source_indices = source_indices[write_slices[dimension_index]]
+            run_slices, run_positions = get_index_runs(piece_source_indices, get_run_gap(piece_source_indices, max_gap))
+            
+            if len(run_slices) > 1:
+                read_slices.append(run_slices)
+                select_indices.append(run_positions)
+            else: # Single run can be read as one slice
+                read_slices.append(run_slices[0])
+                select_indices.append(run_positions 
+                                      if (run_slices[0].stop - run_slices[0].start != len(piece_source_indices) 
+                                          or np.any(np.diff(piece_source_indices) <= 0))
+                                      else None
+                                      )
+            
+        yield write_slices, tuple(read_slices), tuple(select_indices)
+        
+def read_copy_piece(input_variable, read_slices, select_indices):
+    '''
+    Function to read a piece of an input variable and select masked indices in each dimension
+    Lists of run slices may be given for masked or reordered dimensions, in which case the runs are read 
+    separately and concatenated
+    '''
+    run_dimension_indices = [dimension_index for dimension_index in range(len(read_slices)) 
+                             if type(read_slices[dimension_index]) == list]
+    
+    if run_dimension_indices:
+        run_dimension_index = run_dimension_indices[0]
+        piece_array = np.concatenate([read_copy_piece(input_variable, 
+                                                      tuple(run_slice if dimension_index == run_dimension_index 
+                                                            else read_slices[dimension_index]
+                                                            for dimension_index in range(len(read_slices))),
+                                                      [None] * len(read_slices))
+                                      for run_slice in read_slices[run_dimension_index]
+                                      ],
+                                     axis=run_dimension_index)
+    else:
+        piece_array = input_variable[read_slices]
+        
+    for dimension_index in range(len(select_indices)):
+        if select_indices[dimension_index] is not None:
+            piece_array = np.take(piece_array, select_indices[dimension_index], axis=dimension_index)
+    return piece_array
+
+# Input netCDF dataset for the current worker process when copying pieces in a process pool
+_worker_copy_dataset = None
+
+def _init_copy_worker(nc_path):
+    '''
+    Initialiser for copy worker processes. Opens a separate input dataset in each process
+    '''
+    global _worker_copy_dataset
+    _worker_copy_dataset = netCDF4.Dataset(nc_path)
+    _worker_copy_dataset.set_auto_mask(False)
+    
+def _read_copy_piece_worker(variable_name, read_slices, select_indices):
+    '''
+    Function to read a piece of a variable for copying in a worker process
+    '''
+    return read_copy_piece(_worker_copy_dataset.variables[variable_name], read_slices, select_indices)
+
+
 class NetCDFUtils(object):
     '''
     NetCDFUtils class implementing useful functionality against netCDF files
@@ -58,6 +202,12 @@ class NetCDFUtils(object):
                             'endian': 'little',
                             #'chunksizes': [1024, 1024]
                             }
+    
+    COPY_CHUNK_LCM_LIMIT = 4 # Maximum ratio of copy piece unit to the larger of the input & output chunk sizes
+    COPY_STRING_ITEM_BYTES = 64 # Nominal size of variable-length string elements for planning copy pieces
+    COPY_CHECKPOINT_INTERVAL = 60 # Minimum number of seconds between copy checkpoints
+    COPY_PROGRESS_INTERVAL = 10 # Minimum number of seconds between copy progress messages
+    COPY_RUN_GAP = 1024 # Maximum number of unwanted elements to read between runs of a reordered dimension
 
     def __init__(self, netcdf_dataset, debug=False):
         '''
@@ -105,6 +255,40 @@ class NetCDFUtils(object):
         self.netcdf_dataset.set_auto_mask(True) #TODO: set this at a function level
         
 
+    def get_copy_piece_shape(self, input_variable, output_variable, dest_shape, source_indices_list, max_bytes):
+        '''
+        Function to return the shape of output pieces for copying a variable. Pieces are aligned to the output
+        chunks, and also to the input chunks where a dimension is neither masked nor subsetted and the lowest
+        common multiple of the input and output chunk sizes is not too large.
+        @param input_variable: netCDF4.Variable to copy from
+        @param output_variable: netCDF4.Variable to copy to
+        @param dest_shape: shape of output variable
+        @param source_indices_list: list of source index arrays (or None for unchanged dimensions) for each dimension
+        @param max_bytes: maximum number of bytes per piece
+        @return piece_shape: tuple containing piece shape in output index space
+        '''
+        input_chunk_shape = get_chunk_shape(input_variable)
+        output_chunk_shape = get_chunk_shape(output_variable)
+        
+        chunk_units = []
+        for dimension_index in range(len(dest_shape)):
+            input_chunk_size = (input_chunk_shape[dimension_index] 
+                                if input_chunk_shape and source_indices_list[dimension_index] is None 
+                                else None)
+            output_chunk_size = output_chunk_shape[dimension_index] if output_chunk_shape else None
+            
+            if input_chunk_size and output_chunk_size:
+                chunk_unit = math.lcm(input_chunk_size, output_chunk_size)
+                if chunk_unit > NetCDFUtils.COPY_CHUNK_LCM_LIMIT * max(input_chunk_size, output_chunk_size):
+                    chunk_unit = output_chunk_size # Output alignment avoids re-compressing partially-written chunks
+            else:
+                chunk_unit = output_chunk_size or input_chunk_size or 1
+            chunk_units.append(min(chunk_unit, max(dest_shape[dimension_index], 1)))
+            
+        itemsize = np.dtype(input_variable.dtype).itemsize or NetCDFUtils.COPY_STRING_ITEM_BYTES
+        
+        return get_piece_shape(dest_shape, itemsize, max_bytes, tuple(chunk_units))
+    
     def copy(self, 
              nc_out_path, 
              datatype_map_dict={},
@@ -115,10 +299,18 @@ class NetCDFUtils(object):
              limit_dim_size=False,
              var_list=[],
              empty_var_list=[],
+             max_workers=1,
+             checkpoint_path=None,
+             resume=False,
+             dim_order_dict={},
              ):
         '''
         Function to copy a netCDF dataset to another one with potential changes to size, format, 
             variable creation options and datatypes.
+            All dimensions, variables and attributes are created before any data is copied. Array data is copied in 
+            chunk-aligned pieces, which are read from the source dataset by a pool of worker processes and written 
+            in order by a single writer. Progress is recorded in a checkpoint file so that an interrupted copy can be 
+            resumed, and throughput statistics for each variable are stored in self.copy_statistics.
             
             @param nc_out_path: path to netCDF output file 
             @param datatype_map_dict: dict containing any maps from source datatype to new datatype.
@@ -133,8 +325,15 @@ class NetCDFUtils(object):
             @param limit_dim_size: Boolean flag indicating whether unlimited dimensions should be fixed
             @param var_list: List of strings denoting variable names for variables which should be copied
             @param empty_var_list: List of strings denoting variable names for variables which should be created but not copied
+            @param max_workers: number of worker processes for reading pieces. Defaults to 1 for serial in-process reading
+            @param checkpoint_path: path of checkpoint file. Defaults to nc_out_path + '.checkpoint.json'
+            @param resume: Boolean flag indicating whether to resume an interrupted copy from its checkpoint
+            @param dim_order_dict: dict of source index arrays keyed by dimension name defining the output order of 
+                a reordered dimension. Any mask or range for the dimension is applied to the reordered indices
         '''  
         logger.debug('variable_options_dict: {}'.format(variable_options_dict))   
+        max_workers = max_workers or 1
+        checkpoint_path = checkpoint_path or nc_out_path + '.checkpoint.json'
                   
         self.netcdf_dataset.set_auto_mask(False)
         
@@ -151,290 +350,332 @@ class NetCDFUtils(object):
             filtered_variables = self.netcdf_dataset.variables
         
         # Override default variable options with supplied ones for all data variables
-        for variable_name in filtered_variables.keys():
-            variable_dict = dict(NetCDFUtils.DEFAULT_COPY_OPTIONS)
-            variable_dict.update(variable_options_dict.get(variable_name) or {})
-            variable_options_dict[variable_name] = variable_dict
+        variable_options_dict = {variable_name: dict(NetCDFUtils.DEFAULT_COPY_OPTIONS, 
+                                                     **(variable_options_dict.get(variable_name) or {}))
+                                 for variable_name in filtered_variables.keys()
+                                 }
                                 
         nc_format = nc_format or self.netcdf_dataset.file_format 
         logger.debug('Output format is %s' % nc_format)
         
-        nc_output_dataset = netCDF4.Dataset(nc_out_path, mode="w", clobber=True, format=nc_format)
+        # Determine source indices for all dimensions which have masks or ranges
+        dims_used = set()
+        source_indices_dict = {} # Array of source indices for each masked or subsetted dimension
+        dest_dim_size = {}
+        for variable_name, variable in filtered_variables.items():               
+            dims_used |= set(variable.dimensions)
+            
+        for dimension_name in dims_used:
+            source_dimension = self.netcdf_dataset.dimensions[dimension_name]
+            dim_mask = dim_mask_dict.get(dimension_name)
+            dim_range = dim_range_dict.get(dimension_name)
+            dim_order = dim_order_dict.get(dimension_name)
+            
+            if dim_mask is None and not dim_range and dim_order is None:
+                dest_dim_size[dimension_name] = source_dimension.size
+                continue
+            
+            if dim_mask is None:
+                dim_mask = np.ones(shape=(source_dimension.size,), dtype=bool)
+            else:
+                assert dim_mask.shape == (source_dimension.size,), 'Dimension mask must be a 1D boolean mask of size {}'.format(source_dimension.size)
+                dim_mask = np.array(dim_mask, dtype=bool) # Copy mask to avoid modifying supplied one
+                
+            if dim_range:
+                dim_mask[:dim_range[0]] = False
+                dim_mask[dim_range[1]:] = False
+                
+            if dim_order is None:
+                source_indices_dict[dimension_name] = np.where(dim_mask)[0]
+            else:
+                assert dim_order.shape == (source_dimension.size,), 'Dimension order must be a 1D index array of size {}'.format(source_dimension.size)
+                source_indices_dict[dimension_name] = dim_order[dim_mask[dim_order]]
+            dest_dim_size[dimension_name] = len(source_indices_dict[dimension_name]) # Update sizes to take masks into account
+                
+        logger.debug('dest_dim_size = {}'.format(dest_dim_size))
+        
+        copy_variables = [variable_name for variable_name in filtered_variables.keys()
+                          if variable_name not in empty_var_list
+                          ]
+        
+        checkpoint = None
+        if resume:
+            checkpoint = self._read_copy_checkpoint(checkpoint_path, nc_out_path, dest_dim_size, copy_variables)
+            
+        if checkpoint:
+            logger.info('Resuming copy to {} from checkpoint {}'.format(nc_out_path, checkpoint_path))
+            nc_output_dataset = netCDF4.Dataset(nc_out_path, mode="r+")
+        else:
+            nc_output_dataset = netCDF4.Dataset(nc_out_path, mode="w", clobber=True, format=nc_format)
         nc_output_dataset.set_auto_mask(False)
         
+        self.copy_statistics = OrderedDict()
+        executor = None
         try:
-            dims_used = set()
-            dest_dim_size = {}
-            for variable_name, variable in filtered_variables.items():               
-                dims_used |= set(variable.dimensions)
+            if not checkpoint:
+                self._create_copy_structure(nc_output_dataset, filtered_variables, datatype_map_dict, 
+                                            variable_options_dict, dims_used, dest_dim_size, limit_dim_size)
                 
-                # Update the sizes for all dimensions which have masks or ranges
-                for dimension_index in range(len(variable.dimensions)): 
-                    dimension_name = variable.dimensions[dimension_index]
-                    source_dimension = self.netcdf_dataset.dimensions[dimension_name]
-                    
-                    if dest_dim_size.get(dimension_name): # We have already configured this dimension
-                        continue
-                        
-                    dim_mask = dim_mask_dict.get(dimension_name)
-                    if dim_mask is None:
-                        dim_mask = np.ones(shape=(variable.shape[dimension_index],), dtype=np.bool)
-                    else:
-                        assert dim_mask.shape == (source_dimension.size,), 'Dimension mask must be a 1D boolean mask of size {}'.format(source_dimension.size)
-                        
-                    dim_range = dim_range_dict.get(dimension_name)
-                    if dim_range:
-                        dim_mask[:dim_range[0]] = False
-                        dim_mask[dim_range[1]:] = False
-                        
-                    dest_dim_size[dimension_name] = np.count_nonzero(dim_mask) # Update sizes to take masks into account
-                        
-                    #dim_mask_dict[dimension_name] = dim_mask # Update mask to include range
-                        
-                    
-            logger.debug('dest_dim_size = {}'.format(dest_dim_size))
+                checkpoint = {'nc_path': self.nc_path,
+                              'nc_out_path': nc_out_path,
+                              'dimension_sizes': dest_dim_size,
+                              'variables': OrderedDict()
+                              }
+                
+            # Plan pieces for any variables not already in the checkpoint
+            piece_max_bytes = max(self.max_bytes // (2 * max_workers + 1), 1) # Allow for pieces in flight
+            for variable_name in copy_variables:
+                if variable_name in checkpoint['variables']:
+                    continue
+                input_variable = filtered_variables[variable_name]
+                dest_shape = tuple(dest_dim_size[dimension_name] for dimension_name in input_variable.dimensions)
+                piece_shape = self.get_copy_piece_shape(input_variable, 
+                                                        nc_output_dataset.variables[variable_name], 
+                                                        dest_shape, 
+                                                        [source_indices_dict.get(dimension_name) 
+                                                         for dimension_name in input_variable.dimensions], 
+                                                        piece_max_bytes)
+                checkpoint['variables'][variable_name] = {
+                    'piece_shape': list(piece_shape),
+                    'piece_count': (reduce(lambda x, y: x * y, 
+                                           [int(math.ceil(dest_shape[dimension_index] / piece_shape[dimension_index]))
+                                            for dimension_index in range(len(dest_shape))], 
+                                           1)
+                                    ),
+                    'pieces_written': 0
+                    }
+                
+            nc_output_dataset.sync()
+            self._write_copy_checkpoint(checkpoint_path, checkpoint)
+            last_checkpoint_time = time.time()
             
-            #Copy dimensions
-            for dimension_name, dimension in self.netcdf_dataset.dimensions.items():
-                if dimension_name in dims_used: # Discard unused dimensions
-                    logger.debug('Copying dimension %s of length %d' % (dimension_name, dest_dim_size[dimension_name]))
-                    nc_output_dataset.createDimension(dimension_name, 
-                                          dest_dim_size[dimension_name] 
-                                          if not dimension.isunlimited() or limit_dim_size 
-                                          else None)
-                else:
-                    logger.debug('Skipping unused dimension %s' % dimension_name)
-    
-            # Copy variables
-            for variable_name, input_variable in filtered_variables.items():
-                dtype = datatype_map_dict.get(str(input_variable.datatype)) or input_variable.datatype
+            # Copy data
+            for variable_name in copy_variables:
+                input_variable = filtered_variables[variable_name]
+                output_variable = nc_output_dataset.variables[variable_name]
+                variable_checkpoint = checkpoint['variables'][variable_name]
+                piece_shape = tuple(variable_checkpoint['piece_shape'])
+                piece_count = variable_checkpoint['piece_count']
+                pieces_skipped = variable_checkpoint['pieces_written']
                 
-                # Special case for "crs" or "transverse_mercator" - want byte datatype
-                if input_variable == self.crs_variable: 
-                    dtype = 'i1'
-                    
-                # Start off by copying options from input variable (if specified)
-                var_options = input_variable.filters() or {}
+                variable_statistics = OrderedDict([('pieces', piece_count), 
+                                                   ('pieces_skipped', pieces_skipped), 
+                                                   ('bytes', 0), 
+                                                   ('elapsed_seconds', 0.0),
+                                                   ('megabytes_per_second', None),
+                                                   ])
+                self.copy_statistics[variable_name] = variable_statistics
                 
-                # Chunking is defined outside the filters() result
-                chunking = input_variable.chunking()
-                if chunking and chunking != 'contiguous':
-                    # Input variable is chunked - use same chunking by default unless overridden
-                    input_variable_chunking = [min(chunking[dimension_index], dest_dim_size[input_variable.dimensions[dimension_index]])
-                                                 for dimension_index in range(len(chunking))]
-                elif (len(input_variable.dimensions) == 2 and 
-                    variable_options_dict.get(variable_name) and
-                    variable_options_dict.get(variable_name).get('chunksizes')
-                    ): #TODO: Improve this
-                    # If input variable is unchunked 2D and output chunking is specified - assume row chunking for input
-                    input_variable_chunking = [1, dest_dim_size[input_variable.dimensions[1]]]
-                else:
-                    # Input variable is not chunked
-                    input_variable_chunking = None
+                if pieces_skipped >= piece_count:
+                    logger.debug('\tVariable {} already copied'.format(variable_name))
+                    continue
                 
-                # Default to same chunking on input and output
-                if input_variable_chunking: 
-                    var_options['chunksizes'] = input_variable_chunking
-                    
-                if hasattr(input_variable, '_FillValue'):
-                    var_options['fill_value'] = input_variable._FillValue
-                    
-                # Apply any supplied options over top of defaults
-                var_options.update(variable_options_dict.get(variable_name) or {})
+                start_time = time.time()
+                last_progress_time = start_time
                 
-                # Ensure chunk sizes aren't bigger than variable sizes
-                if var_options.get('chunksizes'):
-                    for dimension_index in range(len(input_variable.dimensions)):
-                        var_options['chunksizes'][dimension_index] = min(var_options['chunksizes'][dimension_index] or dest_dim_size[input_variable.dimensions[dimension_index]],
-                                                                         dest_dim_size[input_variable.dimensions[dimension_index]])
-                             
-                options_string = ' with options: %s' % ', '.join(['%s=%s' % item for item in var_options.items()]) if var_options else ''   
-                logger.debug("Copying variable %s from datatype %s to datatype %s%s" % (variable_name, 
-                                                                                       input_variable.datatype, 
-                                                                                       dtype, 
-                                                                                       options_string
-                                                                                       )
-                            )
-                # Create output variable using var_options to specify output options
-                output_variable = nc_output_dataset.createVariable(variable_name, 
-                                              dtype, 
-                                              input_variable.dimensions,
-                                              **var_options
-                                              )
+                if not input_variable.shape: # scalar variable - simple copy
+                    logger.debug('\tCopying %s scalar data' % variable_name)
+                    if output_variable.dtype == input_variable.dtype: # Don't copy "crs" values converted to bytes
+                        output_variable.assignValue(input_variable.getValue())
+                    variable_checkpoint['pieces_written'] = 1
+                    continue
                 
-                # Copy variable attributes
-                logger.debug('\tCopying %s attributes: %s' % (variable_name, ', '.join(input_variable.ncattrs())))
-                output_variable.setncatts({k: input_variable.getncattr(k) for k in input_variable.ncattrs() if not k.startswith('_')})
+                dest_shape = tuple(dest_dim_size[dimension_name] for dimension_name in input_variable.dimensions)
+                logger.debug('\tCopying {} array data of shape {} in {} pieces of shape {}'.format(variable_name, dest_shape, 
+                                                                                                 piece_count, piece_shape))
                 
-                if variable_name not in empty_var_list:
-                    # Copy data
-                    if input_variable.shape: # array
-                        input_variable_slices = tuple([
-                            slice(*dim_range_dict[input_variable.dimensions[dimension_index]])  
-                            if dim_range_dict.get(input_variable.dimensions[dimension_index])
-                            else slice(0, input_variable.shape[dimension_index])
-                        for dimension_index in range(len(input_variable.dimensions))
-                        ])
-                        
-                        #logger.debug('input_variable_slices={}'.format(input_variable_slices))
-                        
-                        logger.debug('\tCopying {} array data of shape {}'.format(
-                            variable_name,
-                            tuple([input_variable_slices[dimension_index].stop - input_variable_slices[dimension_index].start
-                                   for dimension_index in range(len(input_variable.dimensions))]
-                                  )
-                            ))
-                        
-                        # Build list of full dimension masks for this variable
-                        # We are using None instead of all-true masks because of the issue described in 
-                        # https://github.com/numpy/numpy/issues/13255
-                        # This results in extra dimensions, but the piece assignment operation doesn't care
-                        # See the behaviour described in https://stackoverflow.com/questions/1408311/numpy-array-slice-using-none
-                        variable_masks = tuple([dim_mask_dict.get(dimension_name) # Use specified mask if it exists, None otherwise
-                                          for dimension_name in input_variable.dimensions
-                                          ])
-                        
-                        if not input_variable_chunking: 
-                            # No chunking - Try to copy in one hit. This may bork due to OPeNDAP or memory limitations
-                            #TODO: Make this safe for massive arrays, possibly using the array_pieces code
-                            logger.debug('Copying un-chunked array')
-                            if any(variable_masks):
-                                output_variable[...] = input_variable[input_variable_slices][variable_masks]
-                            else:
-                                output_variable[...] = input_variable[input_variable_slices]
-                        
-                        else: # Chunked - perform copy in pieces
-                            logger.debug('input_variable.shape = {}'.format(input_variable.shape))
-                            
-                            array_item_size = np.dtype(input_variable.dtype).itemsize
-                            #TODO: Deal with strings in a better way
-                            # Assume string arrays aren't going to be huge - check largest size of all elements
-                            if not array_item_size and input_variable.dtype == str: #  and len(input_variable.dimensions) == 1
-                                array_item_size = max([sys.getsizeof(element) for element in input_variable[:]])
-                            logger.debug('array_item_size (in bytes) = {}'.format(array_item_size))
-                            
+                piece_list = list(itertools.islice(get_copy_pieces(dest_shape, 
+                                                                   piece_shape, 
+                                                                   [source_indices_dict.get(dimension_name) 
+                                                                    for dimension_name in input_variable.dimensions],
+                                                                   max_gap=NetCDFUtils.COPY_RUN_GAP),
+                                                   pieces_skipped, None))
+                
+                if max_workers > 1 and len(piece_list) > 1 and executor is None:
+                    executor = ProcessPoolExecutor(max_workers=max_workers, 
+                                                   initializer=_init_copy_worker, 
+                                                   initargs=(self.nc_path,))
 
-                            # Use largest chunk sizes between input and output as the smallest possible piece
-                            smallest_piece_sizes = [
-                                max(var_options['chunksizes'][dimension_index],
-                                    input_variable_chunking[dimension_index]
-                                    )
-                                for dimension_index in range(len(input_variable.dimensions))
-                                ]
-                            logger.debug('smallest_piece_sizes = {}'.format(smallest_piece_sizes))
-                            
-                            
-                            # Compute piece_sizes using the largest multiple of the smallest pieces under the maximum number of bytes
-                            piece_sizes = list(smallest_piece_sizes)
-                            piece_counts = tuple([
-                                int(math.ceil(float(self.netcdf_dataset.dimensions[input_variable.dimensions[dimension_index]].size) / piece_sizes[dimension_index]))
-                                for dimension_index in range(len(input_variable.dimensions)) 
-                                ])
-                            largest_piece_count_index = piece_counts.index(max(piece_counts))
-                            smallest_piece_bytes = array_item_size * reduce(lambda x, y: x * y, smallest_piece_sizes)                            
-                            piece_sizes[largest_piece_count_index] = min(input_variable.shape[largest_piece_count_index],
-                                                                         int(smallest_piece_sizes[largest_piece_count_index] * (self.max_bytes // smallest_piece_bytes))
-                                                                         )
-                            
-                            piece_bytes = np.dtype(input_variable.dtype).itemsize * reduce(lambda x, y: x * y, piece_sizes)
-                            logger.debug('piece_sizes = {}, bytes = {}'.format(piece_sizes, piece_bytes))
-                            
-                            piece_index_ranges = [
-                                (input_variable_slices[dimension_index].start // piece_sizes[dimension_index],
-                                 int(math.ceil(float(input_variable_slices[dimension_index].stop) / piece_sizes[dimension_index]))
-                                 )
-                                for dimension_index in range(len(input_variable.dimensions))
-                                ]
-                                                  
-                            # Recompute piece_counts for revised piece_sizes
-                            piece_counts = tuple([
-                                int(math.ceil(float(self.netcdf_dataset.dimensions[input_variable.dimensions[dimension_index]].size) / piece_sizes[dimension_index]))
-                                for dimension_index in range(len(input_variable.dimensions)) 
-                                ])
+                def piece_array_generator():
+                    '''
+                    Generator yielding arrays for each piece in order
+                    '''
+                    if executor is None or len(piece_list) == 1: # Serial in-process
+                        for _write_slices, read_slices, select_indices in piece_list:
+                            yield read_copy_piece(input_variable, read_slices, select_indices)
+                        return
+                    
+                    future_list = []
+                    piece_index = 0
+                    # Keep a bounded number of pieces in flight to limit memory usage
+                    while piece_index < len(piece_list) or future_list:
+                        while piece_index < len(piece_list) and len(future_list) < 2 * max_workers:
+                            _write_slices, read_slices, select_indices = piece_list[piece_index]
+                            future_list.append(executor.submit(_read_copy_piece_worker, variable_name, 
+                                                               read_slices, select_indices))
+                            piece_index += 1
                             
-                            logger.debug('\tCopying {} pieces of dimensions {}'.format(' x '.join([str(piece_count) for piece_count in piece_counts]),
-                                                                                       ' x '.join([str(piece_size) for piece_size in piece_sizes])
-                                                                          )
-                                        )
-                             
-                            # Iterate over every piece
-                            for piece_indices in itertools.product(
-                                *[range(piece_index_ranges[dimension_index][0], 
-                                        piece_index_ranges[dimension_index][1]
-                                        )
-                                  for dimension_index in range(len(input_variable.dimensions))
-                                  ]
-                                 ):
-                                 
-                                offset_piece_indices = tuple([(indices[0] - indices[1] + 1) 
-                                                              for indices in zip(piece_indices, [piece_index_range[0] for piece_index_range in piece_index_ranges])])
-                                logger.debug('\t\tCopying piece {}/{}'.format(offset_piece_indices, piece_counts))
-                                
-                                 
-                                piece_read_slices = tuple([
-                                    slice(
-                                        max(input_variable_slices[dimension_index].start,
-                                            piece_indices[dimension_index] * piece_sizes[dimension_index]
-                                            ),                                                 
-                                        min(input_variable_slices[dimension_index].stop,
-                                            (piece_indices[dimension_index] + 1) * piece_sizes[dimension_index]
-                                            )
-                                        )
-                                    for dimension_index in range(len(input_variable.dimensions))
-                                    ])
-                                 
-                                #logger.debug('piece_read_slices = {}'.format(piece_read_slices))
-                                
-                                piece_write_slices = tuple([
-                                    (
-                                        slice(
-                                            np.count_nonzero(variable_masks[dimension_index][input_variable_slices[dimension_index]][:piece_read_slices[dimension_index].start]),
-                                            (np.count_nonzero(variable_masks[dimension_index][input_variable_slices[dimension_index]][:piece_read_slices[dimension_index].start]) + 
-                                                np.count_nonzero(variable_masks[dimension_index][input_variable_slices[dimension_index]][piece_read_slices[dimension_index]]))
-                                            ) 
-                                        if variable_masks[dimension_index] is not None else 
-                                        slice(piece_read_slices[dimension_index].start - input_variable_slices[dimension_index].start,
-                                              piece_read_slices[dimension_index].stop - input_variable_slices[dimension_index].start
-                                              ) # No mask in this dimension
-                                    )
-                                    for dimension_index in range(len(input_variable.dimensions))
-                                    ])
-                                
-                                #logger.debug('piece_write_slices = {}'.format(piece_write_slices))
-                                
-                                # Get mask subsets for piece
-                                piece_dim_masks = tuple([
-                                    (variable_masks[dimension_index][piece_read_slices[dimension_index]] 
-                                     if variable_masks[dimension_index] is not None else None)
-                                    for dimension_index in range(len(input_variable.dimensions))
-                                    ])
-                                               
-                                #logger.debug('piece_dim_masks = {}'.format(pformat(piece_dim_masks)))
-                                
-                                # N.B: Nones in piece_dim_mask for unmasked dimensions will result in newaxis dimensions, but shape doesn't matter                               
-                                output_variable[piece_write_slices] = input_variable[piece_read_slices][piece_dim_masks]
-                                #logger.debug('output_variable[piece_write_slices] = {}'.format(output_variable[piece_write_slices]))
-                        
-                    else: # scalar variable - simple copy
-                        logger.debug('\tCopying %s scalar data' % variable_name)
-                        output_variable = input_variable
-                else:
-                    logger.debug('\tNot copying data for variable %s' % variable_name)
+                        yield future_list.pop(0).result()
                     
-            # Copy global attributes  
-            logger.debug("Copying global attributes: %s" % ', '.join(self.netcdf_dataset.__dict__.keys()))
-            for item, value in self.netcdf_dataset.__dict__.items():
-                if type(value) == str:
-                    nc_output_dataset.__setattr__(item, value.encode('utf-8'))
-                else:
-                    nc_output_dataset.__setattr__(item, value)
+                # Single writer
+                for (write_slices, _read_slices, _select_indices), piece_array in zip(piece_list, piece_array_generator()):
+                    output_variable[write_slices] = piece_array
                     
+                    variable_checkpoint['pieces_written'] += 1
+                    variable_statistics['bytes'] += piece_array.nbytes
+                    
+                    if time.time() - last_checkpoint_time >= NetCDFUtils.COPY_CHECKPOINT_INTERVAL:
+                        nc_output_dataset.sync()
+                        self._write_copy_checkpoint(checkpoint_path, checkpoint)
+                        last_checkpoint_time = time.time()
+                        
+                    if time.time() - last_progress_time >= NetCDFUtils.COPY_PROGRESS_INTERVAL:
+                        elapsed_seconds = time.time() - start_time
+                        logger.info('\tCopied {}/{} pieces of {} ({:.1f}MB/s)'.format(variable_checkpoint['pieces_written'], 
+                                                                                  piece_count, 
+                                                                                  variable_name,
+                                                                                  variable_statistics['bytes'] / 1000000.0 / elapsed_seconds))
+                        last_progress_time = time.time()
+                        
+                variable_statistics['elapsed_seconds'] = time.time() - start_time
+                if variable_statistics['elapsed_seconds']:
+                    variable_statistics['megabytes_per_second'] = variable_statistics['bytes'] / 1000000.0 / variable_statistics['elapsed_seconds']
+                logger.debug('\tCopied {} pieces ({} bytes) of {} in {:.3f}s'.format(piece_count - pieces_skipped, 
+                                                                                  variable_statistics['bytes'], 
+                                                                                  variable_name, 
+                                                                                  variable_statistics['elapsed_seconds']))
+
             logger.debug('Finished copying netCDF dataset %s to %s.' % (self.nc_path, nc_out_path))
+            checkpoint = None # Copy completed - no checkpoint required
         
         finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+                
             self.netcdf_dataset.set_auto_mask(True)
+            
+            if checkpoint: # Record progress of incomplete copy
+                nc_output_dataset.sync()
+                self._write_copy_checkpoint(checkpoint_path, checkpoint)
+                logger.info('Copy to {} incomplete. Checkpoint written to {}'.format(nc_out_path, checkpoint_path))
+            elif os.path.isfile(checkpoint_path):
+                os.remove(checkpoint_path)
+                
             nc_output_dataset.close()
             
+    def _create_copy_structure(self, 
+                               nc_output_dataset, 
+                               filtered_variables, 
+                               datatype_map_dict, 
+                               variable_options_dict, 
+                               dims_used, 
+                               dest_dim_size, 
+                               limit_dim_size):
+        '''
+        Helper function to create dimensions, variables and attributes in the output dataset for copy()
+        '''
+        #Copy dimensions
+        for dimension_name, dimension in self.netcdf_dataset.dimensions.items():
+            if dimension_name in dims_used: # Discard unused dimensions
+                logger.debug('Copying dimension %s of length %d' % (dimension_name, dest_dim_size[dimension_name]))
+                nc_output_dataset.createDimension(dimension_name, 
+                                      dest_dim_size[dimension_name] 
+                                      if not dimension.isunlimited() or limit_dim_size 
+                                      else None)
+            else:
+                logger.debug('Skipping unused dimension %s' % dimension_name)
+
+        # Copy variables
+        for variable_name, input_variable in filtered_variables.items():
+            dtype = datatype_map_dict.get(str(input_variable.datatype)) or input_variable.datatype
+            
+            # Special case for "crs" or "transverse_mercator" - want byte datatype
+            if input_variable == self.crs_variable: 
+                dtype = 'i1'
+                
+            # Start off by copying options from input variable (if specified)
+            var_options = get_filter_options(input_variable)
+            
+            # Chunking is defined outside the filters() result
+            input_chunk_shape = get_chunk_shape(input_variable)
+            if input_chunk_shape:
+                # Input variable is chunked - use same chunking by default unless overridden
+                var_options['chunksizes'] = [min(input_chunk_shape[dimension_index], dest_dim_size[input_variable.dimensions[dimension_index]])
+                                             for dimension_index in range(len(input_chunk_shape))]
+                
+            if hasattr(input_variable, '_FillValue'):
+                var_options['fill_value'] = input_variable._FillValue
+                
+            # Apply any supplied options over top of defaults
+            var_options.update(variable_options_dict.get(variable_name) or {})
+            
+            # Ensure chunk sizes aren't bigger than variable sizes
+            if var_options.get('chunksizes'):
+                var_options['chunksizes'] = [max(min(var_options['chunksizes'][dimension_index] or dest_dim_size[input_variable.dimensions[dimension_index]],
+                                                     dest_dim_size[input_variable.dimensions[dimension_index]]), 
+                                                 1)
+                                             for dimension_index in range(len(input_variable.dimensions))]
+                         
+            options_string = ' with options: %s' % ', '.join(['%s=%s' % item for item in var_options.items()]) if var_options else ''   
+            logger.debug("Creating variable %s from datatype %s to datatype %s%s" % (variable_name, 
+                                                                                   input_variable.datatype, 
+                                                                                   dtype, 
+                                                                                   options_string
+                                                                                   )
+                        )
+            # Create output variable using var_options to specify output options
+            output_variable = nc_output_dataset.createVariable(variable_name, 
+                                          dtype, 
+                                          input_variable.dimensions,
+                                          **var_options
+                                          )
+            
+            # Copy variable attributes
+            logger.debug('\tCopying %s attributes: %s' % (variable_name, ', '.join(input_variable.ncattrs())))
+            output_variable.setncatts({k: input_variable.getncattr(k) for k in input_variable.ncattrs() if not k.startswith('_')})
+                
+        # Copy global attributes  
+        logger.debug("Copying global attributes: %s" % ', '.join(self.netcdf_dataset.__dict__.keys()))
+        for item, value in self.netcdf_dataset.__dict__.items():
+            if type(value) == str:
+                nc_output_dataset.__setattr__(item, value.encode('utf-8'))
+            else:
+                nc_output_dataset.__setattr__(item, value)
+                
+    def _read_copy_checkpoint(self, checkpoint_path, nc_out_path, dest_dim_size, copy_variables):
+        '''
+        Helper function to return a checkpoint for resuming copy() or None if no usable checkpoint exists
+        '''
+        if not (os.path.isfile(checkpoint_path) and os.path.isfile(nc_out_path)):
+            logger.info('No checkpoint found at {}. Starting new copy'.format(checkpoint_path))
+            return None
+        
+        try:
+            with open(checkpoint_path, 'r') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file, object_pairs_hook=OrderedDict)
+                
+            assert checkpoint['nc_path'] == self.nc_path, 'Input dataset has changed'
+            assert checkpoint['dimension_sizes'] == dest_dim_size, 'Dimension sizes have changed'
+            assert set(checkpoint['variables'].keys()) <= set(copy_variables), 'Variables have changed'
+            
+            # Check that output dataset is readable
+            with netCDF4.Dataset(nc_out_path, mode="r") as nc_output_dataset:
+                assert set(copy_variables) <= set(nc_output_dataset.variables.keys()), 'Variables missing from output dataset'
+        except Exception as e:
+            logger.warning('Unable to resume from checkpoint {}: {}. Starting new copy'.format(checkpoint_path, e))
+            return None
+        
+        return checkpoint
+        
+    def _write_copy_checkpoint(self, checkpoint_path, checkpoint):
+        '''
+        Helper function to atomically write a checkpoint for copy()
+        '''
+        temp_checkpoint_path = checkpoint_path + '.tmp'
+        with open(temp_checkpoint_path, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file, indent=2)
+        os.replace(temp_checkpoint_path, checkpoint_path)
+        
     def get_crs_attributes(self, crs):
         '''\
         Function to return name and attributes of crs or transverse_mercator variable
@@ -669,6 +910,12 @@ def main():
                         type=str)
     parser.add_argument("--complevel", help="Compression level for chunked variables as an integer 0-9. Default is 4",
                         type=int, default=4)
+    parser.add_argument("-w", "--workers", help="Number of worker processes for reading pieces, or 0 for number of CPUs. Default is 1",
+                        type=int, default=1)
+    parser.add_argument("--checkpoint", help="Path of checkpoint file. Default is <output_path>.checkpoint.json",
+                        type=str)
+    parser.add_argument('-r', '--resume', action='store_const', const=True, default=False,
+                        help='resume an interrupted copy from its checkpoint. Default is to start a new copy')
     parser.add_argument('-d', '--debug', action='store_const', const=True, default=False,
                         help='output debug information. Default is no debug info')
     parser.add_argument("input_path")
@@ -704,6 +951,9 @@ def main():
              #dim_mask_dict={},
              nc_format=args.format,
              #limit_dim_size=False
+             max_workers=args.workers or os.cpu_count(),
+             checkpoint_path=args.checkpoint,
+             resume=args.resume,
              )
         
 
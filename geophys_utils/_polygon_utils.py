@@ -49,8 +49,11 @@ def get_grid_edge_points(grid_array, dimension_ordinates, nodata_value, max_byte
     '''
     assert len(grid_array.shape) == 2, 'grid_array is not 2D'
 
+    # Read 1D ordinates up-front so that no netCDF access occurs while the next piece is being prefetched
+    dimension_ordinates = [np.asarray(dimension_ordinates[dim_index][:]) for dim_index in range(2)]
+
     edge_point_list = []  # Complete list of edge points (unknown length)
-    for piece_array, array_offset in array_pieces(grid_array, max_bytes=max_bytes):
+    for piece_array, array_offset in array_pieces(grid_array, max_bytes=max_bytes, prefetch=True):
         dimension_subset = [dimension_ordinates[dim_index][array_offset[dim_index]:array_offset[
             dim_index] + piece_array.shape[dim_index]] for dim_index in range(2)]
 
@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+'''
+SpatialIndex class implementing a persistent grid bucket index for point coordinates.
+Points are sorted by grid cell (row-major) so that any rectangular search area maps to one
+contiguous run of sorted points per grid row. The index is saved as a directory of .npy files
+which are memory-mapped on loading, plus a small JSON header identifying the source dataset.
+
+Created on 16Oct.,2026
+'''
+import os
+import sys
+import json
+import math
+import shutil
+import tempfile
+import time
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO) # Initial logging level for this module
+
+SPATIAL_INDEX_VERSION = 1 # Increment this to invalidate existing index files
+POINTS_PER_CELL = 64 # Target mean number of points per grid cell
+MAX_GRID_CELLS = 4194304 # Upper limit on grid cells to keep offset array small
+
+SPACE_FILLING_CURVES = ['hilbert', 'zorder']
+CURVE_BITS = 16 # Number of bits per ordinate for space-filling curve keys
+
+INDEX_ARRAY_NAMES = ['sorted_indices', 'sorted_xy', 'cell_offsets']
+HEADER_FILENAME = 'header.json'
+
+
+def get_source_key(nc_path, point_count, date_modified=None):
+    '''
+    Function to return a dict uniquely identifying the current state of a source dataset.
+    Local files are keyed by modification time and size. OPeNDAP endpoints are keyed by point count
+    and any date_modified global attribute.
+    @param nc_path: Path or URL of source netCDF dataset
+    @param point_count: Number of points in source dataset
+    @param date_modified: Optional date_modified attribute value for source dataset
+    @return source_key: dict containing source identification values
+    '''
+    source_key = {'source': nc_path,
+                  'point_count': int(point_count),
+                  'version': SPATIAL_INDEX_VERSION
+                  }
+    if os.path.isfile(nc_path):
+        stat_result = os.stat(nc_path)
+        source_key['mtime'] = stat_result.st_mtime
+        source_key['size'] = stat_result.st_size
+    else:
+        source_key['date_modified'] = str(date_modified) if date_modified is not None else None
+
+    return source_key
+
+
+def get_curve_ordinates(xycoords, bounds=None, bits=CURVE_BITS):
+    '''
+    Function to return integer ordinates in the range [0, 2**bits) for an array of coordinates
+    @param xycoords: n x 2 array of XY coordinates
+    @param bounds: Optional [xmin, ymin, xmax, ymax] for scaling. Defaults to extent of finite coordinates
+    @param bits: Number of bits per ordinate
+    @return ix, iy: int64 arrays of scaled ordinates. Non-finite coordinates are set to zero
+    '''
+    finite_mask = np.all(np.isfinite(xycoords), axis=1)
+    if bounds is None:
+        if np.any(finite_mask):
+            bounds = np.concatenate((np.min(xycoords[finite_mask], axis=0), np.max(xycoords[finite_mask], axis=0)))
+        else:
+            bounds = [0.0, 0.0, 1.0, 1.0]
+
+    max_ordinate = 2 ** bits - 1
+    scaled_ordinates = []
+    for dim_index in range(2):
+        extent = (bounds[dim_index + 2] - bounds[dim_index]) or 1.0
+        scaled_ordinate = np.zeros(shape=(xycoords.shape[0],), dtype='int64')
+        scaled_ordinate[finite_mask] = np.clip(((xycoords[finite_mask, dim_index] - bounds[dim_index]) / extent * max_ordinate).astype('int64'),
+                                               0, max_ordinate)
+        scaled_ordinates.append(scaled_ordinate)
+
+    return tuple(scaled_ordinates)
+
+def get_zorder_keys(xycoords, bounds=None, bits=CURVE_BITS):
+    '''
+    Function to return Z-order (Morton) curve keys for an array of coordinates
+    @param xycoords: n x 2 array of XY coordinates
+    @param bounds: Optional [xmin, ymin, xmax, ymax] for scaling. Defaults to extent of finite coordinates
+    @param bits: Number of bits per ordinate (maximum 31)
+    @return keys: int64 array of curve keys
+    '''
+    assert bits <= 31, 'Maximum of 31 bits per ordinate'
+    ix, iy = get_curve_ordinates(xycoords, bounds, bits)
+
+    keys = np.zeros(shape=ix.shape, dtype='int64')
+    for bit in range(bits):
+        keys |= ((ix >> bit) & 1) << (2 * bit)
+        keys |= ((iy >> bit) & 1) << (2 * bit + 1)
+    return keys
+
+def get_hilbert_keys(xycoords, bounds=None, bits=CURVE_BITS):
+    '''
+    Function to return Hilbert curve keys for an array of coordinates
+    @param xycoords: n x 2 array of XY coordinates
+    @param bounds: Optional [xmin, ymin, xmax, ymax] for scaling. Defaults to extent of finite coordinates
+    @param bits: Number of bits per ordinate (maximum 31)
+    @return keys: int64 array of curve keys
+    '''
+    assert bits <= 31, 'Maximum of 31 bits per ordinate'
+    ix, iy = get_curve_ordinates(xycoords, bounds, bits)
+    side = 2 ** bits
+
+    keys = np.zeros(shape=ix.shape, dtype='int64')
+    step = side // 2
+    while step > 0:
+        rx = (ix & step) > 0
+        ry = (iy & step) > 0
+        keys += step * step * ((3 * rx.astype('int64')) ^ ry.astype('int64'))
+
+        # Rotate quadrant so that the curve is continuous
+        flip_mask = np.logical_and(~ry, rx)
+        ix[flip_mask] = side - 1 - ix[flip_mask]
+        iy[flip_mask] = side - 1 - iy[flip_mask]
+        swap_mask = ~ry
+        ix[swap_mask], iy[swap_mask] = iy[swap_mask], ix[swap_mask]
+
+        step //= 2
+    return keys
+
+def get_spatial_order(xycoords, curve='hilbert', bounds=None, bits=CURVE_BITS):
+    '''
+    Function to return point indices sorted along a space-filling curve
+    @param xycoords: n x 2 array of XY coordinates
+    @param curve: Space-filling curve name - 'hilbert' or 'zorder'
+    @param bounds: Optional [xmin, ymin, xmax, ymax] for scaling. Defaults to extent of finite coordinates
+    @param bits: Number of bits per ordinate
+    @return point_order: array of point indices in curve order, with non-finite coordinates last
+    '''
+    assert curve in SPACE_FILLING_CURVES, 'Invalid space-filling curve {}. Must be one of {}'.format(curve, SPACE_FILLING_CURVES)
+    keys = (get_hilbert_keys if curve == 'hilbert' else get_zorder_keys)(xycoords, bounds, bits)
+    keys[~np.all(np.isfinite(xycoords), axis=1)] = np.iinfo('int64').max # Sort missing coordinates last
+    return np.argsort(keys, kind='stable')
+
+
+class SpatialIndex(object):
+    '''
+    SpatialIndex class implementing a memory-mappable grid bucket index for point coordinates
+    '''
+    def __init__(self, header, sorted_indices, sorted_xy, cell_offsets):
+        '''
+        SpatialIndex Constructor - use SpatialIndex.build or SpatialIndex.load to create instances
+        @param header: dict containing grid definition and source key
+        @param sorted_indices: array of original point indices in cell order
+        @param sorted_xy: n x 2 array of point coordinates in cell order
+        @param cell_offsets: array of start positions for each cell in sorted arrays with total as last element
+        '''
+        self.header = header
+        self.sorted_indices = sorted_indices
+        self.sorted_xy = sorted_xy
+        self.cell_offsets = cell_offsets
+
+        self.point_count = header['point_count'] # Total points in source, including any without valid coordinates
+        self.bounds = header['bounds']
+        self.grid_shape = tuple(header['grid_shape']) # (rows, columns)
+        self.cell_size = tuple(header['cell_size']) # (x size, y size)
+
+    @classmethod
+    def build(cls, xycoords, source_key=None, points_per_cell=POINTS_PER_CELL):
+        '''
+        Function to build a new SpatialIndex from an array of coordinates
+        N.B: Points with non-finite coordinates are excluded from the index
+        @param xycoords: n x 2 array of XY coordinates
+        @param source_key: dict identifying source dataset as returned by get_source_key
+        @param points_per_cell: Target mean number of points per grid cell
+        @return spatial_index: new SpatialIndex object
+        '''
+        start_time = time.time()
+        point_count = xycoords.shape[0]
+
+        valid_indices = np.where(np.all(np.isfinite(xycoords), axis=1))[0]
+        valid_xy = xycoords[valid_indices]
+
+        if len(valid_indices):
+            xmin, ymin = np.min(valid_xy, axis=0).tolist()
+            xmax, ymax = np.max(valid_xy, axis=0).tolist()
+        else:
+            xmin = ymin = xmax = ymax = np.nan
+
+        # Choose grid dimensions to give approximately square cells with points_per_cell mean occupancy
+        cell_count = min(max(len(valid_indices) // points_per_cell, 1), MAX_GRID_CELLS)
+        width = (xmax - xmin) if len(valid_indices) else 0.0
+        height = (ymax - ymin) if len(valid_indices) else 0.0
+        if width > 0 and height > 0:
+            columns = max(int(round(math.sqrt(cell_count * width / height))), 1)
+            rows = max(int(math.ceil(cell_count / columns)), 1)
+        elif width > 0:
+            columns, rows = cell_count, 1
+        elif height > 0:
+            columns, rows = 1, cell_count
+        else:
+            columns, rows = 1, 1
+
+        cell_size = ((width / columns) or 1.0,
+                     (height / rows) or 1.0
+                     )
+
+        header = {'source_key': source_key,
+                  'point_count': int(point_count),
+                  'bounds': [xmin, ymin, xmax, ymax],
+                  'grid_shape': [rows, columns],
+                  'cell_size': list(cell_size),
+                  }
+
+        if len(valid_indices):
+            cell_ids = cls._get_cell_ids(valid_xy, header)
+            sort_order = np.argsort(cell_ids, kind='stable')
+            sorted_indices = valid_indices[sort_order].astype('int64')
+            sorted_xy = valid_xy[sort_order]
+            cell_offsets = np.zeros(shape=(rows * columns + 1,), dtype='int64')
+            cell_offsets[1:] = np.cumsum(np.bincount(cell_ids, minlength=rows * columns))
+        else:
+            sorted_indices = np.zeros(shape=(0,), dtype='int64')
+            sorted_xy = np.zeros(shape=(0, 2), dtype=xycoords.dtype)
+            cell_offsets = np.zeros(shape=(rows * columns + 1,), dtype='int64')
+
+        logger.debug('Built {} x {} spatial index for {} points in {:.3f}s'.format(rows, columns, len(valid_indices), time.time() - start_time))
+
+        return SpatialIndex(header, sorted_indices, sorted_xy, cell_offsets)
+
+    @classmethod
+    def load(cls, index_dir, source_key=None):
+        '''
+        Function to open an existing SpatialIndex with memory-mapped arrays
+        @param index_dir: Directory containing saved index
+        @param source_key: dict identifying source dataset as returned by get_source_key. None to skip check
+        @return spatial_index: SpatialIndex object, or None if index doesn't exist or is stale
+        '''
+        header_path = os.path.join(index_dir, HEADER_FILENAME)
+        if not os.path.isfile(header_path):
+            logger.debug('Spatial index {} does not exist'.format(index_dir))
+            return None
+
+        try:
+            with open(header_path, 'r') as header_file:
+                header = json.load(header_file)
+        except (OSError, ValueError) as e:
+            logger.debug('Unable to read spatial index header {}: {}'.format(header_path, e))
+            return None
+
+        if source_key is not None and header.get('source_key') != source_key:
+            logger.debug('Spatial index {} is stale: {} != {}'.format(index_dir, header.get('source_key'), source_key))
+            return None
+
+        try:
+            index_arrays = [np.load(os.path.join(index_dir, array_name + '.npy'), mmap_mode='r')
+                            for array_name in INDEX_ARRAY_NAMES]
+        except (OSError, ValueError) as e:
+            logger.debug('Unable to read spatial index arrays from {}: {}'.format(index_dir, e))
+            return None
+
+        logger.debug('Opened spatial index {}'.format(index_dir))
+        return SpatialIndex(header, *index_arrays)
+
+    def save(self, index_dir):
+        '''
+        Function to write index to disk. Files are written to a temporary directory which then replaces
+        any existing index so that concurrent readers never see a partially written index.
+        @param index_dir: Directory to contain saved index
+        '''
+        parent_dir = os.path.dirname(os.path.abspath(index_dir))
+        os.makedirs(parent_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=parent_dir, prefix='.' + os.path.basename(index_dir))
+        try:
+            for array_name in INDEX_ARRAY_NAMES:
+                np.save(os.path.join(temp_dir, array_name + '.npy'), np.asarray(getattr(self, array_name)))
+
+            with open(os.path.join(temp_dir, HEADER_FILENAME), 'w') as header_file:
+                json.dump(self.header, header_file)
+
+            if os.path.isdir(index_dir):
+                shutil.rmtree(index_dir, ignore_errors=True)
+            os.rename(temp_dir, index_dir)
+            logger.debug('Saved spatial index to {}'.format(index_dir))
+        except:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def _get_cell_ids(xy, header):
+        '''
+        Helper function to return row-major grid cell IDs for coordinates (clipped to grid)
+        '''
+        rows, columns = header['grid_shape']
+        column_indices = np.clip(np.floor((xy[:,0] - header['bounds'][0]) / header['cell_size'][0]), 0, columns - 1).astype('int64')
+        row_indices = np.clip(np.floor((xy[:,1] - header['bounds'][1]) / header['cell_size'][1]), 0, rows - 1).astype('int64')
+        return row_indices * columns + column_indices
+
+    def get_bbox_positions(self, bounds):
+        '''
+        Function to return positions in the sorted arrays of all points within a bounding box
+        @param bounds: Iterable containing [<xmin>, <ymin>, <xmax>, <ymax>] in index CRS
+        @return positions: Array of positions in sorted_indices and sorted_xy
+        '''
+        xmin, ymin, xmax, ymax = [float(ordinate) for ordinate in bounds]
+        rows, columns = self.grid_shape
+
+        if (not len(self.sorted_indices)
+            or xmin > self.bounds[2] or xmax < self.bounds[0]
+            or ymin > self.bounds[3] or ymax < self.bounds[1]):
+            return np.zeros(shape=(0,), dtype='int64')
+
+        start_column, end_column = np.clip(np.floor((np.array([xmin, xmax]) - self.bounds[0]) / self.cell_size[0]), 0, columns - 1).astype('int64')
+        start_row, end_row = np.clip(np.floor((np.array([ymin, ymax]) - self.bounds[1]) / self.cell_size[1]), 0, rows - 1).astype('int64')
+
+        # Each grid row in the search area is one contiguous run of sorted points
+        row_cell_ids = np.arange(start_row, end_row + 1) * columns
+        run_starts = self.cell_offsets[row_cell_ids + start_column]
+        run_ends = self.cell_offsets[row_cell_ids + end_column + 1]
+        run_lengths = run_ends - run_starts
+
+        total_length = int(np.sum(run_lengths))
+        if not total_length:
+            return np.zeros(shape=(0,), dtype='int64')
+
+        # Concatenate ranges without a Python loop
+        run_offsets = np.cumsum(run_lengths) - run_lengths
+        positions = np.arange(total_length, dtype='int64') + np.repeat(run_starts - run_offsets, run_lengths)
+
+        candidate_xy = self.sorted_xy[positions]
+        return positions[np.logical_and(np.logical_and(candidate_xy[:,0] >= xmin, candidate_xy[:,0] <= xmax),
+                                        np.logical_and(candidate_xy[:,1] >= ymin, candidate_xy[:,1] <= ymax)
+                                        )]
+
+    def get_bbox_points(self, bounds):
+        '''
+        Function to return original point indices and coordinates of all points within a bounding box
+        @param bounds: Iterable containing [<xmin>, <ymin>, <xmax>, <ymax>] in index CRS
+        @return point_indices: Array of original point indices
+        @return point_xy: n x 2 array of point coordinates
+        '''
+        positions = self.get_bbox_positions(bounds)
+        return np.asarray(self.sorted_indices[positions]), np.asarray(self.sorted_xy[positions])
+
+    def get_bbox_mask(self, bounds):
+        '''
+        Function to return Boolean mask of all points within a bounding box
+        @param bounds: Iterable containing [<xmin>, <ymin>, <xmax>, <ymax>] in index CRS
+        @return mask: Boolean array of size point_count
+        '''
+        mask = np.zeros(shape=(self.point_count,), dtype=bool)
+        mask[self.sorted_indices[self.get_bbox_positions(bounds)]] = True
+        return mask
+
+    def nearest(self, coordinates, points_required=1, max_distance=None, point_mask=None):
+        '''
+        Function to find nearest neighbours by searching expanding square areas around each coordinate.
+        Return values follow the scipy cKDTree.query convention for missing neighbours (inf distance, index = point_count),
+        and as for cKDTree.query distance_upper_bound, only points nearer than max_distance are returned
+        @param coordinates: n x 2 array of XY coordinates in index CRS
+        @param points_required: Number of points to retrieve for each coordinate
+        @param max_distance: Maximum search distance or None for unlimited
+        @param point_mask: Optional Boolean array of size point_count used to filter points
+        @return distances: n x points_required array of distances
+        @return indices: n x points_required array of original point indices
+        '''
+        coordinates = np.asarray(coordinates, dtype='float64').reshape((-1, 2))
+        max_distance = np.inf if max_distance is None else max_distance
+
+        distances = np.full(shape=(coordinates.shape[0], points_required), fill_value=np.inf, dtype='float64')
+        indices = np.full(shape=(coordinates.shape[0], points_required), fill_value=self.point_count, dtype='int64')
+
+        if not len(self.sorted_indices):
+            return distances, indices
+
+        bbox_corners = np.array(self.bounds)[[0, 1, 2, 1, 2, 3, 0, 3]].reshape((4, 2))
+
+        for coordinate_index, coordinate in enumerate(coordinates):
+            if not np.all(np.isfinite(coordinate)):
+                continue
+
+            # Radius of circle around coordinate enclosing all indexed points
+            full_radius = np.max(np.hypot(bbox_corners[:,0] - coordinate[0], bbox_corners[:,1] - coordinate[1]))
+            search_radius = max(self.cell_size)
+            while True:
+                search_radius = min(search_radius, max_distance)
+                positions = self.get_bbox_positions([coordinate[0] - search_radius, coordinate[1] - search_radius,
+                                                     coordinate[0] + search_radius, coordinate[1] + search_radius])
+                if point_mask is not None:
+                    positions = positions[point_mask[self.sorted_indices[positions]]]
+
+                candidate_distances = np.hypot(self.sorted_xy[positions][:,0] - coordinate[0],
+                                               self.sorted_xy[positions][:,1] - coordinate[1])
+                # Only points within the inscribed circle are guaranteed to be nearer than any points outside the search area
+                within_radius = candidate_distances <= search_radius
+
+                if (np.count_nonzero(within_radius) >= points_required
+                    or search_radius >= max_distance
+                    or search_radius >= full_radius):
+                    within_radius &= candidate_distances < max_distance
+                    positions = positions[within_radius]
+                    candidate_distances = candidate_distances[within_radius]
+                    nearest_order = np.argsort(candidate_distances, kind='stable')[:points_required]
+                    distances[coordinate_index,:len(nearest_order)] = candidate_distances[nearest_order]
+                    indices[coordinate_index,:len(nearest_order)] = self.sorted_indices[positions[nearest_order]]
+                    break
+
+                search_radius *= 2
+
+        return distances, indices
+
+
+def main():
+    '''
+    Main function for quick and dirty benchmarking of index construction and bbox queries
+    Usage: python -m geophys_utils._spatial_index [<point_count>]
+    '''
+    point_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    xycoords = np.random.default_rng(0).random((point_count, 2)) * [10.0, 5.0] + [120.0, -30.0]
+
+    start_time = time.time()
+    spatial_index = SpatialIndex.build(xycoords)
+    print('Built index for {} points in {:.3f}s'.format(point_count, time.time() - start_time))
+
+    index_dir = tempfile.mkdtemp()
+    try:
+        spatial_index.save(os.path.join(index_dir, 'spatial_index'))
+        start_time = time.time()
+        spatial_index = SpatialIndex.load(os.path.join(index_dir, 'spatial_index'))
+        print('Opened index in {:.3f}s'.format(time.time() - start_time))
+
+        bounds = [124.0, -28.0, 124.5, -27.5]
+        start_time = time.time()
+        mask = spatial_index.get_bbox_mask(bounds)
+        print('Index bbox mask: {} points in {:.3f}s'.format(np.count_nonzero(mask), time.time() - start_time))
+
+        start_time = time.time()
+        scan_mask = np.logical_and(np.logical_and(xycoords[:,0] >= bounds[0], xycoords[:,0] <= bounds[2]),
+                                   np.logical_and(xycoords[:,1] >= bounds[1], xycoords[:,1] <= bounds[3]))
+        print('Full scan bbox mask: {} points in {:.3f}s'.format(np.count_nonzero(scan_mask), time.time() - start_time))
+
+        start_time = time.time()
+        distances, indices = spatial_index.nearest([[125.0, -27.0]], points_required=5)
+        print('Nearest 5 points {} at distances {} in {:.3f}s'.format(indices[0], distances[0], time.time() - start_time))
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
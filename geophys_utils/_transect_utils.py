@@ -22,7 +22,15 @@ Created on 23Nov.,2016
 '''
 import numpy as np
 import math
-from ._crs_utils import get_utm_wkt, transform_coords
+from ._crs_utils import get_utm_wkt, get_utm_zones, get_utm_wkt_for_zone, transform_coords
+from ._vincenty import vinc_dist_array
+
+# WGS84 ellipsoid parameters for geodesic distances
+GEODESIC_SEMI_MAJOR_AXIS = 6378137.0
+GEODESIC_FLATTENING = 1.0 / 298.257223563
+
+# Relative tolerance for polyline lengths which are exact multiples of the sample spacing
+SAMPLE_LENGTH_TOLERANCE = 1.0e-9
 
 
 def line_length(line):
@@ -67,92 +75,194 @@ def utm_coords(coordinate_array, wkt):
     return utm_wkt, np.array(transform_coords(coordinate_array, wkt, utm_wkt))
 
 
-def coords2distance(coordinate_array):
+def _segment_distances(coordinate_array, geodesic=False):
+    '''
+    Helper function to return the distances between consecutive coordinates as a float64 array of shape (n-1)
+    @param coordinate_array: Array of shape (n, 2) containing coordinate pairs
+    @param geodesic: Boolean flag indicating whether coordinates are lon/lat degrees for which ellipsoidal 
+        distances in metres should be computed. Planar distances in native units are computed if False
+    '''
+    if geodesic:
+        radian_array = np.radians(np.asarray(coordinate_array, dtype='float64'))
+        return vinc_dist_array(GEODESIC_FLATTENING, GEODESIC_SEMI_MAJOR_AXIS,
+                               radian_array[:-1,1], radian_array[:-1,0], 
+                               radian_array[1:,1], radian_array[1:,0])[0]
+    
+    ordinate_differences = np.diff(np.asarray(coordinate_array, dtype='float64'), axis=0)
+    return np.hypot(ordinate_differences[:,0], ordinate_differences[:,1])
+
+
+def _distance_dtype(coordinate_array):
     '''
-    Function to calculate cumulative distance in metres from native (lon/lat) coordinates
+    Helper function to return the dtype for distances computed from coordinate_array
+    '''
+    return coordinate_array.dtype if coordinate_array.dtype.kind == 'f' else np.dtype('float64')
+
+
+def coords2distance(coordinate_array, geodesic=False):
+    '''
+    Function to calculate cumulative distance from coordinates
     @param coordinate_array: Array of shape (n, 2) or iterable containing coordinate pairs
+    @param geodesic: Boolean flag indicating whether coordinate_array contains lon/lat degrees for which 
+        cumulative ellipsoidal (WGS84) distances in metres should be calculated. Planar distances in the native 
+        units of coordinate_array (e.g. metres for UTM) are calculated if False
     
     @return distance_array: Array of shape (n) containing cumulative distances from first coord
     '''
+    coordinate_array = np.asarray(coordinate_array)
+    distance_array = np.zeros((coordinate_array.shape[0],), dtype='float64')
+    if coordinate_array.shape[0] > 1:
+        np.cumsum(_segment_distances(coordinate_array, geodesic), out=distance_array[1:])
+        
+    return distance_array.astype(_distance_dtype(coordinate_array), copy=False)
+
+
+def grouped_coords2distance(coordinate_array, group_start_indices, geodesic=False):
+    '''
+    Function to calculate cumulative distances from the start of each group of contiguous coordinates 
+    (e.g. each line) in a single pass over all coordinates. 
+    Equivalent to calling coords2distance for each group, with any NaN distance only affecting its own group.
+    @param coordinate_array: Array of shape (n, 2) or iterable containing coordinate pairs
+    @param group_start_indices: Array or list of indices into coordinate_array at which each group starts. 
+        Each group ends at the next group start (in coordinate order) or at the end of coordinate_array
+    @param geodesic: Boolean flag indicating whether coordinate_array contains lon/lat degrees for which 
+        ellipsoidal (WGS84) distances in metres should be calculated. Planar distances are calculated if False
+    
+    @return distance_array: Array of shape (n) containing cumulative distances from the first coord in each group
+    '''
+    coordinate_array = np.asarray(coordinate_array)
     coord_count = coordinate_array.shape[0]
-    distance_array = np.zeros((coord_count,), coordinate_array.dtype)
-    cumulative_distance = 0.0
-    distance_array[0] = cumulative_distance
-    last_point = coordinate_array[0]
-    
-    for coord_index in range(1, coord_count):
-        point = coordinate_array[coord_index]
-        distance = math.sqrt(math.pow(point[0] - last_point[0], 2.0) + math.pow(point[1] - last_point[1], 2.0))
-        distance = line_length((point, last_point))
-        cumulative_distance += distance
-        distance_array[coord_index] = cumulative_distance
-        last_point = point
+    distance_array = np.zeros((coord_count,), dtype='float64')
+    if coord_count < 2:
+        return distance_array.astype(_distance_dtype(coordinate_array), copy=False)
+    
+    group_start_mask = np.zeros((coord_count,), dtype=bool)
+    group_start_mask[0] = True
+    group_start_mask[np.asarray(group_start_indices, dtype='int64')] = True
+    
+    # Index of the start of the group containing each coordinate
+    group_start_index_array = np.maximum.accumulate(np.where(group_start_mask, np.arange(coord_count), 0))
+    
+    segment_distance_array = _segment_distances(coordinate_array, geodesic)
+    segment_distance_array[group_start_mask[1:]] = 0.0 # No distance between last point of one group and next group
+    
+    # Keep NaN distances out of the running sum so that they cannot propagate into following groups
+    nan_segment_mask = np.isnan(segment_distance_array)
+    segment_distance_array[nan_segment_mask] = 0.0
+    np.cumsum(segment_distance_array, out=distance_array[1:])
+    distance_array -= distance_array[group_start_index_array]
+    
+    if np.any(nan_segment_mask):
+        nan_count_array = np.zeros((coord_count,), dtype='int64')
+        np.cumsum(nan_segment_mask, out=nan_count_array[1:])
+        distance_array[nan_count_array > nan_count_array[group_start_index_array]] = np.nan
         
-    return distance_array
+    return distance_array.astype(_distance_dtype(coordinate_array), copy=False)
+    
     
+def sample_polylines(vertex_array, polyline_start_indices, sample_spacing):
+    '''
+    Function to return points sample_spacing apart along multiple polylines in a single pass.
+    Samples start at the first vertex of each polyline and continue through its vertices at distances which are 
+    exact multiples of sample_spacing, so samples are carried across vertices rather than restarted at each segment.
+    @param vertex_array: Array of shape (n, 2) containing the vertices of all polylines in planar coordinates
+    @param polyline_start_indices: Ascending array or list of indices into vertex_array at which each polyline starts
+    @param sample_spacing: distance between sample points in the units of vertex_array
     
+    @return sample_point_array: Array of shape (N, 2) containing sample points for all polylines
+    @return sample_counts: Array containing the number of sample points for each polyline. Polylines with fewer 
+        than two vertices have no sample points
+    '''
+    assert sample_spacing > 0, 'Invalid sample spacing {}'.format(sample_spacing)
+    
+    vertex_array = np.asarray(vertex_array, dtype='float64').reshape((-1, 2))
+    polyline_start_indices = np.asarray(polyline_start_indices, dtype='int64').reshape((-1,))
+    polyline_end_indices = np.append(polyline_start_indices[1:], len(vertex_array))
+    
+    sample_counts = np.zeros(polyline_start_indices.shape, dtype='int64')
+    sampled_polylines = (polyline_end_indices - polyline_start_indices) >= 2
+    if not np.any(sampled_polylines):
+        return np.zeros((0, 2), dtype='float64'), sample_counts
+    
+    distance_array = grouped_coords2distance(vertex_array, polyline_start_indices[polyline_start_indices < len(vertex_array)])
+    polyline_lengths = np.where(sampled_polylines, distance_array[np.maximum(polyline_end_indices - 1, 0)], 0.0)
+    
+    # Allow for rounding error in lengths which are exact multiples of sample_spacing
+    sample_counts[sampled_polylines] = np.floor(polyline_lengths[sampled_polylines] / sample_spacing * (1.0 + SAMPLE_LENGTH_TOLERANCE)).astype('int64') + 1
+
+    # Offset each polyline along a single monotonic distance axis, with a gap between polylines
+    polyline_offsets = np.cumsum(polyline_lengths + sample_spacing) - (polyline_lengths + sample_spacing)
+    vertex_distance_array = distance_array + np.repeat(polyline_offsets, polyline_end_indices - polyline_start_indices)
+    
+    sample_count = np.sum(sample_counts)
+    sample_ordinals = np.arange(sample_count) - np.repeat(np.cumsum(sample_counts) - sample_counts, sample_counts)
+    sample_distance_array = np.minimum(sample_ordinals * sample_spacing, np.repeat(polyline_lengths, sample_counts)) + np.repeat(polyline_offsets, sample_counts)
+    
+    sample_point_array = np.stack([np.interp(sample_distance_array, vertex_distance_array, vertex_array[:,dim_index]) 
+                                   for dim_index in range(2)], axis=1)
+    
+    return sample_point_array, sample_counts
+    
+    
+def sample_transects(transect_vertices_list, wkt, sample_metres):
+    '''
+    Function to return arrays of sample points sample_metres apart along lines between transect vertices for 
+    multiple transects. Each transect is sampled in the UTM zone of its centre, with all transects in the same 
+    zone transformed and sampled together.
+    Vertices with non-finite coordinates are ignored.
+    @param transect_vertices_list: list of lists or arrays of transect vertex coordinates
+    @param wkt: coordinate reference system for transect vertices
+    @param sample_metres: distance between sample points in metres
+    
+    @return sample_point_arrays: list containing an array of shape (N, 2) of sample points in wkt for each transect
+    '''
+    transect_vertex_arrays = [np.array(transect_vertices, dtype='float64').reshape((-1, 2)) 
+                              for transect_vertices in transect_vertices_list]
+    transect_vertex_arrays = [transect_vertex_array[np.all(np.isfinite(transect_vertex_array), axis=1)] 
+                              for transect_vertex_array in transect_vertex_arrays]
+    
+    sample_point_arrays = [np.zeros((0, 2), dtype='float64') for _ in transect_vertex_arrays]
+    sampled_transect_indices = [transect_index for transect_index in range(len(transect_vertex_arrays)) 
+                                if len(transect_vertex_arrays[transect_index]) >= 2]
+    if not sampled_transect_indices:
+        return sample_point_arrays
+    
+    # Find UTM zones for all transect centres with a single coordinate transformation
+    centre_coordinate_array = np.array([np.mean(transect_vertex_arrays[transect_index], axis=0) 
+                                        for transect_index in sampled_transect_indices])
+    utm_zones, is_northern = get_utm_zones(centre_coordinate_array, wkt)
+    
+    zone_transect_indices = {}
+    for list_index, transect_index in enumerate(sampled_transect_indices):
+        zone_transect_indices.setdefault((int(utm_zones[list_index]), int(is_northern[list_index])), []).append(transect_index)
+    
+    for (utm_zone, utm_is_northern), transect_indices in zone_transect_indices.items():
+        utm_wkt = get_utm_wkt_for_zone(utm_zone, utm_is_northern)
+        vertex_counts = np.array([len(transect_vertex_arrays[transect_index]) for transect_index in transect_indices])
+        utm_vertex_array = transform_coords(np.concatenate([transect_vertex_arrays[transect_index] 
+                                                            for transect_index in transect_indices]), 
+                                            wkt, utm_wkt)
+        
+        utm_sample_point_array, sample_counts = sample_polylines(utm_vertex_array, 
+                                                                 np.cumsum(vertex_counts) - vertex_counts, 
+                                                                 sample_metres)
+        
+        sample_point_array = np.array(transform_coords(utm_sample_point_array, utm_wkt, wkt)).reshape((-1, 2))
+        for transect_index, transect_sample_point_array in zip(transect_indices, 
+                                                               np.split(sample_point_array, np.cumsum(sample_counts)[:-1])):
+            sample_point_arrays[transect_index] = transect_sample_point_array
+            
+    return sample_point_arrays
+
+
 def sample_transect(transect_vertices, wkt, sample_metres):
     '''
-    Function to return a list of sample points sample_metres apart along lines between transect vertices
+    Function to return an array of sample points sample_metres apart along lines between transect vertices
     @param transect_vertices: list or array of transect vertex coordinates
     @param wkt: coordinate reference system for transect_vertices
     @param sample_metres: distance between sample points in metres
+    
+    @return sample_point_array: Array of shape (N, 2) containing sample points in wkt
+    @return sample_metres: distance between sample points in metres
     '''
-    transect_vertex_array = np.array(transect_vertices)
-    # print 'transect_vertex_array = %s' % transect_vertex_array
-    nominal_utm_wkt, utm_transect_vertices = utm_coords(transect_vertex_array, wkt)
-    # print 'nominal_utm_wkt = %s' % nominal_utm_wkt
-    # print 'utm_transect_vertices = %s' % utm_transect_vertices
-
-    sample_points = []
-    residual = 0
-    for vertex_index in range(len(utm_transect_vertices) - 1):
-        utm_line = (utm_transect_vertices[
-                    vertex_index], utm_transect_vertices[vertex_index + 1])
-        # print 'utm_line = %s' % (utm_line,)
-        utm_line_length = line_length(utm_line)
-        # print 'utm_line_length = %s' % utm_line_length
-
-        # Skip lines of infinite length
-        if utm_line_length == float('inf'):
-            continue
-
-        sample_count = int((utm_line_length + residual) // sample_metres)
-        # print 'sample_count = %s' % sample_count
-        if not sample_count:
-            residual += utm_line_length
-            continue
-
-        if residual:  # Use un-sampled distance from last line
-            start_point = point_along_line(
-                utm_line, sample_metres - residual)
-        else:
-            start_point = utm_line[0]  # Start at beginning
-        # print 'start_point = %s' % (start_point,)
-
-        # Calculate new residual
-        residual = (utm_line_length + residual) % sample_metres
-        # print 'residual = %s' % residual
-
-        end_point = point_along_line(utm_line, utm_line_length - residual)
-        # print 'end_point = %s' % (end_point,)
-
-        try:
-            sample_point_array = np.stack([np.linspace(start_point[dim_index], end_point[
-                                          dim_index], sample_count + 1) for dim_index in range(2)]).transpose()
-            # print 'sample_point_array.shape = %s' %
-            # (sample_point_array.shape,)
-        except Exception as e:
-            print('Line sampling failed: {}'.format(e))
-            residual = 0
-            continue
-
-        sample_points += list(sample_point_array)
-
-        # Don't double up end point with next start point
-        if (not residual) and (vertex_index <
-                               len(utm_transect_vertices) - 1):
-            sample_points.pop()
-
-    return transform_coords(
-        sample_points, nominal_utm_wkt, wkt), sample_metres
+    return sample_transects([transect_vertices], wkt, sample_metres)[0], sample_metres
@@ -49,10 +49,16 @@ Calculate: the ellipsoidal distance (s) and
 forward and reverse azimuths between the points (alpha12, alpha21).
 '''
 
+import sys
+import time
 import numpy
 import math
 
 __version__ = '1.0.1'
+
+# Maximum number of iterations for array versions of Vincenty's formulae
+VINCENTY_MAX_ITERATIONS = 200
+
 class GreatCircle(object):
     """
     formula for perfect sphere from Ed Williams' 'Aviation Formulary'
@@ -144,23 +150,15 @@ class GreatCircle(object):
             z = A*math.sin(lat1)               +B*math.sin(lat2)
             lats=numpy.arctan2(z,numpy.sqrt(x**2+y**2))
             lons=numpy.arctan2(y,x)
-            lons = map(math.degrees,lons.tolist())
-            lats = map(math.degrees,lats.tolist())
+            lons = list(map(math.degrees,lons.tolist()))
+            lats = list(map(math.degrees,lats.tolist()))
         # use ellipsoid formulas
         else:
-            latpt = self.lat1
-            lonpt = self.lon1
-            azimuth = self.azimuth12
-            lons = [math.degrees(lonpt)]
-            lats = [math.degrees(latpt)]
-            for _n in range(npoints-2):
-                latptnew, lonptnew, _alpha21=vinc_pt(self.f,self.a,latpt,lonpt,azimuth,incdist)
-                d,azimuth, _a21=vinc_dist(self.f,self.a,latptnew,lonptnew,lat2,lon2)
-                lats.append(math.degrees(latptnew))
-                lons.append(math.degrees(lonptnew))
-                latpt = latptnew; lonpt = lonptnew
-            lons.append(math.degrees(self.lon2))
-            lats.append(math.degrees(self.lat2))
+            # Project all intermediate points directly from the start point along the geodesic
+            latpts, lonpts, _alpha21 = vinc_pt_array(self.f, self.a, lat1, lon1, self.azimuth12, 
+                                                     incdist * numpy.arange(1, npoints-1))
+            lons = [math.degrees(self.lon1)] + numpy.degrees(lonpts).tolist() + [math.degrees(self.lon2)]
+            lats = [math.degrees(self.lat1)] + numpy.degrees(latpts).tolist() + [math.degrees(self.lat2)]
         return lons,lats
 
 # ---------------------------------------------------------------------
@@ -301,6 +299,149 @@ def vinc_dist(  f,  a,  phi1,  lembda1,  phi2,  lembda2 ) :
     # END of Vincenty's Inverse formulae
 
 
+def vinc_dist_array( f, a, phi1, lembda1, phi2, lembda2, max_iterations=VINCENTY_MAX_ITERATIONS ) :
+    """
+    Array version of vinc_dist. Returns the distances between pairs of geographic points on the ellipsoid
+    and the forward and reverse azimuths between these points.
+    lats, longs and azimuths are in radians, distance in metres.
+    All points are iterated together, with each element dropped from the iteration as soon as it has converged.
+    
+    Arguments:
+        f: flattening
+        a: equatorial radius (metres)
+        phi1: array of latitudes of first points
+        lembda1: array of longitudes of first points
+        phi2: array of latitudes of second points
+        lembda2: array of longitudes of second points
+        max_iterations: maximum number of iterations. Elements which have not converged (e.g. nearly
+            antipodal points) are left with the values from the last iteration
+        
+    Returns ( s, alpha12,  alpha21 ) as a tuple of arrays with the broadcast shape of the arguments
+    """
+    phi1, lembda1, phi2, lembda2 = numpy.broadcast_arrays(*[numpy.asarray(value, dtype=numpy.float64) 
+                                                            for value in (phi1, lembda1, phi2, lembda2)])
+    result_shape = phi1.shape
+    phi1, lembda1, phi2, lembda2 = [value.ravel() for value in (phi1, lembda1, phi2, lembda2)]
+
+    s = numpy.zeros(shape=phi1.shape, dtype=numpy.float64)
+    alpha12 = numpy.zeros(shape=phi1.shape, dtype=numpy.float64)
+    alpha21 = numpy.zeros(shape=phi1.shape, dtype=numpy.float64)
+
+    # Coincident points have zero distance and azimuths
+    calculate = ~numpy.logical_and(numpy.abs( phi2 - phi1 ) < 1e-8, numpy.abs( lembda2 - lembda1) < 1e-8)
+    if not calculate.any():
+        return s.reshape(result_shape), alpha12.reshape(result_shape), alpha21.reshape(result_shape)
+
+    two_pi = 2.0*math.pi
+
+    b = a * (1.0 - f)
+
+    U1 = numpy.arctan((1-f) * numpy.tan( phi1[calculate] ))
+    U2 = numpy.arctan((1-f) * numpy.tan( phi2[calculate] ))
+    SinU1 = numpy.sin(U1)
+    CosU1 = numpy.cos(U1)
+    SinU2 = numpy.sin(U2)
+    CosU2 = numpy.cos(U2)
+
+    omega = lembda2[calculate] - lembda1[calculate]
+    lembda = omega.copy()
+    
+    # Products of reduced latitude terms used in each iteration
+    SinU1SinU2 = SinU1 * SinU2
+    CosU1CosU2 = CosU1 * CosU2
+    CosU1SinU2 = CosU1 * SinU2
+    SinU1CosU2 = SinU1 * CosU2
+
+    # Iterate the following equations on unconverged elements
+    #  until there is no significant change in lembda
+    active = numpy.arange(len(omega))
+    for _iteration in range(max(max_iterations, 1)):
+        all_active = (len(active) == len(omega))
+        def active_values(array):
+            return array if all_active else array[active]
+        
+        active_lembda = active_values(lembda)
+        active_CosU2 = active_values(CosU2)
+        active_CosU1CosU2 = active_values(CosU1CosU2)
+        active_SinU1SinU2 = active_values(SinU1SinU2)
+        Sin_lembda = numpy.sin(active_lembda)
+        Cos_lembda = numpy.cos(active_lembda)
+        
+        active_sqr_sin_sigma = (numpy.square( active_CosU2 * Sin_lembda ) + 
+            numpy.square( active_values(CosU1SinU2) - active_values(SinU1CosU2) * Cos_lembda ))
+
+        active_Sin_sigma = numpy.sqrt( active_sqr_sin_sigma )
+
+        active_Cos_sigma = active_SinU1SinU2 + active_CosU1CosU2 * Cos_lembda
+
+        active_sigma = numpy.arctan2( active_Sin_sigma, active_Cos_sigma )
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            Sin_alpha = active_CosU1CosU2 * Sin_lembda / active_Sin_sigma
+            active_Cos_sq_alpha = 1.0 - numpy.square( Sin_alpha )
+
+            # Cos2sigma_m is zero for equatorial lines where cos(alpha) is zero
+            active_Cos2sigma_m = numpy.where(active_Cos_sq_alpha != 0,
+                                             active_Cos_sigma - (2 * active_SinU1SinU2 / active_Cos_sq_alpha),
+                                             0.0)
+
+        C = (f/16) * active_Cos_sq_alpha * (4 + f * (4 - 3 * active_Cos_sq_alpha))
+
+        new_lembda = active_values(omega) + (1-C) * f * Sin_alpha * (active_sigma + C * active_Sin_sigma * 
+            (active_Cos2sigma_m + C * active_Cos_sigma * (-1 + 2 * numpy.square(active_Cos2sigma_m) )))
+        
+        if all_active:
+            sqr_sin_sigma, Sin_sigma, Cos_sigma, sigma, Cos_sq_alpha, Cos2sigma_m = (
+                active_sqr_sin_sigma, active_Sin_sigma, active_Cos_sigma, active_sigma, active_Cos_sq_alpha, active_Cos2sigma_m)
+            lembda = new_lembda
+        else:
+            sqr_sin_sigma[active] = active_sqr_sin_sigma
+            Sin_sigma[active] = active_Sin_sigma
+            Cos_sigma[active] = active_Cos_sigma
+            sigma[active] = active_sigma
+            Cos_sq_alpha[active] = active_Cos_sq_alpha
+            Cos2sigma_m[active] = active_Cos2sigma_m
+            lembda[active] = new_lembda
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            converged = numpy.logical_or(new_lembda == 0, 
+                                         numpy.abs( (active_lembda - new_lembda)/new_lembda) <= 1.0e-9)
+        active = active[~converged]
+        if not len(active):
+            break
+
+    u2 = Cos_sq_alpha * (a*a-b*b) / (b*b)
+
+    A = 1 + (u2/16384) * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+
+    B = (u2/1024) * (256 + u2 * (-128+ u2 * (74 - 47 * u2)))
+
+    delta_sigma = B * Sin_sigma * (Cos2sigma_m + (B/4) * 
+        (Cos_sigma * (-1 + 2 * numpy.power(Cos2sigma_m, 2) ) - 
+        (B/6) * Cos2sigma_m * (-3 + 4 * sqr_sin_sigma) * 
+        (-3 + 4 * numpy.power(Cos2sigma_m,2 ) )))
+
+    s[calculate] = b * A * (sigma - delta_sigma)
+
+    calculated_alpha12 = numpy.arctan2( (CosU2 * numpy.sin(lembda)), 
+        (CosU1 * SinU2 - SinU1 * CosU2 * numpy.cos(lembda)))
+
+    calculated_alpha21 = numpy.arctan2( (CosU1 * numpy.sin(lembda)), 
+        (-SinU1 * CosU2 + CosU1 * SinU2 * numpy.cos(lembda)))
+
+    calculated_alpha12[calculated_alpha12 < 0.0] += two_pi
+    calculated_alpha12[calculated_alpha12 > two_pi] -= two_pi
+
+    calculated_alpha21 = calculated_alpha21 + two_pi / 2.0
+    calculated_alpha21[calculated_alpha21 < 0.0] += two_pi
+    calculated_alpha21[calculated_alpha21 > two_pi] -= two_pi
+    
+    alpha12[calculate] = calculated_alpha12
+    alpha21[calculate] = calculated_alpha21
+
+    return s.reshape(result_shape), alpha12.reshape(result_shape), alpha21.reshape(result_shape)
+
+
 #----------------------------------------------------------------------------
 # Vincenty's Direct formulae                                                |
 # Given: latitude and longitude of a point (phi1, lembda1) and              |
@@ -390,6 +531,122 @@ def  vinc_pt( f, a, phi1, lembda1, alpha12, s ) :
 
     # END of Vincenty's Direct formulae
 
+def vinc_pt_array( f, a, phi1, lembda1, alpha12, s, max_iterations=VINCENTY_MAX_ITERATIONS ) :
+    """
+    Array version of vinc_pt. Returns the lats and longs of projected points and reverse azimuths
+    given reference points and distances and azimuths to project.
+    lats, longs and azimuths are in radians, distances in metres.
+    All points are iterated together, with each element dropped from the iteration as soon as it has converged.
+
+    Arguments:
+        f: flattening
+        a: equatorial radius (metres)
+        phi1: array of latitudes of reference points
+        lembda1: array of longitudes of reference points
+        alpha12: array of azimuths from reference points
+        s: array of distances from reference points
+        max_iterations: maximum number of iterations
+
+    Returns ( phi2,  lambda2,  alpha21 ) as a tuple of arrays with the broadcast shape of the arguments
+    """
+    phi1, lembda1, alpha12, s = numpy.broadcast_arrays(*[numpy.asarray(value, dtype=numpy.float64) 
+                                                         for value in (phi1, lembda1, alpha12, s)])
+    result_shape = phi1.shape
+    phi1, lembda1, alpha12, s = [value.ravel() for value in (phi1, lembda1, alpha12, s)]
+
+    two_pi = 2.0*math.pi
+
+    alpha12 = alpha12.copy()
+    alpha12[alpha12 < 0.0] += two_pi
+    alpha12[alpha12 > two_pi] -= two_pi
+
+    b = a * (1.0 - f)
+
+    TanU1 = (1-f) * numpy.tan(phi1)
+    U1 = numpy.arctan( TanU1 )
+    SinU1 = numpy.sin(U1)
+    CosU1 = numpy.cos(U1)
+    Sin_alpha12 = numpy.sin(alpha12)
+    Cos_alpha12 = numpy.cos(alpha12)
+    sigma1 = numpy.arctan2( TanU1, Cos_alpha12 )
+    Sinalpha = CosU1 * Sin_alpha12
+    cosalpha_sq = 1.0 - Sinalpha * Sinalpha
+
+    u2 = cosalpha_sq * (a * a - b * b ) / (b * b)
+    A = 1.0 + (u2 / 16384) * (4096 + u2 * (-768 + u2 * 
+        (320 - 175 * u2) ) )
+    B = (u2 / 1024) * (256 + u2 * (-128 + u2 * (74 - 47 * u2) ) )
+
+    # Starting with the approximation
+    sigma0 = (s / (b * A))
+    sigma = sigma0.copy()
+    two_sigma_m = 2 * sigma1 + sigma
+
+    # Iterate the following three equations on unconverged elements
+    # until there is no significant change in sigma
+    # two_sigma_m , delta_sigma
+    active = numpy.flatnonzero(sigma != 0) # Zero distances need no iteration
+    for _iteration in range(max_iterations):
+        if not len(active):
+            break
+        
+        all_active = (len(active) == len(sigma))
+        def active_values(array):
+            return array if all_active else array[active]
+        
+        active_sigma = active_values(sigma)
+        active_two_sigma_m = 2 * active_values(sigma1) + active_sigma
+        active_B = active_values(B)
+        Cos_two_sigma_m = numpy.cos(active_two_sigma_m)
+        Sin_sigma = numpy.sin(active_sigma)
+
+        delta_sigma = active_B * Sin_sigma * ( Cos_two_sigma_m 
+            + (active_B/4) * (numpy.cos(active_sigma) * 
+            (-1 + 2 * numpy.square( Cos_two_sigma_m ) -  
+             (active_B/6) * Cos_two_sigma_m * 
+            (-3 + 4 * numpy.square( Sin_sigma )) *  
+            (-3 + 4 * numpy.square( Cos_two_sigma_m )))))
+
+        new_sigma = active_values(sigma0) + delta_sigma
+        
+        if all_active:
+            two_sigma_m = active_two_sigma_m
+            sigma = new_sigma
+        else:
+            two_sigma_m[active] = active_two_sigma_m
+            sigma[active] = new_sigma
+        
+        active = active[numpy.abs( (active_sigma - new_sigma) / new_sigma) > 1.0e-9]
+
+    Sin_sigma = numpy.sin(sigma)
+    Cos_sigma = numpy.cos(sigma)
+    Cos_two_sigma_m = numpy.cos(two_sigma_m)
+    
+    phi2 = numpy.arctan2 ( (SinU1 * Cos_sigma + CosU1 * Sin_sigma * Cos_alpha12 ), 
+        ((1-f) * numpy.sqrt( numpy.square(Sinalpha) +  
+        numpy.square(SinU1 * Sin_sigma - CosU1 * Cos_sigma * Cos_alpha12))))
+
+    lembda = numpy.arctan2( (Sin_sigma * Sin_alpha12 ), (CosU1 * Cos_sigma -  
+        SinU1 * Sin_sigma * Cos_alpha12))
+
+    C = (f/16) * cosalpha_sq * (4 + f * (4 - 3 * cosalpha_sq ))
+
+    omega = lembda - (1-C) * f * Sinalpha * (
+        sigma + C * Sin_sigma * (Cos_two_sigma_m + 
+        C * Cos_sigma * (-1 + 2 * numpy.square(Cos_two_sigma_m) )))
+
+    lembda2 = lembda1 + omega
+
+    alpha21 = numpy.arctan2 ( Sinalpha, (-SinU1 * Sin_sigma +  
+        CosU1 * Cos_sigma * Cos_alpha12))
+
+    alpha21 = alpha21 + two_pi / 2.0
+    alpha21[alpha21 < 0.0] += two_pi
+    alpha21[alpha21 > two_pi] -= two_pi
+
+    return phi2.reshape(result_shape), lembda2.reshape(result_shape), alpha21.reshape(result_shape)
+
+
 ##---------------------------------------------------------------------------
 # Notes:
 #
@@ -436,3 +693,52 @@ def  vinc_pt( f, a, phi1, lembda1, alpha12, s ) :
 #
 #
 ##*******************************************************************
+
+
+def main():
+    '''
+    Main function to benchmark array versions of Vincenty's formulae against the scalar functions
+    Usage: python -m geophys_utils._vincenty [<point_count>]
+    '''
+    point_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    
+    # WGS-84
+    a = 6378137.0
+    f = 1.0 / 298.257223563
+    
+    random_state = numpy.random.RandomState(0)
+    phi1 = numpy.radians(random_state.uniform(-80.0, 80.0, point_count))
+    lembda1 = numpy.radians(random_state.uniform(-180.0, 180.0, point_count))
+    phi2 = numpy.radians(random_state.uniform(-80.0, 80.0, point_count))
+    lembda2 = lembda1 + numpy.radians(random_state.uniform(-90.0, 90.0, point_count))
+    
+    start_time = time.time()
+    scalar_results = numpy.array([vinc_dist(f, a, *point_values) for point_values in zip(phi1, lembda1, phi2, lembda2)]).T
+    scalar_elapsed = time.time() - start_time
+    
+    start_time = time.time()
+    array_results = vinc_dist_array(f, a, phi1, lembda1, phi2, lembda2)
+    array_elapsed = time.time() - start_time
+    
+    print('vinc_dist: {:.3f}s, vinc_dist_array: {:.3f}s ({:.1f}x) for {} points. Maximum distance difference {:.3e}m'.format(
+        scalar_elapsed, array_elapsed, scalar_elapsed / array_elapsed, point_count, 
+        numpy.max(numpy.abs(array_results[0] - scalar_results[0]))))
+    
+    alpha12 = array_results[1]
+    s = array_results[0]
+    
+    start_time = time.time()
+    scalar_results = numpy.array([vinc_pt(f, a, *point_values) for point_values in zip(phi1, lembda1, alpha12, s)]).T
+    scalar_elapsed = time.time() - start_time
+    
+    start_time = time.time()
+    array_results = vinc_pt_array(f, a, phi1, lembda1, alpha12, s)
+    array_elapsed = time.time() - start_time
+    
+    print('vinc_pt: {:.3f}s, vinc_pt_array: {:.3f}s ({:.1f}x) for {} points. Maximum latitude difference {:.3e} radians'.format(
+        scalar_elapsed, array_elapsed, scalar_elapsed / array_elapsed, point_count, 
+        numpy.max(numpy.abs(array_results[0] - scalar_results[0]))))
+    
+    
+if __name__ == '__main__':
+    main()
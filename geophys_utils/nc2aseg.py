@@ -39,6 +39,7 @@ import zipstream
 
 from geophys_utils import get_spatial_ref_from_wkt
 from geophys_utils import NetCDFPointUtils
+from geophys_utils._fixed_width_format import format_fixed_width_column, join_fixed_width_columns, SPACE
 
 locale.setlocale(locale.LC_ALL, '')  # Use '' for auto, or force e.g. to 'en_US.UTF-8'
 
@@ -76,7 +77,7 @@ TEMP_DIR = tempfile.gettempdir()
 DEBUG_POINT_LIMIT = 0
 
 # List of regular expressions for variable names to exclude from output
-EXCLUDE_NAME_REGEXES = (['.*_index$', 'ga_.*metadata', 'latitude.+', 'longitude.+', 'easting.+', 'northing.+'] +
+EXCLUDE_NAME_REGEXES = (['.*_index$', '.*_point_count$', 'ga_.*metadata', 'latitude.+', 'longitude.+', 'easting.+', 'northing.+'] +
                         NetCDFPointUtils.CRS_VARIABLE_NAMES
                         )
 
@@ -227,6 +228,53 @@ class RowValueCache(object):
         if clear_cache:
             self.clear_cache()  # Clear cache after outputting all lines
 
+    def chunk_column_char_arrays(self, python_format_list, row_count=None):
+        '''
+        Function to format all cached rows as fixed-width text without iterating over rows, expanding 2D variables
+        to multiple columns. Output is identical to formatting each row from chunk_row_data_generator, including the
+        leading space separator and any truncation to MAX_FIELD_WIDTH.
+        @param python_format_list: List of Python format strings for each output column
+        @param row_count: Number of rows to format. Defaults to all cached rows
+        @return char_array_list: List of n x width uint8 character arrays, one per column, or None if any column
+            cannot be represented as fixed-width ASCII text (e.g. masked, overflowing or truncated values)
+        '''
+        row_count = self.index_range if row_count is None else min(row_count, self.index_range)
+
+        char_array_list = []
+        column_index = 0
+        for field_name, field_definition in self.field_definitions.items():
+            data = self.cache[field_name]
+            if isinstance(data, np.ndarray):
+                if np.ma.is_masked(data):
+                    return None
+                data = np.ma.getdata(data)
+
+            for field_column_index in range(field_definition['columns']):
+                if field_definition['columns'] == 1:  # 1D variable
+                    column_values = data[:row_count]
+                else:  # Column from 2D variable
+                    column_values = np.asarray(data)[:row_count, field_column_index]
+
+                python_format = python_format_list[column_index]
+                char_array = format_fixed_width_column(column_values, python_format)
+                if char_array is None:
+                    logger.debug('Unable to format field {} as fixed-width text'.format(field_name))
+                    return None
+
+                # Equivalent of ' ' + formatted_string[1 - MAX_FIELD_WIDTH::]
+                width = char_array.shape[1]
+                field_start = width - len(('x' * width)[1 - MAX_FIELD_WIDTH::])
+                if field_start:
+                    char_array = char_array[:, field_start - 1:]
+                    char_array[:, 0] = SPACE
+                else:
+                    char_array = np.hstack([np.full(shape=(row_count, 1), fill_value=SPACE, dtype='uint8'), char_array])
+
+                char_array_list.append(char_array)
+                column_index += 1
+
+        return char_array_list
+
 
 class NC2ASEGGDF2(object):
 
@@ -779,15 +827,14 @@ PROJGDA94 / MGA zone 54 GRS 1980  6378137.0000  298.257222  0.000000  Transverse
             Generator to yield all line strings across all point variables for specified row range
             '''
 
-            def chunk_line_generator(row_value_cache, python_format_list, start_index, end_index, point_mask=None):
+            def chunk_line_generator(row_value_cache, python_format_list, row_count):
                 '''
-                Helper Generator to yield line strings for specified rows across all point variables
+                Helper Generator to yield line strings for cached rows across all point variables
                 '''
-                logger.debug('Reading rows {:n} - {:n}'.format(start_index + 1, end_index))
-                row_value_cache.read_points(start_index, end_index, point_mask=point_mask)
-
-                logger.debug('Preparing ASEG-GDF lines for rows {:n} - {:n}'.format(start_index + 1, end_index))
-                for row_value_list in row_value_cache.chunk_row_data_generator():
+                for row_value_list in row_value_cache.chunk_row_data_generator(clear_cache=False):
+                    if not row_count:
+                        break
+                    row_count -= 1
                     # logger.debug('row_value_list: {}'.format(row_value_list))
                     # Turn list of values into a string using python_formats
                     # Truncate fields to maximum width with leading space - only string fields should be affected
@@ -799,28 +846,32 @@ PROJGDA94 / MGA zone 54 GRS 1980  6378137.0000  298.257222  0.000000  Transverse
             # Process all chunks
             point_count = 0
             for chunk_index in range(self.total_points // cache_chunk_rows + 1):
-                chunk_line_list = []
-                for line in chunk_line_generator(row_value_cache, python_format_list,
-                                                 start_index=chunk_index * cache_chunk_rows,
-                                                 end_index=min((chunk_index + 1) * cache_chunk_rows,
-                                                               self.total_points
-                                                               ),
-                                                 point_mask=point_mask
-                                                 ):
-                    point_count += 1
-
-                    if not (point_count % self.line_report_increment):
-                        self.info_output(
-                            '{:n} / {:n} ASEG-GDF2 rows converted to text'.format(point_count, self.total_points))
-
-                    # logger.debug('line: "{}"'.format(line))
-                    chunk_line_list.append(line)
-
-                    if self.debug and DEBUG_POINT_LIMIT and (
-                            point_count >= DEBUG_POINT_LIMIT):  # Don't process more lines
-                        break
+                start_index = chunk_index * cache_chunk_rows
+                end_index = min((chunk_index + 1) * cache_chunk_rows, self.total_points)
+
+                logger.debug('Reading rows {:n} - {:n}'.format(start_index + 1, end_index))
+                row_value_cache.read_points(start_index, end_index, point_mask=point_mask)
+
+                row_count = row_value_cache.index_range
+                if self.debug and DEBUG_POINT_LIMIT:  # Don't process more lines than limit
+                    row_count = max(min(row_count, DEBUG_POINT_LIMIT - point_count), 0)
+
+                logger.debug('Preparing ASEG-GDF lines for rows {:n} - {:n}'.format(start_index + 1, end_index))
+                char_array_list = row_value_cache.chunk_column_char_arrays(python_format_list, row_count) if row_count else None
+
+                if char_array_list is not None:  # Whole chunk formatted as fixed-width columns
+                    chunk_buffer_string = join_fixed_width_columns(char_array_list)
+                else:  # Fall back to formatting each row individually
+                    chunk_buffer_string = '\n'.join(chunk_line_generator(row_value_cache, python_format_list, row_count)) + '\n'
+
+                row_value_cache.clear_cache()
 
-                chunk_buffer_string = '\n'.join(chunk_line_list) + '\n'  # Yield a chunk of lines
+                # Report progress at the same row counts as a row-by-row conversion
+                chunk_point_counts = np.arange(point_count + 1, point_count + row_count + 1)
+                for report_point_count in chunk_point_counts[(chunk_point_counts % self.line_report_increment) == 0]:
+                    self.info_output(
+                        '{:n} / {:n} ASEG-GDF2 rows converted to text'.format(report_point_count, self.total_points))
+                point_count += row_count
 
                 if encoding:
                     encoded_bytestring = chunk_buffer_string.encode(encoding)
@@ -1078,4 +1129,4 @@ if __name__ == '__main__':
         logger.addHandler(console_handler)
         logger.debug('Logging handlers set up for logger {}'.format(logger.name))
 
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
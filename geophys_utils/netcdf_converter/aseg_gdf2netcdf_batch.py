@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+'''
+Batch conversion of multiple ASEG-GDF datasets to netCDF using a pool of worker processes.
+Input .dat files are specified by glob patterns and/or a manifest file. Each conversion runs in a fresh worker
+process with its own temporary cache file, and is written to a temporary output file which is only renamed
+to the final netCDF path on success. Up-to-date outputs are skipped, so an interrupted batch can simply be re-run.
+A CSV report of per-file status, timing and throughput is written on completion.
+
+Created on 16Oct.,2026
+'''
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+import logging
+from collections import OrderedDict
+from multiprocessing import Pool
+
+from geophys_utils.netcdf_converter import aseg_gdf2netcdf_converter
+from geophys_utils.netcdf_converter.aseg_gdf2netcdf_converter import ASEGGDF2NetCDFConverter
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO) # Logging level for this module
+
+# Suffix for incomplete netCDF output files
+PARTIAL_FILE_SUFFIX = '.part'
+
+REPORT_FIELDS = ['dat_path',
+                 'nc_path',
+                 'status',
+                 'elapsed_seconds',
+                 'dat_bytes',
+                 'point_count',
+                 'points_per_second',
+                 'megabytes_per_second',
+                 'error'
+                 ]
+
+
+def get_conversion_list(glob_patterns=None, manifest_path=None, output_dir=None):
+    '''
+    Function to return a list of (dat_path, nc_path, dfn_path) tuples for all conversions
+    @param glob_patterns: Optional list of glob patterns for .dat files. "**" matches subdirectories
+    @param manifest_path: Optional path to CSV manifest file with lines of the form <dat_path>[,<nc_path>[,<dfn_path>]]
+        Blank lines and lines starting with "#" are ignored
+    @param output_dir: Optional output directory for netCDF files not specified in the manifest.
+        Defaults to the directory containing each .dat file
+
+    @return conversion_list: List of (dat_path, nc_path, dfn_path) tuples
+    '''
+    def default_nc_path(dat_path):
+        nc_path = os.path.splitext(dat_path)[0] + '.nc'
+        if output_dir:
+            nc_path = os.path.join(output_dir, os.path.basename(nc_path))
+        return nc_path
+
+    conversion_list = []
+
+    for glob_pattern in (glob_patterns or []):
+        dat_path_list = sorted(glob.glob(glob_pattern, recursive=True))
+        if not dat_path_list:
+            logger.warning('No files found matching {}'.format(glob_pattern))
+        for dat_path in dat_path_list:
+            conversion_list.append((dat_path, default_nc_path(dat_path), os.path.splitext(dat_path)[0] + '.dfn'))
+
+    if manifest_path:
+        with open(manifest_path, 'r', newline='') as manifest_file:
+            for row in csv.reader(manifest_file):
+                row = [value.strip() for value in row]
+                if not row or not row[0] or row[0].startswith('#'):
+                    continue
+                dat_path = row[0]
+                nc_path = row[1] if len(row) >= 2 and row[1] else default_nc_path(dat_path)
+                dfn_path = row[2] if len(row) >= 3 and row[2] else os.path.splitext(dat_path)[0] + '.dfn'
+                conversion_list.append((dat_path, nc_path, dfn_path))
+
+    # Remove any duplicate output paths, keeping the first occurrence
+    nc_path_set = set()
+    unique_conversion_list = []
+    for conversion in conversion_list:
+        nc_path = os.path.abspath(conversion[1])
+        if nc_path in nc_path_set:
+            logger.warning('Ignoring duplicate conversion of {} to {}'.format(conversion[0], conversion[1]))
+            continue
+        nc_path_set.add(nc_path)
+        unique_conversion_list.append(conversion)
+
+    return unique_conversion_list
+
+
+def is_up_to_date(nc_path, input_path_list):
+    '''
+    Function to determine whether a netCDF output file is newer than all of its input files
+    @param nc_path: Path to netCDF output file
+    @param input_path_list: List of input file paths. Missing or None paths are ignored
+
+    @return up_to_date: Boolean flag indicating whether nc_path exists and is newer than all inputs
+    '''
+    if not os.path.isfile(nc_path):
+        return False
+
+    nc_modified_time = os.path.getmtime(nc_path)
+    return all([nc_modified_time >= os.path.getmtime(input_path)
+                for input_path in input_path_list
+                if input_path and os.path.isfile(input_path)
+                ])
+
+
+def init_worker(max_memory=None, log_level=logging.INFO):
+    '''
+    Function to initialise each worker process, setting the logging level and optional address space limit
+    @param max_memory: Optional maximum address space per worker process in bytes (POSIX only)
+    @param log_level: Logging level for converter
+    '''
+    aseg_gdf2netcdf_converter.logger.setLevel(log_level)
+    logging.getLogger('geophys_utils.netcdf_converter').setLevel(log_level)
+
+    if max_memory:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning('Unable to limit worker memory to {} bytes: {}'.format(max_memory, e))
+
+
+def convert_dataset(dat_path, nc_path, dfn_path, converter_kwargs=None, force=False):
+    '''
+    Function to convert a single ASEG-GDF dataset to netCDF and return a report dict
+    The netCDF file is written to a temporary path and renamed on success so that incomplete files are never left
+    at nc_path.
+    @param dat_path: Path to .dat file
+    @param nc_path: Path to netCDF output file
+    @param dfn_path: Path to .dfn file
+    @param converter_kwargs: Optional dict of keyword arguments for ASEGGDF2NetCDFConverter constructor
+    @param force: Boolean flag indicating whether to convert even if nc_path is up to date
+
+    @return report_dict: OrderedDict of report values keyed by REPORT_FIELDS
+    '''
+    converter_kwargs = converter_kwargs or {}
+
+    report_dict = OrderedDict([(field_name, None) for field_name in REPORT_FIELDS])
+    report_dict['dat_path'] = dat_path
+    report_dict['nc_path'] = nc_path
+
+    try:
+        report_dict['dat_bytes'] = os.path.getsize(dat_path)
+
+        if not force and is_up_to_date(nc_path, [dat_path, dfn_path, converter_kwargs.get('settings_path')]):
+            report_dict['status'] = 'skipped'
+            return report_dict
+
+        partial_nc_path = nc_path + PARTIAL_FILE_SUFFIX
+        nc_dir = os.path.dirname(os.path.abspath(nc_path))
+        if not os.path.isdir(nc_dir):
+            os.makedirs(nc_dir, exist_ok=True)
+
+        start_time = time.time()
+        d2n = ASEGGDF2NetCDFConverter(partial_nc_path,
+                                      dat_path,
+                                      dfn_path,
+                                      **converter_kwargs
+                                      )
+        try:
+            d2n.convert2netcdf()
+            report_dict['point_count'] = d2n.total_points
+        finally:
+            d2n.__del__() # Close output file and remove cache file
+            del d2n
+
+        os.replace(partial_nc_path, nc_path)
+        elapsed_seconds = time.time() - start_time
+
+        report_dict['status'] = 'converted'
+        report_dict['elapsed_seconds'] = round(elapsed_seconds, 3)
+        if elapsed_seconds:
+            report_dict['points_per_second'] = round(report_dict['point_count'] / elapsed_seconds, 1)
+            report_dict['megabytes_per_second'] = round(report_dict['dat_bytes'] / elapsed_seconds / 1048576.0, 3)
+
+    except Exception as e:
+        report_dict['status'] = 'failed'
+        report_dict['error'] = '{}: {}'.format(type(e).__name__, e)
+        try:
+            os.remove(nc_path + PARTIAL_FILE_SUFFIX)
+        except OSError:
+            pass
+
+    return report_dict
+
+
+def convert_dataset_star(conversion_args):
+    '''
+    Function to call convert_dataset with a tuple of arguments, as required by Pool.imap_unordered
+    @param conversion_args: Tuple of (dat_path, nc_path, dfn_path, converter_kwargs, force)
+
+    @return report_dict: OrderedDict of report values keyed by REPORT_FIELDS
+    '''
+    return convert_dataset(*conversion_args)
+
+
+def convert_datasets(conversion_list,
+                     converter_kwargs=None,
+                     processes=None,
+                     max_memory=None,
+                     force=False,
+                     log_level=logging.INFO
+                     ):
+    '''
+    Generator to convert multiple ASEG-GDF datasets to netCDF in a pool of worker processes
+    Each worker process performs one conversion only so that all memory is released between conversions.
+    @param conversion_list: List of (dat_path, nc_path, dfn_path) tuples as returned by get_conversion_list
+    @param converter_kwargs: Optional dict of keyword arguments for ASEGGDF2NetCDFConverter constructor
+    @param processes: Number of worker processes. Defaults to number of CPUs
+    @param max_memory: Optional maximum address space per worker process in bytes (POSIX only)
+    @param force: Boolean flag indicating whether to convert datasets even if outputs are up to date
+    @param log_level: Logging level for worker processes
+
+    @return report_dict: OrderedDict of report values for each conversion in order of completion
+    '''
+    pool = Pool(processes=processes,
+                initializer=init_worker,
+                initargs=(max_memory, log_level),
+                maxtasksperchild=1
+                )
+    try:
+        for report_dict in pool.imap_unordered(convert_dataset_star,
+                                               [(dat_path, nc_path, dfn_path, converter_kwargs, force)
+                                                for dat_path, nc_path, dfn_path in conversion_list
+                                                ]
+                                               ):
+            yield report_dict
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main():
+    '''
+    Main function
+    '''
+    def get_args():
+        """
+        Handles all the arguments that are passed into the script
+
+        :return: Returns a parsed version of the arguments.
+        """
+        parser = argparse.ArgumentParser(description='Convert multiple ASEG-GDF files to netCDF in parallel')
+        parser.add_argument("-m", "--manifest",
+                            help="Path to CSV manifest file with lines of the form <dat_path>[,<nc_path>[,<dfn_path>]]",
+                            type=str,
+                            dest="manifest_path")
+        parser.add_argument("-u", "--output_dir",
+                            help="Output directory for netCDF files. Default is the directory of each .dat file",
+                            type=str,
+                            dest="output_dir")
+        parser.add_argument("-t", "--report",
+                            help="Path to CSV report file. Default is aseg2nc_batch_report_<timestamp>.csv in current directory",
+                            type=str,
+                            dest="report_path")
+        parser.add_argument("-p", "--processes",
+                            help="Number of worker processes. Default is number of CPUs",
+                            type=int,
+                            dest="processes")
+        parser.add_argument("-x", "--max_memory",
+                            help="Maximum memory per worker process in MB (POSIX only). Default is no limit",
+                            type=int,
+                            dest="max_memory")
+        parser.add_argument("-e", "--force", action='store_const', const=True, default=False,
+                            help="Convert all files, even if netCDF output is up to date",
+                            dest="force")
+        parser.add_argument("-s", "--settings",
+                            help="Path to settings file",
+                            type=str,
+                            dest="settings_path")
+        parser.add_argument("-r", "--crs",
+                            help="Coordinate Reference System string (e.g. GDA94, EPSG:4283)",
+                            type=str,
+                            dest="crs")
+        parser.add_argument("-c", "--chunking",
+                            help="Chunking size in each dimension",
+                            type=int,
+                            dest="chunking",
+                            default=1024)
+        parser.add_argument('-o', '--optimise',
+                            help='Optimise datatypes to reduce variable size without affecting precision. Default is True',
+                            type=int,
+                            dest='optimise',
+                            default=True
+                            )
+        parser.add_argument('-a', '--space_delimited',
+                            help='Read .dat file as space-delimited instead of fixed-length. Default is False',
+                            type=int,
+                            dest='space_delimited',
+                            default=False
+                            )
+
+        parser.add_argument('-d', '--debug', action='store_const', const=True, default=False,
+                            help='output debug information. Default is no debug info')
+
+        parser.add_argument('-v', '--verbose', action='store_const', const=True, default=False,
+                            help='output verbosity. Default is non-verbose')
+
+        parser.add_argument('positional_args',
+                            nargs=argparse.REMAINDER,
+                            help='<dat_glob_pattern> [<dat_glob_pattern>...]')
+
+        return parser.parse_args()
+
+    args = get_args()
+
+    # Setup Logging
+    log_level = logging.DEBUG if args.debug else logging.INFO
+    logger.setLevel(level=log_level)
+
+    assert args.positional_args or args.manifest_path, 'No input files specified.\n\
+Usage: python {} <options> [-m <manifest_path>] [<dat_glob_pattern>...]'.format(os.path.basename(sys.argv[0]))
+
+    conversion_list = get_conversion_list(glob_patterns=args.positional_args,
+                                          manifest_path=args.manifest_path,
+                                          output_dir=args.output_dir
+                                          )
+    logger.info('{} datasets to convert'.format(len(conversion_list)))
+
+    converter_kwargs = {'crs_string': args.crs,
+                        'default_chunk_size': args.chunking,
+                        'settings_path': args.settings_path,
+                        'fix_precision': args.optimise,
+                        'space_delimited': args.space_delimited,
+                        'verbose': args.verbose
+                        }
+
+    report_path = args.report_path or 'aseg2nc_batch_report_{}.csv'.format(time.strftime('%Y%m%d_%H%M%S'))
+
+    status_counts = OrderedDict([('converted', 0), ('skipped', 0), ('failed', 0)])
+    start_time = time.time()
+    with open(report_path, 'w', newline='') as report_file:
+        report_writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        report_writer.writeheader()
+
+        for report_dict in convert_datasets(conversion_list,
+                                            converter_kwargs=converter_kwargs,
+                                            processes=args.processes,
+                                            max_memory=args.max_memory * 1048576 if args.max_memory else None,
+                                            force=args.force,
+                                            log_level=log_level if args.verbose else logging.WARNING
+                                            ):
+            report_writer.writerow(report_dict)
+            report_file.flush()
+            status_counts[report_dict['status']] += 1
+
+            if report_dict['status'] == 'converted':
+                logger.info('Converted {} to {} in {:.3f}s ({} points/s)'.format(report_dict['dat_path'],
+                                                                                  report_dict['nc_path'],
+                                                                                  report_dict['elapsed_seconds'],
+                                                                                  report_dict['points_per_second']))
+            elif report_dict['status'] == 'skipped':
+                logger.info('Skipped {}: {} is up to date'.format(report_dict['dat_path'], report_dict['nc_path']))
+            else:
+                logger.error('Failed to convert {}: {}'.format(report_dict['dat_path'], report_dict['error']))
+
+    logger.info('{} in {:.3f}s. Report written to {}'.format(', '.join(['{} {}'.format(count, status)
+                                                                        for status, count in status_counts.items()]),
+                                                             time.time() - start_time,
+                                                             report_path
+                                                             ))
+
+
+if __name__ == '__main__':
+    # Setup logging handlers if required
+    if not logger.handlers:
+        # Set handler for root logger to standard output
+        console_handler = logging.StreamHandler(sys.stdout)
+        #console_handler.setLevel(logging.INFO)
+        console_handler.setLevel(logging.DEBUG)
+        console_formatter = logging.Formatter('%(message)s')
+        console_handler.setFormatter(console_formatter)
+        logger.addHandler(console_handler)
+
+    main()
@@ -38,7 +38,7 @@ import locale
 
 from geophys_utils.netcdf_converter import ToNetCDFConverter, NetCDFVariable
 from geophys_utils import get_spatial_ref_from_wkt
-from geophys_utils.netcdf_converter.aseg_gdf_utils import aseg_gdf_format2dtype, fix_field_precision, truncate
+from geophys_utils.netcdf_converter.aseg_gdf_utils import aseg_gdf_format2dtype, fix_field_precision, truncate, get_fixed_width_record_array, read_fixed_width_records
 from geophys_utils import points2convex_hull
 from geophys_utils import transform_coords
 
@@ -57,6 +57,9 @@ POINT_LIMIT = 0
 # Number of rows per chunk in temporary netCDF cache file
 CACHE_CHUNK_ROWS = 16384
 
+# Number of bytes to read from .dat file at a time for bulk parsing of fixed-width lines
+DAT_BLOCK_SIZE = 16777216
+
 class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
     '''
     ASEGGDF2NetCDFConverter concrete class for converting ASEG-GDF data to netCDF
@@ -72,7 +75,8 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
                  settings_path=None,
                  fix_precision=True,
                  space_delimited=False,
-                 verbose=False
+                 verbose=False,
+                 cache_dir=None
                  ):
         '''
         Concrete constructor for subclass ASEGGDF2NetCDFConverter
@@ -86,6 +90,7 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
         @param default_variable_parameters: Optional dict containing default parameters for netCDF variable creation
         @param settings_path: Optional path for settings YAML file
         @param fix_precision: Optional Boolean flag indicating whether to fix (i.e. reduce) field precisions
+        @param cache_dir: Optional directory for temporary netCDF cache file. Defaults to TEMP_DIR
         '''
 
         def get_field_definitions():
@@ -210,7 +215,11 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
                 Function to create temporary cache file with one 2D variable
                 Needs to have self.column_count defined to work
                 '''
-                self.nc_cache_path = os.path.join(TEMP_DIR, re.sub('\W+', '_', os.path.splitext(self.dat_path)[0]) + '.nc')
+                # Use a unique cache file name so that concurrent conversions cannot collide
+                cache_file_handle, self.nc_cache_path = tempfile.mkstemp(suffix='.nc',
+                                                                         prefix=re.sub('\W+', '_', os.path.splitext(os.path.basename(self.dat_path))[0]) + '_',
+                                                                         dir=self.cache_dir)
+                os.close(cache_file_handle)
                 self._nc_cache_dataset = netCDF4.Dataset(self.nc_cache_path, mode="w", clobber=True, format='NETCDF4')
                 self._nc_cache_dataset.createDimension(dimname='rows', size=None) # Unlimited size
                 
@@ -266,24 +275,33 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
                               
                 logger.debug('Created temporary cache file {}'.format(self.nc_cache_path))
             
-            def cache_chunk_list(chunk_list, start_row):
+            def cache_chunk_arrays(chunk_array_list, start_row):
                 '''
-                Helper function to write list of lists to cache variables
+                Helper function to write list of arrays (one per field) to cache variables
                 '''
-                end_row = start_row + len(chunk_list)
+                end_row = start_row + len(chunk_array_list[0])
                 logger.debug('Writing rows {}-{} to disk cache'.format(start_row, end_row))
                 for field_index in range(len(self.field_definitions)):
                     field_definition = self.field_definitions[field_index]
                     short_name = field_definition['short_name']
                     cache_variable = self._nc_cache_dataset.variables[short_name]
                     
-                    chunk_array = np.array([row_list[field_index] for row_list in chunk_list])
+                    chunk_array = chunk_array_list[field_index]
                     #logger.debug('{} cache_variable: {}'.format(cache_variable.name, cache_variable))
                     #logger.debug('{}: {}-element {} chunk_array: {}'.format(short_name, chunk_array.shape[0], chunk_array.dtype, chunk_array))
 
                     cache_variable[start_row:end_row] = chunk_array
             
-                self.total_points += len(chunk_list)
+                self.total_points += end_row - start_row
+                
+            def cache_chunk_list(chunk_list, start_row):
+                '''
+                Helper function to write list of lists to cache variables
+                '''
+                cache_chunk_arrays([np.array([row_list[field_index] for row_list in chunk_list])
+                                    for field_index in range(len(self.field_definitions))
+                                    ], 
+                                   start_row)
                 
                 
             def read_fixed_length_fields(line):
@@ -387,40 +405,94 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
                 return row_list
                 
                 
+            def dat_block_generator(dat_in_file):
+                '''
+                Helper generator to yield blocks of bytes containing only complete lines
+                '''
+                remainder = b''
+                while True:
+                    byte_block = dat_in_file.read(DAT_BLOCK_SIZE)
+                    if not byte_block: 
+                        break
+                    
+                    byte_block = remainder + byte_block
+                    end_index = byte_block.rfind(b'\n') + 1
+                    remainder = byte_block[end_index:]
+                    if end_index:
+                        yield byte_block[:end_index]
+                        
+                if remainder: # Unterminated last line
+                    yield remainder + b'\n'
+                
+            def read_line(line):
+                '''
+                Helper function to read a single line into a list of lists, or return None for an invalid line
+                '''
+                if self.space_delimited:
+                    return read_delimited_fields(line, '\s+')
+                elif '\t' in line: # Assume tab delimited line
+                    return read_delimited_fields(line, '\t')
+                else:
+                    return read_fixed_length_fields(line)
+                
             self.info_output('Reading data file {}'.format(dat_path))
-            dat_in_file = open(dat_path, 'r')
+            # Read bytes so that blocks of fixed-width lines can be parsed by column
+            dat_in_file = open(dat_path, 'rb')
+            encoding = locale.getpreferredencoding(False)
             
             create_nc_cache()
             
             line_count = 0
+            self.rejected_line_count = 0
             self.total_points = 0
             chunk_list = []
-            for line in dat_in_file:
-                line = re.sub('\n$', '', line) # Strip trailing EOL
-                #logger.debug('line: "{}"'.format(line))
-                if not line.strip(): # Skip empty lines
-                    continue
-                
+            for byte_block in dat_block_generator(dat_in_file):
+                # Try to parse whole block of fixed-width lines at once
                 if self.space_delimited:
-                    row_list = read_delimited_fields(line, '\s+')
-                elif '\t' in line: # Assume tab delimited line
-                    row_list = read_delimited_fields(line, '\t')
+                    chunk_array_list = None
                 else:
-                    row_list = read_fixed_length_fields(line)
+                    record_array = get_fixed_width_record_array(byte_block)
+                    chunk_array_list = read_fixed_width_records(record_array, self.field_definitions) if record_array is not None else None
                     
-                if not row_list: # Invalid line - ignore
-                    continue
-                
-                chunk_list.append(row_list)
-                line_count += 1
-                
-                if len(chunk_list) % CACHE_CHUNK_ROWS == 0:
-                    cache_chunk_list(chunk_list, self.total_points)
-                    chunk_list = [] # Reset chunk after writing
-                
-                if not line_count % 10000:
-                    self.info_output('{} lines read'.format(line_count))
-                     
+                if chunk_array_list is not None:
+                    if len(chunk_list): # Write any preceding rows read line by line
+                        cache_chunk_list(chunk_list, self.total_points)
+                        chunk_list = []
+                        
+                    cache_chunk_arrays(chunk_array_list, self.total_points)
+                    
+                    block_line_count = len(chunk_array_list[0])
+                    if (line_count + block_line_count) // 10000 > line_count // 10000:
+                        self.info_output('{} lines read'.format(line_count + block_line_count))
+                    line_count += block_line_count
+                    
+                else: # Read block line by line
+                    logger.debug('Reading block of {} bytes line by line'.format(len(byte_block)))
+                    # Split on universal newlines as for a file opened in text mode
+                    for line in byte_block.decode(encoding).replace('\r\n', '\n').replace('\r', '\n').split('\n')[:-1]:
+                        #logger.debug('line: "{}"'.format(line))
+                        if not line.strip(): # Skip empty lines
+                            continue
+                        
+                        row_list = read_line(line)
+                            
+                        if not row_list: # Invalid line - ignore
+                            self.rejected_line_count += 1
+                            continue
+                        
+                        chunk_list.append(row_list)
+                        line_count += 1
+                        
+                        if len(chunk_list) % CACHE_CHUNK_ROWS == 0:
+                            cache_chunk_list(chunk_list, self.total_points)
+                            chunk_list = [] # Reset chunk after writing
+                        
+                        if not line_count % 10000:
+                            self.info_output('{} lines read'.format(line_count))
+                             
+                        if POINT_LIMIT and self.total_points >= POINT_LIMIT:
+                            break
+                         
                 if POINT_LIMIT and self.total_points >= POINT_LIMIT:
                     logger.debug('Truncating input for testing after {} points'.format(POINT_LIMIT))
                     break
@@ -432,6 +504,8 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
             dat_in_file.close()             
     
             self.info_output('A total of {} points were read'.format(self.total_points))
+            if self.rejected_line_count:
+                logger.warning('{} invalid lines were skipped'.format(self.rejected_line_count))
             
             assert self.total_points, 'Unable to read any points'
             
@@ -638,6 +712,7 @@ class ASEGGDF2NetCDFConverter(ToNetCDFConverter):
         self._nc_cache_dataset = None
         self.column_count = None # Number of columns in .dat file
         self.space_delimited = space_delimited
+        self.cache_dir = cache_dir or TEMP_DIR
 
         if verbose:
             logger.debug('Enabling info level output')
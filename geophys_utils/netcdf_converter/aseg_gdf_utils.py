@@ -373,3 +373,92 @@ def truncate(fill_value, data_array, no_data_mask, width_specifier, decimal_plac
     except Exception as e:
         logger.debug('Unable to truncate fill value from {} to {} ({}). Keeping original value.'.format(fill_value, truncated_fill_value, e))
         return fill_value
+
+
+def get_fixed_width_record_array(byte_block):
+    '''
+    Function to return an n x record_length uint8 array of the lines in a block of bytes ending with a newline
+    Trailing carriage returns are discarded.
+    @param byte_block: bytes containing one or more complete newline-terminated lines
+
+    @return record_array: n x record_length uint8 array, or None if the lines are not all of equal length
+    '''
+    byte_array = np.frombuffer(byte_block, dtype='uint8')
+    if not len(byte_array) or byte_array[-1] != ord('\n'):
+        return None
+
+    newline_indices = np.flatnonzero(byte_array == ord('\n'))
+    line_length = newline_indices[0] + 1
+    if len(byte_array) != len(newline_indices) * line_length or np.any(np.diff(newline_indices) != line_length):
+        return None
+
+    record_array = byte_array.reshape((len(newline_indices), line_length))[:,:-1]
+
+    if record_array.shape[1] and np.all(record_array[:,-1] == ord('\r')): # DOS line endings
+        record_array = record_array[:,:-1]
+
+    return record_array
+
+
+def read_fixed_width_records(record_array, field_definitions):
+    '''
+    Function to convert an array of fixed-width ASCII records into one array per field by slicing whole columns at
+    the offsets given by each field's width_specifier. Values are identical to those obtained by converting each
+    stripped field string with int(), float() or str.strip() in turn.
+    @param record_array: n x record_length uint8 array of ASCII characters as returned by get_fixed_width_record_array
+    @param field_definitions: list of field definition dicts containing 'short_name', 'format', 'dtype', 'columns'
+        and 'width_specifier' values
+
+    @return column_array_list: List of arrays with one array per field definition (n x columns for 2D fields), or
+        None if any record requires line-by-line handling. This occurs for non-ASCII, control or blank records,
+        records which are too short, numeric fields containing internal spaces and values which cannot be converted.
+    '''
+    record_count, record_length = record_array.shape
+    record_width = sum([field_definition['width_specifier'] * field_definition['columns']
+                        for field_definition in field_definitions])
+
+    if not record_count or record_length < record_width:
+        return None
+
+    # Only printable ASCII records can be parsed by character offsets
+    if np.any(np.logical_or(record_array < ord(' '), record_array > ord('~'))):
+        return None
+
+    if not np.all(np.any(record_array != ord(' '), axis=1)): # Blank record(s) present
+        return None
+
+    column_array_list = []
+    start_char_index = 0
+    for field_definition in field_definitions:
+        width = field_definition['width_specifier']
+        columns = field_definition['columns']
+        dtype = field_definition['dtype']
+        end_char_index = start_char_index + width * columns
+
+        # Make contiguous n x columns array of fixed-length byte strings
+        field_array = np.ascontiguousarray(record_array[:,start_char_index:end_char_index]).view('S{}'.format(width))
+
+        if not field_definition['format'].startswith('A'): # Numeric field - check for any spaces between values
+            char_array = field_array.view('uint8').reshape((record_count * columns, width))
+            non_space_mask = (char_array != ord(' '))
+            first_char_indices = np.argmax(non_space_mask, axis=1)
+            last_char_indices = width - 1 - np.argmax(non_space_mask[:,::-1], axis=1)
+            if np.any(np.count_nonzero(non_space_mask, axis=1) < (last_char_indices - first_char_indices + 1)):
+                logger.debug('Internal spaces found in field {}'.format(field_definition['short_name']))
+                return None
+
+        try:
+            if dtype.startswith('int'):
+                column_array = field_array.astype('int64')
+            elif dtype.startswith('float'):
+                column_array = field_array.astype('float64')
+            else: # Assume string
+                column_array = np.char.strip(field_array.astype('U{}'.format(width)))
+        except (ValueError, OverflowError) as e:
+            logger.debug('Unable to convert field {} values to type {}: {}'.format(field_definition['short_name'], dtype, e))
+            return None
+
+        column_array_list.append(column_array[:,0] if columns == 1 else column_array)
+        start_char_index = end_char_index
+
+    return column_array_list
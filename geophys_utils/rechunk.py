@@ -4,10 +4,12 @@ Created on 23 Feb 2020
 @author: alex
 '''
 import argparse
+import os
 import sys
 import logging
 
 from geophys_utils._get_netcdf_util import get_netcdf_util
+from geophys_utils._chunk_advisor import ACCESS_PATTERNS, get_chunk_advice, benchmark_chunk_advice
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO) # Initial logging level for this module
@@ -22,10 +24,22 @@ def main():
     
     parser.add_argument("-f", "--format", help="NetCDF file format (one of 'NETCDF4', 'NETCDF4_CLASSIC', 'NETCDF3_CLASSIC', 'NETCDF3_64BIT_OFFSET' or 'NETCDF3_64BIT_DATA')",
                         type=str, default='NETCDF4')
-    parser.add_argument("--chunkspec", help="comma-separated list of <dimension_name>/<chunk_size> specifications",
+    chunk_group = parser.add_mutually_exclusive_group()
+    chunk_group.add_argument("--chunkspec", help="comma-separated list of <dimension_name>/<chunk_size> specifications",
+                             type=str)
+    chunk_group.add_argument("--auto-chunk", help="Recommend chunking and compression for the specified access pattern (one of {})".format(
+                                 ', '.join(["'{}'".format(access_pattern) for access_pattern in ACCESS_PATTERNS])),
+                             type=str, choices=ACCESS_PATTERNS, dest='auto_chunk')
+    parser.add_argument('--benchmark', action='store_const', const=True, default=False,
+                        help='benchmark candidate layouts on a sample subset before choosing --auto-chunk chunk sizes. Default is no benchmark')
+    parser.add_argument("--complevel", help="Compression level for chunked variables as an integer 0-9. Default is 4, or recommended level for --auto-chunk",
+                        type=int)
+    parser.add_argument("-w", "--workers", help="Number of worker processes for reading pieces, or 0 for number of CPUs. Default is 1",
+                        type=int, default=1)
+    parser.add_argument("--checkpoint", help="Path of checkpoint file. Default is <output_path>.checkpoint.json",
                         type=str)
-    parser.add_argument("--complevel", help="Compression level for chunked variables as an integer 0-9. Default is 4",
-                        type=int, default=4)
+    parser.add_argument('-r', '--resume', action='store_const', const=True, default=False,
+                        help='resume an interrupted copy from its checkpoint. Default is to start a new copy')
     parser.add_argument('-d', '--debug', action='store_const', const=True, default=False,
                         help='output debug information. Default is no debug info')
     parser.add_argument("input_path")
@@ -43,22 +57,46 @@ def main():
                           debug=args.debug
                           )   
     
+    if args.auto_chunk:
+        chunk_bytes = None
+        if args.benchmark:
+            benchmark_results = benchmark_chunk_advice(ncu.netcdf_dataset, args.auto_chunk)
+            for benchmark_result in benchmark_results:
+                logger.info('Chunk size {chunk_bytes} bytes (chunksizes {chunksizes}): read {read_seconds:.3f}s, write {write_seconds:.3f}s, {file_bytes} bytes on disk'.format(**benchmark_result))
+            chunk_bytes = benchmark_results[0]['chunk_bytes']
+            
+        variable_options_dict = get_chunk_advice(ncu.netcdf_dataset, args.auto_chunk, chunk_bytes=chunk_bytes)
+        if args.complevel is not None:
+            for variable_options in variable_options_dict.values():
+                variable_options.update({'zlib': bool(args.complevel), 'complevel': args.complevel})
+        logger.info('Using {} chunking: {}'.format(args.auto_chunk, 
+                                                   ', '.join(['{}={}'.format(variable_name, variable_options['chunksizes']) 
+                                                              for variable_name, variable_options in variable_options_dict.items()])))
+    elif chunk_spec:
+        complevel = 4 if args.complevel is None else args.complevel
+        # Compress all chunked variables
+        variable_options_dict = {variable_name: {'chunksizes': [chunk_spec.get(dimension) 
+                                                                for dimension in variable.dimensions
+                                                                ],
+                                                 'zlib': bool(complevel),
+                                                 'complevel': complevel
+                                                 }
+                                 for variable_name, variable in ncu.netcdf_dataset.variables.items()
+                                 if (set(variable.dimensions) & set(chunk_spec.keys()))
+                                 }
+    else:
+        variable_options_dict = {}
+    
     ncu.copy(args.output_path, 
              #datatype_map_dict={},
-             # Compress all chunked variables
-             variable_options_dict={variable_name: {'chunksizes': [chunk_spec.get(dimension) 
-                                                                   for dimension in variable.dimensions
-                                                                   ],
-                                                    'zlib': bool(args.complevel),
-                                                    'complevel': args.complevel
-                                                    }
-                               for variable_name, variable in ncu.netcdf_dataset.variables.items()
-                               if (set(variable.dimensions) & set(chunk_spec.keys()))
-                               } if chunk_spec else {},
+             variable_options_dict=variable_options_dict,
              #dim_range_dict={'lat': (5,205),'lon': (5,305)},
              #dim_mask_dict={},
              nc_format=args.format,
              #limit_dim_size=False
+             max_workers=args.workers or os.cpu_count(),
+             checkpoint_path=args.checkpoint,
+             resume=args.resume,
              )
     
     logger.debug('Copy complete')   
@@ -23,10 +23,21 @@ Created on 15/11/2016
 
 @author: Alex Ip
 """
-from geophys_utils.test import test_array_pieces, test_crs_utils, test_data_stats, test_netcdf_grid_utils
+from geophys_utils.test import test_array_pieces, test_aseg_gdf2netcdf_batch, test_aseg_gdf2netcdf_converter, test_chunk_advisor, test_crs_utils, test_data_stats, test_dem_utils, test_fixed_width_format, test_gdal_grid_utils, test_netcdf_grid_utils, test_netcdf_utils, test_point_in_polygon, test_spatial_index, test_transect_utils, test_vincenty
 
 # Run all tests
 test_array_pieces.main()
+test_aseg_gdf2netcdf_batch.main()
+test_aseg_gdf2netcdf_converter.main()
+test_chunk_advisor.main()
 test_crs_utils.main()
 test_data_stats.main()
-test_netcdf_grid_utils.main()
\ No newline at end of file
+test_dem_utils.main()
+test_fixed_width_format.main()
+test_gdal_grid_utils.main()
+test_netcdf_grid_utils.main()
+test_netcdf_utils.main()
+test_point_in_polygon.main()
+test_spatial_index.main()
+test_transect_utils.main()
+test_vincenty.main()
\ No newline at end of file
@@ -25,7 +25,7 @@ Created on 15/11/2016
 import unittest
 import numpy as np
 from functools import reduce
-from geophys_utils._array_pieces import array_pieces
+from geophys_utils._array_pieces import array_pieces, get_piece_shape
 
 class TestArrayPieces(unittest.TestCase):
     """Unit tests for geophys_utils._array_pieces module."""
@@ -59,7 +59,7 @@ class TestArrayPieces(unittest.TestCase):
             slices = [slice(array_offset[dim_index], 
                             array_offset[dim_index]+piece_array.shape[dim_index]
                             ) for dim_index in range(2)]
-            assert not np.any(piece_array - test_array[slices]), 'Array contents changed for array piece at %s' % array_offset
+            assert not np.any(piece_array - test_array[tuple(slices)]), 'Array contents changed for array piece at %s' % array_offset
         
         print('\tTesting sixteenth arrays with overlap')
         array_pieces_results = {array_offset: piece_array for piece_array, array_offset in array_pieces(test_array,
@@ -82,8 +82,28 @@ class TestArrayPieces(unittest.TestCase):
             slices = [slice(array_offset[dim_index], 
                             array_offset[dim_index]+piece_array.shape[dim_index]
                             ) for dim_index in range(2)]
-            assert not np.any(piece_array - test_array[slices]), 'Array contents changed for array piece at %s' % array_offset
+            assert not np.any(piece_array - test_array[tuple(slices)]), 'Array contents changed for array piece at %s' % array_offset
         
+    def test_array_pieces_coverage(self):
+        print('Testing array_pieces coverage of N-dimensional arrays with partial pieces')
+        test_array = np.reshape(np.arange(0, 7 * 45 * 33, dtype='int32'), (7, 45, 33))
+        
+        for prefetch in [False, True]:
+            coverage_array = np.zeros(shape=test_array.shape, dtype='int32')
+            for piece_array, array_offset in array_pieces(test_array, max_bytes=2000, prefetch=prefetch):
+                assert piece_array.nbytes <= 2000, 'piece_array too large'
+                slices = tuple(slice(array_offset[dim_index], 
+                                     array_offset[dim_index]+piece_array.shape[dim_index]
+                                     ) for dim_index in range(3))
+                assert not np.any(piece_array - test_array[slices]), 'Array contents changed for array piece at %s' % (array_offset,)
+                coverage_array[slices] += 1
+            assert np.all(coverage_array == 1), 'Array not covered exactly once with prefetch={}'.format(prefetch)
+        
+    def test_get_piece_shape(self):
+        print('Testing get_piece_shape function')
+        assert get_piece_shape((100, 100), 2, 1250) == (25, 25), 'Incorrect unchunked piece shape'
+        assert get_piece_shape((100, 100), 2, 1250, (10, 10)) == (20, 30), 'Pieces not aligned to chunks'
+        assert get_piece_shape((100, 100), 2, 100, (10, 10)) == (7, 7), 'Chunking not disregarded for oversized chunks'
 
 
 # Define test suites
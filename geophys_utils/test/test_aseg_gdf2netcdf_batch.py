@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils.netcdf_converter.aseg_gdf2netcdf_batch module
+
+Created on 16/10/2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from geophys_utils.netcdf_converter.aseg_gdf2netcdf_batch import get_conversion_list, is_up_to_date
+
+class TestASEGGDF2NetCDFBatch(unittest.TestCase):
+    """Unit tests for geophys_utils.netcdf_converter.aseg_gdf2netcdf_batch module."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for dat_name in ['a.dat', 'b.dat', os.path.join('sub', 'c.dat')]:
+            dat_path = os.path.join(self.temp_dir, dat_name)
+            os.makedirs(os.path.dirname(dat_path), exist_ok=True)
+            with open(dat_path, 'w') as dat_file:
+                dat_file.write('1 2 3\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_conversion_list_glob(self):
+        print('Testing get_conversion_list function with glob patterns')
+        conversion_list = get_conversion_list(glob_patterns=[os.path.join(self.temp_dir, '**', '*.dat')])
+        assert conversion_list == [(os.path.join(self.temp_dir, dat_name + '.dat'),
+                                    os.path.join(self.temp_dir, dat_name + '.nc'),
+                                    os.path.join(self.temp_dir, dat_name + '.dfn'))
+                                   for dat_name in ['a', 'b', os.path.join('sub', 'c')]
+                                   ], 'Incorrect conversion list: {}'.format(conversion_list)
+
+        output_dir = os.path.join(self.temp_dir, 'out')
+        conversion_list = get_conversion_list(glob_patterns=[os.path.join(self.temp_dir, 'sub', '*.dat')],
+                                              output_dir=output_dir)
+        assert conversion_list == [(os.path.join(self.temp_dir, 'sub', 'c.dat'),
+                                    os.path.join(output_dir, 'c.nc'),
+                                    os.path.join(self.temp_dir, 'sub', 'c.dfn'))
+                                   ], 'Output directory not applied: {}'.format(conversion_list)
+
+    def test_get_conversion_list_manifest(self):
+        print('Testing get_conversion_list function with manifest file and duplicates')
+        a_path, b_path, c_path = [os.path.join(self.temp_dir, dat_name) for dat_name in ['a.dat', 'b.dat', os.path.join('sub', 'c.dat')]]
+        manifest_path = os.path.join(self.temp_dir, 'manifest.csv')
+        with open(manifest_path, 'w') as manifest_file:
+            manifest_file.write('# dat_path, nc_path, dfn_path\n')
+            manifest_file.write('\n')
+            manifest_file.write(' {} , {} , {} \n'.format(b_path, os.path.join(self.temp_dir, 'b_out.nc'), os.path.join(self.temp_dir, 'b.def')))
+            manifest_file.write('{},,{}\n'.format(c_path, os.path.join(self.temp_dir, 'c.def')))
+            manifest_file.write('{}\n'.format(a_path)) # Duplicate of glob output
+            manifest_file.write('{},{}\n'.format(c_path, os.path.join(self.temp_dir, 'b_out.nc'))) # Duplicate output path
+
+        conversion_list = get_conversion_list(glob_patterns=[os.path.join(self.temp_dir, 'a.dat')],
+                                              manifest_path=manifest_path)
+        assert conversion_list == [(a_path, os.path.join(self.temp_dir, 'a.nc'), os.path.join(self.temp_dir, 'a.dfn')),
+                                   (b_path, os.path.join(self.temp_dir, 'b_out.nc'), os.path.join(self.temp_dir, 'b.def')),
+                                   (c_path, os.path.join(self.temp_dir, 'sub', 'c.nc'), os.path.join(self.temp_dir, 'c.def')),
+                                   ], 'Incorrect conversion list: {}'.format(conversion_list)
+
+        # Relative and absolute paths to the same output are duplicates
+        current_dir = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            conversion_list = get_conversion_list(glob_patterns=['a.dat', a_path])
+        finally:
+            os.chdir(current_dir)
+        assert conversion_list == [('a.dat', 'a.nc', 'a.dfn')], 'Duplicate output not removed: {}'.format(conversion_list)
+
+    def test_is_up_to_date(self):
+        print('Testing is_up_to_date function')
+        dat_path = os.path.join(self.temp_dir, 'a.dat')
+        nc_path = os.path.join(self.temp_dir, 'a.nc')
+        missing_path = os.path.join(self.temp_dir, 'missing.dfn')
+
+        assert not is_up_to_date(nc_path, [dat_path]), 'Missing output is up to date'
+
+        with open(nc_path, 'w') as nc_file:
+            nc_file.write('netCDF')
+        dat_time = os.path.getmtime(dat_path)
+        os.utime(nc_path, (dat_time + 10, dat_time + 10))
+        assert is_up_to_date(nc_path, [dat_path, None, missing_path]), 'Newer output is not up to date'
+
+        os.utime(dat_path, (dat_time + 20, dat_time + 20))
+        assert not is_up_to_date(nc_path, [dat_path, None, missing_path]), 'Older output is up to date'
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestASEGGDF2NetCDFBatch]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
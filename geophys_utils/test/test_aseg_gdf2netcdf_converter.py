@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for .dat file parsing in geophys_utils.netcdf_converter.aseg_gdf2netcdf_converter module
+
+Created on 16/10/2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from geophys_utils.netcdf_converter import aseg_gdf2netcdf_converter
+from geophys_utils.netcdf_converter.aseg_gdf2netcdf_converter import ASEGGDF2NetCDFConverter
+from geophys_utils.netcdf_converter.aseg_gdf_utils import get_fixed_width_record_array, read_fixed_width_records
+
+DFN_TEXT = '''DEFN   ST=RECD,RT=COMM;RT:A4;COMMENTS:A76
+DEFN 1 ST=RECD,RT=;line:I6:NAME=Line number
+DEFN 2 ST=RECD,RT=;fiducial:F10.1:NAME=Fiducial
+DEFN 3 ST=RECD,RT=;longitude:F12.6:NAME=Longitude
+DEFN 4 ST=RECD,RT=;latitude:F11.6:NAME=Latitude
+DEFN 5 ST=RECD,RT=;thickness:3F8.2:NAME=Layer thickness
+DEFN 6 ST=RECD,RT=;END DEFN
+'''
+
+FIELD_NAMES = ['line', 'fiducial', 'longitude', 'latitude', 'thickness']
+
+class TestASEGGDF2NetCDFConverterDatParsing(unittest.TestCase):
+    """Unit tests comparing block and line-by-line parsing of fixed-width .dat files"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dfn_path = os.path.join(self.temp_dir, 'test.dfn')
+        with open(self.dfn_path, 'w') as dfn_file:
+            dfn_file.write(DFN_TEXT)
+
+        random_state = np.random.RandomState(0)
+        self.row_count = 40
+        self.expected_values = {'line': np.repeat([100, 110], self.row_count // 2),
+                                'fiducial': np.round(np.arange(self.row_count) * 0.5 + 1000.0, 1),
+                                'longitude': np.round(137 + random_state.rand(self.row_count), 6),
+                                'latitude': np.round(-29 + random_state.rand(self.row_count), 6),
+                                'thickness': np.round(random_state.rand(self.row_count, 3) * 100 - 50, 2)
+                                }
+        self.lines = ['{:>6d}{:>10.1f}{:>12.6f}{:>11.6f}{}'.format(self.expected_values['line'][row_index],
+                                                                   self.expected_values['fiducial'][row_index],
+                                                                   self.expected_values['longitude'][row_index],
+                                                                   self.expected_values['latitude'][row_index],
+                                                                   ''.join(['{:>8.2f}'.format(value)
+                                                                            for value in self.expected_values['thickness'][row_index]])
+                                                                   )
+                      for row_index in range(self.row_count)
+                      ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_dat(self, dat_text, line_by_line=False):
+        '''
+        Helper function to write dat_text to a .dat file and return the cached field arrays, the rejected line count
+        and the number of blocks parsed by column
+        @param dat_text: Text content of .dat file
+        @param line_by_line: Boolean flag indicating whether to force line-by-line parsing of all blocks
+        '''
+        dat_path = os.path.join(self.temp_dir, 'test.dat')
+        with open(dat_path, 'wb') as dat_file:
+            dat_file.write(dat_text.encode('ascii'))
+
+        block_results = []
+        def mock_read_fixed_width_records(record_array, field_definitions):
+            block_results.append(None if line_by_line else read_fixed_width_records(record_array, field_definitions))
+            return block_results[-1]
+
+        # Use small blocks so that each file is read in several blocks
+        with mock.patch.object(aseg_gdf2netcdf_converter, 'DAT_BLOCK_SIZE', 600), \
+                mock.patch.object(aseg_gdf2netcdf_converter, 'read_fixed_width_records', mock_read_fixed_width_records):
+            d2n = ASEGGDF2NetCDFConverter(os.path.join(self.temp_dir, 'test.nc'),
+                                          dat_path,
+                                          self.dfn_path,
+                                          crs_string='EPSG:4283',
+                                          fix_precision=False,
+                                          cache_dir=self.temp_dir
+                                          )
+        try:
+            field_arrays = {field_name: np.asarray(d2n.get_raw_data(field_name)) for field_name in FIELD_NAMES}
+            return field_arrays, d2n.rejected_line_count, len([result for result in block_results if result is not None])
+        finally:
+            d2n.__del__()
+
+    def check_dat(self, dat_text, expected_row_indices, expected_rejected_line_count):
+        '''
+        Helper function to check that block and line-by-line parsing of dat_text give the expected values
+        '''
+        block_arrays, block_rejected_line_count, parsed_block_count = self.read_dat(dat_text)
+        line_arrays, line_rejected_line_count, _ = self.read_dat(dat_text, line_by_line=True)
+
+        assert parsed_block_count, 'No blocks parsed by column'
+        assert block_rejected_line_count == line_rejected_line_count == expected_rejected_line_count, \
+            'Incorrect rejected line counts {} and {}. Expected {}'.format(block_rejected_line_count,
+                                                                           line_rejected_line_count,
+                                                                           expected_rejected_line_count)
+        for field_name in FIELD_NAMES:
+            assert block_arrays[field_name].dtype == line_arrays[field_name].dtype, 'Mismatched {} dtypes'.format(field_name)
+            assert np.array_equal(block_arrays[field_name], line_arrays[field_name]), 'Mismatched {} values'.format(field_name)
+            assert np.allclose(block_arrays[field_name], self.expected_values[field_name][expected_row_indices]), 'Incorrect {} values'.format(field_name)
+
+    def test_get_fixed_width_record_array(self):
+        print('Testing get_fixed_width_record_array function')
+        assert get_fixed_width_record_array(b'abc\ndef\n').tobytes() == b'abcdef', 'Incorrect LF records'
+        assert get_fixed_width_record_array(b'abc\r\ndef\r\n').tobytes() == b'abcdef', 'Incorrect CRLF records'
+        assert get_fixed_width_record_array(b'abc\nde\n') is None, 'Unequal records not detected'
+        assert get_fixed_width_record_array(b'abc\ndef') is None, 'Unterminated block not detected'
+
+    def test_clean_lines(self):
+        print('Testing parsing of clean .dat lines')
+        self.check_dat('\n'.join(self.lines) + '\n', np.arange(self.row_count), 0)
+
+    def test_crlf_lines(self):
+        print('Testing parsing of .dat lines with CRLF line endings')
+        self.check_dat('\r\n'.join(self.lines) + '\r\n', np.arange(self.row_count), 0)
+
+    def test_unterminated_lines(self):
+        print('Testing parsing of .dat lines without final newline')
+        self.check_dat('\n'.join(self.lines), np.arange(self.row_count), 0)
+
+    def test_bad_lines(self):
+        print('Testing parsing of .dat lines with short, garbled and blank lines')
+        lines = list(self.lines)
+        lines[5] = lines[5][:30] # Short line
+        lines[20] = lines[20][:20] + 'garbled!' + lines[20][28:] # Unconvertible longitude
+        lines[30] = '' # Blank lines are skipped without rejection
+        self.check_dat('\n'.join(lines) + '\n',
+                       np.array([row_index for row_index in range(self.row_count) if row_index not in [5, 20, 30]]),
+                       2)
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestASEGGDF2NetCDFConverterDatParsing]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
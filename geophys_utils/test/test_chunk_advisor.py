@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._chunk_advisor module
+
+Created on 16/10/2026
+"""
+import os
+import unittest
+import netCDF4
+from geophys_utils._chunk_advisor import ACCESS_PATTERNS, get_variable_chunk_shape, get_chunk_advice, benchmark_chunk_advice
+
+class TestChunkAdvisor(unittest.TestCase):
+    """Unit tests for geophys_utils._chunk_advisor module."""
+
+    NC_PATH = 'test_grid.nc'
+
+    def test_get_variable_chunk_shape(self):
+        print('Testing get_variable_chunk_shape function')
+        grid_dims = ('lat', 'lon')
+        grid_shape = (40000, 50000)
+        assert get_variable_chunk_shape(grid_dims, grid_shape, 4, 'spatial-window') == [256, 256], 'Incorrect spatial-window tile shape'
+        assert get_variable_chunk_shape(grid_dims, grid_shape, 4, 'line-by-line') == [5, 50000], 'Incorrect line-by-line row band shape'
+        assert get_variable_chunk_shape(('time',) + grid_dims, (365, 4000, 5000), 4, 'pixel-drill') == [365, 4, 4], 'Pixel drill chunks must span time'
+        assert get_variable_chunk_shape(('point',), (10000000,), 8, 'line-by-line', line_point_count=3000) == [4096], 'Incorrect line-by-line point chunk'
+        assert get_variable_chunk_shape(('point', 'window'), (10000000, 256), 4, 'point-stream') == [4096, 256], 'Trailing point dimension split'
+        assert get_variable_chunk_shape(grid_dims, (100, 100), 4, 'point-stream') == [100, 100], 'Chunks larger than variable'
+
+    def test_get_chunk_advice(self):
+        print('Testing get_chunk_advice function')
+        with netCDF4.Dataset(os.path.join(os.path.dirname(__file__), TestChunkAdvisor.NC_PATH)) as netcdf_dataset:
+            for access_pattern in ACCESS_PATTERNS:
+                variable_options_dict = get_chunk_advice(netcdf_dataset, access_pattern)
+                assert 'crs' not in variable_options_dict, 'Scalar variable chunked'
+                for variable_name, variable_options in variable_options_dict.items():
+                    variable = netcdf_dataset.variables[variable_name]
+                    assert len(variable_options['chunksizes']) == len(variable.shape), 'Incorrect chunk dimensionality for {}'.format(variable_name)
+                    assert all(0 < variable_options['chunksizes'][dim_index] <= variable.shape[dim_index]
+                               for dim_index in range(len(variable.shape))), 'Invalid chunk shape for {}'.format(variable_name)
+
+    def test_benchmark_chunk_advice(self):
+        print('Testing benchmark_chunk_advice function')
+        with netCDF4.Dataset(os.path.join(os.path.dirname(__file__), TestChunkAdvisor.NC_PATH)) as netcdf_dataset:
+            benchmark_results = benchmark_chunk_advice(netcdf_dataset, 'spatial-window', chunk_bytes_list=[4096, 65536], read_count=8)
+        assert sorted(benchmark_result['chunk_bytes'] for benchmark_result in benchmark_results) == [4096, 65536], 'Layouts missing from benchmark'
+        assert benchmark_results[0]['read_seconds'] <= benchmark_results[1]['read_seconds'], 'Benchmark results not sorted by read time'
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestChunkAdvisor]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
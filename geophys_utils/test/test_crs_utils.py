@@ -25,8 +25,9 @@ Created on 15/11/2016
 import unittest
 import numpy as np
 import re
+import threading
 from osgeo.osr import CoordinateTransformation
-from geophys_utils._crs_utils import get_coordinate_transformation, get_utm_wkt, transform_coords
+from geophys_utils._crs_utils import get_coordinate_transformation, get_utm_wkt, transform_coords, get_crs_cache_info, clear_crs_cache
 
 class TestCRSUtils(unittest.TestCase):
     """Unit tests for geophys_utils._crs_utils module."""
@@ -75,6 +76,24 @@ class TestCRSUtils(unittest.TestCase):
         print('Testing transform_coords function with multi coordinate {}'.format(TestCRSUtils.EPSG4326_COORD_ARRAY))
         utm_coord_array = transform_coords(TestCRSUtils.EPSG4326_COORD_ARRAY, TestCRSUtils.EPSG4326_WKT, TestCRSUtils.UTM_WKT)
         assert (utm_coord_array == np.array(TestCRSUtils.UTM_COORD_ARRAY)).all(), 'Incorrect UTM coordinates: {} instead of {}'.format(utm_coord_array, TestCRSUtils.UTM_COORD_ARRAY)
+
+    def test_coordinate_transformation_cache(self):
+        print('Testing coordinate transformation cache')
+        clear_crs_cache()
+        coordinate_transformation = get_coordinate_transformation(TestCRSUtils.EPSG4326_EPSG, 
+                                                                  TestCRSUtils.EPSG3577_EPSG)
+        assert get_coordinate_transformation(' epsg:4326', TestCRSUtils.EPSG3577_EPSG) is coordinate_transformation, 'Cached transformation not returned'
+        cache_info = get_crs_cache_info()
+        assert (cache_info['hits'], cache_info['misses']) == (1, 1), 'Incorrect cache counters: {}'.format(cache_info)
+
+        thread_transformation_list = []
+        thread = threading.Thread(target=lambda: thread_transformation_list.append(get_coordinate_transformation(TestCRSUtils.EPSG4326_EPSG, 
+                                                                                                                 TestCRSUtils.EPSG3577_EPSG)))
+        thread.start()
+        thread.join()
+        assert thread_transformation_list[0] is not coordinate_transformation, 'Transformation shared between threads'
+        assert get_crs_cache_info()['misses'] == 2, 'New thread should not use cached transformation'
+
 # Define test suites
 def test_suite():
     """Returns a test suite of all the tests in this module."""
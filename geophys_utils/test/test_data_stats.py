@@ -24,7 +24,8 @@ Created on 15/11/2016
 """
 import unittest
 import os
-from geophys_utils._data_stats import DataStats
+import numpy as np
+from geophys_utils._data_stats import DataStats, StreamingStats
 
 class TestDataStats(unittest.TestCase):
     """Unit tests for geophys_utils._data_stats module."""
@@ -38,7 +39,7 @@ class TestDataStats(unittest.TestCase):
                        'max': 3412.063, 
                        #'nc_path': u'C:\\Users\\u76345\\git\\geophys_utils\\geophys_utils\\test\\test_grid.nc', 
                        'x_size': 79, 
-                       'mean': -15.958283494050137, 
+                       'mean': -18.473817515700013, 
                        'nodata_value': -99999.0}
 
     
@@ -56,6 +57,35 @@ class TestDataStats(unittest.TestCase):
             except TypeError:
                 assert data_stats.value(key) == TestDataStats.EXPECTED_RESULT[key], 'Incorrect value for %s' % key
 
+    def test_data_stats_workers(self):
+        print('Testing DataStats class with multiple workers')
+        nc_path = os.path.join(os.path.dirname(__file__), TestDataStats.NC_PATH)
+        serial_data_stats = DataStats(nc_path, max_bytes=TestDataStats.MAX_BYTES, max_workers=1)
+        parallel_data_stats = DataStats(nc_path, max_bytes=TestDataStats.MAX_BYTES, max_workers=4)
+        assert sum(parallel_data_stats.piece_counts) == parallel_data_stats.value('count'), 'Piece counts do not add up to total count'
+        for key in DataStats.key_list:
+            assert serial_data_stats.value(key) == parallel_data_stats.value(key), 'Serial and parallel values differ for {}'.format(key)
+        
+    def test_streaming_stats(self):
+        print('Testing StreamingStats class')
+        random_state = np.random.RandomState(0)
+        values = np.concatenate([random_state.normal(1000.0, 50.0, 10000), random_state.exponential(5.0, 5000) - 3000.0])
+        
+        streaming_stats = StreamingStats(histogram_bins=1024)
+        for piece_values in np.array_split(values, 7):
+            piece_stats = StreamingStats(histogram_bins=1024)
+            piece_stats.add(piece_values)
+            streaming_stats.merge(piece_stats)
+            
+        assert streaming_stats.count == len(values), 'Incorrect count'
+        assert streaming_stats.min == values.min() and streaming_stats.max == values.max(), 'Incorrect min or max'
+        assert abs(streaming_stats.mean - values.mean()) < TestDataStats.MAX_ERROR, 'Incorrect mean'
+        assert abs(streaming_stats.std_dev - values.std()) < TestDataStats.MAX_ERROR, 'Incorrect standard deviation'
+        
+        max_percentile_error = 2.0 * (values.max() - values.min()) / 1024
+        for percent in [1, 50, 99]:
+            assert abs(streaming_stats.percentile(percent) - np.percentile(values, percent)) <= max_percentile_error, 'Incorrect percentile {}'.format(percent)
+
 
 # Define test suites
 def test_suite():
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._dem_utils module
+
+Created on 16/10/2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import netCDF4
+import numpy as np
+from geophys_utils._dem_utils import DEMUtils
+
+class TestDEMUtils(unittest.TestCase):
+    """Unit tests for geophys_utils._dem_utils module."""
+
+    NC_PATH = 'test_grid.nc'
+    MAX_BYTES = 200000 # Small tiles to test halo handling
+
+    def test_create_slope_and_aspect(self):
+        print('Testing DEMUtils.create_slope_and_aspect in serial and thread modes')
+        dem_utils = DEMUtils(os.path.join(os.path.dirname(__file__), TestDEMUtils.NC_PATH))
+        temp_dir = tempfile.mkdtemp()
+        try:
+            output_arrays = {}
+            for max_workers in [1, 3]:
+                slope_path = os.path.join(temp_dir, 'slope_{}.nc'.format(max_workers))
+                aspect_path = os.path.join(temp_dir, 'aspect_{}.nc'.format(max_workers))
+                dem_utils.create_slope_and_aspect(slope_path, aspect_path, 
+                                                  max_workers=max_workers, use_processes=False, max_bytes=TestDEMUtils.MAX_BYTES)
+                with netCDF4.Dataset(slope_path) as slope_dataset, netCDF4.Dataset(aspect_path) as aspect_dataset:
+                    output_arrays[max_workers] = (slope_dataset.variables['slope'][:], aspect_dataset.variables['aspect'][:])
+
+            assert len(dem_utils.get_slope_and_aspect_tile_shape(TestDEMUtils.MAX_BYTES)) == 2, 'Invalid tile shape'
+            assert np.any(np.isfinite(output_arrays[1][0])), 'No valid slope values'
+            for array_index in range(2):
+                assert np.array_equal(output_arrays[1][array_index].tobytes(), output_arrays[3][array_index].tobytes()), \
+                    'Thread results differ from serial results'
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_tiled_slope_and_aspect(self):
+        print('Testing DEMUtils.create_slope_and_aspect with small tiles against a single tile')
+        dem_utils = DEMUtils(os.path.join(os.path.dirname(__file__), TestDEMUtils.NC_PATH))
+        array_shape = dem_utils.data_variable.shape
+        temp_dir = tempfile.mkdtemp()
+        try:
+            output_arrays = {}
+            for max_bytes in [TestDEMUtils.MAX_BYTES, DEMUtils.DEFAULT_TILE_BYTES]:
+                tile_shape = dem_utils.get_slope_and_aspect_tile_shape(max_bytes)
+                tile_counts = [int(np.ceil(array_shape[dim_index] / tile_shape[dim_index])) for dim_index in range(2)]
+                slope_path = os.path.join(temp_dir, 'slope_{}.nc'.format(max_bytes))
+                aspect_path = os.path.join(temp_dir, 'aspect_{}.nc'.format(max_bytes))
+                dem_utils.create_slope_and_aspect(slope_path, aspect_path, max_workers=1, max_bytes=max_bytes)
+                with netCDF4.Dataset(slope_path) as slope_dataset, netCDF4.Dataset(aspect_path) as aspect_dataset:
+                    output_arrays[max_bytes] = (slope_dataset.variables['slope'][:], aspect_dataset.variables['aspect'][:])
+                
+                if max_bytes == TestDEMUtils.MAX_BYTES:
+                    assert min(tile_counts) > 1, 'DEM not split into tiles in both dimensions: {}'.format(tile_counts)
+                else:
+                    assert tile_counts == [1, 1], 'DEM not processed as a single tile: {}'.format(tile_counts)
+            
+            for array_index in range(2):
+                assert np.array_equal(output_arrays[TestDEMUtils.MAX_BYTES][array_index].tobytes(), 
+                                      output_arrays[DEMUtils.DEFAULT_TILE_BYTES][array_index].tobytes()), \
+                    'Tiled results differ from single tile results'
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestDEMUtils]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
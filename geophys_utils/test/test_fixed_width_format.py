@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+# 
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+# 
+#        http://www.apache.org/licenses/LICENSE-2.0
+# 
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._fixed_width_format module
+
+Created on 16/10/2026
+"""
+import unittest
+import warnings
+import numpy as np
+from geophys_utils._fixed_width_format import format_fixed_width_column, join_fixed_width_columns
+
+class TestFixedWidthFormat(unittest.TestCase):
+    """Unit tests for geophys_utils._fixed_width_format module."""
+    
+    def check_column(self, values, python_format):
+        char_array = format_fixed_width_column(values, python_format)
+        assert char_array is not None, 'Unable to format values with {}'.format(python_format)
+        for value_index in range(len(values)):
+            formatted = char_array[value_index].tobytes().decode('ascii')
+            expected = python_format.format(values[value_index])
+            assert formatted == expected, 'Incorrect value "{}" returned. Expected "{}"'.format(formatted, expected)
+    
+    def test_exponential_format(self):
+        print('Testing format_fixed_width_column with exponential formats')
+        rng = np.random.default_rng(0)
+        test_values = np.concatenate([rng.normal(0, 1, 10000) * 10.0 ** rng.integers(-40, 40, 10000),
+                                      [0.0, -0.0, np.nan, np.inf, -np.inf, 1.0e+100, -1.0e-120, 
+                                       9.99999999995, 9.999999999949, 0.5, 2.5e-7, -9.9999999999e+32]
+                                      ])
+        self.check_column(test_values, '{:>18.10e}')
+        self.check_column(test_values.astype('float32'), '{:>14.6e}')
+        
+    def test_high_precision_exponential_format(self):
+        print('Testing format_fixed_width_column with high precision exponential formats')
+        rng = np.random.default_rng(0)
+        test_values = np.concatenate([rng.random(2000), 
+                                      rng.normal(0, 1, 2000) * 10.0 ** rng.integers(-300, 300, 2000),
+                                      [0.0, np.nan, np.inf, -np.inf, 5.0e-324, 1.7976931348623157e+308]
+                                      ])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            for python_format in ['{:>20.11e}', '{:>21.12e}', '{:>24.16e}', '{:>26.17e}']:
+                self.check_column(test_values, python_format)
+        
+    def test_integer_format(self):
+        print('Testing format_fixed_width_column with integer formats')
+        for dtype in ['int8', 'int16', 'int32', 'int64', 'uint64']:
+            dtype_info = np.iinfo(dtype)
+            test_values = np.array([0, 1, -1, dtype_info.min, dtype_info.max], dtype=dtype) if dtype_info.min else np.array([0, 1, dtype_info.max], dtype=dtype)
+            self.check_column(test_values, '{:>21d}')
+        
+        assert format_fixed_width_column(np.array([123456], dtype='int32'), '{:>5d}') is None, 'Overflowing value not detected'
+        
+    def test_string_format(self):
+        print('Testing format_fixed_width_column with string format')
+        self.check_column(np.array(['abc', 'de', ''], dtype=object), '{:>4s}')
+        assert format_fixed_width_column(['abcdef'], '{:>4s}') is None, 'Overflowing string not detected'
+        
+    def test_join_fixed_width_columns(self):
+        print('Testing join_fixed_width_columns function')
+        text = join_fixed_width_columns([format_fixed_width_column(np.array([1, -20]), '{:>4d}'),
+                                         format_fixed_width_column(np.array([0.5, 2.0]), '{:>10.2e}')
+                                         ])
+        assert text == '   1  5.00e-01\n -20  2.00e+00\n', 'Incorrect text "{}" returned'.format(text)
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestFixedWidthFormat]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
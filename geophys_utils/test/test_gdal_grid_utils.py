@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._gdal_grid_utils module
+
+Created on 16/10/2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from osgeo import gdal
+from geophys_utils._gdal_grid_utils import get_gdal_grid_values
+
+WKT = 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]]'
+GEOTRANSFORM = (140.0, 0.01, 0.0, -30.0, 0.0, -0.01)
+RASTER_SHAPE = (80, 100) # rows, columns
+BLOCK_SIZE = 16
+NO_DATA_VALUE = -9999
+
+class TestGDALGridUtils(unittest.TestCase):
+    """Unit tests for geophys_utils._gdal_grid_utils module."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gdal_dataset = gdal.GetDriverByName('GTiff').Create(os.path.join(self.temp_dir, 'test.tif'),
+                                                                 RASTER_SHAPE[1], RASTER_SHAPE[0], 1, gdal.GDT_Int16,
+                                                                 options=['TILED=YES',
+                                                                          'BLOCKXSIZE={}'.format(BLOCK_SIZE),
+                                                                          'BLOCKYSIZE={}'.format(BLOCK_SIZE)])
+        self.gdal_dataset.SetGeoTransform(GEOTRANSFORM)
+        self.gdal_dataset.SetProjection(WKT)
+        gdal_band = self.gdal_dataset.GetRasterBand(1)
+        gdal_band.SetNoDataValue(NO_DATA_VALUE)
+        gdal_band.WriteArray(np.random.RandomState(0).randint(-1000, 1000, RASTER_SHAPE).astype('int16'))
+        self.gdal_dataset.FlushCache()
+
+        # Fractional pixel offsets (column, row) for points within blocks, either side of block edges and outside
+        # N.B: Offsets are rounded to pixel indices, so offsets within half a pixel of the far edges are outside the raster
+        random_offsets = np.random.RandomState(1).uniform(0, 1, (200, 2)) * [RASTER_SHAPE[1] - 0.5, RASTER_SHAPE[0] - 0.5]
+        edge_offsets = [(column + fraction, row + fraction)
+                        for column in [0, BLOCK_SIZE - 1, BLOCK_SIZE, 2 * BLOCK_SIZE - 1, 2 * BLOCK_SIZE, RASTER_SHAPE[1] - 1]
+                        for row in [0, BLOCK_SIZE - 1, BLOCK_SIZE, RASTER_SHAPE[0] - 1]
+                        for fraction in [0.1, 0.45]
+                        ]
+        outside_offsets = [(-0.3, 5.2), (-2.0, 5.2), (5.2, -2.0), (RASTER_SHAPE[1] + 1.0, 5.2), (5.2, RASTER_SHAPE[0] + 1.0)]
+        pixel_offsets = np.concatenate([random_offsets, edge_offsets, outside_offsets])
+        self.sample_points = np.stack([GEOTRANSFORM[0] + pixel_offsets[:,0] * GEOTRANSFORM[1],
+                                       GEOTRANSFORM[3] + pixel_offsets[:,1] * GEOTRANSFORM[5]], axis=1)
+
+    def tearDown(self):
+        self.gdal_dataset = None
+        shutil.rmtree(self.temp_dir)
+
+    def get_expected_values(self):
+        '''
+        Helper function to read the value at each sample point individually, with no-data outside the raster
+        '''
+        gdal_band = self.gdal_dataset.GetRasterBand(1)
+        expected_values = []
+        for point in self.sample_points:
+            indices = (int((point[0] - GEOTRANSFORM[0]) / GEOTRANSFORM[1] + 0.5),
+                       int((point[1] - GEOTRANSFORM[3]) / GEOTRANSFORM[5] + 0.5))
+            if 0 <= indices[0] < RASTER_SHAPE[1] and 0 <= indices[1] < RASTER_SHAPE[0]:
+                expected_values.append(gdal_band.ReadAsArray(xoff=indices[0], yoff=indices[1], win_xsize=1, win_ysize=1)[0,0])
+            else:
+                expected_values.append(NO_DATA_VALUE)
+        return np.array(expected_values)
+
+    def test_get_gdal_grid_values(self):
+        print('Testing get_gdal_grid_values function against point-by-point reads')
+        assert list(self.gdal_dataset.GetRasterBand(1).GetBlockSize()) == [BLOCK_SIZE, BLOCK_SIZE], 'Raster not tiled'
+        expected_values = self.get_expected_values()
+        assert np.count_nonzero(expected_values == NO_DATA_VALUE) == 4, 'Unexpected number of points outside raster'
+
+        for max_bytes in [BLOCK_SIZE * BLOCK_SIZE * 2, 4 * BLOCK_SIZE * BLOCK_SIZE * 2, None]: # One block, 2 x 2 blocks and whole raster
+            values = get_gdal_grid_values(self.gdal_dataset, self.sample_points, WKT, max_bytes=max_bytes)
+            assert values.dtype == np.dtype('int16'), 'Incorrect dtype {} for max_bytes={}'.format(values.dtype, max_bytes)
+            assert np.array_equal(values, expected_values), 'Incorrect values for max_bytes={}'.format(max_bytes)
+
+        print('Testing get_gdal_grid_values function with all points inside raster')
+        inside_mask = expected_values != NO_DATA_VALUE
+        values = get_gdal_grid_values(self.gdal_dataset, self.sample_points[inside_mask], WKT, max_bytes=BLOCK_SIZE * BLOCK_SIZE * 2)
+        assert np.array_equal(values, expected_values[inside_mask]), 'Incorrect values for points inside raster'
+
+        print('Testing get_gdal_grid_values function with all points outside raster')
+        values = get_gdal_grid_values(self.gdal_dataset, self.sample_points[~inside_mask], WKT)
+        assert np.all(values == NO_DATA_VALUE), 'Points outside raster not set to no-data'
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestGDALGridUtils]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
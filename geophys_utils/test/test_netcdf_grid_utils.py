@@ -41,7 +41,7 @@ TEST_MULTI_INDICES = [[1, 1], [176, 77]]
 TEST_FRACTIONAL_INDICES = [1.25, 1.25]
 TEST_VALUE = -99999.
 TEST_MULTI_VALUES = [-99999.0, -134.711334229]
-TEST_INTERPOLATED_VALUE = -99997.6171875
+TEST_INTERPOLATED_VALUE = -99999. # No-data propagated from neighbourhood
     
 class TestNetCDFGridUtilsConstructor(unittest.TestCase):
     """Unit tests for TestNetCDFGridUtils Constructor.
@@ -61,15 +61,22 @@ class TestNetCDFGridUtilsFunctions1(unittest.TestCase):
     def test_get_indices_from_coords(self):
         print('Testing get_indices_from_coords function with single coordinate {}'.format(TEST_COORDS))
         indices = netcdf_grid_utils.get_indices_from_coords(TEST_COORDS)
-        assert (indices == np.array(TEST_INDICES)).all, 'Incorrect indices: {} instead of {}'.format(indices, TEST_INDICES)
+        assert indices.shape == (2,), 'Incorrect shape for single coordinate indices: {}'.format(indices.shape)
+        assert (indices == np.array(TEST_INDICES)).all(), 'Incorrect indices: {} instead of {}'.format(indices, TEST_INDICES)
 
         print('Testing get_indices_from_coords function with multi coordinates {}'.format(TEST_MULTI_COORDS))
         multi_indices = netcdf_grid_utils.get_indices_from_coords(TEST_MULTI_COORDS)
-        assert (multi_indices == np.array(TEST_MULTI_INDICES)).all, 'Incorrect indices: {} instead of {}'.format(multi_indices, TEST_MULTI_INDICES)
+        assert (multi_indices == np.array(TEST_MULTI_INDICES)).all(), 'Incorrect indices: {} instead of {}'.format(multi_indices, TEST_MULTI_INDICES)
+
+        print('Testing get_indices_from_coords function with out-of-bounds coordinate')
+        out_of_bounds_indices = netcdf_grid_utils.get_indices_from_coords([TEST_COORDS, (0.0, 0.0)])
+        assert not np.ma.is_masked(out_of_bounds_indices[0]), 'In-bounds indices should not be masked'
+        assert out_of_bounds_indices.mask[1].all(), 'Out-of-bounds indices should be masked'
 
     def test_get_fractional_indices_from_coords(self):
         print('Testing get_fractional_indices_from_coords function')
         indices = netcdf_grid_utils.get_fractional_indices_from_coords(TEST_COORDS)
+        assert indices.shape == (2,), 'Incorrect shape for single coordinate fractional indices: {}'.format(indices.shape)
         for ordinate_index in range(len(indices)):
             assert round(indices[ordinate_index], 6) == TEST_FRACTIONAL_INDICES[ordinate_index], 'Fractional index incorrect'
 
@@ -81,16 +88,30 @@ class TestNetCDFGridUtilsFunctions1(unittest.TestCase):
         print('Testing get_value_at_coords function with multiple coordinates {}'.format(TEST_MULTI_COORDS))
         multi_values = netcdf_grid_utils.get_value_at_coords(TEST_MULTI_COORDS)
         assert (np.abs(np.array(multi_values) - np.array(TEST_MULTI_VALUES)) < MAX_ERROR).all(), 'Incorrect retrieved value: {} instead of {}'.format(multi_values, TEST_MULTI_VALUES)
+        assert netcdf_grid_utils.last_read_statistics['point_count'] == len(TEST_MULTI_COORDS), 'Incorrect point count in read statistics'
+        assert 1 <= netcdf_grid_utils.last_read_statistics['block_count'] <= len(TEST_MULTI_COORDS), 'Incorrect block count in read statistics'
 
     def test_get_interpolated_value_at_coords(self):
         print('Testing get_interpolated_value_at_coords function')
         interpolated_value = netcdf_grid_utils.get_interpolated_value_at_coords(TEST_COORDS)
         assert interpolated_value == TEST_INTERPOLATED_VALUE, 'Incorrect interpolated value retrieved'
 
+        print('Testing get_interpolated_value_at_coords function with multiple coordinates {}'.format(TEST_MULTI_COORDS))
+        for order in [1, 3]:
+            multi_interpolated_values = netcdf_grid_utils.get_interpolated_value_at_coords(TEST_MULTI_COORDS, order=order)
+            assert (np.abs(np.array(multi_interpolated_values) - np.array(TEST_MULTI_VALUES)) < 0.0001).all(), 'Incorrect interpolated values: {} instead of {}'.format(multi_interpolated_values, TEST_MULTI_VALUES)
+
     def test_sample_transect(self):
         print('Testing sample_transect function')
-        #TODO: Finish this!
-        #transect_samples = netcdf_grid_utils.sample_transect(transect_vertices, crs=None, sample_metres=None)
+        sample_points, sample_metres = netcdf_grid_utils.sample_transect(TEST_MULTI_COORDS)
+        assert sample_metres == netcdf_grid_utils.default_sample_metres, 'Incorrect default sample spacing {}'.format(sample_metres)
+        assert sample_points.ndim == 2 and sample_points.shape[1] == 2 and len(sample_points) > 2, 'Incorrect sample points shape {}'.format(sample_points.shape)
+        assert (np.abs(sample_points[0] - TEST_MULTI_COORDS[0]) < MAX_ERROR).all(), 'Incorrect first sample point {}'.format(sample_points[0])
+        
+        print('Testing sample_transect function with multiple transects')
+        transect_sample_points, _sample_metres = netcdf_grid_utils.sample_transect([TEST_MULTI_COORDS, TEST_MULTI_COORDS[::-1]])
+        assert len(transect_sample_points) == 2, 'Incorrect number of transects'
+        assert (np.abs(transect_sample_points[0] - sample_points) < MAX_ERROR).all(), 'Batch sample points differ from single transect sample points'
 
     def test_concave_hull(self):
         print('Testing concave hull')
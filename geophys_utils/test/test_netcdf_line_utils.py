@@ -25,6 +25,8 @@ Created on 15/11/2016
 import unittest
 import os
 import re
+import shutil
+import tempfile
 import netCDF4
 import numpy as np
 from geophys_utils._netcdf_line_utils import NetCDFLineUtils
@@ -110,6 +112,114 @@ class TestNetCDFLineUtilsFunctions2(unittest.TestCase):
             if count >= 2:
                 break
 
+class TestNetCDFLineUtilsLineSegments(unittest.TestCase):
+    """Unit tests for line segment index using a small local dataset with non-contiguous lines"""
+    
+    LINE_NUMBERS = [100, 110, 120, 130]
+    
+    def test_get_line_point_indices(self):
+        print('Testing get_line_point_indices function with non-contiguous lines')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_path = os.path.join(temp_dir, 'test_line.nc')
+            random_state = np.random.RandomState(0)
+            # Each line is acquired in several runs of points interleaved with other lines
+            line_index = np.concatenate([[line_index] * random_state.randint(5, 20) 
+                                         for line_index in random_state.permutation(np.repeat(np.arange(4), 3))]).astype('int8')
+            with netCDF4.Dataset(nc_path, 'w') as nc_dataset:
+                nc_dataset.createDimension('point', len(line_index))
+                nc_dataset.createDimension('line', len(TestNetCDFLineUtilsLineSegments.LINE_NUMBERS))
+                nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+                nc_dataset.createVariable('line', 'i4', ('line',))[:] = TestNetCDFLineUtilsLineSegments.LINE_NUMBERS
+                nc_dataset.createVariable('line_index', 'i1', ('point',))[:] = line_index
+                nc_dataset.createVariable('longitude', 'f8', ('point',))[:] = 137 + random_state.rand(len(line_index))
+                nc_dataset.createVariable('latitude', 'f8', ('point',))[:] = -29 + random_state.rand(len(line_index))
+                
+            subset_mask = random_state.rand(len(line_index)) > 0.3
+            with netCDF4.Dataset(nc_path) as nc_dataset:
+                line_utils = NetCDFLineUtils(nc_dataset, enable_disk_cache=False)
+                assert line_utils.line_segments[0] is not None, 'Non-contiguous lines not detected'
+                
+                for line_number, point_indices in line_utils.get_line_point_indices():
+                    expected_indices = np.where(line_index == TestNetCDFLineUtilsLineSegments.LINE_NUMBERS.index(line_number))[0]
+                    assert np.array_equal(point_indices, expected_indices), 'Incorrect point indices for line {}'.format(line_number)
+                    
+                for line_number, point_indices in line_utils.get_line_point_indices([120, 999], subset_mask=subset_mask):
+                    assert line_number == 120, 'Invalid line number returned'
+                    assert np.array_equal(point_indices, np.where(np.logical_and(line_index == 2, subset_mask))[0]), 'Incorrect subset point indices'
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestNetCDFLineUtilsSortedCopy(unittest.TestCase):
+    """Unit tests for copying a small local line dataset with sort_by_line=True"""
+
+    LINE_NUMBERS = [100, 110, 120, 130, 900]
+    COPY_MAX_BYTES = 300 # Copy in several pieces
+
+    def test_sort_by_line_copy(self):
+        print('Testing copy function with sort_by_line=True')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_path = os.path.join(temp_dir, 'test_line.nc')
+            sorted_nc_path = os.path.join(temp_dir, 'test_line_sorted.nc')
+            random_state = np.random.RandomState(0)
+            # Each line is acquired in several runs of points interleaved with other lines, with fiducials out of order
+            line_index = np.concatenate([[line_index] * random_state.randint(5, 40)
+                                         for line_index in random_state.permutation(np.repeat(np.arange(len(TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS)), 2))]).astype('int8')
+            point_count = len(line_index)
+            with netCDF4.Dataset(nc_path, 'w') as nc_dataset:
+                nc_dataset.createDimension('point', point_count)
+                nc_dataset.createDimension('line', len(TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS))
+                nc_dataset.createDimension('layer', 3)
+                nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+                nc_dataset.createVariable('line', 'i4', ('line',))[:] = TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS
+                nc_dataset.createVariable('line_index', 'i1', ('point',), chunksizes=(16,), zlib=True)[:] = line_index
+                nc_dataset.createVariable('fiducial', 'f8', ('point',), chunksizes=(16,), zlib=True)[:] = random_state.permutation(point_count) * 0.5
+                nc_dataset.createVariable('longitude', 'f8', ('point',), chunksizes=(16,))[:] = 137 + random_state.rand(point_count)
+                nc_dataset.createVariable('latitude', 'f8', ('point',), chunksizes=(16,))[:] = -29 + random_state.rand(point_count)
+                nc_dataset.createVariable('mag', 'f4', ('point',), chunksizes=(16,), zlib=True)[:] = random_state.rand(point_count)
+                nc_dataset.createVariable('thickness', 'f4', ('point', 'layer'), chunksizes=(16, 3))[:] = random_state.rand(point_count, 3)
+
+            with netCDF4.Dataset(nc_path) as nc_dataset:
+                line_utils = NetCDFLineUtils(nc_dataset, enable_disk_cache=False)
+                assert line_utils.line_segments[0] is not None, 'Source lines are contiguous'
+                line_utils.max_bytes = TestNetCDFLineUtilsSortedCopy.COPY_MAX_BYTES
+                line_utils.copy(sorted_nc_path, sort_by_line=True)
+
+                with netCDF4.Dataset(sorted_nc_path) as sorted_nc_dataset:
+                    sorted_line_index = sorted_nc_dataset.variables['line_index'][:]
+                    sorted_fiducial = sorted_nc_dataset.variables['fiducial'][:]
+                    assert np.all(np.diff(sorted_line_index) >= 0), 'Lines are not contiguous'
+                    for line_index_value in range(len(TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS)):
+                        assert np.all(np.diff(sorted_fiducial[sorted_line_index == line_index_value]) > 0), \
+                            'Points in line {} are not ordered by fiducial'.format(TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS[line_index_value])
+
+                    print('Testing line_start_index & line_point_count variables')
+                    expected_counts = np.bincount(line_index, minlength=len(TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS))
+                    assert np.array_equal(sorted_nc_dataset.variables['line_point_count'][:], expected_counts), 'Incorrect line_point_count values'
+                    assert np.array_equal(sorted_nc_dataset.variables['line_start_index'][:],
+                                          np.searchsorted(sorted_line_index, np.arange(len(TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS)))), \
+                        'Incorrect line_start_index values'
+
+                    print('Testing get_lines function on sorted copy')
+                    sorted_line_utils = NetCDFLineUtils(sorted_nc_dataset, enable_disk_cache=False)
+                    assert sorted_line_utils.line_segments[0] is None, 'Sorted lines are not contiguous'
+                    assert np.array_equal(sorted_line_utils.line_segments[1], sorted_nc_dataset.variables['line_start_index'][:]), \
+                        'Line segment index not read from line_start_index variable'
+
+                    variables = ['fiducial', 'mag', 'thickness']
+                    source_lines = dict(line_utils.get_lines(variables=variables))
+                    sorted_lines = dict(sorted_line_utils.get_lines(variables=variables))
+                    assert sorted(sorted_lines.keys()) == TestNetCDFLineUtilsSortedCopy.LINE_NUMBERS, 'Incorrect line numbers from sorted copy'
+                    for line_number, line_dict in sorted_lines.items():
+                        fiducial_order = np.argsort(source_lines[line_number]['fiducial'])
+                        for key in ['coordinates'] + variables:
+                            assert np.array_equal(line_dict[key], source_lines[line_number][key][fiducial_order]), \
+                                'Incorrect {} values for line {}'.format(key, line_number)
+        finally:
+            shutil.rmtree(temp_dir)
+
 
 # Define test suites
 def test_suite():
@@ -117,7 +227,9 @@ def test_suite():
 
     test_classes = [TestNetCDFLineUtilsConstructor,
                     TestNetCDFLineUtilsFunctions1,
-                    TestNetCDFLineUtilsFunctions2
+                    TestNetCDFLineUtilsFunctions2,
+                    TestNetCDFLineUtilsLineSegments,
+                    TestNetCDFLineUtilsSortedCopy
                     ]
 
     suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
@@ -25,9 +25,13 @@ Created on 15/11/2016
 import unittest
 import os
 import re
+import shutil
+import tempfile
 import netCDF4
 import numpy as np
+from geophys_utils import _netcdf_point_utils
 from geophys_utils._netcdf_point_utils import NetCDFPointUtils
+from shapely.geometry import Polygon
 
 netcdf_point_utils = None
 
@@ -118,6 +122,359 @@ class TestNetCDFPointUtilsGridFunctions(unittest.TestCase):
         assert (crs, geotransform, grids.shape) == TEST_GRID_RESULTS[1], 'Invalid grid results: {} != {}'.format((crs, geotransform, grids.shape), TEST_GRID_RESULTS[1])
 
 
+class TestNetCDFPointUtilsColumns(unittest.TestCase):
+    """Unit tests for column-oriented point data functions using a small local dataset"""
+    
+    POINT_COUNT = 1000
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.nc_path = os.path.join(cls.temp_dir, 'test_point.nc')
+        random_state = np.random.RandomState(0)
+        with netCDF4.Dataset(cls.nc_path, 'w') as nc_dataset:
+            nc_dataset.createDimension('point', cls.POINT_COUNT)
+            nc_dataset.createDimension('line', 4)
+            nc_dataset.createDimension('window', 3)
+            nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+            nc_dataset.createVariable('height', 'f4')[:] = 80.0
+            nc_dataset.createVariable('line', 'i4', ('line',))[:] = [100, 110, 120, 130]
+            nc_dataset.createVariable('line_index', 'i1', ('point',))[:] = np.arange(cls.POINT_COUNT) * 4 // cls.POINT_COUNT
+            nc_dataset.createVariable('longitude', 'f8', ('point',))[:] = 137 + random_state.rand(cls.POINT_COUNT)
+            nc_dataset.createVariable('latitude', 'f8', ('point',))[:] = -29 + random_state.rand(cls.POINT_COUNT)
+            nc_dataset.createVariable('mag', 'f4', ('point', 'window'))[:] = random_state.rand(cls.POINT_COUNT, 3)
+            
+        cls.nc_dataset = netCDF4.Dataset(cls.nc_path)
+        cls.point_utils = NetCDFPointUtils(cls.nc_dataset, enable_disk_cache=False)
+        cls.mask = random_state.rand(cls.POINT_COUNT) > 0.5
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.nc_dataset.close()
+        shutil.rmtree(cls.temp_dir)
+    
+    def test_chunk_point_data_columns(self):
+        print('Testing chunk_point_data_columns function')
+        variable_attributes, column_dict = list(self.point_utils.chunk_point_data_columns(start_index=100, end_index=400, 
+                                                                                          mask=self.mask,
+                                                                                          yield_variable_attributes_first=True))
+        assert list(column_dict.keys()) == ['height', 'line', 'longitude', 'latitude', 'mag'], 'Incorrect fields {}'.format(list(column_dict.keys()))
+        assert list(variable_attributes.keys()) == list(column_dict.keys()), 'Variable attributes do not match fields'
+        
+        point_indices = np.arange(100, 400)[self.mask[100:400]]
+        assert np.array_equal(column_dict['mag'], self.nc_dataset.variables['mag'][:][point_indices]), 'Incorrect point variable values'
+        assert np.array_equal(column_dict['line'], np.array([100, 110, 120, 130])[point_indices * 4 // self.POINT_COUNT]), 'Incorrect lookup values'
+        assert np.all(column_dict['height'] == 80.0) and len(column_dict['height']) == len(point_indices), 'Incorrect scalar values'
+        
+        structured_data = next(self.point_utils.chunk_point_data_columns(start_index=100, end_index=400, 
+                                                                         mask=self.mask, structured_array=True))
+        assert structured_data['mag'].shape == (len(point_indices), 3), 'Incorrect structured array shape'
+        assert np.array_equal(structured_data['longitude'], column_dict['longitude']), 'Incorrect structured array values'
+        
+        assert not list(self.point_utils.chunk_point_data_columns(field_list=['missing'], structured_array=True)), 'Empty fields yielded'
+    
+    def test_all_point_data_columns(self):
+        print('Testing all_point_data_columns function')
+        for read_chunk_size in [250, 300]: # Including point count which is a multiple of chunk size
+            for structured_array in [False, True]:
+                chunk_list = list(self.point_utils.all_point_data_columns(field_list=['longitude', 'mag'], 
+                                                                          read_chunk_size=read_chunk_size, 
+                                                                          structured_array=structured_array))
+                assert list(chunk_list[0].keys()) == ['longitude', 'mag'], 'Variable attributes not yielded first'
+                chunk_lengths = [len(chunk_data if structured_array else chunk_data['longitude']) for chunk_data in chunk_list[1:]]
+                assert chunk_lengths[:-1] == [read_chunk_size] * (len(chunk_lengths) - 1) and 0 < chunk_lengths[-1] <= read_chunk_size, \
+                    'Incorrect chunk lengths {}'.format(chunk_lengths)
+                assert np.array_equal(np.concatenate([chunk_data['longitude'] for chunk_data in chunk_list[1:]]), 
+                                      self.nc_dataset.variables['longitude'][:]), 'Incorrect values'
+    
+    def test_point_limit(self):
+        print('Testing all_point_data_columns POINT_LIMIT truncation')
+        original_point_limit = _netcdf_point_utils.POINT_LIMIT
+        try:
+            _netcdf_point_utils.POINT_LIMIT = 420
+            for structured_array in [False, True]:
+                chunk_list = list(self.point_utils.all_point_data_columns(field_list=['latitude'], mask=self.mask,
+                                                                          read_chunk_size=200, 
+                                                                          yield_variable_attributes_first=False,
+                                                                          structured_array=structured_array))
+                latitudes = np.concatenate([chunk_data['latitude'] for chunk_data in chunk_list])
+                assert np.array_equal(latitudes, self.nc_dataset.variables['latitude'][:][self.mask][:420]), 'Incorrect truncation'
+        finally:
+            _netcdf_point_utils.POINT_LIMIT = original_point_limit
+
+
+class TestNetCDFPointUtilsChunkSummaries(unittest.TestCase):
+    """Unit tests for per-chunk summary variables using a small local dataset"""
+    
+    def test_get_value_mask(self):
+        print('Testing set_variable_chunk_summaries and get_value_mask functions')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_path = os.path.join(temp_dir, 'test_point.nc')
+            random_state = np.random.RandomState(0)
+            with netCDF4.Dataset(nc_path, 'w') as nc_dataset:
+                nc_dataset.createDimension('point', 1000)
+                nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+                for variable_name, values in [('longitude', 137 + random_state.rand(1000)),
+                                              ('latitude', -29 + random_state.rand(1000)),
+                                              ('mag', np.cumsum(random_state.rand(1000))) # Ascending values allow chunks to be skipped
+                                              ]:
+                    nc_dataset.createVariable(variable_name, 'f8', ('point',), chunksizes=(100,))[:] = values
+            
+            with netCDF4.Dataset(nc_path, 'r+') as nc_dataset:
+                point_utils = NetCDFPointUtils(nc_dataset, enable_disk_cache=False)
+                point_utils.set_variable_chunk_summaries()
+                assert point_utils.get_chunk_summary('mag')[0] == 100, 'Chunk size not taken from variable chunking'
+                
+                mag = nc_dataset.variables['mag'][:]
+                min_value, max_value = np.percentile(mag, [20, 30])
+                assert np.count_nonzero(point_utils.get_chunk_candidate_mask('mag', min_value, max_value)) <= 2, 'Chunks not skipped'
+                assert np.array_equal(point_utils.get_value_mask('mag', min_value, max_value), 
+                                      np.logical_and(mag >= min_value, mag <= max_value)), 'Incorrect range mask'
+                assert np.array_equal(point_utils.get_value_mask('mag', value_list=[mag[10], mag[500]]), 
+                                      np.isin(np.arange(1000), [10, 500])), 'Incorrect value list mask'
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_get_value_mask_packed(self):
+        print('Testing chunk summaries and get_value_mask for packed variable')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_path = os.path.join(temp_dir, 'test_point.nc')
+            random_state = np.random.RandomState(0)
+            with netCDF4.Dataset(nc_path, 'w') as nc_dataset:
+                nc_dataset.createDimension('point', 1000)
+                nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+                nc_dataset.createVariable('longitude', 'f8', ('point',), chunksizes=(100,))[:] = 137 + random_state.rand(1000)
+                nc_dataset.createVariable('latitude', 'f8', ('point',), chunksizes=(100,))[:] = -29 + random_state.rand(1000)
+                mag_variable = nc_dataset.createVariable('mag', 'i2', ('point',), chunksizes=(100,))
+                mag_variable.scale_factor = np.float64(0.01)
+                mag_variable.add_offset = np.float64(50.0)
+                mag_variable[:] = 50 + np.cumsum(random_state.rand(1000)) / 10 # Ascending unpacked values between 50 and 100
+            
+            with netCDF4.Dataset(nc_path, 'r+') as nc_dataset:
+                point_utils = NetCDFPointUtils(nc_dataset, enable_disk_cache=False)
+                point_utils.set_variable_chunk_summaries(['mag'])
+                
+                mag = nc_dataset.variables['mag'][:]
+                chunk_summary = point_utils.get_chunk_summary('mag')[1]
+                assert np.allclose(chunk_summary['min'], mag.reshape((10, 100)).min(axis=1)), 'Chunk minima not unpacked'
+                assert np.allclose(chunk_summary['max'], mag.reshape((10, 100)).max(axis=1)), 'Chunk maxima not unpacked'
+                assert np.allclose(nc_dataset.variables['mag'].actual_range, [mag.min(), mag.max()]), 'actual_range not unpacked'
+                
+                min_value, max_value = mag[250], mag[349]
+                assert np.array_equal(point_utils.get_value_mask('mag', min_value, max_value), 
+                                      np.logical_and(mag >= min_value, mag <= max_value)), 'Incorrect range mask'
+                assert np.array_equal(point_utils.get_value_mask('mag', value_list=[mag[99], mag[999]]), 
+                                      np.isin(mag, [mag[99], mag[999]])), 'Incorrect value list mask'
+        finally:
+            shutil.rmtree(temp_dir)
+
+class TestNetCDFPointUtilsSpatialOrder(unittest.TestCase):
+    """Unit tests for copying a small local dataset with spatial_order='hilbert'"""
+
+    POINT_COUNT = 1000
+    CHUNK_SIZE = 100
+
+    def test_hilbert_copy(self):
+        print('Testing copy function with spatial_order="hilbert"')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_path = os.path.join(temp_dir, 'test_point.nc')
+            ordered_nc_path = os.path.join(temp_dir, 'test_point_hilbert.nc')
+            random_state = np.random.RandomState(0)
+            with netCDF4.Dataset(nc_path, 'w') as nc_dataset:
+                nc_dataset.createDimension('point', TestNetCDFPointUtilsSpatialOrder.POINT_COUNT)
+                nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+                for variable_name, datatype, values in [('longitude', 'f8', 137 + random_state.rand(TestNetCDFPointUtilsSpatialOrder.POINT_COUNT)),
+                                                        ('latitude', 'f8', -29 + random_state.rand(TestNetCDFPointUtilsSpatialOrder.POINT_COUNT)),
+                                                        ('point_id', 'i4', np.arange(TestNetCDFPointUtilsSpatialOrder.POINT_COUNT)) # Identifies points after reordering
+                                                        ]:
+                    nc_dataset.createVariable(variable_name, datatype, ('point',),
+                                              chunksizes=(TestNetCDFPointUtilsSpatialOrder.CHUNK_SIZE,))[:] = values
+
+            with netCDF4.Dataset(nc_path) as nc_dataset:
+                point_utils = NetCDFPointUtils(nc_dataset, enable_disk_cache=False, enable_spatial_index=False)
+                point_utils.copy(ordered_nc_path, spatial_order='hilbert')
+                source_point_ids = nc_dataset.variables['point_id'][:]
+
+                with netCDF4.Dataset(ordered_nc_path) as ordered_nc_dataset:
+                    ordered_point_utils = NetCDFPointUtils(ordered_nc_dataset, enable_disk_cache=False, enable_spatial_index=False)
+                    ordered_point_ids = ordered_nc_dataset.variables['point_id'][:]
+                    assert sorted(ordered_point_ids) == list(source_point_ids), 'Points not preserved in copy'
+                    assert not np.array_equal(ordered_point_ids, source_point_ids), 'Points not reordered'
+
+                    print('Testing point_chunk_bounds variable')
+                    chunk_size, chunk_bounds = ordered_point_utils.point_chunk_bounds
+                    assert chunk_size == TestNetCDFPointUtilsSpatialOrder.CHUNK_SIZE, 'Chunk size not taken from variable chunking'
+                    assert chunk_bounds.shape == (TestNetCDFPointUtilsSpatialOrder.POINT_COUNT // chunk_size, 4), \
+                        'Incorrect point_chunk_bounds shape {}'.format(chunk_bounds.shape)
+                    xycoords = ordered_nc_dataset.variables['longitude'][:], ordered_nc_dataset.variables['latitude'][:]
+                    for chunk_index in range(len(chunk_bounds)):
+                        chunk_slice = slice(chunk_index * chunk_size, (chunk_index + 1) * chunk_size)
+                        assert np.array_equal(chunk_bounds[chunk_index],
+                                              [xycoords[0][chunk_slice].min(), xycoords[1][chunk_slice].min(),
+                                               xycoords[0][chunk_slice].max(), xycoords[1][chunk_slice].max()]), \
+                            'Incorrect bounds for chunk {}'.format(chunk_index)
+
+                    print('Testing get_spatial_mask function on Hilbert-ordered copy')
+                    for bounds in [(137.2, -28.9, 137.5, -28.6),
+                                   Polygon([(137.1, -28.9), (137.6, -28.8), (137.4, -28.3)]),
+                                   ]:
+                        bbox = bounds.bounds if isinstance(bounds, Polygon) else bounds
+                        intersecting_chunk_count = np.count_nonzero(np.logical_and.reduce((chunk_bounds[:,0] <= bbox[2],
+                                                                                           chunk_bounds[:,2] >= bbox[0],
+                                                                                           chunk_bounds[:,1] <= bbox[3],
+                                                                                           chunk_bounds[:,3] >= bbox[1]
+                                                                                           )))
+                        assert intersecting_chunk_count < len(chunk_bounds), 'No chunks skipped for bounds {}'.format(bounds)
+
+                        source_mask = point_utils.get_spatial_mask(bounds)
+                        ordered_mask = ordered_point_utils.get_spatial_mask(bounds)
+                        assert np.count_nonzero(source_mask), 'No points selected for bounds {}'.format(bounds)
+                        assert np.array_equal(np.sort(ordered_point_ids[ordered_mask]), source_point_ids[source_mask]), \
+                            'Different points selected for bounds {}'.format(bounds)
+        finally:
+            shutil.rmtree(temp_dir)
+
+class TestNetCDFPointUtilsNearestNeighbours(unittest.TestCase):
+    """Unit tests for nearest neighbour functions with and without the spatial index using a small local dataset"""
+    
+    POINT_COUNT = 2000
+    QUERY_COORDS = [(137.5, -28.5), (137.013, -28.991), (136.9, -29.1), (140.0, -25.0)] # Last two outside extent
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.nc_path = os.path.join(cls.temp_dir, 'test_point.nc')
+        random_state = np.random.RandomState(0)
+        with netCDF4.Dataset(cls.nc_path, 'w') as nc_dataset:
+            nc_dataset.createDimension('point', cls.POINT_COUNT)
+            nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+            nc_dataset.createVariable('longitude', 'f8', ('point',))[:] = 137 + random_state.rand(cls.POINT_COUNT)
+            nc_dataset.createVariable('latitude', 'f8', ('point',))[:] = -29 + random_state.rand(cls.POINT_COUNT)
+            
+        cls.nc_dataset = netCDF4.Dataset(cls.nc_path)
+        cls.indexed_point_utils = NetCDFPointUtils(cls.nc_dataset, 
+                                                   enable_disk_cache=True, 
+                                                   enable_spatial_index=True,
+                                                   cache_path=os.path.join(cls.temp_dir, 'test_point_cache.nc'))
+        cls.unindexed_point_utils = NetCDFPointUtils(cls.nc_dataset, enable_disk_cache=False, enable_spatial_index=False)
+        cls.xycoords = np.column_stack([cls.nc_dataset.variables['longitude'][:], cls.nc_dataset.variables['latitude'][:]])
+        cls.mask = random_state.rand(cls.POINT_COUNT) > 0.5
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.nc_dataset.close()
+        shutil.rmtree(cls.temp_dir)
+        
+    def brute_force_nearest(self, coordinates, points_required, max_distance=None, secondary_mask=None):
+        '''
+        Helper function to return distances and indices of nearest points found by exhaustive search
+        '''
+        distances = np.hypot(self.xycoords[:,0] - coordinates[0], self.xycoords[:,1] - coordinates[1])
+        point_indices = np.arange(self.POINT_COUNT)
+        if max_distance is not None:
+            point_indices = point_indices[distances < max_distance]
+        if secondary_mask is not None:
+            point_indices = point_indices[secondary_mask[point_indices]]
+        point_indices = point_indices[np.argsort(distances[point_indices], kind='stable')][:points_required]
+        return distances[point_indices], point_indices
+    
+    def test_nearest_neighbours(self):
+        print('Testing nearest_neighbours function with and without spatial index')
+        assert self.indexed_point_utils.spatial_index is not None, 'Spatial index not enabled'
+        assert self.unindexed_point_utils.spatial_index is None, 'Spatial index enabled'
+        
+        for coordinates in self.QUERY_COORDS:
+            for points_required in [1, 5]:
+                for max_distance in [None, 0, 0.005, 0.02, 0.5]:
+                    for secondary_mask in [None, self.mask]:
+                        results = [point_utils.nearest_neighbours(coordinates, 
+                                                                  points_required=points_required, 
+                                                                  max_distance=max_distance, 
+                                                                  secondary_mask=secondary_mask)
+                                   for point_utils in [self.indexed_point_utils, self.unindexed_point_utils]]
+                        expected_distances, expected_indices = self.brute_force_nearest(coordinates, points_required, max_distance, secondary_mask)
+                        query_description = '{}, points_required={}, max_distance={}, secondary_mask={}'.format(
+                            coordinates, points_required, max_distance, secondary_mask is not None)
+                        
+                        for distances, indices in results:
+                            if not len(expected_indices):
+                                assert (distances, indices) == ([], []), 'Empty result expected for {}'.format(query_description)
+                            elif points_required == 1:
+                                assert np.ndim(distances) == 0 and np.ndim(indices) == 0, 'Scalar result expected for {}'.format(query_description)
+                                assert indices == expected_indices[0] and np.isclose(distances, expected_distances[0]), 'Incorrect nearest point for {}'.format(query_description)
+                            else:
+                                assert np.array_equal(indices, expected_indices), 'Incorrect indices {} instead of {} for {}'.format(indices, expected_indices, query_description)
+                                assert np.allclose(distances, expected_distances), 'Incorrect distances for {}'.format(query_description)
+    
+    def test_batch_nearest_neighbours(self):
+        print('Testing batch_nearest_neighbours function with and without spatial index')
+        query_coords = np.concatenate([self.QUERY_COORDS, 
+                                       np.random.RandomState(1).rand(50, 2) + [137, -29]])
+        for points_required in [1, 5]:
+            for max_distance in [None, 0, 0.005, 0.02]:
+                for secondary_mask in [None, self.mask]:
+                    query_description = 'points_required={}, max_distance={}, secondary_mask={}'.format(
+                        points_required, max_distance, secondary_mask is not None)
+                    for point_utils in [self.indexed_point_utils, self.unindexed_point_utils]:
+                        distance_list, index_list = point_utils.batch_nearest_neighbours(query_coords, 
+                                                                                         points_required=points_required, 
+                                                                                         max_distance=max_distance, 
+                                                                                         secondary_mask=secondary_mask)
+                        assert len(distance_list) == len(index_list) == len(query_coords), 'Incorrect result count for {}'.format(query_description)
+                        
+                        for coordinates, distances, indices in zip(query_coords, distance_list, index_list):
+                            expected_distances, expected_indices = self.brute_force_nearest(coordinates, points_required, max_distance, secondary_mask)
+                            assert np.array_equal(indices, expected_indices), 'Incorrect indices {} instead of {} for {} with {}'.format(
+                                indices, expected_indices, coordinates, query_description)
+                            assert np.allclose(distances, expected_distances), 'Incorrect distances for {} with {}'.format(coordinates, query_description)
+
+class TestNetCDFPointUtilsNpyCache(unittest.TestCase):
+    """Unit tests for memory-mapped .npy disk cache backend using a small local dataset"""
+    
+    def test_npy_cache(self):
+        print('Testing xycoords with npy cache backend')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_path = os.path.join(temp_dir, 'test_point.nc')
+            random_state = np.random.RandomState(0)
+            with netCDF4.Dataset(nc_path, 'w') as nc_dataset:
+                nc_dataset.createDimension('point', 1000)
+                nc_dataset.createVariable('crs', 'i1').spatial_ref = 'EPSG:4283'
+                nc_dataset.createVariable('longitude', 'f8', ('point',))[:] = 137 + random_state.rand(1000)
+                nc_dataset.createVariable('latitude', 'f8', ('point',))[:] = -29 + random_state.rand(1000)
+            
+            with netCDF4.Dataset(nc_path) as nc_dataset:
+                expected_xycoords = np.column_stack([nc_dataset.variables['longitude'][:], nc_dataset.variables['latitude'][:]])
+                for _attempt in range(2): # Create cache then reuse it
+                    point_utils = NetCDFPointUtils(nc_dataset, 
+                                                   enable_disk_cache=True, 
+                                                   enable_spatial_index=False,
+                                                   cache_path=os.path.join(temp_dir, 'test_point_cache.nc'),
+                                                   cache_backend='npy')
+                    assert isinstance(point_utils.xycoords, np.memmap), 'Cached coordinates not memory-mapped'
+                    assert np.array_equal(point_utils.xycoords, expected_xycoords), 'Incorrect cached coordinates'
+                assert sorted(os.listdir(point_utils.npy_cache_dir)) == ['xycoords.json', 'xycoords.npy'], 'Unexpected cache files'
+                
+            print('Testing npy cache is rebuilt after source dataset is modified')
+            with netCDF4.Dataset(nc_path, 'r+') as nc_dataset:
+                nc_dataset.variables['longitude'][:] = 138 + random_state.rand(1000)
+            source_mtime = os.stat(nc_path).st_mtime
+            os.utime(nc_path, (source_mtime + 10, source_mtime + 10)) # Ensure modification is detected on coarse timestamps
+            
+            with netCDF4.Dataset(nc_path) as nc_dataset:
+                expected_xycoords = np.column_stack([nc_dataset.variables['longitude'][:], nc_dataset.variables['latitude'][:]])
+                point_utils = NetCDFPointUtils(nc_dataset, 
+                                               enable_disk_cache=True, 
+                                               enable_spatial_index=False,
+                                               cache_path=os.path.join(temp_dir, 'test_point_cache.nc'),
+                                               cache_backend='npy')
+                assert np.array_equal(point_utils.xycoords, expected_xycoords), 'Stale cached coordinates returned'
+        finally:
+            shutil.rmtree(temp_dir)
+
 
 # Define test suites
 def test_suite():
@@ -125,7 +482,12 @@ def test_suite():
 
     test_classes = [TestNetCDFPointUtilsConstructor,
                     TestNetCDFPointUtilsFunctions1,
-                    TestNetCDFPointUtilsGridFunctions
+                    TestNetCDFPointUtilsGridFunctions,
+                    TestNetCDFPointUtilsColumns,
+                    TestNetCDFPointUtilsChunkSummaries,
+                    TestNetCDFPointUtilsSpatialOrder,
+                    TestNetCDFPointUtilsNearestNeighbours,
+                    TestNetCDFPointUtilsNpyCache
                     ]
 
     suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._netcdf_utils module
+
+Created on 16/10/2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import netCDF4
+import numpy as np
+from geophys_utils import _netcdf_utils
+from geophys_utils._netcdf_utils import NetCDFUtils, get_index_runs, get_copy_pieces, read_copy_piece
+
+class TestNetCDFUtils(unittest.TestCase):
+    """Unit tests for geophys_utils._netcdf_utils module."""
+
+    NC_PATH = 'test_grid.nc'
+
+    def test_get_index_runs(self):
+        print('Testing get_index_runs function')
+        indices = np.array([7, 8, 9, 0, 1, 20, 2, 21])
+        run_slices, run_positions = get_index_runs(indices)
+        assert run_slices == [slice(0, 3), slice(7, 10), slice(20, 22)], 'Incorrect runs'
+        assert np.array_equal(np.concatenate([np.arange(run_slice.start, run_slice.stop) for run_slice in run_slices])[run_positions],
+                              indices), 'Incorrect run positions'
+
+        run_slices, run_positions = get_index_runs(indices, max_gap=4)
+        assert run_slices == [slice(0, 10), slice(20, 22)], 'Small gaps not merged into runs'
+
+    def test_get_copy_pieces(self):
+        print('Testing get_copy_pieces function with reordered dimension')
+        test_array = np.reshape(np.arange(0, 60 * 3), (60, 3))
+        source_indices = np.random.RandomState(0).permutation(60)[:50]
+        copy_array = np.zeros(shape=(50, 3), dtype=test_array.dtype)
+        for write_slices, read_slices, select_indices in get_copy_pieces((50, 3), (16, 3), [source_indices, None]):
+            copy_array[write_slices] = read_copy_piece(test_array, read_slices, select_indices)
+        assert np.array_equal(copy_array, test_array[source_indices]), 'Reordered copy incorrect'
+        
+    def test_get_copy_pieces_sparse(self):
+        print('Testing get_copy_pieces function with sparse mask')
+        source_indices = np.sort(np.random.RandomState(0).choice(10000000, 10000, replace=False))
+        for _write_slices, read_slices, _select_indices in get_copy_pieces((10000,), (2500,), [source_indices], 
+                                                                          max_gap=NetCDFUtils.COPY_RUN_GAP):
+            read_size = sum(run_slice.stop - run_slice.start 
+                            for run_slice in (read_slices[0] if type(read_slices[0]) == list else [read_slices[0]]))
+            assert read_size <= 2 * 2500, 'Read {} source elements for piece of 2500'.format(read_size)
+            
+        test_array = np.reshape(np.arange(0, 300 * 200), (300, 200))
+        row_indices = np.sort(np.random.RandomState(1).choice(300, 40, replace=False))
+        column_indices = np.sort(np.random.RandomState(2).choice(200, 30, replace=False))
+        copy_array = np.zeros(shape=(40, 30), dtype=test_array.dtype)
+        for write_slices, read_slices, select_indices in get_copy_pieces((40, 30), (16, 16), [row_indices, column_indices]):
+            copy_array[write_slices] = read_copy_piece(test_array, read_slices, select_indices)
+        assert np.array_equal(copy_array, test_array[row_indices][:, column_indices]), 'Sparse masked copy incorrect'
+
+    def test_copy(self):
+        print('Testing NetCDFUtils.copy with reordered and masked dimensions')
+        nc_path = os.path.join(os.path.dirname(__file__), TestNetCDFUtils.NC_PATH)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            nc_out_path = os.path.join(temp_dir, 'test_copy.nc')
+            netcdf_utils = NetCDFUtils(nc_path)
+            netcdf_utils.max_bytes = 20000
+            lon_mask = np.zeros(shape=(netcdf_utils.netcdf_dataset.dimensions['lon'].size,), dtype=bool)
+            lon_mask[::3] = True
+            lat_order = np.arange(netcdf_utils.netcdf_dataset.dimensions['lat'].size)[::-1]
+
+            netcdf_utils.copy(nc_out_path, dim_mask_dict={'lon': lon_mask}, dim_order_dict={'lat': lat_order}, max_workers=1)
+            assert not os.path.exists(nc_out_path + '.checkpoint.json'), 'Checkpoint not removed after copy'
+
+            with netCDF4.Dataset(nc_path) as input_dataset, netCDF4.Dataset(nc_out_path) as output_dataset:
+                assert np.array_equal(output_dataset.variables['mag_tmi_anomaly'][:],
+                                      input_dataset.variables['mag_tmi_anomaly'][:][lat_order][:, lon_mask]), 'Grid values incorrect'
+                assert np.array_equal(output_dataset.variables['lat'][:], input_dataset.variables['lat'][:][lat_order]), 'Reordered coordinates incorrect'
+        finally:
+            shutil.rmtree(temp_dir)
+            
+    def test_copy_parallel_resume(self):
+        print('Testing NetCDFUtils.copy with worker processes and resume after interruption')
+        nc_path = os.path.join(os.path.dirname(__file__), TestNetCDFUtils.NC_PATH)
+        temp_dir = tempfile.mkdtemp()
+        original_read_copy_piece = _netcdf_utils.read_copy_piece
+        original_checkpoint_interval = NetCDFUtils.COPY_CHECKPOINT_INTERVAL
+        try:
+            NetCDFUtils.COPY_CHECKPOINT_INTERVAL = 0 # Checkpoint after every piece
+            lat_mask = np.zeros(shape=(NetCDFUtils(nc_path).netcdf_dataset.dimensions['lat'].size,), dtype=bool)
+            lat_mask[::2] = True
+            
+            serial_path = os.path.join(temp_dir, 'test_serial.nc')
+            netcdf_utils = NetCDFUtils(nc_path)
+            netcdf_utils.max_bytes = 20000
+            netcdf_utils.copy(serial_path, dim_mask_dict={'lat': lat_mask})
+            assert netcdf_utils.copy_statistics['mag_tmi_anomaly']['pieces'] > 2, 'Too few pieces for test'
+            
+            parallel_path = os.path.join(temp_dir, 'test_parallel.nc')
+            netcdf_utils.copy(parallel_path, dim_mask_dict={'lat': lat_mask}, max_workers=3)
+            
+            # Interrupt copy after a few pieces have been read
+            resume_path = os.path.join(temp_dir, 'test_resume.nc')
+            read_counts = [0]
+            def interrupted_read_copy_piece(input_variable, read_slices, select_indices):
+                read_counts[0] += 1
+                if read_counts[0] > 5:
+                    raise KeyboardInterrupt('Test interruption')
+                return original_read_copy_piece(input_variable, read_slices, select_indices)
+            
+            _netcdf_utils.read_copy_piece = interrupted_read_copy_piece
+            try:
+                netcdf_utils.copy(resume_path, dim_mask_dict={'lat': lat_mask})
+                assert False, 'Copy not interrupted'
+            except KeyboardInterrupt:
+                pass
+            _netcdf_utils.read_copy_piece = original_read_copy_piece
+            assert os.path.isfile(resume_path + '.checkpoint.json'), 'Checkpoint not written for interrupted copy'
+            
+            netcdf_utils.copy(resume_path, dim_mask_dict={'lat': lat_mask}, resume=True)
+            assert sum(variable_statistics['pieces_skipped'] 
+                       for variable_name, variable_statistics in netcdf_utils.copy_statistics.items()
+                       if netcdf_utils.netcdf_dataset.variables[variable_name].shape) == 5, 'Copy not resumed from checkpoint'
+            assert not os.path.exists(resume_path + '.checkpoint.json'), 'Checkpoint not removed after resumed copy'
+            
+            with netCDF4.Dataset(serial_path) as serial_dataset:
+                for output_path in [parallel_path, resume_path]:
+                    with netCDF4.Dataset(output_path) as output_dataset:
+                        for variable_name, variable in serial_dataset.variables.items():
+                            assert np.array_equal(output_dataset.variables[variable_name][:], variable[:]), \
+                                'Variable {} in {} differs from serial copy'.format(variable_name, os.path.basename(output_path))
+        finally:
+            _netcdf_utils.read_copy_piece = original_read_copy_piece
+            NetCDFUtils.COPY_CHECKPOINT_INTERVAL = original_checkpoint_interval
+            shutil.rmtree(temp_dir)
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestNetCDFUtils]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
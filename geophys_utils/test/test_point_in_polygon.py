@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+# 
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+# 
+#        http://www.apache.org/licenses/LICENSE-2.0
+# 
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._point_in_polygon module
+
+Created on 16/10/2026
+"""
+import unittest
+import numpy as np
+from shapely.geometry import Polygon, MultiPolygon, Point
+from geophys_utils._point_in_polygon import points_in_geometry
+
+class TestPointInPolygon(unittest.TestCase):
+    """Unit tests for geophys_utils._point_in_polygon module."""
+    
+    # Square with square hole plus separate triangle
+    TEST_GEOMETRY = MultiPolygon([Polygon([(0, 0), (10, 0), (10, 10), (0, 10)],
+                                          [[(4, 4), (6, 4), (6, 6), (4, 6)]]),
+                                  Polygon([(20, 0), (30, 0), (25, 10)])
+                                  ])
+    
+    def test_points_in_geometry(self):
+        print('Testing points_in_geometry function')
+        test_points = np.array([[1, 1], # In square
+                                [5, 5], # In hole
+                                [25, 5], # In triangle
+                                [21, 9], # In triangle bbox but outside triangle
+                                [15, 5], # Between polygons
+                                [-5, 5], # Outside bbox
+                                [np.nan, np.nan], # Missing coordinates
+                                ])
+        expected_mask = np.array([True, False, True, False, False, False, False])
+        
+        mask = points_in_geometry(test_points, self.TEST_GEOMETRY)
+        assert np.all(mask == expected_mask), 'Incorrect mask {} returned. Expected {}'.format(mask, expected_mask)
+        
+    def test_random_points(self):
+        print('Testing points_in_geometry against shapely for random points')
+        test_points = np.random.default_rng(0).random((10000, 2)) * 40 - 5
+        
+        expected_mask = np.array([Point(point).within(self.TEST_GEOMETRY) for point in test_points])
+        mask = points_in_geometry(test_points, self.TEST_GEOMETRY)
+        assert np.all(mask == expected_mask), '{} points misclassified'.format(np.count_nonzero(mask != expected_mask))
+        
+        assert not np.any(points_in_geometry(np.zeros(shape=(0, 2)), self.TEST_GEOMETRY)), 'Empty point array not handled'
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestPointInPolygon]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
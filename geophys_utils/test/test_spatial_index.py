@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+# 
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+# 
+#        http://www.apache.org/licenses/LICENSE-2.0
+# 
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._spatial_index module
+
+Created on 16/10/2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from scipy.spatial import cKDTree
+from geophys_utils._spatial_index import SpatialIndex, get_hilbert_keys, get_zorder_keys, get_spatial_order
+
+class TestSpatialIndex(unittest.TestCase):
+    """Unit tests for geophys_utils._spatial_index module."""
+    
+    TEST_SOURCE_KEY = {'source': 'test.nc', 'mtime': 0.0, 'size': 0}
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.xycoords = np.random.default_rng(0).random((100000, 2)) * [3.0, 1.0]
+        cls.xycoords[::101] = np.nan # Missing coordinates should never be returned
+        cls.valid_indices = np.where(np.all(np.isfinite(cls.xycoords), axis=1))[0]
+        cls.index_dir = tempfile.mkdtemp()
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.index_dir, ignore_errors=True)
+    
+    def test_save_load(self):
+        print('Testing SpatialIndex save and load')
+        index_path = os.path.join(self.index_dir, 'spatial_index')
+        SpatialIndex.build(self.xycoords, self.TEST_SOURCE_KEY).save(index_path)
+        
+        spatial_index = SpatialIndex.load(index_path, self.TEST_SOURCE_KEY)
+        assert spatial_index is not None, 'Unable to load saved index'
+        assert isinstance(spatial_index.sorted_xy, np.memmap), 'Index arrays not memory-mapped'
+        assert np.allclose(spatial_index.bounds, 
+                           np.concatenate([np.nanmin(self.xycoords, axis=0), np.nanmax(self.xycoords, axis=0)])), 'Incorrect bounds'
+        
+        assert SpatialIndex.load(index_path, dict(self.TEST_SOURCE_KEY, size=1)) is None, 'Stale index loaded'
+    
+    def test_get_bbox_mask(self):
+        print('Testing SpatialIndex.get_bbox_mask')
+        spatial_index = SpatialIndex.build(self.xycoords)
+        for bounds in [[0.5, 0.2, 0.9, 0.3], [-1, -1, 5, 5], [2.9, 0.9, 4, 4], [5, 5, 6, 6]]:
+            expected_mask = np.logical_and(np.logical_and(self.xycoords[:,0] >= bounds[0], self.xycoords[:,0] <= bounds[2]),
+                                           np.logical_and(self.xycoords[:,1] >= bounds[1], self.xycoords[:,1] <= bounds[3]))
+            assert np.all(spatial_index.get_bbox_mask(bounds) == expected_mask), 'Incorrect mask for bounds {}'.format(bounds)
+    
+    def test_nearest(self):
+        print('Testing SpatialIndex.nearest against cKDTree')
+        spatial_index = SpatialIndex.build(self.xycoords)
+        kdtree = cKDTree(self.xycoords[self.valid_indices])
+        query_coords = np.random.default_rng(1).random((20, 2)) * [4.0, 1.5] - 0.2
+        
+        for max_distance in [None, 0.01]:
+            distances, indices = spatial_index.nearest(query_coords, points_required=5, max_distance=max_distance)
+            expected_distances, expected_indices = kdtree.query(query_coords, k=5, distance_upper_bound=max_distance or np.inf)
+            assert np.allclose(distances, expected_distances), 'Incorrect distances for max_distance={}'.format(max_distance)
+            found = np.isfinite(expected_distances)
+            assert np.all(indices[found] == self.valid_indices[expected_indices[found]]), 'Incorrect indices for max_distance={}'.format(max_distance)
+
+    def test_curve_keys(self):
+        print('Testing space-filling curve keys')
+        grid_xy = np.array([[x, y] for y in range(8) for x in range(8)], dtype='float64')
+        
+        hilbert_keys = get_hilbert_keys(grid_xy, bounds=[0, 0, 7, 7], bits=3)
+        assert np.array_equal(np.sort(hilbert_keys), np.arange(64)), 'Hilbert keys not unique'
+        curve_xy = grid_xy[np.argsort(hilbert_keys)]
+        assert np.all(np.sum(np.abs(np.diff(curve_xy, axis=0)), axis=1) == 1), 'Hilbert curve not continuous'
+        
+        assert np.array_equal(get_zorder_keys(grid_xy[[0, 1, 8, 9]], bounds=[0, 0, 7, 7], bits=3), [0, 1, 2, 3]), 'Incorrect Z-order keys'
+        
+        point_order = get_spatial_order(self.xycoords[:1000])
+        assert np.array_equal(np.sort(point_order), np.arange(1000)), 'Spatial order not a permutation'
+        assert not np.any(np.isfinite(self.xycoords[point_order[-10:], 0])), 'Missing coordinates not sorted last'
+
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestSpatialIndex]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
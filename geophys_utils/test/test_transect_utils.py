@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+# 
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+# 
+#        http://www.apache.org/licenses/LICENSE-2.0
+# 
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._transect_utils module
+
+Created on 16/10/2026
+"""
+import unittest
+import math
+import numpy as np
+from geophys_utils._transect_utils import line_length, coords2distance, grouped_coords2distance, sample_polylines
+from geophys_utils._vincenty import vinc_dist
+
+# WGS-84
+A = 6378137.0
+F = 1.0 / 298.257223563
+
+MAX_DISTANCE_ERROR = 0.000001 # metres
+
+class TestTransectUtils(unittest.TestCase):
+    """Unit tests for geophys_utils._transect_utils module."""
+    
+    def get_random_walk(self, point_count=1000, step=1.0, origin=(0.0, 0.0)):
+        random_state = np.random.RandomState(0)
+        return np.array(origin) + np.cumsum(random_state.normal(0.0, step, (point_count, 2)), axis=0)
+    
+    def get_loop_distances(self, coordinate_array):
+        return np.array([0.0] + list(np.cumsum([line_length((coordinate_array[coord_index - 1], coordinate_array[coord_index])) 
+                                               for coord_index in range(1, len(coordinate_array))])))
+    
+    def test_coords2distance(self):
+        print('Testing coords2distance function')
+        coordinate_array = self.get_random_walk()
+        distance_array = coords2distance(coordinate_array)
+        assert distance_array.shape == (len(coordinate_array),), 'Incorrect distance array shape {}'.format(distance_array.shape)
+        assert np.all(np.abs(distance_array - self.get_loop_distances(coordinate_array)) < MAX_DISTANCE_ERROR), 'Incorrect planar distances'
+        
+        assert list(coords2distance(np.array([[0, 0], [3, 4], [3, 4]]))) == [0.0, 5.0, 5.0], 'Incorrect integer coordinate distances'
+        assert list(coords2distance(np.array([[1.0, 2.0]]))) == [0.0], 'Incorrect single coordinate distance'
+        
+    def test_coords2distance_geodesic(self):
+        print('Testing coords2distance function with geodesic distances')
+        coordinate_array = self.get_random_walk(step=0.01, origin=(144.0, -37.0))
+        distance_array = coords2distance(coordinate_array, geodesic=True)
+        expected_distance_array = np.cumsum([0.0] + [vinc_dist(F, A, 
+                                                               math.radians(coordinate_array[coord_index - 1, 1]), 
+                                                               math.radians(coordinate_array[coord_index - 1, 0]), 
+                                                               math.radians(coordinate_array[coord_index, 1]), 
+                                                               math.radians(coordinate_array[coord_index, 0]))[0]
+                                                     for coord_index in range(1, len(coordinate_array))])
+        assert np.all(np.abs(distance_array - expected_distance_array) < MAX_DISTANCE_ERROR), 'Incorrect geodesic distances'
+        
+    def test_grouped_coords2distance(self):
+        print('Testing grouped_coords2distance function')
+        coordinate_array = self.get_random_walk()
+        coordinate_array[100] = np.nan # NaN distances should only affect their own group
+        group_start_indices = [0, 10, 11, 50, 500, 999]
+        
+        distance_array = grouped_coords2distance(coordinate_array, group_start_indices)
+        
+        group_end_indices = group_start_indices[1:] + [len(coordinate_array)]
+        for group_start_index, group_end_index in zip(group_start_indices, group_end_indices):
+            expected_distance_array = self.get_loop_distances(coordinate_array[group_start_index:group_end_index])
+            group_distance_array = distance_array[group_start_index:group_end_index]
+            assert np.array_equal(np.isnan(group_distance_array), np.isnan(expected_distance_array)), 'Incorrect NaN distances'
+            assert np.all(np.abs(np.nan_to_num(group_distance_array - expected_distance_array)) < MAX_DISTANCE_ERROR), 'Incorrect grouped distances'
+        
+    def test_sample_polylines(self):
+        print('Testing sample_polylines function')
+        vertex_array = np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], # Samples carried across vertices
+                                 [0.0, 0.0], # Single vertex - no samples
+                                 [0.0, 0.0], [0.0, 7.0], [3.0, 7.0]])
+        sample_point_array, sample_counts = sample_polylines(vertex_array, [0, 3, 4], 4.0)
+        
+        assert list(sample_counts) == [6, 0, 3], 'Incorrect sample counts {}'.format(sample_counts)
+        expected_sample_point_array = np.array([[0.0, 0.0], [4.0, 0.0], [8.0, 0.0], [10.0, 2.0], [10.0, 6.0], [10.0, 10.0],
+                                                [0.0, 0.0], [0.0, 4.0], [1.0, 7.0]])
+        assert np.all(np.abs(sample_point_array - expected_sample_point_array) < MAX_DISTANCE_ERROR), 'Incorrect sample points {}'.format(sample_point_array)
+        
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestTransectUtils]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
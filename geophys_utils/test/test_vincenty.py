@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+#===============================================================================
+#    Copyright 2017 Geoscience Australia
+# 
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+# 
+#        http://www.apache.org/licenses/LICENSE-2.0
+# 
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#===============================================================================
+"""
+Unit tests for geophys_utils._vincenty module
+
+Created on 16/10/2026
+"""
+import unittest
+import math
+import numpy as np
+from geophys_utils._vincenty import vinc_dist, vinc_pt, vinc_dist_array, vinc_pt_array, GreatCircle
+
+# WGS-84
+A = 6378137.0
+F = 1.0 / 298.257223563
+
+# Flinders Peak to Buninyong sample data from GDA Technical Manual
+FLINDERS_PEAK = (math.radians(-(37 + 57 / 60.0 + 3.72030 / 3600.0)), math.radians(144 + 25 / 60.0 + 29.52440 / 3600.0))
+BUNINYONG = (math.radians(-(37 + 39 / 60.0 + 10.15610 / 3600.0)), math.radians(143 + 55 / 60.0 + 35.38390 / 3600.0))
+SAMPLE_DISTANCE = 54972.271
+SAMPLE_AZIMUTH = math.radians(306 + 52 / 60.0 + 5.37 / 3600.0)
+
+MAX_DISTANCE_ERROR = 0.000001 # metres
+MAX_ANGLE_ERROR = 1.0e-12 # radians
+
+class TestVincenty(unittest.TestCase):
+    """Unit tests for geophys_utils._vincenty module."""
+    
+    def get_random_points(self, point_count=1000):
+        random_state = np.random.RandomState(0)
+        return (np.radians(random_state.uniform(-80.0, 80.0, point_count)),
+                np.radians(random_state.uniform(-180.0, 180.0, point_count)),
+                np.radians(random_state.uniform(-80.0, 80.0, point_count)),
+                np.radians(random_state.uniform(-180.0, 180.0, point_count)) / 2.0
+                )
+    
+    def test_vinc_dist_array(self):
+        print('Testing vinc_dist_array function')
+        s, alpha12, _alpha21 = vinc_dist_array(F, A, FLINDERS_PEAK[0], FLINDERS_PEAK[1], BUNINYONG[0], BUNINYONG[1])
+        assert abs(s - SAMPLE_DISTANCE) < 0.001, 'Incorrect sample distance {}'.format(s)
+        assert abs(alpha12 - SAMPLE_AZIMUTH) < 1.0e-6, 'Incorrect sample azimuth {}'.format(alpha12)
+        
+        phi1, lembda1, phi2, lembda2 = self.get_random_points()
+        phi2[0:10] = phi1[0:10] # Coincident points
+        lembda2[0:10] = lembda1[0:10]
+        
+        array_results = vinc_dist_array(F, A, phi1, lembda1, phi2, lembda2)
+        scalar_results = np.array([vinc_dist(F, A, *point_values) for point_values in zip(phi1, lembda1, phi2, lembda2)]).T
+        
+        assert np.all(np.abs(array_results[0] - scalar_results[0]) < MAX_DISTANCE_ERROR), 'Array distances differ from scalar distances'
+        for result_index in [1, 2]:
+            assert np.all(np.abs(array_results[result_index] - scalar_results[result_index]) < MAX_ANGLE_ERROR), 'Array azimuths differ from scalar azimuths'
+            
+    def test_vinc_pt_array(self):
+        print('Testing vinc_pt_array function')
+        phi1, lembda1, phi2, lembda2 = self.get_random_points()
+        s, alpha12, _alpha21 = vinc_dist_array(F, A, phi1, lembda1, phi2, lembda2)
+        
+        array_results = vinc_pt_array(F, A, phi1, lembda1, alpha12, s)
+        scalar_results = np.array([vinc_pt(F, A, *point_values) for point_values in zip(phi1, lembda1, alpha12, s)]).T
+        
+        for result_index in range(3):
+            assert np.all(np.abs(array_results[result_index] - scalar_results[result_index]) < MAX_ANGLE_ERROR), 'Array results differ from scalar results'
+            
+        # Round trip back to second points (limited by convergence tolerance over long lines)
+        assert np.all(np.abs(array_results[0] - phi2) < 1.0e-7), 'Projected latitudes differ from original latitudes'
+        longitude_differences = np.abs(array_results[1] - lembda2) % (2.0 * math.pi) # Allow for wrapping
+        assert np.all(np.minimum(longitude_differences, 2.0 * math.pi - longitude_differences) < 1.0e-7), 'Projected longitudes differ from original longitudes'
+        
+    def test_great_circle_points(self):
+        print('Testing GreatCircle.points function')
+        great_circle = GreatCircle(A, A * (1.0 - F), 
+                                   math.degrees(FLINDERS_PEAK[1]), math.degrees(FLINDERS_PEAK[0]),
+                                   math.degrees(BUNINYONG[1]), math.degrees(BUNINYONG[0]))
+        lons, lats = great_circle.points(11)
+        assert len(lons) == len(lats) == 11, 'Incorrect number of points'
+        
+        distances = vinc_dist_array(F, A, np.radians(lats[:-1]), np.radians(lons[:-1]), np.radians(lats[1:]), np.radians(lons[1:]))[0]
+        assert np.all(np.abs(distances - SAMPLE_DISTANCE / 10.0) < 0.001), 'Points not equally spaced: {}'.format(distances)
+        
+
+# Define test suites
+def test_suite():
+    """Returns a test suite of all the tests in this module."""
+
+    test_classes = [TestVincenty]
+
+    suite_list = map(unittest.defaultTestLoader.loadTestsFromTestCase,
+                     test_classes)
+
+    suite = unittest.TestSuite(suite_list)
+
+    return suite
+
+
+# Define main function
+def main():
+    unittest.TextTestRunner(verbosity=2).run(test_suite())
+
+if __name__ == '__main__':
+    main()
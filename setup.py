@@ -41,12 +41,14 @@ setup(name='geophys_utils',
       scripts=(['bin/csw_find',
                 'bin/rechunk',
                 'bin/aseg2nc',
+                'bin/aseg2nc_batch',
                 'bin/nc2aseg',
                 ]
                if (os.name == 'posix')
                else (['bin\\csw_find.bat',
                       'bin\\rechunk.bat',
                       'bin\\aseg2nc.bat',
+                      'bin\\aseg2nc_batch.bat',
                       'bin\\nc2aseg.bat',
                       ] 
                      if (os.name == 'nt')